@@ -7,6 +7,7 @@ import websocket
 from typing import Dict, Any, Optional, List, Callable
 from libs import log
 from libs.caches.trades_cache import Cache
+from libs.trade_batcher import TradeBatcher
 from libs.structs.trade_struct import TradeStruct
 from libs.structs.exchange_struct import ExchangeStruct
 from libs.database_ohlcv import Database, DatabaseOHLCV
@@ -40,6 +41,7 @@ class WebSocket:
         self.cache_ticker_reply: int = 0
         self.cache_my_trade_reply: int = 0
         self.cache_order_reply: int = 0
+        self.trade_batcher = TradeBatcher(exchange="bitmex")
 
     def __del__(self):
         self.stop()
@@ -73,6 +75,7 @@ class WebSocket:
 
     def stop(self) -> None:
         """Close the WebSocket connection."""
+        self.trade_batcher.stop()
         if self.client:
             self.client.close()
         self.client = None
@@ -413,6 +416,7 @@ class WebSocket:
     def on_trade(self, message: Dict[str, Any]) -> None:
         """Handle trade messages."""
         data = message.get('data', [])
+        by_symbol: Dict[str, List[Dict[str, Any]]] = {}
         for trade in data:
             symbol = self.replace_symbol(symbol=trade.get('symbol'))
             trade_data = {
@@ -423,13 +427,11 @@ class WebSocket:
                 'symbol': symbol,
                 'order': trade.get('trdMatchID')
             }
-            with Cache() as store:
-                res = store.push_trade_list(
-                    symbol=trade_data['symbol'],
-                    exchange="bitmex",
-                    trade=trade_data
-                )
-            self.cache_trade_reply = res
+            by_symbol.setdefault(symbol, []).append(trade_data)
+        for symbol, trades in by_symbol.items():
+            self.trade_batcher.add(symbol=symbol, trades=trades)
+        if by_symbol:
+            self.cache_trade_reply = 1
 
     def on_order(self, message: Dict[str, Any]) -> None:
         """Handle order messages."""
@@ -456,6 +458,7 @@ class WebSocket:
     def on_ticker(self, message: Dict[str, Any]) -> None:
         """Handle ticker messages."""
         data = message.get('data', [])
+        store = Cache.shared()
         for instrument in data:
             ticker_data = {
                 'price': instrument.get('lastPrice'),
@@ -468,12 +471,11 @@ class WebSocket:
                     symbol = self._markets[symbol]
                 except KeyError:
                     pass
-                with Cache() as store:
-                    res = store.update_ticker(
-                        symbol=symbol,
-                        exchange="bitmex",
-                        data=ticker_data
-                    )
+                res = store.update_ticker(
+                    symbol=symbol,
+                    exchange="bitmex",
+                    data=ticker_data
+                )
                 self.cache_ticker_reply = res
 
     def get_subscribed_tickers(self) -> List[str]:
@@ -4,6 +4,7 @@ from kraken_wsclient_py import kraken_wsclient_py
 import arrow
 from libs import log
 from libs.caches.trades_cache import Cache
+from libs.trade_batcher import TradeBatcher
 from libs.structs.trade_struct import TradeStruct
 from libs.structs.exchange_struct import ExchangeStruct
 from twisted.internet import reactor
@@ -41,6 +42,7 @@ class WebSocket:
         self.subscribed_trades: list = []
         self.cache_trade_reply = 0
         self.cache_ticker_reply = 0
+        self.trade_batcher = TradeBatcher(exchange="kraken")
 
     def __del__(self):
         self.clean_up()
@@ -71,6 +73,7 @@ class WebSocket:
         Returns:
             None
         """
+        self.trade_batcher.stop()
         if self.client:
             try:
                 self.client.close()  # Close the WebSocket connection
@@ -83,6 +86,7 @@ class WebSocket:
         """
         shots down twisted, necessary for proper shutdown.
         """
+        self.trade_batcher.stop()
         try:
             logger.warning("WebSocket for kraken has been closed, you will need to start a new one on different process")
             reactor.stop()
@@ -305,10 +309,10 @@ class WebSocket:
             except KeyError:
                 pass
 
-            with Cache() as store:
-                _ = store.update_ticker(symbol=symbol,
-                                          exchange="kraken",
-                                          data=ticker_data)
+            store = Cache.shared()
+            _ = store.update_ticker(symbol=symbol,
+                                    exchange="kraken",
+                                    data=ticker_data)
             self.cache_ticker_reply = 1
 
     def on_trade(self, message: Dict[str, Any]) -> None:
@@ -329,25 +333,20 @@ class WebSocket:
             trades = data[1]
             subscription = data[2]
             symbol = data[3]
-
+            try:
+                symbol = self._markets[symbol]
+            except KeyError:
+                pass
+            trade_list = []
             for trade in trades:
-                trade_data = {
+                trade_list.append({
                     'price': trade[0],
                     'volume': trade[1],
                     'time': arrow.get(float(trade[2])).format("YYYY-MM-DD HH:mm:ss.SSS"),
                     'side': trade[3],
                     'order_type': trade[4]
-                }
-                try:
-                    symbol = self._markets[symbol]
-                except KeyError:
-                    pass
-                with Cache() as store:
-                    """ i want to save on redis list """
-                    _ = store.push_trade_list(
-                                        symbol=symbol,
-                                        exchange="kraken",
-                                        trade=trade_data)
+                })
+            self.trade_batcher.add(symbol=symbol, trades=trade_list)
             self.cache_trade_reply = 1
 
     def on_my_trade(self, message: Dict[str, Any]):
@@ -4,7 +4,8 @@ This is a command line tool for managing persea
 """
 from __future__ import unicode_literals, print_function
 import sys
-from typing import List
+import argparse
+from typing import List, Optional
 from prompt_toolkit import PromptSession, print_formatted_text, HTML
 from prompt_toolkit.key_binding import KeyBindings
 from prompt_toolkit.history import FileHistory
@@ -20,6 +21,8 @@ from libs.simulator_prompts import Prompts
 from libs.database import start as start_database, stop as stop_database
 from libs.database_ohlcv import start as start_ohlcv, stop as stop_ohlcv
 from libs.simul_launcher import simulator
+from libs.simul_cluster import serve
+from setproctitle import setproctitle
 
 
 bindings = KeyBindings()
@@ -35,10 +38,29 @@ BOT = {"bot_id": "00000000-0000-0000-0000-000000000006",
        "params": params2}
 '''
 
-start_database()
-start_ohlcv()
-simulator.start()
-PROMPTS = Prompts()
+PROMPTS: Optional[Prompts] = None
+
+
+def start() -> None:
+    """Starts the databases, the simulator workers and the prompts."""
+    global PROMPTS
+    start_database()
+    start_ohlcv()
+    simulator.start()
+    PROMPTS = Prompts()
+
+
+def worker(address: str) -> None:
+    """
+    Runs simulation workers for the simulator listening on address,
+    host:port, until interrupted.
+    """
+    setproctitle("Fullon simulator workers")
+    start_database()
+    try:
+        serve(address=address)
+    finally:
+        stop_database()
 
 
 def launch(argv: List[str]) -> None:
@@ -73,6 +95,8 @@ def launch(argv: List[str]) -> None:
             PROMPTS.load_simul()
             clear()
             print("\nSimulation loaded successfully.")
+        case 'cache':
+            PROMPTS.simul_cache(action=argv[2] if len(argv) > 2 else '')
         case 'help':
             print_help()
         case _:
@@ -92,6 +116,7 @@ def print_help() -> None:
     <b>run</b> Run simulation,
     <b>save</b> Save simulation,
     <b>load</b> Load Simulation,
+    <b>cache</b> Show cached simulation results, <b>cache clear</b> to invalidate them,
     <b>help</b>
     """
     print_formatted_text(HTML(helpstr))
@@ -122,7 +147,8 @@ def sim_exit():
 
 def main() -> None:
     """Main routine for the command-line tool."""
-    commands = ['users', 'bots', 'strat', 'feeds', 'params', 'run', 'save', 'load', 'help']
+    start()
+    commands = ['users', 'bots', 'strat', 'feeds', 'params', 'run', 'save', 'load', 'cache', 'help']
     completer = WordCompleter(commands, ignore_case=True)
     fig = figlet_format('Fullon Simulator', font='larry3d', width=120)
     print_colored_line('=', 'blue')
@@ -182,4 +208,11 @@ def main() -> None:
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Fullon Simulator")
+    parser.add_argument("--worker", metavar="host:port",
+                        help="run simulation workers for the simulator listening on host:port (SIMUL_LISTEN)")
+    args = parser.parse_args()
+    if args.worker:
+        worker(address=args.worker)
+    else:
+        main()
\ No newline at end of file
@@ -5,18 +5,22 @@ from __future__ import (
     unicode_literals
 )
 import sys
+import copy
 import time
 import importlib
 import arrow
 import backtrader as bt
-from libs import cache, log, strategy
+from libs import cache, log, settings, strategy
 from libs.database import Database
 from libs.database_ohlcv import Database as Database_ohlcv
 from libs.btrader.fullonbroker import FullonBroker
 from libs.btrader.basebroker import BaseBroker
 from libs.btrader.fullonresampler import FullonFeedResampler
 from libs.btrader.observers import CashInterestObserver
-from typing import Optional, Any, Tuple
+from libs.simul_cache import SimulCache, source_digest
+from libs.strategy.indicator_cache import IndicatorCache, indicator_params
+from libs.vector_backtest import FAMILIES, VectorBacktest
+from typing import Optional, Any, Dict, Tuple
 from setproctitle import setproctitle
 
 FEED_CLASSES = {
@@ -54,9 +58,14 @@ class Bot:
             self.start_time = arrow.utcnow()
             self.pre_load_bars = 0
             self.str_params = self._str_set_params(dbase=dbase)
+            self._base_str_params = {str_id: dict(params) for str_id, params in self.str_params.items()}
             self.cache = cache.Cache()
             self.str_feeds = self._set_feeds(dbase=dbase)
+            self._base_str_feeds = copy.deepcopy(self.str_feeds)
             self.noise = False
+            self.noise_path = None
+            self.indicator_cache = False
+            self.sweep = None
             if not self.str_feeds:
                 logger.error(
                     "__init__: It is not possible to run a simulation without feeds")
@@ -158,6 +167,18 @@ class Bot:
             ret_params[param['str_id']] = param
         return ret_params
 
+    def reset_simul(self) -> None:
+        """
+        Puts the params, feeds and results back as __init__ left them, so
+        the same Bot can run another simulation without reloading from the
+        database.
+        """
+        self.str_params = {str_id: dict(params) for str_id, params in self._base_str_params.items()}
+        self.str_feeds = copy.deepcopy(self._base_str_feeds)
+        self.simulresults = {str_id: {} for str_id in self.str_feeds.keys()}
+        self.noise = False
+        self.noise_path = None
+
     def extend_str_params(self, str_id: int, test_params: dict) -> None:
         """
         Extend the strategy parameters with additional test parameters.
@@ -474,7 +495,8 @@ class Bot:
                        warm_up: int = 0,
                        event: bool = False,
                        noise: bool = False,
-                       fee: float = 0.0015) -> dict:
+                       fee: float = 0.0015,
+                       noise_path: Optional[Tuple[int, int, int]] = None) -> dict:
         """
         Run a simulation loop.
 
@@ -483,6 +505,8 @@ class Bot:
         :param test_params: A dictionary containing test parameters. Defaults to an empty dictionary.
         :param warm_up: Warm-up period for the simulation. Defaults to 0.
         :param event: A flag indicating whether it's an event. Defaults to False.
+        :param noise_path: (seed, paths, path) of the Monte Carlo path to run with noise,
+            see libs.montecarlo. Without it noise is drawn for this run only.
         :return: Simulation results or an error message.
         """
         if not self.id:
@@ -499,6 +523,7 @@ class Bot:
         broker = self.get_broker(dry=True, mult=leverage, fee=fee)
         cerebro.setbroker(broker)
         self.noise = noise
+        self.noise_path = noise_path if noise else None
         self._load_strategies(cerebro=cerebro, event=event)
         main_str_id = list(self.str_params.keys())[0]
         cerebro.addobserver(CashInterestObserver, interest_rate=0.00, main_str_id=main_str_id)
@@ -506,6 +531,22 @@ class Bot:
             return {}
         if not self._pair_feeds(cerebro=cerebro):
             return {}
+        # Noise without a Monte Carlo path makes every run different and
+        # visual runs are wanted for the plot
+        simul_cache = SimulCache()
+        cache_key = None
+        if simul_cache.enabled and (not noise or self.noise_path) and not visual:
+            cache_key = self._simul_key(cerebro=cerebro, feeds=feeds, warm_up=warm_up,
+                                        event=event, leverage=leverage, fee=fee)
+            results = simul_cache.get(cache_key)
+            if results is not None:
+                return results
+        if getattr(settings, "SIMUL_VECTOR", False) and not (noise or visual or event):
+            results = self._run_vector(cerebro=cerebro, broker=broker, leverage=leverage, fee=fee)
+            if results is not None:
+                if cache_key:
+                    simul_cache.put(cache_key, results)
+                return results
         r = []
         try:
             r = cerebro.run(live=True)
@@ -537,8 +578,105 @@ class Bot:
                                                        "ending_assets": cerebro.broker.getvalue(),
                                                        "interest_earned": interests})
         del cerebro
+        if cache_key:
+            simul_cache.put(cache_key, self.simulresults)
         return self.simulresults
 
+    def _run_vector(self, cerebro: bt.Cerebro, broker: bt.brokers.BackBroker,
+                    leverage: int, fee: float) -> Optional[dict]:
+        """
+        Runs the simulation loaded in cerebro with VectorBacktest instead of
+        backtrader. Only for a bot with one strategy of a FAMILIES family
+        over two feeds whose indicators_df is already in the IndicatorCache
+        of the sweep, a backtrader run with the same indicator params puts
+        it there.
+
+        Returns:
+            dict: simulresults as the backtrader run leaves them, None when
+            the simulation has to go through backtrader.
+        """
+        if not self.indicator_cache or len(self.str_params) != 1 or len(cerebro.datas) != 2:
+            return None
+        str_id, params = next(iter(self.str_params.items()))
+        family = FAMILIES.get(params['cat_name'])
+        if family is None:
+            return None
+        strategy_class = cerebro.strats[0][0][0]
+        params = {**dict(strategy_class.params._getitems()), **params}  # pylint: disable=protected-access
+        ticks, bars = [data.source_frame() for data in cerebro.datas]
+        if ticks is None or ticks.empty or bars is None or bars.empty:
+            return None
+        cache = IndicatorCache(sweep=self.sweep)
+        signals = cache.cached(cache.key(strategy_class=strategy_class,
+                                         params=indicator_params(params),
+                                         frames=[ticks, bars]))
+        if signals is None:
+            return None
+        engine = VectorBacktest(ticks=ticks,
+                                bars=bars,
+                                signals=signals,
+                                bar_size_minutes=cerebro.datas[1].bar_size_minutes,
+                                futures=cerebro.datas[0].feed.futures,
+                                fee=fee,
+                                leverage=leverage,
+                                cash=broker.startingcash,
+                                **family)
+        trades = engine.run(take_profit=params.get('take_profit'),
+                            stop_loss=params.get('stop_loss'),
+                            trailing_stop=params.get('trailing_stop'),
+                            timeout=params.get('timeout'),
+                            size=params.get('size'),
+                            size_pct=params.get('size_pct'))
+        params = self.str_params[str_id]
+        params.pop('helper', None)
+        params.pop('pre_load_bars', None)
+        params.pop('cat_str_id', None)
+        strategy_name = params.pop('cat_name')
+        results = engine.simulresults(trades,
+                                      detail={"strategy": strategy_name, "params": params},
+                                      feeds=len(self.str_feeds[str_id]))
+        for num, feed in enumerate(self.str_feeds[str_id]):
+            results[num][-1]["feed"] = feed
+        self.simulresults[str_id] = results
+        return self.simulresults
+
+    def _simul_key(self, cerebro: bt.Cerebro, feeds: dict, warm_up: int,
+                   event: bool, leverage: int, fee: float) -> str:
+        """
+        SimulCache key of the simulation about to run in cerebro, once its
+        feeds are loaded. Each feed is keyed by the candles it will run on
+        and noisy runs by their Monte Carlo (seed, paths, path).
+        """
+        sources = [source_digest(strat[0][0]) for strat in cerebro.strats]
+        feed_keys = [feeds]
+        for data in cerebro.datas:
+            feed_keys.append((data.feed.exchange_name, data.symbol, data.feed.period,
+                              data.compression, str(data.p.fromdate), data.data_digest()))
+        return SimulCache.key(sources=sources, params=self.str_params, feeds=feed_keys,
+                              bot_id=self.id, bars=self.bars, warm_up=warm_up, event=event,
+                              leverage=leverage, fee=fee, noise_path=self.noise_path)
+
+    def sweep_inputs(self) -> Dict[str, Any]:
+        """
+        What every simulation of a sweep of this bot depends on besides its
+        params: the source of the strategies and the feeds, with the last
+        candle of each in the OHLCV database.
+        """
+        sources = []
+        for params in self.str_params.values():
+            module = importlib.import_module(
+                'strategies.' + params['cat_name'] + '.strategy',
+                package='Strategy')
+            sources.append(source_digest(module.Strategy))
+        feeds = []
+        for str_id, str_feeds in self.str_feeds.items():
+            for feed in str_feeds:
+                with Database_ohlcv(exchange=feed.exchange_name, symbol=feed.symbol) as dbase:
+                    latest = dbase.get_latest_timestamp()
+                feeds.append((str_id, feed.exchange_name, feed.symbol, feed.period,
+                              feed.compression, str(latest)))
+        return {'sources': sources, 'feed_data': feeds}
+
     def _load_live_feeds(self, cerebro: bt.Cerebro):
         """
         Loads the feeds into the cerebro instance for backtesting.
@@ -568,13 +706,16 @@ class Bot:
                 feed_module, feed_class_name = feed_class.rsplit(".", 1)
                 FeedClass = getattr(importlib.import_module(feed_module), feed_class_name)
                 if timeframe == bt.TimeFrame.Ticks:
+                    # tick_throttle, milliseconds, can be set per bot in
+                    # its strategy params, TICK_THROTTLE_MS otherwise
                     data = FeedClass(feed=feed,
                                      timeframe=1,
                                      compression=1,
                                      helper=self,
                                      fromdate=fromdate,
                                      fromdate2=fromdate2,
-                                     mainfeed=None)
+                                     mainfeed=None,
+                                     tick_throttle=self.str_params[str_id].get('tick_throttle'))
                     cerebro.adddata(data, name=f'{index}')
                     try:
                         feed_map[feed.exchange_name].update({feed.symbol: data})
@@ -0,0 +1,244 @@
+"""
+Streaming bar aggregation for the live resampled feeds.
+
+The trade websockets publish every batch of trades they push to the cache on
+next_trades:{exchange}:{symbol}. A BarAggregator folds those trades into
+time buckets the same way the time_bucket_gapfill query of the OHLCV
+database does (first/max/min/last price, summed volume, previous bar carried
+forward when a bucket has no trades), so closed bars can be appended
+without querying TimescaleDB. Buckets the aggregator did not see from their
+start, before it subscribed or while the subscription was down, are left to
+the database.
+
+Bars are kept in a BarRing, preallocated column arrays the feed dataframe is
+a view of.
+"""
+import json
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import arrow
+import numpy
+import pandas
+from libs import log
+
+logger = log.fullon_logger(__name__)
+
+COLUMNS = ("open", "high", "low", "close", "volume")
+# time_bucket origin, buckets are aligned to 2000-01-03 00:00 UTC (a Monday)
+ORIGIN_US = 946_857_600_000_000
+MIN_CAPACITY = 1024
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def trade_us(value: Any) -> int:
+    """
+    Microseconds since epoch of a trade time, naive times are UTC.
+    """
+    try:
+        stamp = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        stamp = arrow.get(value).datetime
+    if stamp.tzinfo is None:
+        stamp = stamp.replace(tzinfo=timezone.utc)
+    delta = stamp - EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+class BarRing():
+    """
+    Preallocated float columns, OHLCV by default, with a DataFrame view over
+    the filled rows.
+
+    When the arrays are full the newest half is copied to new arrays and the
+    oldest rows are dropped, so appending is amortized O(1) and frames taken
+    earlier keep their data.
+
+    Args:
+        capacity (int): Rows to allocate, at least MIN_CAPACITY.
+        utc (bool): Whether frame() returns a UTC aware index.
+        columns (Sequence[str]): Column names.
+    """
+
+    def __init__(self, capacity: int, utc: bool, columns: Sequence[str] = COLUMNS) -> None:
+        self.capacity = max(int(capacity), MIN_CAPACITY)
+        self.utc = utc
+        self.size = 0
+        self.names = tuple(columns)
+        self.stamps = numpy.empty(self.capacity, dtype=numpy.int64)
+        self.columns = {col: numpy.empty(self.capacity, dtype=numpy.float64) for col in self.names}
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _make_room(self, rows: int) -> None:
+        if self.size + rows <= self.capacity:
+            return
+        keep = min(self.size, self.capacity // 2)
+        capacity = max(self.capacity, keep + rows)
+        stamps = numpy.empty(capacity, dtype=numpy.int64)
+        stamps[:keep] = self.stamps[self.size - keep:self.size]
+        for col in self.names:
+            column = numpy.empty(capacity, dtype=numpy.float64)
+            column[:keep] = self.columns[col][self.size - keep:self.size]
+            self.columns[col] = column
+        self.stamps = stamps
+        self.capacity = capacity
+        self.size = keep
+
+    def extend(self, stamps: numpy.ndarray, columns: Dict[str, numpy.ndarray]) -> None:
+        """
+        Appends rows, stamps in microseconds since epoch.
+        """
+        rows = len(stamps)
+        if not rows:
+            return
+        self._make_room(rows)
+        end = self.size + rows
+        self.stamps[self.size:end] = stamps
+        for col in self.names:
+            self.columns[col][self.size:end] = columns[col]
+        self.size = end
+
+    def extend_frame(self, frame: pandas.DataFrame) -> None:
+        """
+        Appends the rows of a dataframe holding the ring columns.
+        """
+        if frame.empty:
+            return
+        index = frame.index
+        if index.tz is None:
+            index = index.tz_localize("UTC")
+        self.extend(index.as_unit("us").asi8,
+                    {col: frame[col].to_numpy(dtype=numpy.float64) for col in self.names})
+
+    def last_stamp(self) -> int:
+        return int(self.stamps[self.size - 1])
+
+    def last_bar(self) -> Tuple[float, float, float, float]:
+        """
+        Open, high, low and close of the newest row.
+        """
+        pos = self.size - 1
+        return tuple(float(self.columns[col][pos]) for col in COLUMNS[:4])
+
+    def frame(self, start: int = 0) -> pandas.DataFrame:
+        """
+        DataFrame over the filled rows from start on, sharing memory with
+        the ring.
+        """
+        index = pandas.DatetimeIndex(self.stamps[start:self.size].view("datetime64[us]"),
+                                     name="date", copy=False)
+        if self.utc:
+            index = index.tz_localize("UTC")
+        return pandas.DataFrame({col: self.columns[col][start:self.size] for col in self.names},
+                                index=index, copy=False)
+
+
+class BarAggregator():
+    """
+    Folds published trades into buckets of bucket_us microseconds.
+
+    add_trades runs on the ticker hub thread and close on the feed thread,
+    both under a lock.
+
+    Attributes:
+        since (int): Start of the first bucket seen from its start, buckets
+            before it must come from the database.
+        closed (int): End of the last bucket closed, trades before it
+            arrived too late and are counted in late.
+    """
+
+    def __init__(self, bucket_us: int, now_us: int) -> None:
+        self.bucket = bucket_us
+        self.since = 0
+        self.closed = 0
+        self.late = 0
+        self._bars: Dict[int, List[float]] = {}
+        self._lock = threading.Lock()
+        self.reset(now_us)
+
+    def bucket_start(self, stamp_us: int) -> int:
+        return stamp_us - (stamp_us - ORIGIN_US) % self.bucket
+
+    def reset(self, now_us: int) -> None:
+        """
+        Drops what was aggregated so far, trades may have been missed up to
+        now_us. Only buckets starting at now_us or later are kept.
+        """
+        start = self.bucket_start(now_us)
+        with self._lock:
+            self._bars.clear()
+            self.since = start if start == now_us else start + self.bucket
+
+    def add(self, stamp_us: int, price: float, volume: float) -> None:
+        key = self.bucket_start(stamp_us)
+        if key < self.since:
+            return
+        if key < self.closed:
+            self.late += 1
+            return
+        bar = self._bars.get(key)
+        if bar is None:
+            self._bars[key] = [stamp_us, price, price, price, stamp_us, price, volume]
+            return
+        first, _, high, low, last, _, _ = bar
+        if stamp_us < first:
+            bar[0], bar[1] = stamp_us, price
+        if price > high:
+            bar[2] = price
+        if price < low:
+            bar[3] = price
+        if stamp_us >= last:
+            bar[4], bar[5] = stamp_us, price
+        bar[6] += volume
+
+    def add_trades(self, data: Any) -> None:
+        """
+        Adds a batch of trades as published by push_trades_list.
+        """
+        trades = json.loads(data)
+        with self._lock:
+            for trade in trades:
+                self.add(trade_us(trade['time']), float(trade['price']), float(trade['volume']))
+
+    def close(self, first: int, end: int,
+              previous: Tuple[float, float, float, float]) -> Tuple[numpy.ndarray, Dict[str, numpy.ndarray]]:
+        """
+        Closes the buckets starting in [first, end), first >= since.
+
+        Buckets without trades repeat previous (open, high, low, close),
+        like LOCF in the gapfill query, with 0 volume.
+
+        Returns:
+            Tuple: The bucket starts and the OHLCV columns, for BarRing.extend.
+        """
+        starts = numpy.arange(first, end, self.bucket, dtype=numpy.int64)
+        values = numpy.empty((len(starts), 5), dtype=numpy.float64)
+        bar = list(previous) + [0.0]
+        with self._lock:
+            for num, start in enumerate(starts.tolist()):
+                seen = self._bars.pop(start, None)
+                if seen is not None:
+                    bar = [seen[1], seen[2], seen[3], seen[5], seen[6]]
+                else:
+                    bar = bar[:4] + [0.0]
+                values[num] = bar
+            for start in [start for start in self._bars if start < end]:
+                del self._bars[start]
+            self.closed = max(self.closed, end)
+            late, self.late = self.late, 0
+        if late:
+            logger.warning("%s trades arrived after their bar was closed and were left out, "
+                           "RESAMPLER_CLOSE_DELAY may be too short", late)
+        return starts, {col: values[:, num] for num, col in enumerate(COLUMNS)}
+
+
+def bucket_microseconds(period: str, compression: int) -> Optional[int]:
+    """
+    Bucket length of a period, None for periods without a fixed length.
+    """
+    seconds = {'minutes': 60, 'hours': 3600, 'days': 86400, 'weeks': 604800}.get(period)
+    if not seconds:
+        return None
+    return int(compression) * seconds * 1_000_000
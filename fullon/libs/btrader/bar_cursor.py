@@ -0,0 +1,98 @@
+"""
+Array backed bar queue for the backtest feeds.
+"""
+from typing import List
+import numpy
+import pandas
+
+COLUMNS = ["open", "high", "low", "close", "volume"]
+# toordinal() of 1970-01-01, backtrader date numbers count days from year 1
+EPOCH_ORDINAL = 719163
+DAY_US = 86_400_000_000
+
+
+def date2num(stamps_us: numpy.ndarray) -> numpy.ndarray:
+    """
+    Vectorized bt.date2num for UTC microsecond timestamps.
+    """
+    days, rest = numpy.divmod(stamps_us, DAY_US)
+    return (EPOCH_ORDINAL + days).astype(numpy.float64) + rest / DAY_US
+
+
+class BarCursor():
+    """
+    Read cursor over the bars of a feed dataframe.
+
+    Stands in for the deque of rows the feeds pop bars from (popleft, len,
+    indexing) but keeps the bars as arrays and an integer position. Date
+    numbers and float64 columns are computed once here, so feeding a bar is
+    an index read, and skipping ahead is a position change found with a
+    binary search on the timestamps instead of rebuilding the queue.
+    """
+
+    def __init__(self, dataframe: pandas.DataFrame) -> None:
+        self.dates = dataframe.index
+        stamps_us = dataframe.index.as_unit("us").asi8
+        # seconds since epoch, naive dates taken as UTC like arrow.get does
+        self.stamps = stamps_us / 1_000_000
+        self.datenums = date2num(stamps_us)
+        self.open, self.high, self.low, self.close, self.volume = [
+            numpy.ascontiguousarray(dataframe[col].to_numpy(dtype=numpy.float64)) for col in COLUMNS]
+        self.pos = 0
+
+    def __len__(self) -> int:
+        return len(self.stamps) - self.pos
+
+    def __bool__(self) -> bool:
+        return self.pos < len(self.stamps)
+
+    def __getitem__(self, key: int) -> List:
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("BarCursor index out of range")
+        return self.row(self.pos + key)
+
+    def row(self, num: int) -> List:
+        """
+        Bar num as a [date, open, high, low, close, volume] row.
+        """
+        return [self.dates[num], float(self.open[num]), float(self.high[num]),
+                float(self.low[num]), float(self.close[num]), float(self.volume[num])]
+
+    def popleft(self) -> List:
+        """
+        Returns the next bar and moves past it.
+        """
+        if self.pos >= len(self.stamps):
+            raise IndexError("pop from an empty BarCursor")
+        self.pos += 1
+        return self.row(self.pos - 1)
+
+    def advance(self) -> int:
+        """
+        Moves past the next bar and returns its position.
+        """
+        pos = self.pos
+        if pos >= len(self.stamps):
+            raise IndexError("pop from an empty BarCursor")
+        self.pos = pos + 1
+        return pos
+
+    def last_stamp(self) -> float:
+        """
+        Timestamp of the last bar, in seconds.
+        """
+        return float(self.stamps[-1])
+
+    def index_at(self, stamp: float) -> int:
+        """
+        Position of the last bar at or before stamp (seconds), -1 if none.
+        """
+        return int(numpy.searchsorted(self.stamps, stamp, side="right")) - 1
+
+    def seek(self, num: int) -> None:
+        """
+        Moves the cursor so that bar num is the next one popped.
+        """
+        self.pos = max(0, min(num, len(self.stamps)))
@@ -0,0 +1,127 @@
+"""
+First touch search over the close prices of an event feed.
+"""
+from typing import Callable, Tuple
+import numpy
+
+
+class EventIndex():
+    """
+    Answers "first bar in [start, end] where the close crosses a level" and
+    trailing stop hits without slicing the feed dataframe.
+
+    Keeps a pyramid of block maxima and minima over the closes: level k holds
+    the max/min of the aligned blocks of 2**k bars, 2n values per side in
+    total. A search skips whole blocks that cannot contain a hit and only
+    descends into the ones that might, so a query costs O(log^2 n) instead
+    of O(bars between start and the hit).
+
+    Args:
+        stamps (numpy.ndarray): Bar timestamps in seconds, ascending.
+        close (numpy.ndarray): Close price of every bar.
+    """
+
+    def __init__(self, stamps: numpy.ndarray, close: numpy.ndarray) -> None:
+        self.stamps = stamps
+        self.close = numpy.ascontiguousarray(close, dtype=numpy.float64)
+        self.maxima = [self.close]
+        self.minima = [self.close]
+        while len(self.maxima[-1]) > 1:
+            top, bottom = self.maxima[-1], self.minima[-1]
+            size = len(top) // 2 * 2
+            self.maxima.append(numpy.maximum(top[0:size:2], top[1:size:2]))
+            self.minima.append(numpy.minimum(bottom[0:size:2], bottom[1:size:2]))
+
+    def position(self, stamp: float) -> int:
+        """
+        First bar at or after stamp (seconds).
+        """
+        return int(numpy.searchsorted(self.stamps, stamp, side="left"))
+
+    def last_position(self, stamp: float) -> int:
+        """
+        Last bar at or before stamp (seconds), -1 if none.
+        """
+        return int(numpy.searchsorted(self.stamps, stamp, side="right")) - 1
+
+    def _search(self, start: int, end: int, skip: Callable[[int, int], bool]) -> int:
+        """
+        First bar in [start, end] that skip(0, bar) rejects.
+
+        skip(level, block) must return True only if no bar of the block is a
+        hit, and be exact on level 0. It is called on blocks in bar order and
+        every block it accepts is jumped over.
+        """
+        pos = start
+        top = len(self.maxima) - 1
+        while pos <= end:
+            level = 0
+            while level < top and pos % (2 << level) == 0 and pos + (2 << level) - 1 <= end:
+                level += 1
+            while level >= 0 and not skip(level, pos >> level):
+                level -= 1
+            if level < 0:
+                return pos
+            pos += 1 << level
+        return -1
+
+    def first_above(self, start: int, end: int, level: float, inclusive: bool = False) -> int:
+        """
+        First bar in [start, end] closing above level (at or above if
+        inclusive), -1 if none.
+        """
+        maxima = self.maxima
+        if inclusive:
+            return self._search(start, end, lambda lvl, block: maxima[lvl][block] < level)
+        return self._search(start, end, lambda lvl, block: maxima[lvl][block] <= level)
+
+    def first_below(self, start: int, end: int, level: float, inclusive: bool = False) -> int:
+        """
+        First bar in [start, end] closing below level (at or below if
+        inclusive), -1 if none.
+        """
+        minima = self.minima
+        if inclusive:
+            return self._search(start, end, lambda lvl, block: minima[lvl][block] > level)
+        return self._search(start, end, lambda lvl, block: minima[lvl][block] >= level)
+
+    def trailing_stop(self, start: int, end: int, price: float,
+                      percent: float, long: bool) -> Tuple[int, float]:
+        """
+        First bar in [start, end] that hits a trailing stop.
+
+        The stop starts at price on the first bar; from there on it trails the
+        running max (long) or min (short) of the closes since start by
+        percent. A long is hit when a close is below the stop of the bar
+        before, a short when it is above it.
+
+        Returns:
+            Tuple[int, float]: The bar and the stop level on it, or
+            (-1, price) if the stop is not hit.
+        """
+        if start > end:
+            return -1, price
+        factor = (1 - percent / 100) if long else (1 + percent / 100)
+        first = self.close[start]
+        if (long and first < price) or (not long and first > price):
+            return start, first * factor
+        extreme = first
+        maxima, minima = self.maxima, self.minima
+
+        def skip(lvl: int, block: int) -> bool:
+            nonlocal extreme
+            high, low = maxima[lvl][block], minima[lvl][block]
+            if long:
+                if low >= max(extreme, high) * factor:
+                    extreme = max(extreme, high)
+                    return True
+            elif high <= min(extreme, low) * factor:
+                extreme = min(extreme, low)
+                return True
+            return False
+
+        pos = self._search(start + 1, end, skip)
+        if pos < 0:
+            return -1, price
+        close = self.close[pos]
+        return pos, (max(extreme, close) if long else min(extreme, close)) * factor
@@ -6,12 +6,12 @@ from __future__ import (
     division,
     print_function,
     unicode_literals)
-import itertools
-from collections import deque
 import pandas
 import arrow
 import backtrader as bt
 from libs.btrader.fullonsimfeed import FullonSimFeed
+from libs.btrader.bar_cursor import BarCursor
+from libs.btrader.event_index import EventIndex
 from typing import Tuple, Optional, Union
 from libs.database_ohlcv import Database as Database_ohclv
 
@@ -25,6 +25,7 @@ class FullonEventFeed(FullonSimFeed):
     timeout = 0
     trailing_stop = None
     razor_dates = []
+    event_index = None
 
     def _load(self):
         """Description"""
@@ -76,77 +77,51 @@ class FullonEventFeed(FullonSimFeed):
                 search for the event.
             limit (str, optional): The end of the time range in which to search
                 for the event.   Defaults to the next timeout.
+
+        The search runs on the EventIndex over the feed closes, no dataframe
+        slice is taken.
+
         Returns:
             arrow: The timestamp of the first occurrence of the event
             within the specified time range.
         """
-        if not limit:
-            alimit = self._next_timeout(cur_time=cur_ts)
-        cur_ts = pandas.to_datetime(cur_ts.format('YYYY-MM-DD HH:mm:ss'))
-        limit = pandas.to_datetime(alimit.format('YYYY-MM-DD HH:mm:ss'))
-        #self._razor_dataframe(timestamp=cur_ts)
-        df_ohlcv = self.dataframe.loc[cur_ts:limit].copy()
-        #df_ohlcv = self._fetch_ohlcv_as_df(start=cur_ts, end=alimit)
+        alimit = arrow.get(limit) if limit else self._next_timeout(cur_time=cur_ts)
+        index = self._get_event_index()
+        start = index.position(cur_ts.int_timestamp)
+        end = index.last_position(alimit.int_timestamp)
+        hit = -1
         match event:
             case "take_profit":
                 if self.pos > 0:
-                    date_ohlcv = df_ohlcv.loc[df_ohlcv['close'] >= price]
+                    hit = index.first_above(start, end, price, inclusive=True)
                 else:
-                    date_ohlcv = df_ohlcv.loc[df_ohlcv['close'] < price]
+                    hit = index.first_below(start, end, price)
             case "stop_loss":
                 if self.pos > 0:  # Stoping a Long
-                    date_ohlcv = df_ohlcv.loc[df_ohlcv['close'] <= price]
+                    hit = index.first_below(start, end, price, inclusive=True)
                 else:  # stoping a short
-                    date_ohlcv = df_ohlcv.loc[df_ohlcv['close'] > price]
+                    hit = index.first_above(start, end, price)
             case "trailing_stop":
-                date_ohlcv = self._trailing_stop(df_ohlcv=df_ohlcv.copy(), price=price)
-                try:
-                    price = date_ohlcv['TrailingStop'].iloc[0]
-                except (IndexError, UnboundLocalError):
-                    pass
-        try:
-            return_date = arrow.get(date_ohlcv.index[0])
-        except (IndexError, UnboundLocalError):
-            # return_date = arrow.get(self.params.mainfeed.result[-2][0])
+                hit, price = index.trailing_stop(start, end, price,
+                                                 percent=self.trailing_stop,
+                                                 long=self.pos > 0)
+        if hit >= 0:
+            return_date = arrow.get(float(index.stamps[hit]))
+        else:
             # pylint-disable: no-member
             return_date = arrow.get(bt.num2date(self.last_moments))
             if alimit < return_date:
                 return_date = alimit
         return (return_date, price)
 
-    def _trailing_stop(self, df_ohlcv: pandas.DataFrame, price: float) -> pandas.DataFrame:
+    def _get_event_index(self) -> EventIndex:
         """
-        Calculate and return a DataFrame with trailing stop information.
-
-        Parameters:
-        df_ohlcv (pandas.DataFrame): Input DataFrame with OHLCV data.
-        price (float): The initial price used for calculating the trailing stop.
-
-        Returns:
-        pandas.DataFrame: The original DataFrame with additional columns for
-        running max/min, trailing stop, and previous trailing stop. It also filters
-        the rows based on whether the close price is lower/higher than the previous trailing stop.
+        Search index over the closes of the feed, built on first use.
         """
-        if self.pos > 0:  # Trailing stop for a Long position
-            df_ohlcv.loc[:, 'RunningMax'] = df_ohlcv.loc[:, 'close'].expanding().max()
-            df_ohlcv.loc[:, 'TrailingStop'] = df_ohlcv.loc[:, 'RunningMax'] * (1 - self.trailing_stop/100)
-        else:  # Trailing stop for a Short position
-            df_ohlcv.loc[:, 'RunningMin'] = df_ohlcv.loc[:, 'close'].expanding().min()
-            df_ohlcv.loc[:, 'TrailingStop'] = df_ohlcv.loc[:, 'RunningMin'] * (1 + self.trailing_stop/100)
-
-
-        # Get the previous time's TrailingStop
-        df_ohlcv.loc[:, 'PreviousTrailingStop'] = df_ohlcv['TrailingStop'].shift(1)
-
-        # Set the initial stop loss
-        df_ohlcv.loc[df_ohlcv.index[0], 'PreviousTrailingStop'] = price
-
-        # Filter rows based on the comparison of 'close' and 'PreviousTrailingStop'
-        if self.pos > 0:  # If Long
-            df_ohlcv = df_ohlcv[df_ohlcv['close'] < df_ohlcv['PreviousTrailingStop']]
-        else:  # If Short
-            df_ohlcv = df_ohlcv[df_ohlcv['close'] > df_ohlcv['PreviousTrailingStop']]       
-        return df_ohlcv
+        if self.event_index is None:
+            cursor = BarCursor(self.dataframe)
+            self.event_index = EventIndex(stamps=cursor.stamps, close=cursor.close)
+        return self.event_index
 
     def get_max_price(self, start: arrow.Arrow, end: arrow.Arrow) -> Tuple[float, arrow.Arrow]:
         """
@@ -176,22 +151,18 @@ class FullonEventFeed(FullonSimFeed):
         min_price_row = df_ohlcv.loc[df_ohlcv['close'].idxmin()]
         return min_price_row['close'], arrow.get(min_price_row.name)
 
-    @staticmethod
-    def _slice_deque(ddeque: deque, start: int, stop: int) -> deque:
+    def _make_result(self) -> BarCursor:
         """
-        Given a deque, rotate the deque to the left by the given start
-        position, slice the deque from start to stop
-        and return the sliced deque.
+        Builds the bar cursor and the search index over its closes.
         """
-        ddeque.rotate(-start)
-        mslice = list(itertools.islice(ddeque, 0, stop - start))
-        mslice.pop()
-        return deque(mslice)
+        cursor = super()._make_result()
+        self.event_index = EventIndex(stamps=cursor.stamps, close=cursor.close)
+        return cursor
 
     def _load_ohlcv(self):
         """Description"""
-        one_row = self._jump_to_next_event()
-        self._load_ohlcv_line(one_row=one_row)
+        self._jump_to_next_event()
+        self._load_bar(self.result)
         if len(self.result) == 0:
             self._empty_bar()
         return True
@@ -222,38 +193,31 @@ class FullonEventFeed(FullonSimFeed):
                 self.dataframe = self.dataframe.loc[razor_date:]
                 break
 
-    def _jump_to_next_event(self) -> Optional[list]:
+    def _jump_to_next_event(self) -> None:
         """
         Determine the next event and jump to it.
         Sometimes this means we do a single step, which is necessary when
         opening and closing a position.
 
-        Returns:
-        list: The next event in the queue, or an empty list if the queue is empty.
+        The jump is a binary search on the bar timestamps for the last bar at
+        or before event_timeout, the bars in between are skipped by moving the
+        cursor. The next bar popped from self.result is the one to load.
         """
-        # Read the first event in the list
-        # Initialize steps to 0
-        steps = 0
-        event = self.result.popleft()
-        if not self.event_timeout:
-            return event
-        if self.event_timeout.timestamp() < arrow.get(event[0]).timestamp():
-            return event
-        steps = (self.event_timeout.timestamp() -
-                 arrow.get(event[0]).timestamp()) / self.time_factor
-        # Get the size of the result_tick list
-        size = len(self.result)
-        # because we poped an element to the list, we need to account for it.
-        # we use int to round down a float. Steps must be int.
-        steps = int(steps) - 1
-        if steps <= 0:
-            return event
-        # compression({self._compression}) event({event[0]}) last_event {self.result[-1][0]}")
-        if size <= steps:
-            return event
+        bars = self.result
+        if not self.event_timeout or not bars:
+            return
+        timeout = self.event_timeout.timestamp()
+        if timeout < bars.stamps[bars.pos]:
+            return
+        # A timeout past the end of the feed leaves the feed stepping bar by bar
+        if timeout >= bars.last_stamp() + self.time_factor:
+            return
+        # Jump to the last bar at or before the timeout, unless that is the next one anyway
+        target = bars.index_at(timeout)
+        if target <= bars.pos + 1:
+            return
         self.event_timeout = None
-        self.result = self._slice_deque(self.result, steps, size + 1)
-        return self.result.popleft() if self.result else []
+        bars.seek(target)
 
     def _fetch_ohlcv_as_df(self,
                            start: Union[str, arrow.Arrow],
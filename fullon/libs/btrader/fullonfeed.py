@@ -12,9 +12,14 @@ from backtrader.feed import DataBase
 import backtrader as bt
 import arrow
 from libs.database_ohlcv import Database as DataBase_ohclv
-from libs import cache
+from libs.btrader.bar_cursor import BarCursor
+from libs.btrader.tick_stream import TickStream, LatencyHistogram
+from libs import cache, settings, log
+import redis
 import time
 
+logger = log.fullon_logger(__name__)
+
 
 class FullonFeed(DataBase):
     """
@@ -40,6 +45,8 @@ class FullonFeed(DataBase):
         _ST_OVER (int): The state value for the finished data state.
         _state (int): The current state of the data feed.
         feed2 (object): Another instance of the data feed object.
+        tick_stream (TickStream): Ticker subscription of the live feed.
+        tick_latency (LatencyHistogram): Exchange to strategy latency of live ticks.
 
     Methods:
         __init__: Initializes a new instance of the FullonFeed class.
@@ -47,6 +54,8 @@ class FullonFeed(DataBase):
         start: Starts the data feed.
         _load: Loads data from the database.
         _fetch_tick: Fetches tick data from the cache.
+        _get_tick_stream: Gets the ticker subscription of a live feed.
+        record_tick_latency: Records the latency of the last live tick.
         _get_table: Gets the table name for the data feed.
         get_last_date: Gets the last timestamp for the data feed.
         _load_ticks: Loads tick data.
@@ -69,6 +78,7 @@ class FullonFeed(DataBase):
         ('fromdate2', ''),
         ('compression', 0),
         ('timeframe', bt.TimeFrame.Ticks),
+        ('tick_throttle', None),
     )
 
     _ST_LIVE: int = 0
@@ -82,6 +92,9 @@ class FullonFeed(DataBase):
     last_moments: Optional[float] = None
     bar_size_minutes: int = 0
     ismainfeed = False
+    tick_stream: Optional[TickStream] = None
+    tick_latency: Optional[LatencyHistogram] = None
+    _tick_time: Optional[float] = None
 
     def __init__(self):
         """
@@ -159,10 +172,39 @@ class FullonFeed(DataBase):
             case 'weeks':
                 self.bar_size_minutes = self.compression*24*60*7
 
+    def _get_tick_stream(self) -> Optional[TickStream]:
+        """
+        Subscribes to the ticker channel of the feed on first use.
+
+        Returns:
+            TickStream: The subscription, None if TICK_STREAM is off or it
+            can't be opened, in which case the feed polls the cache.
+        """
+        if self.tick_stream is None and getattr(settings, "TICK_STREAM", True):
+            stream = TickStream(exchange=self.feed.exchange_name,
+                                symbol=self.symbol,
+                                throttle=self.params.tick_throttle)  # pylint: disable=E1101
+            try:
+                stream.start()
+            except redis.RedisError as error:
+                logger.warning("Bot %s can't subscribe to tickers, polling instead: %s",
+                               self.bot_id, str(error))
+                return None
+            self.tick_stream = stream
+            self.tick_latency = LatencyHistogram()
+        if self.tick_stream and self.tick_stream.alive:
+            return self.tick_stream
+        return None
+
     def _fetch_tick(self, rest: float = 1.0) -> Any:
         """
         Fetches tick data from the cache.
 
+        Waits on the ticker subscription and returns as soon as a ticker is
+        published. If none is published within TICK_HEARTBEAT seconds the
+        last stored ticker is read instead, so the strategy keeps running on
+        quiet markets. Without a subscription the cache is polled.
+
         Args:
             rest (float): The time to rest between requests.
 
@@ -170,6 +212,14 @@ class FullonFeed(DataBase):
             tuple: A tuple containing the tick data.
         """
         try:
+            stream = self._get_tick_stream()
+            if stream:
+                tick = stream.next_tick(timeout=getattr(settings, "TICK_HEARTBEAT", 1.0) or 1.0)
+                if tick:
+                    price, self._tick_time = tick
+                    utc_now = arrow.utcnow().format('YYYY-MM-DD HH:mm:ss.SSS')
+                    return (utc_now, price, price, price, price, price)
+                rest = 0
             with cache.Cache() as mem:
                 res = mem.get_ticker(exchange=self.feed.exchange_name,
                                      symbol=self.symbol)
@@ -178,11 +228,38 @@ class FullonFeed(DataBase):
             if res[0] == 0:
                 time.sleep(1)
                 return self._fetch_tick(rest=rest+rest)
+            self._tick_time = None
             res = (utc_now, res[0], res[0], res[0], res[0], res[0])
             return res
         except KeyboardInterrupt:
             return None
 
+    def record_tick_latency(self) -> None:
+        """
+        Adds the time from the exchange timestamp of the last pushed tick
+        to now to tick_latency, once per tick. Called from the strategy
+        next(), logs a summary every TICK_LATENCY_LOG ticks.
+        """
+        if self._tick_time is None or self.tick_latency is None:
+            return
+        self.tick_latency.add((time.time() - self._tick_time) * 1000)
+        self._tick_time = None
+        every = getattr(settings, "TICK_LATENCY_LOG", 1000) or 0
+        if every and self.tick_latency.count % every == 0:
+            logger.info("Bot %s %s tick latency: %s", self.bot_id, self.symbol,
+                        self.tick_latency.summary())
+
+    def stop(self) -> None:
+        """
+        Stops the data feed and closes its ticker subscription.
+        """
+        DataBase.stop(self)
+        if self.tick_stream:
+            self.tick_stream.stop()
+            logger.info("Bot %s %s tick latency: %s (%s coalesced)", self.bot_id, self.symbol,
+                        self.tick_latency.summary(), self.tick_stream.coalesced)
+            self.tick_stream = None
+
     def _get_table(self) -> str:
         """
         Gets the table name for the data feed.
@@ -305,6 +382,29 @@ class FullonFeed(DataBase):
         self.lines.volume[num] = float(one_row[5])
         self.lines.openinterest[num] = 0
 
+    def _load_bar(self, bars: BarCursor, num: int = 0) -> None:
+        """
+        Loads the next bar of an array backed queue into the data feed.
+
+        Same as _load_ohlcv_line, but date numbers and float columns were
+        computed when the bars were loaded, so this is only index reads.
+        params.fromdate is left at the start of the feed, bars.dates holds
+        the date of every bar.
+
+        Args:
+            bars (BarCursor): The bars, the cursor moves past the loaded one.
+            num (int): The index of the row to load (default: 0).
+        """
+        pos = bars.advance()
+        lines = self.lines
+        lines.datetime[num] = bars.datenums[pos]
+        lines.open[num] = bars.open[pos]
+        lines.high[num] = bars.high[pos]
+        lines.low[num] = bars.low[pos]
+        lines.close[num] = bars.close[pos]
+        lines.volume[num] = bars.volume[pos]
+        lines.openinterest[num] = 0
+
     def _load_ohlcv(self) -> bool:
         """
         Loads OHLCV data into the data feed.
@@ -3,13 +3,27 @@ from backtrader.feed import DataBase
 import backtrader as bt
 from pandas_ta.volatility import pdist
 from libs.database_ohlcv import Database as DataBase_ohclv
+from libs.btrader.bar_aggregator import BarAggregator, BarRing, bucket_microseconds
+from libs.caches.tick_cache import TickerHub
+from libs import settings, log
 import arrow
-from typing import Any
+import redis
+from typing import Any, Optional, Union
 import numpy as np
 
+logger = log.fullon_logger(__name__)
+
 
 class FullonFeedResampler:
-    """ this class can prepare DataBase resampled feed to add mehtods aparameters """
+    """ this class can prepare DataBase resampled feed to add mehtods aparameters
+
+    In live mode closed bars are built in process by a BarAggregator from the
+    trades published on next_trades:{exchange}:{symbol} and appended to a
+    BarRing the feed dataframe is a view of. TimescaleDB is queried for the
+    warm up and for bars the aggregator did not see whole (startup,
+    reconnections), or for every bar when RESAMPLER_STREAM is off or the
+    feed reads from candles instead of trades.
+    """
 
     _data: DataBase
     _period: str
@@ -17,6 +31,11 @@ class FullonFeedResampler:
     delta_time: int
     bars: int
     bar_size_minutes: int = 0
+    _ring: Optional[BarRing] = None
+    _aggregator: Optional[BarAggregator] = None
+    _hub: Optional[TickerHub] = None
+    _resets: int = 0
+    _delay_us: int = 1_000_000
 
     def prepare(self,
                 data: DataBase,
@@ -54,6 +73,7 @@ class FullonFeedResampler:
         # Wrap the originalnext method and set the wrapped version as an attribute of data
         original_next = data.next
         setattr(data, 'next', self._custom_next(original_next))
+        setattr(data, 'stop', self._custom_stop(data.stop))
         bar_size = self._set_bar_size(timeframe=timeframe, compression=compression)
         setattr(data, 'bar_size_minutes', bar_size)
         self._period = self._get_timeframe(self._data.timeframe)
@@ -79,58 +99,140 @@ class FullonFeedResampler:
         to_date = arrow.utcnow()
         with DataBase_ohclv(exchange=self._data.exchange,
                             symbol=self._data.symbol) as dbase:
-            rows = dbase.fetch_ohlcv(table=self._data._table,
-                                     compression=self._data.compression,
-                                     period=self._period,
-                                     fromdate=arrow.get(fromdate).datetime,  # Convert fromdate string to datetime
-                                     todate=to_date.datetime)
+            dataframe = dbase.fetch_ohlcv_df(table=self._data._table,
+                                             compression=self._data.compression,
+                                             period=self._period,
+                                             fromdate=arrow.get(fromdate).datetime,  # Convert fromdate string to datetime
+                                             todate=to_date.datetime)
 
-        last_date = arrow.get(rows[-1][0])
+        last_date = arrow.get(dataframe.index[-1])
         if to_date > last_date:
-            del rows[-1]
-        self._data.dataframe = self._create_dataframe(rows=rows)
+            dataframe = dataframe.iloc[:-1]
+        dataframe = self._create_dataframe(rows=dataframe)
+        if dataframe.empty:
+            self._data.dataframe = dataframe
+            return
+        capacity = getattr(settings, "RESAMPLER_RING_SIZE", 0) or 2 * len(dataframe)
+        self._ring = BarRing(capacity=capacity, utc=dataframe.index.tz is not None)
+        self._ring.extend_frame(dataframe)
+        self._data.dataframe = self._ring.frame()
+        self._start_aggregator()
 
-    def append_row(self) -> None:
+    def _start_aggregator(self) -> None:
         """
-        Appends a new row of OHLCV (Open, High, Low, Close, Volume) data to the internal DataFrame.
-
-        This method calculates the appropriate time range for the new data row, fetches the corresponding
-        OHLCV data from the database, and appends it to the internal DataFrame. The method ensures that
-        the new data is only appended if the current time is beyond the 'to_date' of the OHLCV data, 
-        indicating that the latest period has completed and new data is available.
+        Starts aggregating the published trades of the feed symbol, unless
+        RESAMPLER_STREAM is off or the feed has no trades table.
+        """
+        bucket = bucket_microseconds(self._period, self._data.compression)
+        if not bucket or not self._data._table.endswith(".trades"):
+            return
+        if not getattr(settings, "RESAMPLER_STREAM", True):
+            return
+        try:
+            self._hub = TickerHub.get()
+        except redis.RedisError as error:
+            logger.warning("Can't subscribe to %s trades, bars come from the database: %s",
+                           self._data.symbol, str(error))
+            return
+        self._resets = self._hub.resets
+        self._delay_us = self._close_delay()
+        self._aggregator = BarAggregator(bucket_us=bucket, now_us=self._now_us())
+        self._hub.add_callback(self._channel(), self._aggregator.add_trades)
+        # Trades published before the subscription are missed, only the
+        # buckets starting after it are whole.
+        self._aggregator.reset(self._now_us())
+
+    def _channel(self) -> str:
+        return f"next_trades:{self._data.exchange}:{self._data.symbol}"
+
+    def stop(self) -> None:
         """
+        Stops aggregating trades, bars come from the database again.
+        """
+        if self._aggregator is not None:
+            self._hub.remove_callback(self._channel(), self._aggregator.add_trades)
+            self._aggregator = None
 
-        # Calculate the 'from_date' for the new data row.
-        # This is based on the last date in the DataFrame, shifted by 'delta_time' minutes.
-        # 'delta_time' represents the time interval of each OHLCV data point.
-        from_date = arrow.get(self._data.dataframe.index[-1]).shift(minutes=self.delta_time)
+    def _close_delay(self) -> int:
+        """
+        RESAMPLER_CLOSE_DELAY in microseconds, raised to twice the trade
+        flush interval of the exchange when that is longer, trades batched
+        by the websocket would otherwise come after their bar closed.
+        """
+        delay = float(getattr(settings, "RESAMPLER_CLOSE_DELAY", 1) or 0)
+        flush = 2 * float(getattr(settings, f"{self._data.exchange}_TRADE_FLUSH_MS".upper(), 0) or 0) / 1000
+        if flush > delay:
+            logger.warning("RESAMPLER_CLOSE_DELAY of %ss is below the %s trade flush interval, using %ss",
+                           delay, self._data.exchange, flush)
+            delay = flush
+        return int(delay * 1_000_000)
+
+    @staticmethod
+    def _now_us() -> int:
+        return int(arrow.utcnow().timestamp() * 1_000_000)
 
-        # Calculate the 'to_date' for the new data row.
-        # This is 'from_date' shifted by 'delta_time' minutes, minus one microsecond,
-        # to accurately represent the closing time of the OHLCV data.
-        to_date = arrow.get(from_date).shift(minutes=self.delta_time, microseconds=-1)
+    def append_row(self) -> None:
+        """
+        Appends the bars that closed since the last one of the internal
+        DataFrame.
 
-        # Check if the current time is before 'to_date'.
-        # If it is, the latest OHLCV period has not completed, so we do not append new data yet.
-        if arrow.utcnow() < to_date:
+        Bars the aggregator saw from their start are taken from it, earlier
+        ones are fetched from the database in one query. A bar is closed
+        RESAMPLER_CLOSE_DELAY seconds after its end (see _close_delay), so
+        trades still in flight make it in.
+        """
+        if self._ring is None:
             return
-
-        # Fetch the new OHLCV data row from the database for the time range between 'from_date' and 'to_date'.
+        if self._aggregator is None:
+            self._append_from_database()
+            return
+        if self._hub.resets != self._resets:
+            self._resets = self._hub.resets
+            self._aggregator.reset(self._now_us())
+        due = self._aggregator.bucket_start(self._now_us() - self._delay_us)
+        first = self._ring.last_stamp() + self._aggregator.bucket
+        if first >= due:
+            return
+        if first < self._aggregator.since:
+            repair = min(self._aggregator.since, due)
+            self._ring.extend_frame(self._fetch_bars(fromdate=first, todate=repair))
+            first = repair
+        if first < due:
+            self._ring.extend(*self._aggregator.close(first=first, end=due,
+                                                      previous=self._ring.last_bar()))
+        self._data.dataframe = self._ring.frame()
+
+    def _fetch_bars(self, fromdate: int, todate: int) -> pd.DataFrame:
+        """
+        Bars starting in [fromdate, todate), microseconds since epoch.
+        """
+        start = arrow.get(fromdate / 1_000_000)
         with DataBase_ohclv(exchange=self._data.exchange, symbol=self._data.symbol) as dbase:
-            rows = dbase.fetch_ohlcv(table=self._data._table,
-                                     compression=self._data.compression,
-                                     period=self._period,
-                                     fromdate=from_date,
-                                     todate=to_date)
-
-        # Extract the OHLCV values from the fetched data.
-        # The first element of the row contains the timestamp, and the next five elements are OHLCV.
-        next_date = arrow.get(rows[0][0]).format('YYYY-MM-DD HH:mm:ss')
-        ohlcv_values = rows[0][1:6]
-
-        # Append the new OHLCV data to the internal DataFrame.
-        # The new data is indexed by the 'next_date' and contains the OHLCV values.
-        self._data.dataframe.loc[next_date, ['open', 'high', 'low', 'close', 'volume']] = ohlcv_values
+            dataframe = dbase.fetch_ohlcv_df(table=self._data._table,
+                                             compression=self._data.compression,
+                                             period=self._period,
+                                             fromdate=start.datetime,
+                                             todate=arrow.get(todate / 1_000_000).shift(microseconds=-1).datetime)
+        if dataframe.empty:
+            return dataframe
+        stamps = dataframe.index if dataframe.index.tz else dataframe.index.tz_localize("UTC")
+        return dataframe[stamps.as_unit("us").asi8 >= fromdate]
+
+    def _append_from_database(self) -> None:
+        """
+        Fetches the bar that follows the last one of the internal DataFrame
+        once it has closed.
+        """
+        # The next bar starts 'delta_time' minutes after the last one and
+        # has closed once the current time is past its end.
+        from_date = arrow.get(self._data.dataframe.index[-1]).shift(minutes=self.delta_time)
+        to_date = from_date.shift(minutes=self.delta_time)
+        if arrow.utcnow() < to_date.shift(microseconds=-1):
+            return
+        rows = self._fetch_bars(fromdate=int(from_date.timestamp() * 1_000_000),
+                                todate=int(to_date.timestamp() * 1_000_000))
+        self._ring.extend_frame(rows.iloc[:1])
+        self._data.dataframe = self._ring.frame()
 
     def _custom_next(self, original_next):
         """
@@ -146,6 +248,19 @@ class FullonFeedResampler:
             return result
         return wrapper
 
+    def _custom_stop(self, original_stop):
+        """
+        Wraps the stop method of the data feed to stop aggregating trades
+        along with it.
+
+        :param original_stop: The original stop method of the data feed.
+        :return: The wrapped stop method.
+        """
+        def wrapper(*args, **kwargs):
+            original_stop()
+            self.stop()
+        return wrapper
+
     def _get_table(self, exchange, symbol) -> str:
         """
         Gets the table name for the data feed.
@@ -178,7 +293,7 @@ class FullonFeedResampler:
         }
         return period_map[period]
 
-    def _create_dataframe(self, rows: list) -> pd.DataFrame:
+    def _create_dataframe(self, rows: Union[list, pd.DataFrame]) -> pd.DataFrame:
         """
         Creates a DataFrame from a list of OHLCV data rows.
 
@@ -188,25 +303,28 @@ class FullonFeedResampler:
         delta between the last two data points to determine the interval of the OHLCV data.
 
         Args:
-            rows (list): A list of lists, where each inner list contains OHLCV data.
+            rows (list): A list of lists, where each inner list contains OHLCV data,
+                or a DataFrame already built by fetch_ohlcv_df.
 
         Returns:
             pd.DataFrame: A DataFrame containing the OHLCV data with a datetime index.
         """
-
-        # Create a DataFrame from the provided rows
-        dataframe = pd.DataFrame(rows)
-
-        # Rename columns for readability and set the 'date' column as the index
-        dataframe.rename(columns={0: "date", 1: "open", 2: "high", 3: "low", 4: "close", 5: "volume"}, inplace=True)
-        dataframe.set_index("date", inplace=True)
-
-        # Convert all columns except 'date' to numeric values
-        columns_to_convert = dataframe.columns.difference(['date'])
-        dataframe[columns_to_convert] = dataframe[columns_to_convert].apply(pd.to_numeric)
-
-        # Convert the index to datetime format
-        dataframe.index = pd.to_datetime(dataframe.index)
+        if isinstance(rows, pd.DataFrame):
+            dataframe = rows
+        else:
+            # Create a DataFrame from the provided rows
+            dataframe = pd.DataFrame(rows)
+
+            # Rename columns for readability and set the 'date' column as the index
+            dataframe.rename(columns={0: "date", 1: "open", 2: "high", 3: "low", 4: "close", 5: "volume"}, inplace=True)
+            dataframe.set_index("date", inplace=True)
+
+            # Convert all columns except 'date' to numeric values
+            columns_to_convert = dataframe.columns.difference(['date'])
+            dataframe[columns_to_convert] = dataframe[columns_to_convert].apply(pd.to_numeric)
+
+            # Convert the index to datetime format
+            dataframe.index = pd.to_datetime(dataframe.index)
 
         # Calculate the time delta between the last two data points
         # This is used to determine the interval of the OHLCV data
@@ -7,20 +7,74 @@ from __future__ import (
     print_function,
     unicode_literals)
 import os
-from collections import deque
+from collections import OrderedDict
 import pandas
 import numpy as np
 import backtrader as bt
 import arrow
 from libs.btrader.fullonfeed import FullonFeed
+from libs.btrader.bar_cursor import BarCursor
 from libs.database_ohlcv import Database as Database_ohlcv
+from libs.candle_store import CandleStore
+from libs.montecarlo import NoisePaths
+from libs.strategy.indicator_cache import frame_digest
 from libs import settings, log
-from typing import Optional
+from typing import Any, Callable, Optional, Union
 import time
 
 # from libs import settings
 logger = log.fullon_logger(__name__)
 
+# Candles already loaded by this process, the simulations of a sweep load
+# the same feed ranges over and over. Frames here are shared, never mutate.
+_CANDLES: OrderedDict = OrderedDict()
+_CANDLES_MAX = 16
+# Where candles missing from _CANDLES come from, load_candles unless the
+# process is a remote simulation worker getting them from its coordinator.
+CANDLE_SOURCE: Optional[Callable[..., pandas.DataFrame]] = None
+
+
+def load_candles(exchange: str, symbol: str, table: str, compression: int, period: str,
+                 fromdate: Any, todate: arrow.Arrow) -> pandas.DataFrame:
+    """
+    Reads the range up to todate from the candle store or the database.
+    """
+    store = CandleStore(table=table, compression=compression, period=period)
+    with Database_ohlcv(exchange=exchange, symbol=symbol) as dbase:
+        def fetch(fromdate, todate):
+            return dbase.fetch_ohlcv_df(table=table,
+                                        compression=compression,
+                                        period=period,
+                                        fromdate=fromdate,
+                                        todate=todate)
+        if not store.supported:
+            return fetch(fromdate, todate.datetime)
+        latest = dbase.get_latest_timestamp(table2=table)
+        return store.load(fromdate=fromdate,
+                          todate=todate.datetime,
+                          fetch=fetch,
+                          latest=latest)
+
+
+def candles(exchange: str, symbol: str, table: str, compression: int, period: str,
+            fromdate: Any, todate: arrow.Arrow) -> pandas.DataFrame:
+    """
+    The candles of a feed range, from memory if this process loaded them
+    before. Shared with later loads of the same range, never mutate.
+    """
+    key = (exchange, symbol, table, compression, period, str(fromdate), str(todate))
+    if key in _CANDLES:
+        _CANDLES.move_to_end(key)
+        return _CANDLES[key]
+    dataframe = (CANDLE_SOURCE or load_candles)(exchange=exchange, symbol=symbol, table=table,
+                                                compression=compression, period=period,
+                                                fromdate=fromdate, todate=todate)
+    if dataframe is not None and not dataframe.empty:
+        _CANDLES[key] = dataframe
+        while len(_CANDLES) > _CANDLES_MAX:
+            _CANDLES.popitem(last=False)
+    return dataframe
+
 
 class FullonSimFeed(FullonFeed):
     """ Fullon Sim for step by step simul, very slow but reliable """
@@ -30,6 +84,8 @@ class FullonSimFeed(FullonFeed):
     dataframe = None
     MAX_TRADE_MINUTES = 525600  # bars
     noise = False
+    noise_path = None
+    base_dataframe = None
 
     def _load(self):
         """Description"""
@@ -50,19 +106,22 @@ class FullonSimFeed(FullonFeed):
             seconds=-self.time_factor)
         self.last_moments = bt.date2num(self.last_moments.datetime)
         self.noise = self.helper.noise
+        self.noise_path = getattr(self.helper, 'noise_path', None)
         seed_value = int(time.time()) + os.getpid()
         np.random.seed(seed_value)
 
-    def _save_to_df(self, rows: list):
+    def _save_to_df(self, rows: Union[list, pandas.DataFrame]):
         """
         Saves the data to a DataFrame.
-        :param rows: The data to be saved
+        :param rows: The data to be saved, rows or an already built DataFrame
         """
         def _create_dataframe(rows):
             """
             Creates a DataFrame from the input data
             :param rows: The data to be saved
             """
+            if isinstance(rows, pandas.DataFrame):
+                return rows
             dataframe = pandas.DataFrame(rows)
             # Rename the columns
             dataframe.rename(columns={0: "date",
@@ -85,55 +144,6 @@ class FullonSimFeed(FullonFeed):
         except AttributeError:
             self.dataframe = _create_dataframe(rows)
 
-    def _save_to_pickle(self, fromdate: str):
-        """
-        Saves the given rows as a pandas dataframe in a pickle file.
-        The file is saved in the 'pickle' directory and is named after t
-        he table name, compression, frame and the fromdate.
-        If the 'pickle' directory does not exist, it will be created.
-
-        Args:
-        fromdate (str): The start date of the data in the format of "YYYY-MM-DD HH:mm:ss".
-
-        Returns:
-        bool: Returns True if the file was successfully saved, False otherwise.
-        """
-        pre_fix = f"pickle/{self._table}_{self.compression}_{self.feed.period}"
-        filename = pre_fix + f"_{arrow.get(fromdate).format('YYYY_MM_DD_HH')}"
-        filename += f"_to_{self.last_date.format('YYYY_MM_DD_HH')}.pkl"
-        try:
-            self.dataframe.to_pickle(filename)
-            print(f"saved: {filename}")
-        except (FileNotFoundError, OSError):
-            os.mkdir('pickle')
-            self.dataframe.to_pickle(filename)
-
-    def _load_from_pickle(self, fromdate: str) -> list[tuple[str, float, float, float, float, float]]:
-        """Load data from a pickle file and return a Pandas DataFrame.
-        Args:
-            fromdate (str): The date of the data to load, in the format 'YYYY-MM-DD'.
-        Returns:
-            pd.DataFrame: The loaded data.
-        """
-        pre_fix = f"pickle/{self._table}_{self.compression}_{self.feed.period}"
-        filename = pre_fix + f"_{arrow.get(fromdate).format('YYYY_MM_DD_HH')}"
-        filename += f"_to_{self.last_date.format('YYYY_MM_DD_HH')}.pkl"
-        rows = []
-        try:
-            with open(filename, 'rb') as file:
-                self.dataframe = pandas.read_pickle(file)
-                x_date = bt.num2date(self.params.mainfeed.fromdate)  # pylint: disable=no-member
-                x_date = arrow.get(x_date).shift(
-                    seconds=-self.time_factor).format('YYYY-MM-DD HH:mm:ss')
-                new_df = self.dataframe[self.dataframe.index >= x_date]
-                new_df.reset_index(inplace=True)
-                rows = new_df.values.tolist()
-
-        except FileNotFoundError:
-            logger.warning(f"Pickle file ({filename}) not found")
-            logger.info("Creating file then")
-        return rows
-
     def _add_gaussian_noise(self, std_scale=0.003):
         """
         Adds Gaussian noise to the 'open', 'high', 'low', 'close' and 'volume' columns.
@@ -146,48 +156,45 @@ class FullonSimFeed(FullonFeed):
             noise = np.random.normal(mean, std_dev, size=len(self.dataframe))  # generate Gaussian noise
             self.dataframe[col] += noise  # add the noise to the dataframe column
 
-    @staticmethod
-    def _wait_for_flagfile(filename, max_loops=600, sleep_time=0.5):
+    def _noise_paths(self) -> NoisePaths:
+        """
+        The Monte Carlo paths noise_path, (seed, paths, path), picks from,
+        drawn over the candles of the mainfeed.
         """
-        Wait until the specified flag file is removed.
-        Parameters:
-            filename (str): The path to the flag file.
-            max_loops (int): The maximum number of loops to wait for. Default is 600.
-            sleep_time (float): The time to sleep between each loop. Default is 0.5 seconds.
+        seed, paths, _ = self.noise_path
+        mainfeed = self if self.ismainfeed else self.params.mainfeed
+        return NoisePaths(dataframe=mainfeed.base_dataframe, paths=paths, seed=seed,
+                          sweep=getattr(self.helper, 'sweep', None))
 
-        Raises:
-            Exception: If the file still exists after max_loops.
+    def source_frame(self) -> pandas.DataFrame:
+        """
+        The candles this feed is going to run on before noise, loaded the
+        way start and _fetch_ohlcv load them, so their later load comes from
+        memory. Shared, never mutate.
         """
-        loop_count = 0
-        while os.path.exists(filename) and loop_count < max_loops:
-            time.sleep(sleep_time)
-            loop_count += 1
-        if loop_count >= max_loops:
-            raise Exception(f"Timeout waiting for flagfile ({filename}) to be deleted.")
+        self._table = self._get_table()
+        self.last_date = self.get_last_date().floor('day')
+        return self.fetch_data_from_db()
 
-    @staticmethod
-    def _create_empty_flagfile(filename):
+    def data_digest(self) -> str:
         """
-        Create an empty flag file with the given filename.
-        Parameters:
-            filename (str): The path to the flag file.
+        Digest of the candles this feed is going to run on, see source_frame.
         """
-        with open(filename, 'w'):
-            pass
+        return frame_digest(self.source_frame())
 
-    def fetch_data_from_db(self):
+    def fetch_data_from_db(self) -> pandas.DataFrame:
         """
+        Loads the feed range through the local candle store, only what the
+        store lacks is fetched from the database. Ranges this process loaded
+        before are served from memory.
+
         Returns:
-            rows: The fetched data.
+            pandas.DataFrame: The fetched data, in columnar form. Shared with
+            later loads of the same range, copy before changing it.
         """
-        todate = self.last_date.shift(microseconds=-1)
-        with Database_ohlcv(exchange=self.feed.exchange_name,
-                            symbol=self.symbol) as dbase:
-            return dbase.fetch_ohlcv(table=self._table,
-                                     compression=self.compression,
-                                     period=self.feed.period,
-                                     fromdate=self.p.fromdate,
-                                     todate=todate.datetime)
+        return candles(exchange=self.feed.exchange_name, symbol=self.symbol, table=self._table,
+                       compression=self.compression, period=self.feed.period,
+                       fromdate=self.p.fromdate, todate=self.last_date.shift(microseconds=-1))
 
     def _resample(self):
         # Determine the resampling rule based on the compression and feed period
@@ -218,38 +225,27 @@ class FullonSimFeed(FullonFeed):
     def _fetch_ohlcv(self):
         """
         Fetch the OHLCV data for the current instance.
-        This method orchestrates the whole process of data fetching,
-        including checking for existing data, waiting for flag files,
-        and saving the fetched data.
+        Candles come from the shared candle store, which fetches only the
+        missing range from the database.
         """
         if self.result:
             return
-        pre_fix = f"pickle/{self._table}_{self.compression}_{self.feed.period}"
-        filename = f"{pre_fix}_{arrow.get(self.p.fromdate).format('YYYY_MM_DD_HH_mm')}.started"
-
-        if os.path.exists(filename):
-            self._wait_for_flagfile(filename)
-
-        pkl_exists = True
-        rows = self._load_from_pickle(fromdate=self.p.fromdate)
-        if not rows:
-            self._create_empty_flagfile(filename)
-            pkl_exists = False
-            rows = self.fetch_data_from_db()
-        if rows:
-            self._save_to_df(rows=rows)  # only works if self.dataframe is not set
-            if not pkl_exists:
-                self._save_to_pickle(fromdate=self.p.fromdate)
-                os.remove(filename)
+        dataframe = self.fetch_data_from_db()
+        if dataframe is not None and not dataframe.empty:
+            self._save_to_df(rows=dataframe)  # only works if self.dataframe is not set
             if self.noise:
                 if not self.ismainfeed:
                     # Step 1: Store the original DataFrame
                     orig_df = self.dataframe.copy()
-                    # Step 2: Assign mainfeed DataFrame to self.dataframe
-                    self.dataframe = self.params.mainfeed.dataframe.copy()
-                    # Step 3: Resample self.dataframe. Assuming _resample() returns a resampled DataFrame
-                    self._resample()
-                    # Step 4: Merge the beginning of orig_df onto self.dataframe
+                    # Step 2: Take the noisy mainfeed path, resampled to this feed
+                    if self.noise_path:
+                        self.dataframe = self._noise_paths().path(num=self.noise_path[2],
+                                                                  compression=self.compression,
+                                                                  period=self.feed.period)
+                    else:
+                        self.dataframe = self.params.mainfeed.dataframe.copy()
+                        self._resample()
+                    # Step 3: Merge the beginning of orig_df onto self.dataframe
                     # Finding the first common index
                     common_start = orig_df.index.intersection(self.dataframe.index).min()
                     if common_start:
@@ -257,17 +253,27 @@ class FullonSimFeed(FullonFeed):
                         orig_df = orig_df.drop(overlap)  # Drop overlapping indices from orig_df
                         self.dataframe = pandas.concat([orig_df, self.dataframe.loc[common_start:]])
                 else:
-                    self._add_gaussian_noise()
-                rows = self.dataframe.reset_index().values.tolist()
-            self.last_date = arrow.get(rows[-1][0])
+                    self.base_dataframe = self.dataframe
+                    if self.noise_path:
+                        self.dataframe = self._noise_paths().path(num=self.noise_path[2])
+                    else:
+                        self.dataframe = self.dataframe.copy()
+                        self._add_gaussian_noise()
+            self.last_date = arrow.get(self.dataframe.index[-1])
             self.last_moments = self.params.mainfeed.last_date.shift(  # pylint: disable=no-member
                 seconds=-self.time_factor)
             self.last_moments = bt.date2num(self.last_moments.datetime)
-            self.result = deque(rows)
+            self.result = self._make_result()
 
         else:
             self._empty_bar()
 
+    def _make_result(self) -> BarCursor:
+        """
+        Builds the queue of bars _load_ohlcv pops from.
+        """
+        return BarCursor(self.dataframe)
+
     def _empty_bar(self):
         """
         Reset the state of the object to its initial state
@@ -279,7 +285,7 @@ class FullonSimFeed(FullonFeed):
     def _load_ohlcv(self):
         """Description"""
         try:
-            one_row = self.result.popleft()
+            self._load_bar(self.result)
         except IndexError:
             self._state = self._ST_OVER
             return False
@@ -288,7 +294,6 @@ class FullonSimFeed(FullonFeed):
                 self.result = []
                 return False
             raise
-        self._load_ohlcv_line(one_row=one_row)
         if len(self.result) == 0:
             self._empty_bar()
         return True
@@ -0,0 +1,177 @@
+"""
+Push based tick source for the live feeds.
+
+TickCache.update_ticker publishes every ticker it stores on the
+next_ticker:{exchange}:{symbol} channel. A TickStream registers on the
+process wide TickerHub for that channel and wakes the feed as soon as a
+ticker arrives, instead of the feed reading tickers:{exchange} and sleeping.
+
+Only the newest ticker is kept: if several arrive while the strategy is busy
+the feed gets the last one (coalescing). A throttle can be set so a bot is
+not woken more often than once every TICK_THROTTLE_MS milliseconds, or the
+tick_throttle strategy param of the bot.
+"""
+import json
+import threading
+import time
+from bisect import bisect_left
+from typing import Optional, Tuple
+import arrow
+from libs import settings, log
+from libs.caches.tick_cache import TickerHub
+
+logger = log.fullon_logger(__name__)
+
+
+class LatencyHistogram():
+    """
+    Fixed bucket histogram of latencies in milliseconds.
+
+    Bucket n counts the samples up to BOUNDS[n], the last bucket everything
+    above the last bound.
+    """
+
+    BOUNDS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, millis: float) -> None:
+        """
+        Adds one sample, negative ones (clock skew) count as 0.
+        """
+        millis = max(millis, 0.0)
+        self.counts[bisect_left(self.BOUNDS, millis)] += 1
+        self.count += 1
+        self.total += millis
+        self.max = max(self.max, millis)
+
+    def percentile(self, pct: float) -> float:
+        """
+        Upper bound of the bucket holding the pct percentile, the largest
+        sample if it falls in the last bucket. 0 without samples.
+        """
+        if not self.count:
+            return 0.0
+        rank = pct / 100 * self.count
+        seen = 0
+        for num, count in enumerate(self.counts[:-1]):
+            seen += count
+            if seen >= rank:
+                return float(self.BOUNDS[num])
+        return self.max
+
+    def summary(self) -> str:
+        """
+        One line description for the logs.
+        """
+        if not self.count:
+            return "no samples"
+        return (f"n={self.count} avg={self.total / self.count:.1f}ms "
+                f"p50<={self.percentile(50):g}ms p90<={self.percentile(90):g}ms "
+                f"p99<={self.percentile(99):g}ms max={self.max:.1f}ms")
+
+
+class TickStream():
+    """
+    Subscription to the ticker channel of one exchange and symbol.
+
+    Args:
+        exchange (str): Exchange name, as used by update_ticker.
+        symbol (str): Symbol, as used by update_ticker.
+        throttle (float, optional): Minimum milliseconds between two ticks
+            handed to the feed, TICK_THROTTLE_MS by default.
+    """
+
+    def __init__(self, exchange: str, symbol: str, throttle: Optional[float] = None) -> None:
+        self.channel = f"next_ticker:{exchange}:{symbol}"
+        if throttle is None:
+            throttle = getattr(settings, "TICK_THROTTLE_MS", 0) or 0
+        self.throttle = float(throttle) / 1000
+        self.coalesced = 0
+        self._tick: Optional[Tuple[float, Optional[float]]] = None
+        self._fresh = False
+        self._delivered = 0.0
+        self._cond = threading.Condition()
+        self._hub: Optional[TickerHub] = None
+
+    def start(self) -> None:
+        """
+        Starts receiving the tickers of the channel.
+
+        Raises:
+            redis.RedisError: If the hub can't subscribe.
+        """
+        self._hub = TickerHub.get()
+        self._hub.add_callback(self.channel, self.push)
+
+    def stop(self) -> None:
+        """
+        Stops receiving tickers.
+        """
+        if self._hub:
+            self._hub.remove_callback(self.channel, self.push)
+            self._hub = None
+
+    @property
+    def alive(self) -> bool:
+        return self._hub is not None and self._hub.alive
+
+    def push(self, data: str) -> None:
+        """
+        Makes a published ticker the next tick of the stream.
+
+        Args:
+            data (str): The ticker as published by update_ticker.
+        """
+        try:
+            ticker = json.loads(data)
+            price = float(ticker['price'])
+        except (ValueError, KeyError, TypeError) as error:
+            logger.error("Bad ticker on %s: %s", self.channel, str(error))
+            return
+        try:
+            stamp = arrow.get(ticker['time']).timestamp()
+        except (KeyError, TypeError, ValueError, arrow.parser.ParserError):
+            stamp = None
+        with self._cond:
+            if self._fresh:
+                self.coalesced += 1
+            self._tick = (price, stamp)
+            self._fresh = True
+            self._cond.notify_all()
+
+    def next_tick(self, timeout: float) -> Optional[Tuple[float, Optional[float]]]:
+        """
+        Waits for a ticker newer than the last one returned.
+
+        A ticker that arrived while the throttle holds is returned when the
+        throttle ends, even if that is later than timeout.
+
+        Args:
+            timeout (float): Seconds to wait for a ticker to be published.
+
+        Returns:
+            Tuple[float, Optional[float]]: Price and exchange timestamp in
+            seconds (None if the ticker had no readable time), or None if
+            nothing was published within timeout.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self._fresh:
+                    hold = self._delivered + self.throttle - now
+                    if hold <= 0:
+                        break
+                    self._cond.wait(hold)
+                    continue
+                if now >= deadline:
+                    return None
+                self._cond.wait(deadline - now)
+            self._fresh = False
+            self._delivered = time.monotonic()
+            return self._tick
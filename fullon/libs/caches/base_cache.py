@@ -8,14 +8,17 @@ preparing the cache, and filtering cache entries based
 on timestamps and component types.
 """
 
+import os
 import sys
+import threading
 import redis
 from libs import settings, log
-from typing import List
+from typing import Dict, List
 
 logger = log.fullon_logger(__name__)
 
 EXCHANGES_DIR = ['kraken', 'kucoin_futures']
+HEALTH_CHECK_INTERVAL = 30
 
 
 class Cache:
@@ -32,23 +35,36 @@ class Cache:
     db_cache = None
     conn: redis.Redis
     _test = False
+    _shared = False
+    _pool_pid = None
+    _shared_instances: Dict = {}
+    _shared_lock = threading.Lock()
 
     def __init__(self, reset: bool = False, test: bool = False) -> None:
         """
         Initialize the Cache instance and set up the Redis connection.
 
+        The server is only pinged when the connection pool is created for
+        the current process, afterwards connections are health checked by
+        the pool itself when they are used.
+
         Args:
             test (bool, optional): Set to True to run in test mode. Defaults to False.
         """
         self._test = test
-        if Cache.connection_pool is None:
+        if Cache.connection_pool is None or Cache._pool_pid != os.getpid():
             Cache.connection_pool = self._create_connection_pool()
-        self._init_redis()
+            Cache._pool_pid = os.getpid()
+            self._init_redis()
+        else:
+            self.conn = redis.Redis(connection_pool=Cache.connection_pool)
         if reset:
             pass
 
     def __del__(self) -> None:
         """Clean up the Redis connection when the Cache instance is deleted."""
+        if self._shared:
+            return
         try:
             del self.conn
         except AttributeError:
@@ -60,6 +76,30 @@ class Cache:
     def __exit__(self, exc_type, exc_value, traceback):
         self.__del__()
 
+    @classmethod
+    def shared(cls):
+        """
+        Returns a long lived instance of this cache class for the current process.
+
+        The instance is meant for hot paths such as websocket callbacks, where
+        building a new Cache per message is too expensive. redis.Redis is thread
+        safe, so every thread of the process can reuse it. Leaving a ``with``
+        block does not release the shared connection.
+
+        Returns:
+            Cache: The shared instance.
+        """
+        key = (cls, os.getpid())
+        store = cls._shared_instances.get(key)
+        if store is None:
+            with cls._shared_lock:
+                store = cls._shared_instances.get(key)
+                if store is None:
+                    store = cls()
+                    store._shared = True
+                    cls._shared_instances[key] = store
+        return store
+
     def _create_connection_pool(self) -> redis.ConnectionPool:
         """
         Create a connection pool for the Redis connection.
@@ -76,6 +116,8 @@ class Cache:
                                     db=settings.CACHE_DB,
                                     password=settings.CACHE_PASSWORD,
                                     socket_timeout=settings.CACHE_TIMEOUT,
+                                    health_check_interval=HEALTH_CHECK_INTERVAL,
+                                    retry_on_error=[redis.exceptions.ConnectionError],
                                     decode_responses=param)
 
     def _init_redis(self) -> None:
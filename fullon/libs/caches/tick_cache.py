@@ -8,15 +8,18 @@ preparing the cache, and filtering cache entries based
 on timestamps and component types.
 """
 
+import os
 import time
 import json
+import threading
+from collections import deque
 import redis
 from  os import listdir
 from redis.exceptions import RedisError
 from libs import settings, log
 from libs.caches import symbol_cache as cache
 from libs.structs.tick_struct import TickStruct
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Callable, Dict, Any, Optional, List, Tuple
 
 logger = log.fullon_logger(__name__)
 
@@ -32,6 +35,201 @@ for folder in ['ccxt','__init__.py','__pycache__']:
         pass
 
 
+TICKER_PATTERN = "next_ticker:*"
+TICKER_PREFIX = "next_ticker:"
+HUB_LISTEN_TIMEOUT = 0.25
+HUB_RECONNECT_WAIT = 1.0
+HUB_SUBSCRIBE_WAIT = 2.0
+
+
+class TickerHub():
+    """
+    Per process fan out of the next_ticker:{exchange}:{symbol} channels,
+    and of the other channels callbacks are registered for.
+
+    A single pattern subscription to next_ticker:* is kept open by a daemon
+    thread, which hands every published message to the callbacks registered
+    for its channel. Any number of exchanges, symbols and waiting threads
+    share that one connection, and nothing is subscribed or unsubscribed on
+    the server per call. Other channels, like the next_trades:{exchange}:{symbol}
+    ones the live resamplers read, are subscribed one by one on the same
+    connection while they have a callback, a process only receives the
+    trades it aggregates. PubSub is not thread safe, so those subscribe and
+    unsubscribe requests are queued and sent by the hub thread between
+    reads. The subscription is reopened after connection errors, resets
+    counts how many times, messages published meanwhile are lost.
+    """
+
+    _instances: Dict[int, "TickerHub"] = {}
+    _lock = threading.Lock()
+
+    def __init__(self) -> None:
+        self._callbacks: Dict[str, List[Callable[[Any], None]]] = {}
+        self._callbacks_lock = threading.Lock()
+        self._requests: deque = deque()
+        self._pubsub = None
+        self.resets = 0
+        self._subscribe()
+        self._thread = threading.Thread(target=self._listen, name="ticker_hub", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def get(cls) -> "TickerHub":
+        """
+        Returns the hub of the current process, starting it on first use.
+
+        Raises:
+            redis.RedisError: If the subscription can't be opened.
+        """
+        pid = os.getpid()
+        hub = cls._instances.get(pid)
+        if hub is None:
+            with cls._lock:
+                hub = cls._instances.get(pid)
+                if hub is None:
+                    hub = cls()
+                    cls._instances[pid] = hub
+        return hub
+
+    @property
+    def alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def _subscribe(self) -> None:
+        pubsub = Cache.shared().conn.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(TICKER_PATTERN)
+        with self._callbacks_lock:
+            channels = [channel for channel in self._callbacks if not channel.startswith(TICKER_PREFIX)]
+            if channels:
+                pubsub.subscribe(*channels)
+            # The channels with callbacks now are subscribed, queued requests are moot
+            while self._requests:
+                self._requests.popleft()[2].set()
+            self._pubsub = pubsub
+
+    def _request(self, command: str, channel: str) -> Optional[threading.Event]:
+        """
+        Queues subscribing or unsubscribing a channel outside next_ticker:*
+        for the hub thread, caller holds the callbacks lock.
+
+        Returns:
+            threading.Event: Set once the hub thread sent it, None if there
+            is nothing to send.
+        """
+        if channel.startswith(TICKER_PREFIX):
+            return None
+        done = threading.Event()
+        self._requests.append((command, channel, done))
+        return done
+
+    def _send_requests(self) -> None:
+        """
+        Sends the queued requests, only ever called from the hub thread.
+        """
+        while True:
+            with self._callbacks_lock:
+                if not self._requests:
+                    return
+                command, channel, done = self._requests.popleft()
+            try:
+                getattr(self._pubsub, command)(channel)
+            finally:
+                done.set()
+
+    def _close(self) -> None:
+        with self._callbacks_lock:
+            pubsub, self._pubsub = self._pubsub, None
+        try:
+            if pubsub:
+                pubsub.close()
+        except RedisError:
+            pass
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                if self._pubsub is None:
+                    self._subscribe()
+                self._send_requests()
+                message = self._pubsub.get_message(timeout=HUB_LISTEN_TIMEOUT)
+            except (RedisError, OSError) as error:
+                logger.warning("Ticker hub lost its connection: %s", str(error))
+                self.resets += 1
+                self._close()
+                time.sleep(HUB_RECONNECT_WAIT)
+                continue
+            if message:
+                self.dispatch(message)
+
+    def dispatch(self, message: Dict[str, Any]) -> None:
+        """
+        Hands a message to the callbacks of its channel.
+        """
+        if message.get('type') not in ('pmessage', 'message'):
+            return
+        channel = message['channel']
+        if isinstance(channel, bytes):
+            channel = channel.decode()
+        with self._callbacks_lock:
+            callbacks = list(self._callbacks.get(channel, ()))
+        for callback in callbacks:
+            try:
+                callback(message['data'])
+            except Exception as error:  # pylint: disable=broad-except
+                logger.error("Ticker callback on %s failed: %s", channel, str(error))
+
+    def add_callback(self, channel: str, callback: Callable[[Any], None]) -> None:
+        """
+        Calls callback(data) from the hub thread for every message published
+        on channel, until remove_callback. A channel outside next_ticker:*
+        is subscribed by the time it returns, unless the connection is down.
+        """
+        subscribed = None
+        with self._callbacks_lock:
+            if channel not in self._callbacks:
+                subscribed = self._request("subscribe", channel)
+            self._callbacks.setdefault(channel, []).append(callback)
+        if subscribed and threading.current_thread() is not self._thread:
+            if not subscribed.wait(HUB_SUBSCRIBE_WAIT):
+                logger.warning("Ticker hub did not subscribe %s in %ss", channel, HUB_SUBSCRIBE_WAIT)
+
+    def remove_callback(self, channel: str, callback: Callable[[Any], None]) -> None:
+        with self._callbacks_lock:
+            callbacks = self._callbacks.get(channel, [])
+            for num, registered in enumerate(callbacks):
+                if registered == callback:
+                    del callbacks[num]
+                    break
+            if not callbacks and self._callbacks.pop(channel, None) is not None:
+                self._request("unsubscribe", channel)
+
+    def wait(self, channel: str, timeout: Optional[float] = None) -> Optional[Any]:
+        """
+        Waits for the next ticker published on channel.
+
+        Args:
+            channel (str): next_ticker:{exchange}:{symbol}.
+            timeout (float, optional): Seconds to wait, forever if None.
+
+        Returns:
+            The published data, None on timeout.
+        """
+        received: List[Any] = []
+        event = threading.Event()
+
+        def callback(data: Any) -> None:
+            if not received:
+                received.append(data)
+                event.set()
+
+        self.add_callback(channel, callback)
+        try:
+            event.wait(timeout)
+        finally:
+            self.remove_callback(channel, callback)
+        return received[0] if received else None
+
+
 class Cache(cache.Cache):
     """
     A class for managing caching operations with Redis.
@@ -100,7 +298,11 @@ class Cache(cache.Cache):
 
     def get_next_ticker(self, symbol: str, exchange: str) -> Tuple[float, Optional[str]]:
         """
-        Subscribe to a ticker update channel and return the price and timestamp once a message is received.  
+        Wait for the next ticker update of a symbol and return its price and timestamp.
+
+        Waits on the per process TickerHub, so no connection is opened and
+        nothing is subscribed per call.
+
         Args:
             symbol (str): The trading symbol for which ticker updates are being listened.
             exchange (str): The exchange that the symbol belongs to.
@@ -109,22 +311,15 @@ class Cache(cache.Cache):
             Tuple[float, Optional[str]]: A tuple containing the updated price as a float and the timestamp as a string.
             If an error occurs, (0, None) is returned.
         """
+        channel = f'next_ticker:{exchange}:{symbol}'
         try:
-            pubsub = self.conn.pubsub()
-            pubsub.subscribe(f'next_ticker:{exchange}:{symbol}')
-
-            for message in pubsub.listen():
-                if message['type'] == 'message':
-                    ticker = json.loads(message['data'])
-                    pubsub.unsubscribe(f'next_ticker:{exchange}:{symbol}')
+            hub = TickerHub.get()
+            while True:
+                data = hub.wait(channel, timeout=settings.CACHE_TIMEOUT)
+                if data is not None:
+                    ticker = json.loads(data)
                     return (float(ticker['price']), ticker['time'])
-
-            return (0, None)
-        except (redis.exceptions.TimeoutError, TimeoutError) as e:
-            logger.warning(f"No ticker ({exchange}:{symbol}) data received, trying again...")
-            time.sleep(0.1)
-            pubsub.unsubscribe(f'next_ticker:{exchange}:{symbol}')
-            return self.get_next_ticker(symbol=symbol, exchange=exchange)
+                logger.warning(f"No ticker ({exchange}:{symbol}) data received, trying again...")
         except redis.ConnectionError as error:
             # If any error occurred, log it and return (0, None)
             logger.error(f"Error in get_next_ticker: {error}")
@@ -13,7 +13,7 @@ import redis
 from libs import log
 from libs.caches import orders_cache as cache
 from libs.structs.trade_struct import TradeStruct
-from typing import Dict, List, Optional, Union
+from typing import Dict, Iterator, List, Optional, Union
 from os import listdir
 import arrow
 
@@ -55,13 +55,52 @@ class Cache(cache.Cache):
             int: The new length of the list after the push operation.
         """
         # Create a Redis key using the exchange and symbol
+        channel = f"next_trades:{exchange}:{symbol}"
         symbol = symbol.replace("/", "")
         redis_key = f"trades:{exchange}:{symbol}"
         res = self.conn.rpush(redis_key, json.dumps(trade))
+        self.conn.publish(channel, json.dumps([trade]))
         if self.update_trade_status(key=f"{exchange}"):
             return res
         return 0
 
+    def push_trades_list(self,
+                         symbol: str,
+                         exchange: str,
+                         trades: List[Dict]) -> int:
+        """
+        Push a batch of trades to a Redis list in a single round trip.
+
+        All trades go out in one RPUSH with many values, together with the
+        trade status update, inside one pipeline. The batch is also published
+        on next_trades:{exchange}:{symbol} for the live bar aggregators, only
+        the processes aggregating that symbol are subscribed to it.
+
+        Args:
+            symbol (str): The trading symbol for the asset pair.
+            exchange (str): The name of the exchange where the trades occurred.
+            trades (List[Dict]): The trades to push, oldest first.
+
+        Returns:
+            int: The new length of the list after the push operation.
+        """
+        if not trades:
+            return 0
+        channel = f"next_trades:{exchange}:{symbol}"
+        symbol = symbol.replace("/", "")
+        redis_key = f"trades:{exchange}:{symbol}"
+        encoded = [json.dumps(trade) for trade in trades]
+        try:
+            with self.conn.pipeline(transaction=False) as pipe:
+                pipe.rpush(redis_key, *encoded)
+                pipe.set(f"TRADE:STATUS:{exchange}", arrow.utcnow().timestamp())
+                pipe.publish(channel, f"[{','.join(encoded)}]")
+                res = pipe.execute()
+                return res[0]
+        except redis.RedisError as error:
+            logger.error("push_trades_list error: %s", str(error))
+        return 0
+
     def update_trade_status(self, key: str) -> bool:
         """
         Updates status variable for trades.
@@ -211,6 +250,9 @@ class Cache(cache.Cache):
         """
         Retrieve a list of TradeStruct instances representing the trades for a specific exchange.
 
+        The list is read and deleted in one MULTI/EXEC transaction, so trades
+        pushed while draining are kept for the next call.
+
         Args:
             symbol (str): The user ID.
             exchange (str): The name of the exchange.
@@ -220,9 +262,44 @@ class Cache(cache.Cache):
         """
         symbol = symbol.replace("/", "")
         redis_key = f"trades:{exchange}:{symbol}"
-        trades = self.conn.lrange(redis_key, 0, -1)
-        self.conn.delete(redis_key)
+        with self.conn.pipeline(transaction=True) as pipe:
+            pipe.lrange(redis_key, 0, -1)
+            pipe.delete(redis_key)
+            trades, _ = pipe.execute()
         ret_trades = []
         for trade in trades:
             ret_trades.append(TradeStruct.from_dict(json.loads(trade)))
         return ret_trades
+
+    def drain_trades_list(self,
+                          symbol: str,
+                          exchange: str,
+                          batch_size: int = 1000) -> Iterator[List[TradeStruct]]:
+        """
+        Drain the trade list of a symbol in chunks.
+
+        Each chunk is taken with LRANGE + LTRIM inside one MULTI/EXEC
+        transaction, so no trade pushed concurrently is lost and the backlog
+        never has to be loaded in memory at once. Draining stops when the
+        list is empty.
+
+        Args:
+            symbol (str): The trading symbol.
+            exchange (str): The name of the exchange.
+            batch_size (int): Max trades per chunk.
+
+        Yields:
+            List[TradeStruct]: The next chunk of trades, oldest first.
+        """
+        symbol = symbol.replace("/", "")
+        redis_key = f"trades:{exchange}:{symbol}"
+        while True:
+            with self.conn.pipeline(transaction=True) as pipe:
+                pipe.lrange(redis_key, 0, batch_size - 1)
+                pipe.ltrim(redis_key, batch_size, -1)
+                trades, _ = pipe.execute()
+            if not trades:
+                return
+            yield [TradeStruct.from_dict(json.loads(trade)) for trade in trades]
+            if len(trades) < batch_size:
+                return
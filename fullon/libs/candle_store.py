@@ -0,0 +1,229 @@
+"""
+Local columnar candle store shared by the simulation feeds.
+
+Candles are kept per table, compression and period in a directory of
+append-only binary column files (timestamp.i8, open.f8, ...) next to a small
+meta.json with the row count and the covered time range. Readers memory-map
+the columns, so simulations running in parallel share the same pages instead
+of unpickling their own copy. Workers coordinate with flock on a lock file:
+readers hold it shared while they map, the worker fetching missing candles
+holds it exclusive. Only the missing tail is fetched when a later date range
+is requested; a range starting before the stored one rebuilds the store.
+
+Rows are only ever appended, or the files replaced as a whole, so a mapping
+taken by a reader stays valid while the store grows.
+"""
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional, Union
+import arrow
+import numpy
+import pandas
+from libs import settings, log
+
+logger = log.fullon_logger(__name__)
+
+STORE_DIR = "candles/"
+COLUMNS = ("open", "high", "low", "close", "volume")
+PERIOD_SECONDS = {'minutes': 60, 'hours': 3600, 'days': 86400, 'weeks': 604800}
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _to_us(value: Union[str, datetime, arrow.Arrow]) -> int:
+    """
+    Microseconds since epoch, naive values are taken as UTC.
+    """
+    return (arrow.get(value).datetime - EPOCH) // timedelta(microseconds=1)
+
+
+def _from_us(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=int(value))
+
+
+class CandleStore():
+    """
+    Memory-mapped candle store for one table/compression/period.
+
+    Args:
+        table (str): schema.table the candles come from.
+        compression (int): Bucket compression.
+        period (str): Bucket period, minutes, hours, days or weeks.
+        root (str, optional): Store directory, CANDLE_STORE_DIR by default.
+    """
+
+    def __init__(self, table: str, compression: int, period: str, root: Optional[str] = None) -> None:
+        root = root or getattr(settings, "CANDLE_STORE_DIR", STORE_DIR)
+        self.path = os.path.join(root, f"{table}_{compression}_{period}")
+        seconds = PERIOD_SECONDS.get(str(period).lower())
+        self.bucket = int(compression) * seconds * 1_000_000 if seconds else 0
+        self.utc = "trades" not in table
+
+    @property
+    def supported(self) -> bool:
+        """
+        Periods without a fixed length (months, ticks) are not stored.
+        """
+        return self.bucket > 0
+
+    @contextmanager
+    def _lock(self, mode: int):
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, "lock"), "a+") as lock_file:
+            fcntl.flock(lock_file, mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _read_meta(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._file("meta.json"), encoding="ascii") as meta_file:
+                return json.load(meta_file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_meta(self, meta: Dict[str, Any]) -> None:
+        tmp = self._file("meta.json.tmp")
+        with open(tmp, "w", encoding="ascii") as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(tmp, self._file("meta.json"))
+
+    def _columns(self, rows: int) -> Dict[str, numpy.ndarray]:
+        """
+        Maps the first rows of every column file. Copy-on-write, so callers
+        may modify the arrays without touching the store.
+        """
+        arrays = {'timestamp': numpy.memmap(self._file("timestamp.i8"), dtype=numpy.int64,
+                                            mode="c", shape=(rows,))}
+        for col in COLUMNS:
+            arrays[col] = numpy.memmap(self._file(f"{col}.f8"), dtype=numpy.float64,
+                                       mode="c", shape=(rows,))
+        return arrays
+
+    def _write(self, arrays: Dict[str, numpy.ndarray], rows: int) -> None:
+        """
+        Writes arrays at row offset rows. Offset 0 replaces the files, so
+        readers still mapping the previous ones keep their pages.
+        """
+        for name, dtype in [("timestamp.i8", numpy.int64)] + [(f"{col}.f8", numpy.float64) for col in COLUMNS]:
+            data = numpy.ascontiguousarray(arrays[name.split(".")[0]], dtype=dtype)
+            if rows == 0:
+                tmp = self._file(name + ".tmp")
+                data.tofile(tmp)
+                os.replace(tmp, self._file(name))
+                continue
+            with open(self._file(name), "r+b") as column:
+                column.seek(rows * dtype().itemsize)
+                column.write(data.tobytes())
+                column.truncate()
+
+    def _complete(self, frame: pandas.DataFrame, limit: int, since: int) -> Dict[str, numpy.ndarray]:
+        """
+        Columns of the buckets in frame that start at since or later and end
+        at limit or earlier, the ones that will not change anymore.
+        """
+        stamps = frame.index.as_unit("us").asi8
+        keep = (stamps >= since) & (stamps + self.bucket <= limit)
+        arrays = {'timestamp': stamps[keep]}
+        for col in COLUMNS:
+            arrays[col] = frame[col].to_numpy(dtype=numpy.float64)[keep]
+        return arrays
+
+    def _frame(self, arrays: Dict[str, numpy.ndarray], start: int, end: int) -> pandas.DataFrame:
+        """
+        DataFrame over the buckets overlapping [start, end], sharing memory
+        with arrays.
+        """
+        stamps = arrays['timestamp']
+        first = numpy.searchsorted(stamps, start - self.bucket, side="right")
+        last = numpy.searchsorted(stamps, end, side="right")
+        index = pandas.DatetimeIndex(stamps[first:last].view("datetime64[us]"), name="date", copy=False)
+        if self.utc:
+            index = index.tz_localize("UTC")
+        return pandas.DataFrame({col: arrays[col][first:last] for col in COLUMNS},
+                                index=index, copy=False)
+
+    def _covers(self, meta: Optional[Dict[str, Any]], start: int, limit: int) -> bool:
+        return bool(meta) and meta['rows'] > 0 and meta['start'] <= start and meta['end'] >= limit
+
+    def _update(self, meta: Optional[Dict[str, Any]], start: int, end: int, limit: int,
+                fetch: Callable[[datetime, datetime], pandas.DataFrame]) -> Dict[str, Any]:
+        """
+        Fetches what the store lacks for [start, limit), called with the
+        exclusive lock held. Returns the new meta.
+        """
+        if meta and meta['rows'] > 0 and meta['start'] <= start:
+            rows = meta['rows']
+            since = int(self._columns(rows)['timestamp'][-1]) + self.bucket
+            frame = fetch(_from_us(since), _from_us(end))
+            arrays = self._complete(frame, limit, since)
+            if len(arrays['timestamp']):
+                self._write(arrays, rows)
+                rows += len(arrays['timestamp'])
+            meta = dict(meta, rows=rows, end=max(meta['end'], limit))
+        else:
+            frame = fetch(_from_us(start), _from_us(end))
+            arrays = self._complete(frame, limit, -2**62)
+            rows = len(arrays['timestamp'])
+            if not rows:
+                return {'start': start, 'end': start, 'rows': 0}
+            self._write(arrays, 0)
+            meta = {'start': start, 'end': limit, 'rows': rows}
+        self._write_meta(meta)
+        logger.debug("Candle store %s holds %s rows", self.path, meta['rows'])
+        return meta
+
+    def load(self,
+             fromdate: Union[str, datetime, arrow.Arrow],
+             todate: Union[str, datetime, arrow.Arrow],
+             fetch: Callable[[datetime, datetime], pandas.DataFrame],
+             latest: Optional[Union[str, datetime]] = None) -> pandas.DataFrame:
+        """
+        Returns the candles between fromdate and todate (inclusive).
+
+        Candles that are missing from the store are fetched with
+        fetch(fromdate, todate), which must return a frame shaped like
+        Database.fetch_ohlcv_df. Only buckets that are closed, ending before
+        now and before latest (the newest trade in the database) are stored;
+        newer buckets are fetched again on every call.
+
+        Args:
+            fromdate: Start of the range.
+            todate: End of the range, inclusive.
+            fetch (Callable): Database fetcher for missing ranges.
+            latest (datetime, optional): Timestamp of the newest trade.
+
+        Returns:
+            pandas.DataFrame: float64 open, high, low, close and volume columns
+            with a 'date' index, backed by the mapped store where possible.
+        """
+        start, end = _to_us(fromdate), _to_us(todate)
+        now = _to_us(arrow.utcnow())
+        limit = min(end + 1, now, _to_us(latest) + 1 if latest else now)
+        with self._lock(fcntl.LOCK_SH):
+            meta = self._read_meta()
+            covered = self._covers(meta, start, limit)
+            if covered:
+                arrays = self._columns(meta['rows'])
+        if not covered:
+            with self._lock(fcntl.LOCK_EX):
+                meta = self._read_meta()
+                if not self._covers(meta, start, limit):
+                    meta = self._update(meta, start, end, limit, fetch)
+                if not meta['rows']:
+                    return fetch(_from_us(start), _from_us(end))
+                arrays = self._columns(meta['rows'])
+        frame = self._frame(arrays, start, end)
+        tail = int(arrays['timestamp'][-1]) + self.bucket
+        if tail <= end:
+            recent = fetch(_from_us(tail), _from_us(end))
+            recent = recent[recent.index.as_unit("us").asi8 >= tail]
+            if not recent.empty:
+                frame = pandas.concat([frame, recent])
+        return frame
@@ -2,9 +2,10 @@
 Sets up database queues
 """
 from inspect import Attribute
-from typing import Any, Dict, Callable, Optional
+from typing import Any, Dict, Callable, Optional, Tuple
 from multiprocessing import Process, Manager
 from multiprocessing.queues import Queue
+from queue import Empty
 from time import sleep
 from setproctitle import setproctitle
 import psycopg2
@@ -12,15 +13,19 @@ from libs import log, settings
 from libs.models.bot_model import Database as MainDatabase
 from libs.models.crawler_model import Database as CrawlerDatabase
 from libs.queue_pool import QueuePool
+from libs import pipe_transport
 from enum import Enum
 
 # Setup logging
 logger = log.fullon_logger(__name__)
 request_queue: Optional[Queue] = None
 response_queue_pool: Optional[QueuePool] = None
+pipe_client: Optional[pipe_transport.PipeClient] = None
 processes: Dict = {}
 _started: bool = False
 WORKERS = settings.DBWORKERS
+# Seconds a request waits for its reply, DB_RESPONSE_TIMEOUT, 0 waits forever
+RESPONSE_TIMEOUT = 600
 
 
 class ControlSignals(Enum):
@@ -41,6 +46,46 @@ def crawler_methods(method_name: str, method_params: dict):
         return result
 
 
+def run_request(dbase_instance: Optional[MainDatabase],
+                method_name: str,
+                method_params: dict) -> Tuple[Optional[MainDatabase], Any]:
+    """
+    Runs one database method, retrying on connection errors.
+
+    Parameters:
+        dbase_instance: The worker database instance, may be None.
+        method_name: Name of the method.
+        method_params: Keyword arguments for the method.
+
+    Returns:
+        The (possibly new) database instance and the result.
+    """
+    max_retries = 30
+    for attempt in range(max_retries):
+        try:
+            if not dbase_instance:
+                dbase_instance = MainDatabase()
+            if hasattr(dbase_instance, method_name):
+                method = getattr(dbase_instance, method_name)
+                result = method(**method_params)
+            else:
+                result = crawler_methods(method_name=method_name, method_params=method_params)
+            return dbase_instance, result
+        except AttributeError as error:
+            print(str(error))
+            return dbase_instance, None
+        except psycopg2.OperationalError as db_error:
+            if attempt < max_retries - 1:  # Check if more retries are left
+                logger.warning(f"Database operation failed, retry {attempt + 1}/{max_retries}. Error: {db_error}")
+                sleep(1.5)  # Wait before retrying
+                if dbase_instance:
+                    dbase_instance.endthis()  # Reset connection pool before retry
+                    dbase_instance = None
+            else:
+                logger.error(f"Database operation failed after {max_retries} attempts. Error: {db_error}")
+    return dbase_instance, None
+
+
 def process_requests(num: int, request_queue: Queue, mngr: object) -> None:
     """
     Continuously listens for requests and processes them.
@@ -62,35 +107,8 @@ def process_requests(num: int, request_queue: Queue, mngr: object) -> None:
                 break
 
             method_name, method_params, response_queue = request
-
-            # Attempt to process the request with retries
-            max_retries = 30
-            for attempt in range(max_retries):
-                try:
-                    if not dbase_instance:
-                        dbase_instance = MainDatabase()
-                    if hasattr(dbase_instance, method_name):
-                        method = getattr(dbase_instance, method_name)
-                        result = method(**method_params)
-                    else:
-                        result = crawler_methods(method_name=method_name, method_params=method_params)
-                    response_queue.put(result)
-                    break  # Break the loop if successful
-                except AttributeError as error:
-                    print(str(error))
-                    response_queue.put(None)
-                    break
-                except psycopg2.OperationalError as db_error:
-                    if attempt < max_retries - 1:  # Check if more retries are left
-                        logger.warning(f"Database operation failed, retry {attempt + 1}/{max_retries}. Error: {db_error}")
-                        sleep(1.5)  # Wait before retrying
-                        if dbase_instance:
-                            dbase_instance.endthis()  # Reset connection pool before retry
-                            dbase_instance = None
-                    else:
-                        logger.error(f"Database operation failed after {max_retries} attempts. Error: {db_error}")
-                        response_queue.put(None)  # Indicate failure to the requester
-                        break
+            dbase_instance, result = run_request(dbase_instance, method_name, method_params)
+            response_queue.put(result)
         except KeyboardInterrupt:
             logger.error("KeyboardInterrupt received. Shutting down.")
             break
@@ -105,44 +123,85 @@ def process_requests(num: int, request_queue: Queue, mngr: object) -> None:
     mngr.shutdown()
 
 
+def process_pipe_requests(num: int, address: str) -> None:
+    """
+    Worker for the pipe transport, answers requests sent straight to its socket.
+
+    Parameters:
+        num: int worker #
+        address: Unix socket the worker listens on.
+    """
+    setproctitle(f"Fullon database worker #{num} for {settings.DBNAME}")
+    state = {'dbase': MainDatabase()}
+
+    def handler(request: Tuple[str, dict]) -> Any:
+        method_name, method_params = request
+        state['dbase'], result = run_request(state['dbase'], method_name, method_params)
+        return result
+
+    def on_stop() -> None:
+        logger.warning(f"Stopping worker {num}")
+        if state['dbase']:
+            state['dbase'].endthis()
+
+    pipe_transport.serve(address=address, handler=handler, on_stop=on_stop)
+
+
 def start():
     """
     Starts the request processing by initializing Queues and kicking off the separate process.
     """
-    global request_queue, processes, _started, WORKERS, response_queue_pool
-    if not response_queue_pool:
-        response_queue_pool = QueuePool(procname="Database Ohlcv")
+    global request_queue, processes, _started, WORKERS, response_queue_pool, pipe_client
     setproctitle("Fullon OHLCV Launcher")
-    if not _started:
-        _started = True
-        logger.info("Starting Database Queue Manager for %s", settings.DBNAME)
-        mngr = Manager()
-        request_queue = mngr.Queue()
+    if _started:
+        return
+    _started = True
+    if getattr(settings, "DB_TRANSPORT", "queue") == "pipe":
+        logger.info("Starting Database pipe workers for %s", settings.DBNAME)
+        addresses = []
         for num in range(0, WORKERS):
-            processes[num] = Process(target=process_requests,  args=(num, request_queue,  mngr))
+            address = pipe_transport.worker_address(name=settings.DBNAME, num=num)
+            processes[num] = Process(target=process_pipe_requests, args=(num, address))
             processes[num].start()
+            addresses.append(address)
+        pipe_client = pipe_transport.PipeClient(addresses=addresses)
+        return
+    if not response_queue_pool:
+        response_queue_pool = QueuePool(procname="Database Ohlcv")
+    logger.info("Starting Database Queue Manager for %s", settings.DBNAME)
+    mngr = Manager()
+    request_queue = mngr.Queue()
+    for num in range(0, WORKERS):
+        processes[num] = Process(target=process_requests,  args=(num, request_queue,  mngr))
+        processes[num].start()
 
 
 def stop():
     """
     Stops the request processing by sending a STOP signal and joining the process.
     """
-    global request_queue, response_queue_pool, processes, _started
+    global request_queue, response_queue_pool, processes, _started, pipe_client
     logger.info("Stopping Exchange Queue Manager for %s", settings.DBNAME)
-    try:
-        request_queue.put(ControlSignals.STOP.value)
-        sleep(1)
-    except FileNotFoundError:
-        pass
+    if pipe_client:
+        for address in pipe_client.addresses:
+            pipe_transport.stop_worker(address=address)
+        sleep(0.5)
+    else:
+        try:
+            request_queue.put(ControlSignals.STOP.value)
+            sleep(1)
+        except (FileNotFoundError, AttributeError):
+            pass
     for num in processes.copy().keys():
         processes[num].join(timeout=1)
         if processes[num].is_alive():
             # logger.warning("Force terminating process for %s", settings.DBNAME)
             processes[num].terminate()
         del processes[num]
-        request_queue = None
-        response_queue_pool = None
-        _started = False
+    request_queue = None
+    response_queue_pool = None
+    pipe_client = None
+    _started = False
 
 
 class Database:
@@ -194,7 +253,9 @@ class Database:
         Raises:
             WorkerError: If the database queue is not initialized.
         """
-        global request_queue, response_queue_pool
+        global request_queue, response_queue_pool, pipe_client
+        if pipe_client:
+            return pipe_client.call((attr, params))
         try:
             # print("DB QUEUE", request_queue.qsize(), len(processes))
             with response_queue_pool.get_queue() as response_queue:
@@ -202,10 +263,16 @@ class Database:
                     raise WorkerError("Database queue not initialized")
 
                 request_queue.put((attr, params, response_queue))
+                timeout = getattr(settings, "DB_RESPONSE_TIMEOUT", RESPONSE_TIMEOUT) or None
                 try:
-                    result = response_queue.get()
+                    result = response_queue.get(timeout=timeout)
                 except EOFError:
+                    response_queue_pool.discard(response_queue)
                     return
+                except Empty:
+                    # the reply may still come, the queue can't be reused
+                    response_queue_pool.discard(response_queue)
+                    raise WorkerError(f"No reply to {attr} after {timeout}s")
                 if isinstance(result, tuple) and result[0] == ControlSignals.STOP.value:
                     raise WorkerError(f"Error in worker process: {result[1]}")
                 return result
@@ -1,20 +1,28 @@
-from typing import Any, Dict, Callable, Optional
+from typing import Any, Dict, Callable, Optional, Tuple
 from multiprocessing import Process, Manager
 from multiprocessing.queues import Queue
+from queue import Empty
 from time import sleep
 from setproctitle import setproctitle
 import psycopg2
 from libs import log, settings
 from libs.models.ohlcv_model import Database as DatabaseOHLCV
 from libs.queue_pool import QueuePool
+from libs import pipe_transport
 from enum import Enum
 
 # Setup logging
 logger = log.fullon_logger(__name__)
 request_queue: Optional[Queue] = None
 response_queue_pool: Optional[QueuePool] = None
+pipe_client: Optional[pipe_transport.PipeClient] = None
+# Answers the requests instead of the workers when set, remote simulation
+# workers send them to their coordinator.
+remote: Optional[Callable[[Tuple[str, str, str, dict]], Any]] = None
 processes: Dict[int, Process] = {}
 _started: bool = False
+# Seconds a request waits for its reply, DB_RESPONSE_TIMEOUT, 0 waits forever
+RESPONSE_TIMEOUT = 600
 
 
 class ControlSignals(Enum):
@@ -25,6 +33,52 @@ class WorkerError(Exception):
     """Custom error to be raised when an error occurs in the worker thread."""
 
 
+def run_request(dbase_instance: Optional[DatabaseOHLCV],
+                exchange: str,
+                symbol: str,
+                method_name: str,
+                method_params: dict) -> Tuple[Optional[DatabaseOHLCV], Any]:
+    """
+    Runs one ohlcv database method, retrying on connection errors.
+
+    Parameters:
+        dbase_instance: The worker database instance, may be None.
+        exchange: The name of the exchange.
+        symbol: The trading symbol.
+        method_name: Name of the method.
+        method_params: Keyword arguments for the method.
+
+    Returns:
+        The (possibly new) database instance and the result.
+    """
+    max_retries = 30
+    for attempt in range(max_retries):
+        try:
+            if not dbase_instance:
+                dbase_instance = DatabaseOHLCV(exchange=exchange, symbol=symbol)
+            else:
+                dbase_instance.reset_params(exchange=exchange, symbol=symbol)
+            method = getattr(dbase_instance, method_name)
+            result = method(**method_params)
+            return dbase_instance, result
+        except psycopg2.OperationalError as db_error:
+            if attempt < max_retries - 1:  # Check if more retries are left
+                msg = f"OHLCV database operation failed, retry {attempt + 1}/{max_retries}. Error: {db_error}"
+                logger.warning(msg)
+                sleep(1.5)  # Wait before retrying
+                if dbase_instance:
+                    dbase_instance.endthis()  # Reset connection pool before retry
+                    dbase_instance = None
+            else:
+                msg = f"OHLCVd atabase operation failed after {max_retries} attempts. Error: {db_error}"
+                logger.error(msg)
+        except psycopg2.errors.SyntaxError:
+            msg = f"Error in method{method_name} with params {method_params}"
+            logger.error(msg)
+            break
+    return dbase_instance, None
+
+
 def process_requests(num: int, request_queue: Queue, mngr: object) -> None:
     """
     Continuously listens for requests and processes them.
@@ -44,33 +98,8 @@ def process_requests(num: int, request_queue: Queue, mngr: object) -> None:
                 logger.warning(f"Stopping ohlcv worker {num}")
                 break
             exchange, symbol, method_name, method_params, response_queue = request
-            max_retries = 30
-            for attempt in range(max_retries):
-                try:
-                    if not dbase_instance:
-                        dbase_instance = DatabaseOHLCV(exchange=exchange, symbol=symbol)
-                    else:
-                        dbase_instance.reset_params(exchange=exchange, symbol=symbol)
-                    method = getattr(dbase_instance, method_name)
-                    result = method(**method_params)
-                    response_queue.put(result)
-                    break  # Break the loop if successful
-                except psycopg2.OperationalError as db_error:
-                    if attempt < max_retries - 1:  # Check if more retries are left
-                        msg = f"OHLCV database operation failed, retry {attempt + 1}/{max_retries}. Error: {db_error}"
-                        logger.warning(msg)
-                        sleep(1.5)  # Wait before retrying
-                        if dbase_instance:
-                            dbase_instance.endthis()  # Reset connection pool before retry
-                            dbase_instance = None
-                    else:
-                        msg = f"OHLCVd atabase operation failed after {max_retries} attempts. Error: {db_error}"
-                        logger.error(msg)
-                        response_queue.put(None)  # Indicate failure to the requester
-                        break
-                except psycopg2.errors.SyntaxError:
-                    msg = f"Error in method{method_name} with params {method_params}"
-                    logger.error(msg)
+            dbase_instance, result = run_request(dbase_instance, exchange, symbol, method_name, method_params)
+            response_queue.put(result)
         except KeyboardInterrupt:
             #logger.error("KeyboardInterrupt received. Shutting down.")
             break
@@ -85,34 +114,74 @@ def process_requests(num: int, request_queue: Queue, mngr: object) -> None:
     mngr.shutdown()
 
 
+def process_pipe_requests(num: int, address: str) -> None:
+    """
+    Worker for the pipe transport, answers requests sent straight to its socket.
+    Large fetch_ohlcv results travel back as packed NumPy buffers.
+
+    Parameters:
+        num: int worker #
+        address: Unix socket the worker listens on.
+    """
+    setproctitle(f"Fullon database worker #{num} for OHLCV")
+    state = {'dbase': None}
+
+    def handler(request: Tuple[str, str, str, dict]) -> Any:
+        exchange, symbol, method_name, method_params = request
+        state['dbase'], result = run_request(state['dbase'], exchange, symbol, method_name, method_params)
+        return result
+
+    def on_stop() -> None:
+        logger.warning(f"Stopping ohlcv worker {num}")
+        if state['dbase']:
+            state['dbase'].endthis()
+
+    pipe_transport.serve(address=address, handler=handler, on_stop=on_stop)
+
+
 def start():
     """
     Starts the request processing by initializing Queues and kicking off the separate process.
     """
-    global request_queue, response_queue_pool, process, _started, response_queue_pool
-    if not response_queue_pool:
-        response_queue_pool = QueuePool(procname="Database Ohlcv")
-    if not _started:
-        _started = True
-        logger.info(f"Starting Database Queue Manager for OHCLV")
-        mngr = Manager()
-        request_queue = mngr.Queue()
+    global request_queue, response_queue_pool, process, _started, response_queue_pool, pipe_client
+    if _started:
+        return
+    _started = True
+    if getattr(settings, "DB_TRANSPORT", "queue") == "pipe":
+        logger.info(f"Starting Database pipe workers for OHCLV")
+        addresses = []
         for num in range(0, settings.DBWORKERS_OHLCV):
-            processes[num] = Process(target=process_requests, args=(num, request_queue, mngr))
+            address = pipe_transport.worker_address(name="ohlcv", num=num)
+            processes[num] = Process(target=process_pipe_requests, args=(num, address))
             processes[num].start()
+            addresses.append(address)
+        pipe_client = pipe_transport.PipeClient(addresses=addresses)
+        return
+    if not response_queue_pool:
+        response_queue_pool = QueuePool(procname="Database Ohlcv")
+    logger.info(f"Starting Database Queue Manager for OHCLV")
+    mngr = Manager()
+    request_queue = mngr.Queue()
+    for num in range(0, settings.DBWORKERS_OHLCV):
+        processes[num] = Process(target=process_requests, args=(num, request_queue, mngr))
+        processes[num].start()
 
 
 def stop():
     """
     Stops the request processing by sending a STOP signal and joining the process.
     """
-    global request_queue, response_queue_pool, process, _started
+    global request_queue, response_queue_pool, process, _started, pipe_client
     if _started:
         logger.info(f"Stopping Exchange Queue Manager for 'OHLCV")
-        try:
-            request_queue.put(ControlSignals.STOP.value)
-        except FileNotFoundError:
-            pass
+        if pipe_client:
+            for address in pipe_client.addresses:
+                pipe_transport.stop_worker(address=address)
+        else:
+            try:
+                request_queue.put(ControlSignals.STOP.value)
+            except FileNotFoundError:
+                pass
         for num, process in processes.copy().items():
             process.join(timeout=0.1)
             if process.is_alive():
@@ -121,6 +190,7 @@ def stop():
             del processes[num]
         request_queue = None
         response_queue_pool = None
+        pipe_client = None
         process = {}
         _started = False
 
@@ -179,7 +249,11 @@ class Database:
         Raises:
             WorkerError: If the database queue is not initialized.
         """
-        global request_queue, response_queue_pool
+        global request_queue, response_queue_pool, pipe_client
+        if remote:
+            return remote((self.exchange, self.symbol, attr, params))
+        if pipe_client:
+            return pipe_client.call((self.exchange, self.symbol, attr, params))
         try:
             # print("OHLCV DB QUEUE", request_queue.qsize(), len(processes))
             with response_queue_pool.get_queue() as response_queue:
@@ -187,7 +261,13 @@ class Database:
                     raise WorkerError("Database queue not initialized")
 
                 request_queue.put((self.exchange, self.symbol, attr, params, response_queue))
-                result = response_queue.get()  # Missing line in original code
+                timeout = getattr(settings, "DB_RESPONSE_TIMEOUT", RESPONSE_TIMEOUT) or None
+                try:
+                    result = response_queue.get(timeout=timeout)
+                except Empty:
+                    # the reply may still come, the queue can't be reused
+                    response_queue_pool.discard(response_queue)
+                    raise WorkerError(f"No reply to {attr} after {timeout}s")
 
                 if isinstance(result, tuple) and result[0] == ControlSignals.STOP.value:
                     raise WorkerError(f"Error in worker process: {result[1]}")
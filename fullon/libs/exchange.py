@@ -233,6 +233,7 @@ class Exchange:
                     # Wait for the worker to process the request and get the result.
                     result = response_queue.get(timeout=timeout)
                 except Empty:
+                    response_queue_pool.discard(response_queue)
                     logger.error("Worker timed out running: %s %s", attr, params)
                     logger.error("relaunching worker")
                     stop(exchange=self.exchange)
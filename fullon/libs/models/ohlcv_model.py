@@ -9,9 +9,26 @@ from libs import database_helpers as dbhelpers
 from libs.structs.trade_struct import TradeStruct
 from datetime import datetime
 import base64
+import csv
+import io
+import numpy
+import pandas
 
 logger = log.fullon_logger(__name__)
 
+BULK_COPY_MIN_ROWS = 200
+TRADE_COLUMNS = ("timestamp", "price", "volume", "side", "type", "ord")
+CANDLE_COLUMNS = ("timestamp", "open", "high", "low", "close", "vol")
+# NULL of the csv the COPY staging path writes, never quoted
+COPY_NULL = "\\N"
+OHLCV_COLUMNS = ("open", "high", "low", "close", "volume")
+PGCOPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+# One row of COPY ... (FORMAT binary) for fetch_ohlcv_df: the field count,
+# then length and value of an int8 timestamp and five float8, big endian.
+OHLCV_COPY_ROW = numpy.dtype([("fields", ">i2"), ("ts_len", ">i4"), ("ts", ">i8")] +
+                             [field for col in OHLCV_COLUMNS
+                              for field in ((f"{col}_len", ">i4"), (col, ">f8"))])
+
 
 class Database:
 
@@ -117,21 +134,124 @@ class Database:
             - The closing price for the time bucket.
             - The total trading volume for the time bucket.
         """
-        # Determine column names based on table type
+        fromdate = self._ohlcv_fromdate(fromdate)
+        sql = self._ohlcv_query(table, compression, period, fromdate, todate)
+        # Execute query and return results
+        try:
+            with self.con.cursor() as cur:
+                cur.execute(sql)
+                rows = cur.fetchall()
+            # If any of the initial rows are empty, fetch data from one hour before the fromdate.
+            for i in range(len(rows)):
+                if any(v is None for v in rows[i]):
+                    fromdate_new = arrow.get(fromdate).shift(hours=-1).format('YYYY-MM-DD HH:mm:ss')
+                    todate_new = fromdate
+                    rows_new = self.fetch_ohlcv(table, compression, period, fromdate_new, todate_new)
+                    # Use the last row of the new data to fill the current empty row of the original data.
+                    if rows_new:
+                        rows[i] = (rows[i][0],) + rows_new[-1][1:]
+                    else:
+                        break  # Break the loop once a non-empty row is encountered
+            return rows
+        except psycopg2.DatabaseError as error:
+            raise ValueError(f"Failed to fetch OHLCV data with query: {sql}")
+
+    def fetch_ohlcv_df(self,
+                       table: str,
+                       compression: int,
+                       period: str,
+                       fromdate: datetime,
+                       todate: datetime) -> pandas.DataFrame:
+        """
+        Columnar version of fetch_ohlcv.
+
+        The buckets are streamed with COPY ... TO STDOUT (FORMAT binary) and
+        read straight into NumPy arrays, so no Python object is built per row.
+
+        Args:
+            table (str): The name of the table to fetch data from.
+            compression (int): The compression factor for the time buckets.
+            period (str): The period  for the time buckets. minutes, days, etc
+            fromdate (str): The starting date for the data range (inclusive).
+            todate (str): The ending date for the data range (inclusive).
+
+        Returns:
+            pandas.DataFrame: float64 open, high, low, close and volume columns
+            indexed by a datetime64 'date' index, UTC aware unless the table is
+            a trades table (plain TIMESTAMP).
+        """
+        fromdate = self._ohlcv_fromdate(fromdate)
+        query = self._ohlcv_query(table, compression, period, fromdate, todate)
+        cols = ", ".join(f"COALESCE({col}::float8, 'NaN')" for col in ("open", "high", "low", "close", "vol"))
+        sql = f"""
+            COPY (SELECT (EXTRACT(EPOCH FROM ts) * 1000000)::int8, {cols}
+                  FROM ({query}) AS ohlcv ORDER BY 1)
+            TO STDOUT WITH (FORMAT binary)
+        """
+        buffer = io.BytesIO()
+        try:
+            with self.con.cursor() as cur:
+                cur.copy_expert(sql, buffer)
+        except psycopg2.DatabaseError as error:
+            raise ValueError(f"Failed to fetch OHLCV data with query: {sql}") from error
+        records = self._parse_ohlcv_copy(buffer.getvalue())
+        index = pandas.to_datetime(records["ts"].astype(numpy.int64), unit="us", utc="trades" not in table)
+        dataframe = pandas.DataFrame({col: records[col].astype(numpy.float64) for col in OHLCV_COLUMNS},
+                                     index=pandas.DatetimeIndex(index, name="date"))
+        # Leading buckets before the first trade of the range come back empty,
+        # fill them from the last bucket of the hour before like fetch_ohlcv.
+        missing = dataframe.isna().any(axis=1).to_numpy()
+        if missing.any():
+            fromdate_new = arrow.get(fromdate).shift(hours=-1).format('YYYY-MM-DD HH:mm:ss')
+            previous = self.fetch_ohlcv_df(table, compression, period, fromdate_new, fromdate)
+            if not previous.empty:
+                dataframe.loc[missing, list(OHLCV_COLUMNS)] = previous.iloc[-1].to_numpy()
+        return dataframe
+
+    @staticmethod
+    def _parse_ohlcv_copy(data: bytes) -> numpy.ndarray:
+        """
+        Reads the output of a binary COPY of fetch_ohlcv_df into a record array.
+
+        Every field is fixed width and never NULL, so the tuples between the
+        header and the trailer map directly onto OHLCV_COPY_ROW.
+        """
+        if not data.startswith(PGCOPY_SIGNATURE):
+            raise ValueError("Unexpected COPY binary header")
+        start = len(PGCOPY_SIGNATURE) + 4
+        extension = int.from_bytes(data[start:start + 4], "big")
+        start += 4 + extension
+        return numpy.frombuffer(data, dtype=OHLCV_COPY_ROW, offset=start,
+                                count=(len(data) - start - 2) // OHLCV_COPY_ROW.itemsize)
+
+    def _ohlcv_fromdate(self, fromdate: Union[str, datetime]) -> Union[str, datetime]:
+        """
+        Moves fromdate up to the oldest timestamp stored for the symbol.
+        """
         oldest = self.get_oldest_timestamp()
         if oldest:
             oldest = arrow.get(oldest)
             if oldest > arrow.get(fromdate):
                 fromdate = oldest.datetime
+        return fromdate
+
+    @staticmethod
+    def _ohlcv_query(table: str,
+                     compression: int,
+                     period: str,
+                     fromdate: Union[str, datetime],
+                     todate: Union[str, datetime]) -> str:
+        """
+        Builds the gap filled time bucket query used by the ohlcv fetchers.
+        """
+        # Determine column names based on table type
         if "trades" in table:
             open_col, high_col, low_col, close_col, vol_col = [
                 "price", "price", "price", "price", "volume"]
         else:
             open_col, high_col, low_col, close_col, vol_col = [
                 "open", "high", "low", "close", "vol"]
-
-        # Construct SQL query
-        sql = f"""
+        return f"""
             SELECT time_bucket_gapfill('{compression} {period}', timestamp) AS ts,
             LOCF(FIRST({open_col}, "timestamp")) AS open,
             LOCF(MAX({high_col})) AS high,
@@ -143,25 +263,6 @@ class Database:
             GROUP BY ts
             ORDER BY ts ASC
         """
-        # Execute query and return results
-        try:
-            with self.con.cursor() as cur:
-                cur.execute(sql)
-                rows = cur.fetchall()
-            # If any of the initial rows are empty, fetch data from one hour before the fromdate.
-            for i in range(len(rows)):
-                if any(v is None for v in rows[i]):
-                    fromdate_new = arrow.get(fromdate).shift(hours=-1).format('YYYY-MM-DD HH:mm:ss')
-                    todate_new = fromdate
-                    rows_new = self.fetch_ohlcv(table, compression, period, fromdate_new, todate_new)
-                    # Use the last row of the new data to fill the current empty row of the original data.
-                    if rows_new:
-                        rows[i] = (rows[i][0],) + rows_new[-1][1:]
-                    else:
-                        break  # Break the loop once a non-empty row is encountered
-            return rows
-        except psycopg2.DatabaseError as error:
-            raise ValueError(f"Failed to fetch OHLCV data with query: {sql}")
 
     def install_timescale(self):
         cur = self.con.cursor()
@@ -336,13 +437,18 @@ class Database:
             logger.info(self.error_print(error=error, method="delete_test_view", query=sql))
         return False
 
-    def save_symbol_trades(self, data: List[TradeStruct]) -> None:
+    def save_symbol_trades(self, data: List[TradeStruct], bulk: Optional[bool] = None) -> None:
         """
         Save all trades from exchanges into a trade table.
 
+        Large batches are streamed with COPY into a staging table and merged
+        into the hypertable in one statement, small ones use executemany.
+        Both paths keep the ON CONFLICT (timestamp) DO NOTHING semantics.
+
         Args:
             data (List[Dict[str, Union[str, float]]]): List of trade data dictionaries.
-            symbol (Optional[str], optional): Symbol for the trade table. Defaults to None.
+            bulk (Optional[bool], optional): Force (True) or skip (False) the COPY path.
+                Defaults to None, COPY when there are at least BULK_COPY_MIN_ROWS rows.
 
         Returns:
             None
@@ -359,6 +465,17 @@ class Database:
         prepared_data = [(line.time, line.price, line.volume, line.side, line.order_type, line.ex_trade_id)
                          for line in data]
 
+        if self._use_bulk(rows=len(prepared_data), bulk=bulk):
+            merge = f"""
+                INSERT INTO {table}.trades (timestamp, price, volume, side, type, ord)
+                SELECT timestamp, price, volume, side, type, ord FROM {{stage}}
+                ORDER BY _seq
+                ON CONFLICT (timestamp) DO NOTHING;
+            """
+            if self._copy_merge(target=f"{table}.trades", rows=prepared_data, merge=merge,
+                                columns=TRADE_COLUMNS, method="save_symbol_trades"):
+                return
+
         try:
             cur = self.con.cursor()
             cur.executemany(sql, ([AsIs(table), *row] for row in prepared_data))
@@ -369,6 +486,59 @@ class Database:
             cur.close()
             logger.info(self.error_print(error=error, method="save_symbol_trades", query=sql))
 
+    @staticmethod
+    def _use_bulk(rows: int, bulk: Optional[bool]) -> bool:
+        """
+        Decides whether a write goes through COPY or executemany.
+        """
+        if bulk is not None:
+            return bulk
+        return rows >= getattr(settings, "BULK_COPY_MIN_ROWS", BULK_COPY_MIN_ROWS)
+
+    def _copy_merge(self, target: str, rows: List[Tuple], merge: str,
+                    columns: Tuple[str, ...], method: str) -> bool:
+        """
+        Streams rows with COPY FROM STDIN (csv) into a temporary staging table
+        shaped like target, then runs the merge statement against it, all in
+        one transaction.
+
+        The staging table gets a _seq column in arrival order so the merge can
+        keep the same precedence executemany would have had. None goes out as
+        an unquoted \\N, the NULL of the COPY, csv would write it as "".
+
+        Args:
+            target (str): schema.table the staging table is modelled after.
+            rows (List[Tuple]): Rows in the order of columns.
+            merge (str): INSERT ... SELECT statement, {stage} is the staging table.
+            columns (Tuple[str, ...]): Column names of rows.
+            method (str): Caller name for error messages.
+
+        Returns:
+            bool: True if the rows were merged, False if the caller should fall back.
+        """
+        stage = "_stage_" + target.replace(".", "_")
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows(tuple(COPY_NULL if value is None else value for value in row) for row in rows)
+        buffer.seek(0)
+        cols = ", ".join(columns)
+        sql = f"""
+            CREATE TEMP TABLE IF NOT EXISTS {stage}
+            (LIKE {target} INCLUDING DEFAULTS, _seq BIGSERIAL) ON COMMIT DELETE ROWS;
+        """
+        try:
+            with self.con.cursor() as cur:
+                cur.execute(sql)
+                cur.copy_expert(f"COPY {stage} ({cols}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+                                buffer)
+                cur.execute(merge.format(stage=stage))
+            self.con.commit()
+            return True
+        except (Exception, psycopg2.DatabaseError) as error:
+            self.con.rollback()
+            logger.warning(self.error_print(error=error, method=f"{method} (copy)", query=merge))
+        return False
+
     def make_schema(self):
         """
         Creates a new schema in the database if it does not exist.
@@ -578,13 +748,19 @@ class Database:
             logger.info(self.error_print(error=error, method="delete_before_midnight", query=sql))
             raise
 
-    def fill_candle_table(self, table: str, data: List[Union[dbhelpers.ohlcv, List]]) -> None:
+    def fill_candle_table(self, table: str, data: List[Union[dbhelpers.ohlcv, List]],
+                          bulk: Optional[bool] = None) -> None:
         """
         Fills the candle table with provided OHLCV data.
 
+        Large batches are loaded with COPY into a staging table and upserted
+        from there, keeping the last row per timestamp like executemany did.
+
         Args:
             table (str): The name of the table to fill.
             data (List[Union[dbhelpers.ohlcv, List]]): List of OHLCV data.
+            bulk (Optional[bool], optional): Force (True) or skip (False) the COPY path.
+                Defaults to None, COPY when there are at least BULK_COPY_MIN_ROWS rows.
 
         Returns:
             None
@@ -615,6 +791,26 @@ class Database:
             else:
                 line = dbhelpers.ohlcv(t1=line)
             prepared_data.append((line.ts, line.open, line.high, line.low, line.close, line.vol))
+
+        if self._use_bulk(rows=len(prepared_data), bulk=bulk):
+            target = f"{self.schema}.{table}"
+            merge = f"""
+                INSERT INTO {target} (timestamp, open, high, low, close, vol)
+                SELECT DISTINCT ON (timestamp) timestamp, open, high, low, close, vol
+                FROM {{stage}}
+                ORDER BY timestamp, _seq DESC
+                ON CONFLICT (timestamp)
+                DO UPDATE SET
+                    open = EXCLUDED.open,
+                    high = EXCLUDED.high,
+                    low = EXCLUDED.low,
+                    close = EXCLUDED.close,
+                    vol = EXCLUDED.vol;
+            """
+            if self._copy_merge(target=target, rows=prepared_data, merge=merge,
+                                columns=CANDLE_COLUMNS, method="fill_candle_table"):
+                return
+
         try:
             with self.con.cursor() as cur:
                 cur.executemany(sql, ([AsIs(f"{self.schema}.{table}"), *row] for row in prepared_data))
@@ -0,0 +1,223 @@
+"""
+Noisy candle paths for Monte Carlo simulations.
+
+A Monte Carlo sweep runs every parameter combination over K noisy versions
+of the same candles. Instead of each simulation copying its feed and adding
+noise column by column, NoisePaths draws the noise of all K paths at once
+into a (columns, K, bars) float32 array from a seeded generator, so path k
+of a given seed is always the same. Feeds of a higher timeframe are reduced
+from the K minute paths in one vectorized pass instead of a pandas resample
+per simulation.
+
+The arrays are .npy files in a directory of the sweep in MONTECARLO_DIR,
+/dev/shm by default, which workers map read-only: one copy in shared memory
+serves every worker. The first worker needing an array builds it holding an
+exclusive flock on its key, as IndicatorCache does for indicator frames.
+SimulManager claims the directory before the sweep and removes it after, as
+well as the directories of sweeps whose process died.
+"""
+import fcntl
+import glob
+import hashlib
+import os
+import shutil
+from contextlib import contextmanager
+from typing import Callable, Optional, Tuple
+import numpy
+import pandas
+from libs import settings, log
+from libs.strategy.indicator_cache import claim_sweep, clear_stale_sweeps, frame_digest
+
+logger = log.fullon_logger(__name__)
+
+SHM_DIR = "/dev/shm/fullon_montecarlo/"
+CACHE_DIR = "montecarlo/"
+COLUMNS = ("open", "high", "low", "close", "volume")
+STD_SCALE = 0.003
+
+
+def store_dir() -> str:
+    """
+    MONTECARLO_DIR, or a directory in /dev/shm when there is one.
+    """
+    root = getattr(settings, "MONTECARLO_DIR", None)
+    if root:
+        return root
+    return SHM_DIR if os.path.isdir(os.path.dirname(SHM_DIR.rstrip("/"))) else CACHE_DIR
+
+
+def resample_minutes(compression: int, period: str) -> Optional[int]:
+    """
+    Minutes per bar a secondary feed is reduced to, None when the minute
+    paths are used as they are. Mirrors FullonSimFeed._resample.
+    """
+    period = period.lower()
+    if period == 'minutes' and int(compression) != 1:
+        return int(compression)
+    if period == 'days':
+        return int(compression) * 1440
+    return None
+
+
+def reduce_bins(index: pandas.DatetimeIndex, minutes: int) -> Tuple[numpy.ndarray, numpy.ndarray, pandas.DatetimeIndex]:
+    """
+    Bins of minutes over index as pandas resample makes them (anchored at
+    the start of the first day): the position of the first bar of every
+    non empty bin, the bin each of those is and the index of all bins.
+    """
+    stamps = index.as_unit("ns").asi8
+    width = minutes * 60 * 1_000_000_000
+    origin = index[0].floor("D").as_unit("ns").value
+    bins = (stamps - origin) // width
+    starts = numpy.flatnonzero(numpy.r_[True, bins[1:] != bins[:-1]])
+    count = int(bins[-1] - bins[0] + 1)
+    new_index = pandas.DatetimeIndex((origin + (bins[0] + numpy.arange(count)) * width).astype("datetime64[ns]"),
+                                     name=index.name)
+    if index.tz is not None:
+        new_index = new_index.tz_localize("UTC").tz_convert(index.tz)
+    return starts, bins[starts] - bins[0], new_index.as_unit(index.unit)
+
+
+def reduce_ohlcv(values: numpy.ndarray, index: pandas.DatetimeIndex,
+                 minutes: int) -> Tuple[numpy.ndarray, pandas.DatetimeIndex]:
+    """
+    Reduces (5, ..., bars) open/high/low/close/volume arrays over index to
+    bars of minutes. Bins without bars are NaN with 0 volume, as resample
+    leaves them.
+    """
+    starts, present, new_index = reduce_bins(index=index, minutes=minutes)
+    ends = numpy.r_[starts[1:], values.shape[-1]]
+    out = numpy.full(values.shape[:-1] + (len(new_index),), numpy.nan, dtype=values.dtype)
+    out[0][..., present] = values[0][..., starts]
+    out[1][..., present] = numpy.maximum.reduceat(values[1], starts, axis=-1)
+    out[2][..., present] = numpy.minimum.reduceat(values[2], starts, axis=-1)
+    out[3][..., present] = values[3][..., ends - 1]
+    out[4] = 0
+    out[4][..., present] = numpy.add.reduceat(values[4], starts, axis=-1)
+    return out, new_index
+
+
+class NoisePaths():
+    """
+    The K noisy paths of a feed for one seed.
+
+    Args:
+        dataframe (pandas.DataFrame): Candles of the main feed, no noise.
+        paths (int): Number of paths, K.
+        seed (int): Seed of the noise generator.
+        std_scale (float): Noise standard deviation as a share of each
+            column's standard deviation, as _add_gaussian_noise.
+        root (str, optional): Directory, MONTECARLO_DIR by default.
+        sweep (str, optional): Id of the sweep, its arrays are kept in a
+            directory of their own.
+    """
+
+    def __init__(self, dataframe: pandas.DataFrame, paths: int, seed: int,
+                 std_scale: float = STD_SCALE, root: Optional[str] = None,
+                 sweep: Optional[str] = None) -> None:
+        self.dataframe = dataframe
+        self.paths = int(paths)
+        self.seed = int(seed)
+        self.std_scale = std_scale
+        self.root = os.path.join(root or store_dir(), sweep) if sweep else root or store_dir()
+        digest = hashlib.sha1(frame_digest(dataframe[list(COLUMNS)]).encode())
+        digest.update(f"{self.paths}:{self.seed}:{std_scale}".encode())
+        self.key = digest.hexdigest()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.root, f"{self.key}_{name}.npy")
+
+    @contextmanager
+    def _lock(self, name: str):
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, f"{self.key}_{name}.lock"), "a+") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _array(self, name: str, build: Callable[[str], None]) -> numpy.ndarray:
+        """
+        Maps array name read-only, build writes it to the path it is given
+        first if there is none.
+        """
+        path = self._file(name)
+        if not os.path.exists(path):
+            with self._lock(name):
+                if not os.path.exists(path):
+                    tmp = path + f".{os.getpid()}.tmp"
+                    build(tmp)
+                    os.replace(tmp, path)
+        return numpy.load(path, mmap_mode="r")
+
+    def _build_paths(self, path: str) -> None:
+        bars = len(self.dataframe)
+        rng = numpy.random.default_rng(self.seed)
+        values = numpy.lib.format.open_memmap(path, mode="w+", dtype=numpy.float32,
+                                              shape=(len(COLUMNS), self.paths, bars))
+        for num, col in enumerate(COLUMNS):
+            std = numpy.float32(self.dataframe[col].std() * self.std_scale)
+            rng.standard_normal(size=(self.paths, bars), dtype=numpy.float32, out=values[num])
+            values[num] *= std
+            values[num] += self.dataframe[col].to_numpy(dtype=numpy.float32)
+        values.flush()
+        del values
+
+    def values(self) -> numpy.ndarray:
+        """
+        (5, K, bars) array of every path.
+        """
+        return self._array("minutes", self._build_paths)
+
+    def reduced(self, minutes: int) -> Tuple[numpy.ndarray, pandas.DatetimeIndex]:
+        """
+        (5, K, bins) array of every path reduced to bars of minutes.
+        """
+        index = self.dataframe.index
+
+        def build(path: str) -> None:
+            out, _ = reduce_ohlcv(values=self.values(), index=index, minutes=minutes)
+            with open(path, "wb") as array_file:
+                numpy.save(array_file, out)
+        _, _, new_index = reduce_bins(index=index, minutes=minutes)
+        return self._array(f"{minutes}min", build), new_index
+
+    def path(self, num: int, compression: int = 1, period: str = 'minutes') -> pandas.DataFrame:
+        """
+        Path num as a feed DataFrame, reduced to compression/period for a
+        secondary feed.
+        """
+        minutes = resample_minutes(compression=compression, period=period)
+        if minutes is None:
+            values, index = self.values(), self.dataframe.index
+        else:
+            values, index = self.reduced(minutes=minutes)
+        return pandas.DataFrame({col: values[pos, num].astype(numpy.float64) for pos, col in enumerate(COLUMNS)},
+                                index=index)
+
+    @staticmethod
+    def claim(sweep: str, root: Optional[str] = None) -> None:
+        """
+        Creates the directory of sweep, owned by this process, and removes
+        the ones of sweeps whose process died.
+        """
+        root = root or store_dir()
+        clear_stale_sweeps(root)
+        claim_sweep(os.path.join(root, sweep))
+
+    @staticmethod
+    def clear(root: Optional[str] = None, sweep: Optional[str] = None) -> None:
+        """
+        Removes the path arrays of sweep, or the ones outside any sweep.
+        """
+        root = root or store_dir()
+        if sweep:
+            shutil.rmtree(os.path.join(root, sweep), ignore_errors=True)
+            return
+        for pattern in ("*.npy", "*.lock", "*.tmp"):
+            for path in glob.glob(os.path.join(root, pattern)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,240 @@
+"""
+Direct request/response transport between callers and the database worker
+processes, used when DB_TRANSPORT = pipe in fullon.conf.
+
+Every worker listens on its own unix socket. Callers keep one persistent
+multiprocessing connection per thread and per process, so a request is a
+single send/recv pair instead of two trips through a Manager server.
+Results shaped like OHLCV rows, a list of (datetime, number, ...) tuples,
+are packed into NumPy buffers by the worker and rebuilt on the caller side.
+"""
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+from multiprocessing import AuthenticationError, current_process
+from multiprocessing.connection import Client, Listener
+from time import sleep
+from typing import Any, Callable, List, Optional
+import numpy
+from libs import log
+
+logger = log.fullon_logger(__name__)
+
+STOP = "StopThisRun"
+PACKED = "__packed_rows__"
+PACK_MIN_ROWS = 1000
+CONNECT_RETRIES = 50
+
+
+def worker_address(name: str, num: int) -> str:
+    """
+    Unix socket path for worker num of the named worker group.
+    """
+    return os.path.join(tempfile.gettempdir(), f"fullon-{name}-{os.getpid()}-{num}.sock")
+
+
+def _column_dtype(values: tuple) -> Optional[str]:
+    """ NumPy dtype that gives values back unchanged, None if there is none """
+    kinds = {type(value) for value in values}
+    if kinds == {int}:
+        return 'int64'
+    if kinds == {float}:
+        return 'float64'
+    return None
+
+
+def pack_result(result: Any) -> Any:
+    """
+    Packs a large list of (datetime, number, ...) rows into NumPy buffers.
+
+    Every row is checked, anything else, or rows with missing values or a
+    column mixing ints and floats, is returned unchanged. Int columns are
+    packed as int64, float ones as float64.
+
+    Args:
+        result (Any): Result of a database method.
+
+    Returns:
+        Any: A PACKED tuple or the original result.
+    """
+    if not isinstance(result, list) or len(result) < PACK_MIN_ROWS:
+        return result
+    first = result[0]
+    if not isinstance(first, tuple) or len(first) < 2 or not isinstance(first[0], datetime):
+        return result
+    width = len(first)
+    if not all(isinstance(row, tuple) and len(row) == width for row in result):
+        return result
+    stamps, *columns = zip(*result)
+    aware = first[0].tzinfo is not None
+    if not all(isinstance(stamp, datetime) and (stamp.tzinfo is not None) == aware for stamp in stamps):
+        return result
+    dtypes = [_column_dtype(column) for column in columns]
+    if None in dtypes:
+        return result
+    try:
+        buffers = [(dtype, numpy.array(column, dtype=dtype).tobytes()) for dtype, column in zip(dtypes, columns)]
+        if aware:
+            stamps = numpy.array([stamp.timestamp() for stamp in stamps], dtype=numpy.float64)
+            stamps = numpy.round(stamps * 1_000_000).astype(numpy.int64)
+        else:
+            stamps = numpy.array(stamps, dtype='datetime64[us]').astype(numpy.int64)
+    except (TypeError, ValueError, OverflowError):
+        return result
+    return (PACKED, aware, len(result), stamps.tobytes(), buffers)
+
+
+def unpack_result(result: Any) -> Any:
+    """
+    Rebuilds rows packed by pack_result, other results pass through.
+
+    Timestamps come back as UTC datetimes, timezone aware if they were aware.
+    """
+    if not isinstance(result, tuple) or len(result) != 5 or result[0] != PACKED:
+        return result
+    _, aware, _, stamps, buffers = result
+    stamps = numpy.frombuffer(stamps, dtype=numpy.int64).astype('datetime64[us]').tolist()
+    if aware:
+        stamps = [stamp.replace(tzinfo=timezone.utc) for stamp in stamps]
+    columns = [numpy.frombuffer(values, dtype=dtype).tolist() for dtype, values in buffers]
+    return list(zip(stamps, *columns))
+
+
+def serve(address: str, handler: Callable[[Any], Any], on_stop: Optional[Callable] = None) -> None:
+    """
+    Runs a worker: accepts connections on address and answers every request
+    received on them with handler(request). Each connection is served by its
+    own thread, calls to handler are serialized since workers own a single
+    database connection.
+
+    Args:
+        address (str): Unix socket path to listen on.
+        handler (Callable): Called with each request, returns the result.
+        on_stop (Callable, optional): Called once the worker stops.
+    """
+    lock = threading.Lock()
+    stop_event = threading.Event()
+    try:
+        os.unlink(address)
+    except FileNotFoundError:
+        pass
+    listener = Listener(address, family='AF_UNIX', authkey=current_process().authkey)
+
+    def serve_connection(conn) -> None:
+        while not stop_event.is_set():
+            try:
+                request = conn.recv()
+            except (EOFError, OSError):
+                break
+            if request == STOP:
+                stop_event.set()
+                try:
+                    Client(address, family='AF_UNIX', authkey=current_process().authkey).close()
+                except OSError:
+                    pass
+                break
+            with lock:
+                try:
+                    result = handler(request)
+                except Exception as error:
+                    logger.error(f"Worker error: {error}")
+                    result = None
+            try:
+                conn.send(pack_result(result))
+            except (BrokenPipeError, EOFError, ConnectionResetError, OSError):
+                break
+        conn.close()
+
+    try:
+        while not stop_event.is_set():
+            try:
+                conn = listener.accept()
+            except (OSError, AuthenticationError):
+                continue
+            if stop_event.is_set():
+                conn.close()
+                break
+            threading.Thread(target=serve_connection, args=(conn,), daemon=True).start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+        if on_stop:
+            with lock:
+                on_stop()
+
+
+def stop_worker(address: str) -> None:
+    """
+    Asks the worker listening on address to stop.
+    """
+    try:
+        with Client(address, family='AF_UNIX', authkey=current_process().authkey) as conn:
+            conn.send(STOP)
+    except (FileNotFoundError, ConnectionRefusedError, OSError):
+        pass
+
+
+class PipeClient():
+    """
+    Sends requests to a group of workers over persistent connections.
+
+    Connections are kept per thread and per process, a forked child opens its
+    own ones. Threads are spread over the workers round robin.
+    """
+
+    def __init__(self, addresses: List[str]) -> None:
+        self.addresses = addresses
+        self._local = threading.local()
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        with self._lock:
+            address = self.addresses[self._next % len(self.addresses)]
+            self._next += 1
+        for _ in range(CONNECT_RETRIES):
+            try:
+                return Client(address, family='AF_UNIX', authkey=current_process().authkey)
+            except (FileNotFoundError, ConnectionRefusedError):
+                sleep(0.1)
+        raise ConnectionRefusedError(f"Worker at {address} is not listening")
+
+    def _connection(self):
+        if getattr(self._local, 'pid', None) != os.getpid():
+            self._local.pid = os.getpid()
+            self._local.conn = None
+        if self._local.conn is None:
+            self._local.conn = self._connect()
+        return self._local.conn
+
+    def _drop(self) -> None:
+        try:
+            self._local.conn.close()
+        except (AttributeError, OSError):
+            pass
+        self._local.conn = None
+
+    def call(self, request: Any) -> Any:
+        """
+        Sends request to a worker and waits for its result.
+
+        A connection found broken when sending is reopened once. Once the
+        request went out it is never sent again, the worker may have run it.
+        """
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.send(request)
+            except (EOFError, BrokenPipeError, ConnectionResetError):
+                self._drop()
+                if attempt:
+                    raise
+                continue
+            try:
+                return unpack_result(conn.recv())
+            except (EOFError, ConnectionResetError):
+                self._drop()
+                raise
+        return None
@@ -107,41 +107,18 @@ def _create_empty_flagfile(filename):
 
 def _fetch_data_from_db(feed: FullonFeed,
                         todate: arrow.Arrow,
-                        fromdate: arrow.Arrow) -> List[Any]:
+                        fromdate: arrow.Arrow) -> pandas.DataFrame:
     """
     Returns:
-        rows: The fetched data.
+        pandas.DataFrame: The fetched data, in columnar form.
     """
     with Database_ohlcv(exchange=feed.feed.exchange_name,
                         symbol=feed.symbol) as dbase:
-        rows = dbase.fetch_ohlcv(table=feed._table,
-                                 compression=feed.compression,
-                                 period=feed.feed.period,
-                                 fromdate=fromdate.datetime,
-                                 todate=todate.shift(microseconds=-1).datetime)
-    return rows
-
-
-def _to_df(rows: List[Any]):
-    """
-    Creates a DataFrame from the input data
-    :param rows: The data to be saved
-    """
-    dataframe = pandas.DataFrame(rows)
-    # Rename the columns
-    dataframe.rename(columns={0: "date",
-                              1: "open",
-                              2: "high",
-                              3: "low",
-                              4: "close",
-                              5: "volume"}, inplace=True)
-    # Set the index to the 'date' column
-    dataframe.set_index("date", inplace=True)
-    # Get the columns to convert to numeric
-    columns_to_convert = dataframe.columns.difference(['date'])
-    # Convert the columns to numeric
-    dataframe[columns_to_convert] = dataframe[columns_to_convert].apply(pandas.to_numeric)
-    dataframe.index = pandas.to_datetime(dataframe.index)
+        dataframe = dbase.fetch_ohlcv_df(table=feed._table,
+                                         compression=feed.compression,
+                                         period=feed.feed.period,
+                                         fromdate=fromdate.datetime,
+                                         todate=todate.shift(microseconds=-1).datetime)
     return dataframe
 
 
@@ -206,8 +183,7 @@ def load_dataframe(feed: FullonFeed,
     dataframe = _load_from_pickle(feed=feed, fromdate=fromdate, todate=todate)
     if dataframe.empty:
         _create_empty_flagfile(filename)
-        rows = _fetch_data_from_db(feed=feed, todate=_todate, fromdate=arrow.get(fromdate))
-        dataframe = _to_df(rows=rows)  # only works if self.dataframe is not set
+        dataframe = _fetch_data_from_db(feed=feed, todate=_todate, fromdate=arrow.get(fromdate))
         _save_to_pickle(dataframe=dataframe,
                         feed=feed,
                         fromdate=fromdate,
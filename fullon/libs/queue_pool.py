@@ -1,24 +1,88 @@
+import os
+import threading
 from multiprocessing import Manager
 from contextlib import contextmanager
+from typing import Any, List, Set
 from setproctitle import setproctitle
+from libs import settings
+
+POOL_SIZE = 8
 
 
 class QueuePool:
-    def __init__(self, procname: str = "unknown"):
+    """
+    Pool of manager queues used as response channels.
+
+    Creating a Manager().Queue() costs a new proxy, a server side queue and
+    several round trips to the manager process, so queues are created once,
+    checked out for one request and put back afterwards. Queues are kept per
+    process: a forked child starts with an empty pool instead of sharing the
+    channels its parent may be using.
+    """
+
+    def __init__(self, procname: str = "unknown", size: int = 0):
         setproctitle("Fullon queue manager for: "+procname)
         self.manager = Manager()
         setproctitle("Fullon Daemon")
+        self.size = size or getattr(settings, "QUEUE_POOL_SIZE", POOL_SIZE)
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._free: List[Any] = [self.manager.Queue() for _ in range(self.size)]
+        self._discarded: Set[int] = set()
+
+    def _checkout(self) -> Any:
+        """
+        Takes a free queue from the pool, or creates one if all are in use.
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._free = []
+            if self._free:
+                return self._free.pop()
+        return self.manager.Queue()
+
+    def _release(self, queue: Any) -> None:
+        """
+        Gives a queue back to the pool, extra queues are dropped.
+        """
+        with self._lock:
+            if id(queue) in self._discarded:
+                self._discarded.discard(id(queue))
+                return
+            if self._pid == os.getpid() and len(self._free) < self.size:
+                self._free.append(queue)
 
     @contextmanager
     def get_queue(self):
         """
         Context manager for safely getting and releasing a queue.
+
+        The queue goes back to the pool when the block exits normally. If the
+        block raises, or discard() was called on it, a late reply could still
+        land in it, so it is dropped instead.
         """
         queue = None
+        release = False
         try:
-            queue = self.manager.Queue()
+            queue = self._checkout()
             yield queue
+            release = True
         except ConnectionRefusedError:
             exit()
         finally:
+            if queue is not None:
+                if release:
+                    self._release(queue)
+                else:
+                    with self._lock:
+                        self._discarded.discard(id(queue))
             del queue  # Assuming the queue will be garbage collected
+
+    def discard(self, queue: Any) -> None:
+        """
+        Marks a checked out queue so it is not reused, for instance after a
+        request timed out and its reply may still arrive.
+        """
+        with self._lock:
+            self._discarded.add(id(queue))
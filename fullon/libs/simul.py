@@ -7,8 +7,9 @@ from libs import log
 from PIL import Image
 import numpy as np
 from tabulate import tabulate
-from typing import List, Dict, Union, Any, Optional
+from typing import List, Dict, Union, Any, Optional, Tuple
 from termcolor import cprint, colored
+from libs.simul_metrics import summarize
 
 logger = log.fullon_logger(__name__)
 
@@ -16,6 +17,9 @@ logger = log.fullon_logger(__name__)
 class simul:
     """description"""
 
+    RESULT_COLUMNS = ['TTrades', 'Win rate %', 'Fees', 'Stake Yield', 'Profit', 'ROI', 'Ending Cash',
+                      'AvgReturn', 'MedReturn', 'NegStdDev', 'PosStdDev', 'Max Drawdown %', 'SharpeRatio']
+
     def __init__(self):
         """description"""
         pass
@@ -67,48 +71,34 @@ class simul:
 
     def echo_results(self, bot: dict, results: dict, sharpe_filter: float = 0.0,
                      montecarlo: bool = False, visual: bool = False,
-                     xls: bool = False, verbose: bool = False):
+                     xls: bool = False, verbose: bool = False, store: Any = None):
         """
         Processes the simulation results for output based on given filters.
         Args:
             results (dict): A dictionary of tuples containing bot configurations and their corresponding simulation results.
             sharpe_filter (float): Sharpe ratio filter for the results.
             short (bool): A flag for whether to shorten the output.
+            store (SimulStore, optional): Reads the results of each strategy from the store
+                a sweep wrote them to instead, results is then ignored.
         """
-        consolidate = len(results) > 1
+        str_ids = list(results) if store is None else store.strategies()
+        consolidate = len(str_ids) > 1
         df_list = []  # List of dataframes to hold each row of the DataFrame
 
-        for str_id, result in results.items():
+        for str_id in str_ids:
             # Process each result and get the DataFrame
-            data_for_df = []  # List to hold each row of the DataFrame
-            res = self.echo_result(bot=bot, results=result, sharpe_filter=sharpe_filter, montecarlo=montecarlo, xls=xls, verbose=verbose)
+            if store is None:
+                res = self.echo_result(bot=bot, results=results[str_id], sharpe_filter=sharpe_filter,
+                                       montecarlo=montecarlo, xls=xls, verbose=verbose)
+            else:
+                parsed = store.summaries(str_id=str_id, sharpe_filter=sharpe_filter, frames=bool(verbose or xls))
+                res = self.echo_result(bot=bot, results=[], parsed=parsed, montecarlo=montecarlo,
+                                       xls=xls, verbose=verbose)
             if res is not None and not res.empty:
-                # Iterate over each row in the returned DataFrame
-                for _, row in res.iterrows():
-                    # Create a dictionary for the DataFrame row
-                    data_row = {
-                        'TTrades': row['TTrades'],
-                        'Win rate %': row['Win rate %'],
-                        'Fees': row['Fees'],
-                        'Stake Yield': row['Stake Yield'],
-                        'Profit': row['Profit'],
-                        'ROI': row['ROI'],
-                        'Ending Cash': row['Ending Cash'],
-                        'AvgReturn': row['AvgReturn'],
-                        'MedReturn': row['MedReturn'],
-                        'NegStdDev': row['NegStdDev'],
-                        'PosStdDev': row['PosStdDev'],
-                        'Max Drawdown %': row['Max Drawdown %'],
-                        'SharpeRatio': row['SharpeRatio']
-                    }
-                    data_for_df.append(data_row)
+                df_list.append(res[self.RESULT_COLUMNS].reset_index(drop=True))
             else:
                 print("Empty or None DataFrame received for:", str_id)
 
-            # Convert list of dictionaries to DataFrame
-            if data_for_df:
-                df_list.append(pd.DataFrame(data_for_df))
-
         # Determine the number of rows in the DataFrames
         # Create a list to hold the new DataFrames
         final_dfs = []
@@ -151,17 +141,19 @@ class simul:
         summary_df['count'] = summary_df['count'].astype(int)  # Ensure count is an integer
         return summary_df
 
-    def prepare_data(self, bot, results, sharpe_filter, verbose, xls):
+    def prepare_data(self, bot, results, sharpe_filter, verbose, xls, parsed=None):
         """
         """
         _results = []
-        for bot, result in results:
-            # Parse simulation results according to bot's configuration
-            summaries = self.parse(results=result, sharpe_filter=sharpe_filter)
+        # Parse simulation results according to bot's configuration
+        if parsed is None:
+            parsed = self.parse_many(results=[result for _, result in results], sharpe_filter=sharpe_filter,
+                                     frames=bool(verbose or xls))
+        for summaries in parsed:
             if summaries:
                 summary = self.calculate_final_summary(summaries=summaries)
                 if summary:
-                    _results.append((result, summary))
+                    _results.append((summaries, summary))
         _results = sorted(_results, key=lambda x: x[1]['Total Return'], reverse=True)
         if not _results:
             print("No trades, for any simulation apparently")
@@ -194,18 +186,20 @@ class simul:
                     sharpe_filter: float = 0.0,
                     montecarlo: bool = False,
                     verbose: bool = False,
-                    xls: bool = False) -> Optional[pd.DataFrame]:
+                    xls: bool = False,
+                    parsed: Optional[List[Dict[int, Dict[str, Any]]]] = None) -> Optional[pd.DataFrame]:
         """
          Processes the simulation results for output based on given filters.
         Args:
             results (list): A list of tuples containing bot configurations and their corresponding simulation results.
             sharpe_filter (float): Sharpe ratio filter for the results.
             short (bool): A flag for whether to shorten the output.
+            parsed (list, optional): What parse returned for each simulation, results are not parsed then.
         Note:
             This function creates an instance of the 'simul' class to parse results and deletes it afterwards.
         """
         try:
-            if not results[0][1]:
+            if not (parsed if parsed is not None else results[0][1]):
                 print("Simulation produced no results, maybe a problem with your parameters")
                 return
         except IndexError:
@@ -214,7 +208,7 @@ class simul:
 
         _results, prepared_data = self.prepare_data(bot=bot, results=results,
                                                     sharpe_filter=sharpe_filter,
-                                                    xls=xls, verbose=verbose)
+                                                    xls=xls, verbose=verbose, parsed=parsed)
         if not _results:
             return
 
@@ -325,7 +319,8 @@ class simul:
 
     def parse(self,
               results: List[Union[str, List[Dict[str, Any]]]],
-              sharpe_filter: float = 0.0) -> Dict[int, Dict[str, Any]]:
+              sharpe_filter: float = 0.0,
+              frames: bool = True) -> Dict[int, Dict[str, Any]]:
         """
         Parse the results of multiple simulations and calculate various performance metrics.
 
@@ -333,20 +328,53 @@ class simul:
         ----------
         results : list
             A list of simulation results, where each result is either an error message (str) or a list of trade data (dict).
-        bot : dict
-            A dictionary containing various bot settings, such as verbosity, visualization, etc.
         sharpe_filter : float
             A minimum Sharpe ratio to filter the results.
+        frames : bool
+            Whether to keep the trades of each feed as a DataFrame in 'df', only verbose and xls output need them.
 
         Returns
         -------
-        str or None
-            A formatted string containing the results of the simulations, or None if there is nothing to print.
+        dict
+            The summary of each feed with trades, or an empty dict if one of them is below sharpe_filter.
         """
-        if 'ERROR' in results[0]:
-            return results[0]
+        return self.parse_many(results=[results], sharpe_filter=sharpe_filter, frames=frames)[0]
 
-        summaries = {}
+    def parse_many(self,
+                   results: List[List[Union[str, List[Dict[str, Any]]]]],
+                   sharpe_filter: float = 0.0,
+                   frames: bool = True) -> List[Dict[int, Dict[str, Any]]]:
+        """
+        parse for the results of many simulations, their metrics computed
+        in one pass over the trades of all of them.
+
+        Returns
+        -------
+        list
+            What parse returns for each of results.
+        """
+        parsed: List[Any] = [None] * len(results)
+        simulations = []
+        for pos, result in enumerate(results):
+            if 'ERROR' in result[0]:
+                parsed[pos] = result[0]
+                continue
+            simulations.append((pos, *self._feeds(results=result)))
+        trade_lists = [feed['simulresults'] for _, feeds, _, _ in simulations for feed in feeds]
+        cash = [feed['detail']['starting_cash'] for _, feeds, _, _ in simulations for feed in feeds]
+        metrics = iter(summarize(trade_lists=trade_lists, starting_cash=cash))
+        for pos, feeds, periods, compressions in simulations:
+            parsed[pos] = self._summaries(feeds=feeds, metrics=[next(metrics) for _ in feeds],
+                                          periods=periods, compressions=compressions,
+                                          sharpe_filter=sharpe_filter, frames=frames)
+        return parsed
+
+    @staticmethod
+    def _feeds(results: List[Union[str, List[Dict[str, Any]]]]) -> Tuple[List[Dict[str, Any]], str, str]:
+        """
+        Trades and detail of each feed of a simulation, with the periods
+        and compressions of all of them.
+        """
         compressions = ""
         periods = ""
         _results = []
@@ -365,126 +393,48 @@ class simul:
                 periods += f"{period}, "
             except (KeyError, IndexError):
                 pass
-        compressions = compressions.rstrip(", ")
-        periods = periods.rstrip(", ")
+        return _results, periods.rstrip(", "), compressions.rstrip(", ")
 
-        for n in range(0, len(_results)):
-            try:
-                simulresults = _results[n]['simulresults']
-                detail = _results[n]['detail']
-            except KeyError:
-                print(f"Empty simulation results for feed({n})")
-                continue
-
-            df = pd.DataFrame.from_dict(simulresults)
-            starting_cash: float = detail['starting_cash']
-
-            if df.shape[0] <= 1:
+    @staticmethod
+    def _summaries(feeds: List[Dict[str, Any]],
+                   metrics: List[Optional[Dict[str, Any]]],
+                   periods: str,
+                   compressions: str,
+                   sharpe_filter: float,
+                   frames: bool) -> Dict[int, Dict[str, Any]]:
+        """
+        Summary of each feed of a simulation from its metrics.
+        """
+        summaries = {}
+        for n, (feed, metric) in enumerate(zip(feeds, metrics)):
+            if metric is None:
                 continue
-
-            # Group dataframe by 'ref' to identify individual trades
-            grouped_df = df.groupby('num')
-            opening_trades = grouped_df.ngroups
-
-            # Initiate empty lists to store roi_pct for profitable trades, loss trades, all trades and durations
-            profitable_pnl = []
-            loss_pnl = []
-            all_pnl = []
-            durations = []
-
-
-            # Iterate over grouped_df and add roi_pct of closing trade to the lists and calculate durations
-            for _, group in grouped_df:
-                try:
-                    closing_trade_pnl = group.iloc[-1]['roi']
-                    duration = group.iloc[1]['timestamp'] - group.iloc[0]['timestamp']
-                    durations.append(duration)
-                    all_pnl.append(closing_trade_pnl)
-                    if closing_trade_pnl > 0:
-                        profitable_pnl.append(closing_trade_pnl)
-                    elif closing_trade_pnl < 0:
-                        loss_pnl.append(closing_trade_pnl)
-                except IndexError:
-                    logger.error("IndexError evaluating simul results, try removing pickle/* and try again")
-                    logger.error("or seems last trade was not closed")
-                    pass
-
-            # Calculating metrics
-            total_fees = round(df['fee'].sum(), 2)
-            total_trades = grouped_df.ngroups
-            profitable_trades = len(profitable_pnl)
-            loss_trades = len(loss_pnl)
-            win_rate = round((profitable_trades / total_trades) * 100, 4)
-            average_return = round(np.mean(all_pnl), 4)
-            median_return = round(np.median(all_pnl), 4)
-            if len(loss_pnl) > 1:
-                neg_std_dev = round(np.std(loss_pnl), 4)
-            else:
-                neg_std_dev = 0  # or some other value indicating an error or undefined result
-            if len(profitable_pnl) > 1:
-                pos_std_dev = round(np.std(profitable_pnl), 4)
-            else:
-                pos_std_dev = 0
-            average_duration = round(np.mean(durations).total_seconds(), 4) # In seconds
-            if len(all_pnl) > 1 and np.std(all_pnl) != 0:
-                sharpe_ratio = round(average_return / np.std(all_pnl), 4)
-            else:
-                sharpe_ratio = 0  # np.nan  # or some other value indicating an error or undefined result
-
-            if sharpe_ratio < sharpe_filter:
+            if metric['Sharpe Ratio'] < sharpe_filter:
                 return {}
-            # Filter the DataFrame to include only rows where 'reason' is not null
-            filtered_df = df[df['reason'].notnull()]
-            # Calculate the sum of the 'pnlfee' column from the filtered DataFrame
-            total_return = round(filtered_df['pnlfee'].sum(), 2)
-            #total_return = detail['ending_assets'] - starting_cash
-            roi = round(100 - (starting_cash - total_return) / starting_cash * 100, 2)
-            # Starting and ending dates
-            start_date = df['timestamp'].min()
-            end_date = df['timestamp'].max()
-            # Placeholder for Profit Factor, Recovery Factor
-            profit_factor = "placeholder"
-            recovery_factor = "placeholder"
-            max_drawdown = (starting_cash - filtered_df['assets'].min()) / starting_cash * 100
-
-            if max_drawdown < 0:
-                max_drawdown = 0
-
+            detail = feed['detail']
             # Create summary dictionary
             summary = {
                 'Strategy': detail['strategy'],
                 'Symbol': detail['feed'].symbol,
                 'Period': periods,
                 'Compression': compressions,
-                'Start Date': start_date,
-                'End Date': end_date
+                'Start Date': metric['Start Date'],
+                'End Date': metric['End Date']
             }
             if detail['params']['pairs'] is False:
                 _ = detail['params'].pop('pairs')
             for remove in ['bot_id', 'uid', 'feeds', 'str_id']:
                 _ = detail['params'].pop(remove)
             summary.update(detail['params'])
+            summary.update(metric)
             summary.update({
                 'params': detail['params'],
-                'Total Trades': total_trades,
-                'Profitable Trades': profitable_trades,
-                'Loss Trades': loss_trades,
-                'Win Rate (%)': win_rate,
-                'Total Fees': total_fees,
-                'Average Return %': average_return,
-                'Total Return': total_return,
-                'Total ROI %': roi,
                 'Ending Cash': detail['ending_assets'],
                 'Yield': detail['interest_earned'],
-                'Median Return': median_return,
-                'Negative Returns Standard Deviation': neg_std_dev,
-                'Positive Returns Standard Deviation': pos_std_dev,
-                'Average Duration (hours)': round(average_duration/60/60, 2),
-                'Max Drawdown %': max_drawdown,
-                'Profit Factor': profit_factor,
-                'Recovery Factor': recovery_factor,
-                'Sharpe Ratio': sharpe_ratio,
-                'df': df
+                # Placeholder for Profit Factor, Recovery Factor
+                'Profit Factor': "placeholder",
+                'Recovery Factor': "placeholder",
+                'df': pd.DataFrame.from_dict(feed['simulresults']) if frames else None
             })
             validate_keys = ['stop_loss', 'take_profit', 'trailing_stop', 'timeout', 'size_pct', 'size']
             for key in validate_keys:
@@ -493,7 +443,6 @@ class simul:
             summaries[n] = summary
         return summaries
 
-
     @staticmethod
     def round_floats_in_dict(d, decimal_places=2):
         for k, v in d.items():
@@ -538,7 +487,7 @@ class simul:
              for key in averaged_keys}
         )
 
-        dfs = [summaries[i]['df'] for i in summaries]
+        dfs = [summaries[i].get('df') for i in summaries]
         final_summary.update({'df': dfs})
 
         # Date stuff
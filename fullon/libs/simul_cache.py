@@ -0,0 +1,160 @@
+"""
+On disk cache of simulation results.
+
+Bot.run_simul_loop stores what it returns under a key hashed from
+everything the simulation depends on: the source of the strategy classes,
+the resolved strategy params, the candles of each feed, the Monte Carlo
+path of noisy runs, fee, leverage and the run flags. Re-running a sweep
+that overlaps a previous one only simulates the combinations not seen
+before.
+
+Entries are pickles in SIMUL_CACHE_DIR, written to a temporary file and
+renamed into place so workers never read a partial one. Reading an entry
+touches it; once the directory grows past SIMUL_CACHE_MB the least recently
+used entries are removed. SIMUL_CACHE_MB = 0 disables the cache.
+"""
+import glob
+import hashlib
+import inspect
+import os
+import pickle
+from typing import Any, Dict, Iterable, Optional
+from libs import settings, log
+
+logger = log.fullon_logger(__name__)
+
+CACHE_DIR = "simulcache/"
+CACHE_MB = 512
+SOURCE_PACKAGES = ("strategies.", "libs.strategy.")
+
+
+def source_digest(strategy_class: type) -> str:
+    """
+    Digest of the source files of strategy_class and of the strategy
+    classes it inherits from.
+    """
+    digest = hashlib.sha1()
+    for klass in inspect.getmro(strategy_class):
+        if not klass.__module__.startswith(SOURCE_PACKAGES):
+            continue
+        try:
+            with open(inspect.getsourcefile(klass), "rb") as source:
+                digest.update(source.read())
+        except (TypeError, OSError):
+            digest.update(klass.__module__.encode())
+    return digest.hexdigest()
+
+
+class SimulCache():
+    """
+    Directory of simulation results keyed by their inputs.
+
+    Args:
+        root (str, optional): Cache directory, SIMUL_CACHE_DIR by default.
+        max_mb (int, optional): Size limit in MB, SIMUL_CACHE_MB by default.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_mb: Optional[int] = None) -> None:
+        self.root = root or getattr(settings, "SIMUL_CACHE_DIR", CACHE_DIR)
+        if max_mb is None:
+            max_mb = int(getattr(settings, "SIMUL_CACHE_MB", CACHE_MB))
+        self.max_bytes = max_mb * 1024 * 1024
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def key(sources: Iterable[str], params: Dict[Any, Dict], feeds: Iterable[Any], **inputs: Any) -> str:
+        """
+        Key of a simulation.
+
+        Args:
+            sources: source_digest of each strategy of the bot.
+            params: Resolved params by str_id, the helper is left out.
+            feeds: Whatever identifies the feeds and the candles they run on.
+            inputs: Everything else the run depends on (fee, leverage...).
+        """
+        digest = hashlib.sha1()
+        for source in sources:
+            digest.update(source.encode())
+        for str_id in sorted(params, key=str):
+            items = sorted((str(name), repr(value)) for name, value in params[str_id].items()
+                           if name != 'helper')
+            digest.update(repr((str_id, items)).encode())
+        digest.update(repr(list(feeds)).encode())
+        digest.update(repr(sorted(inputs.items())).encode())
+        return digest.hexdigest()
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.pkl")
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        The results stored under key, None if there are none.
+        """
+        path = self._file(key)
+        try:
+            with open(path, "rb") as entry:
+                results = pickle.load(entry)
+            os.utime(path)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        return results
+
+    def put(self, key: str, results: Any) -> None:
+        """
+        Stores results under key and evicts the least recently used entries
+        past the size limit.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        tmp = os.path.join(self.root, f"{key}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as entry:
+            pickle.dump(results, entry, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self._file(key))
+        self.evict()
+
+    def _entries(self) -> list:
+        entries = []
+        for path in glob.glob(os.path.join(self.root, "*.pkl")):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def evict(self) -> None:
+        """
+        Removes the least recently used entries until the cache fits.
+        """
+        entries = self._entries()
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in entries:
+            if size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Number of entries and bytes they take.
+        """
+        entries = self._entries()
+        return {'entries': len(entries), 'bytes': sum(entry[1] for entry in entries)}
+
+    def clear(self) -> int:
+        """
+        Removes every entry, returns how many there were.
+        """
+        removed = 0
+        for path in glob.glob(os.path.join(self.root, "*.pkl")) + glob.glob(os.path.join(self.root, "*.tmp")):
+            try:
+                os.remove(path)
+                removed += path.endswith(".pkl")
+            except FileNotFoundError:
+                pass
+        return removed
@@ -0,0 +1,303 @@
+"""
+Simulation workers on other machines, over TCP.
+
+With SIMUL_LISTEN = host:port in fullon.conf the simulator also accepts
+workers started elsewhere with
+
+    fullon_simulator.py --worker host:port
+
+A SimulCoordinator thread serves each connected worker from the same
+request queue the local worker processes read, so a sweep is shared by
+whoever is free. A worker gets a batch of jobs, sends the results of each
+job back as it finishes and asks for candles the first time it needs a
+feed range, those are loaded once on the coordinator and cached by the
+worker like any other range it loaded. The other OHLCV lookups of a job,
+the first and last timestamp of a feed or whether its tables exist, are
+answered by the coordinator too. When a worker is lost, the jobs of its
+batch without results go back to the queue.
+
+Messages are pickles over multiprocessing connections authenticated with
+SIMUL_AUTHKEY, which must be the same on both ends. Workers still need the
+fullon database to load their bot, not the OHLCV one.
+"""
+import os
+import shutil
+import socket
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing import AuthenticationError, Process
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Dict, List, Optional, Tuple
+from setproctitle import setproctitle
+from libs import database_ohlcv, settings, log
+from libs.btrader import fullonsimfeed
+from libs.simul_launcher import LOST, TAKEN, FullonSimulator, worker_count
+
+logger = log.fullon_logger(__name__)
+
+RECONNECT_SECONDS = 5
+KEEPALIVE_SECONDS = 60
+SHM_DIR = "/dev/shm/fullon_worker/"
+WORKER_DIR = "simulworker/"
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    """
+    (host, port) of host:port.
+    """
+    host, _, port = address.strip().rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Expected host:port, got {address}")
+    return host, int(port)
+
+
+def authkey() -> bytes:
+    """
+    SIMUL_AUTHKEY, connections between the coordinator and its workers are
+    refused without one.
+    """
+    key = str(getattr(settings, "SIMUL_AUTHKEY", "") or "")
+    if not key:
+        raise ValueError("SIMUL_AUTHKEY must be set to run simulation workers over TCP")
+    return key.encode()
+
+
+class SimulCoordinator():
+    """
+    Hands the requests of FullonSimulator's queue to remote workers.
+
+    Args:
+        request_queue (Queue): FullonSimulator's request queue.
+        listener (Listener): Where workers connect.
+    """
+
+    def __init__(self, request_queue: Any, listener: Listener) -> None:
+        self.request_queue = request_queue
+        self.listener = listener
+        self.workers: Dict[str, float] = {}
+        self.running = True
+        self._lock = threading.Lock()
+        self._candles_lock = threading.Lock()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    @classmethod
+    def listen(cls, request_queue: Any, address: str) -> Optional["SimulCoordinator"]:
+        """
+        Coordinator listening on address, host:port, None if it can't.
+        """
+        try:
+            listener = Listener(parse_address(address), authkey=authkey())
+        except (ValueError, OSError) as error:
+            logger.error("Can't listen for simulation workers on %s: %s", address, error)
+            return None
+        logger.info("Listening for simulation workers on %s", address)
+        return cls(request_queue=request_queue, listener=listener)
+
+    @property
+    def count(self) -> int:
+        """
+        Workers connected now.
+        """
+        return len(self.workers)
+
+    def close(self) -> None:
+        self.running = False
+        self.listener.close()
+
+    def _accept(self) -> None:
+        while self.running:
+            try:
+                conn = self.listener.accept()
+            except (AuthenticationError, EOFError, ConnectionError) as error:
+                logger.warning("Simulation worker refused: %s", error)
+                continue
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    @staticmethod
+    def _keepalive(conn: Connection) -> None:
+        """ Notices a worker whose machine went away, not only a closed connection """
+        sock = socket.socket(fileno=os.dup(conn.fileno()))
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            for option, value in (("TCP_KEEPIDLE", KEEPALIVE_SECONDS), ("TCP_KEEPINTVL", KEEPALIVE_SECONDS),
+                                  ("TCP_KEEPCNT", 3)):
+                if hasattr(socket, option):
+                    sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+        finally:
+            sock.close()
+
+    def _candles(self, args: Dict[str, Any]) -> Any:
+        """ Candles of a feed range, loaded once for every worker """
+        with self._candles_lock:
+            return fullonsimfeed.candles(**args)
+
+    @staticmethod
+    def _ohlcv(request: Tuple[str, str, str, dict]) -> Any:
+        """ What the OHLCV database answers to a worker's (exchange, symbol, method, params) """
+        exchange, symbol, method, params = request
+        with database_ohlcv.Database(exchange=exchange, symbol=symbol) as dbase:
+            return getattr(dbase, method)(**params)
+
+    def _serve(self, conn: Connection) -> None:
+        """
+        Sends requests to the worker on conn until it is lost, reporting the
+        jobs it had not finished as lost.
+        """
+        try:
+            self._keepalive(conn)
+            _, name = conn.recv()
+        except (EOFError, OSError, ValueError):
+            conn.close()
+            return
+        with self._lock:
+            self.workers[name] = time.time()
+        logger.info("Simulation worker %s connected", name)
+        response_queue: Any = None
+        pending: Dict[int, tuple] = {}
+        try:
+            while self.running:
+                *head, jobs, sweep, response_queue = self.request_queue.get()
+                pending = {job[0]: job for job in jobs}
+                response_queue.put((TAKEN, list(pending), 0.0, name))
+                conn.send(("jobs", (*head, jobs, sweep)))
+                while pending:
+                    message = conn.recv()
+                    if message[0] in ("candles", "ohlcv"):
+                        conn.send(self._answer(message))
+                    elif message[0] == "result":
+                        _, num, results, wall = message
+                        pending.pop(num, None)
+                        response_queue.put((num, results, wall, name))
+        except (EOFError, OSError) as error:
+            if self.running:
+                logger.warning("Lost simulation worker %s: %s", name, error)
+        finally:
+            with self._lock:
+                self.workers.pop(name, None)
+            conn.close()
+            if pending:
+                logger.warning("Lost %s simulation jobs with %s", len(pending), name)
+                try:
+                    response_queue.put((LOST, sorted(pending), 0.0, name))
+                except (EOFError, OSError) as error:
+                    logger.warning("Can't report the jobs lost with %s: %s", name, error)
+
+    def _answer(self, message: tuple) -> tuple:
+        """ Reply to a worker's candles or ohlcv message, ("error", message) if it fails """
+        try:
+            if message[0] == "candles":
+                return ("candles", self._candles(message[1]))
+            return ("ohlcv", self._ohlcv(message[1]))
+        except Exception as error:  # pylint: disable=broad-except
+            logger.error("Can't answer %s for a simulation worker: %s", message[0], error)
+            return ("error", str(error))
+
+
+def _cache_dirs(sweep: Optional[str]) -> None:
+    """
+    Points the indicator and Monte Carlo caches of this worker to a
+    directory of sweep, removing the ones of previous sweeps: by the time a
+    worker gets a job of a new sweep every job of the previous one is done.
+    """
+    base = getattr(settings, "SIMUL_WORKER_DIR", "") or \
+        (SHM_DIR if os.path.isdir(os.path.dirname(SHM_DIR.rstrip("/"))) else WORKER_DIR)
+    name = sweep or "default"
+    if os.path.isdir(base):
+        for entry in os.listdir(base):
+            if entry != name:
+                shutil.rmtree(os.path.join(base, entry), ignore_errors=True)
+    settings.INDICATOR_CACHE_DIR = os.path.join(base, name, "indicators/")
+    settings.MONTECARLO_DIR = os.path.join(base, name, "montecarlo/")
+
+
+def work(address: str) -> None:
+    """
+    Runs the jobs the coordinator at address sends until it goes away,
+    connecting again every RECONNECT_SECONDS.
+    """
+    setproctitle(f"Fullon simulator worker for {address}")
+    name = f"{socket.gethostname()}:{os.getpid()}"
+    host_port = parse_address(address)
+    key = authkey()
+    while True:
+        try:
+            conn = Client(host_port, authkey=key)
+        except (ConnectionError, OSError) as error:
+            logger.info("Waiting for the simulation coordinator at %s: %s", address, error)
+            time.sleep(RECONNECT_SECONDS)
+            continue
+        except AuthenticationError:
+            logger.error("Simulation coordinator at %s refused SIMUL_AUTHKEY", address)
+            return
+        logger.info("Simulation worker %s connected to %s", name, address)
+        try:
+            _work(conn=conn, name=name)
+        except (EOFError, OSError) as error:
+            logger.warning("Lost the simulation coordinator at %s: %s", address, error)
+        finally:
+            conn.close()
+            fullonsimfeed.CANDLE_SOURCE = None
+            database_ohlcv.remote = None
+
+
+def _ask(conn: Connection, kind: str, request: Any) -> Any:
+    """
+    What the coordinator answers to request, raises RuntimeError with the
+    error it got instead, which fails the job.
+    """
+    conn.send((kind, request))
+    reply = conn.recv()
+    if reply[0] == "error":
+        raise RuntimeError(f"Coordinator can't answer {kind}: {reply[1]}")
+    return reply[1]
+
+
+def _work(conn: Connection, name: str) -> None:
+    def candles(**args: Any) -> Any:
+        return _ask(conn, "candles", args)
+
+    def ohlcv(request: Tuple[str, str, str, dict]) -> Any:
+        return _ask(conn, "ohlcv", request)
+
+    fullonsimfeed.CANDLE_SOURCE = candles
+    database_ohlcv.remote = ohlcv
+    conn.send(("hello", name))
+    bots: OrderedDict = OrderedDict()
+    sweep: Any = False
+    while True:
+        _, (*head, jobs, request_sweep) = conn.recv()
+        if request_sweep != sweep:
+            sweep = request_sweep
+            _cache_dirs(sweep=sweep)
+        for job in jobs:
+            # A job failing here would fail on every worker it is re-queued to
+            try:
+                for num, results, wall in FullonSimulator.run_batch(bots=bots, request=(*head, [job], sweep)):
+                    conn.send(("result", num, results, wall))
+            except (EOFError, OSError):
+                raise
+            except Exception as error:  # pylint: disable=broad-except
+                logger.error("Simulation job %s failed: %s", job[0], error)
+                bots.clear()
+                conn.send(("result", job[0], {"ERROR": str(error)}, 0.0))
+
+
+def serve(address: str, workers: int = 0) -> None:
+    """
+    Runs workers processes, worker_count() by default, taking jobs from the
+    coordinator at address until interrupted.
+    """
+    workers = workers or worker_count()
+    processes: List[Process] = [Process(target=work, args=(address,)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    logger.info("Started %s simulation workers for %s", workers, address)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
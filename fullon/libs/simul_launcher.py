@@ -1,12 +1,102 @@
-from typing import Any, Dict, Optional
+import os
+import math
+import queue
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from multiprocessing import Process, Manager, Queue
+import psutil
 from setproctitle import setproctitle
-from libs import log
+from libs import log, settings
 from libs.bot import Bot  # import your Bot class
 
 # Setup logging
 logger = log.fullon_logger(__name__)
-WORKERS = 6
+WORKERS = 0  # 0 sizes the pool from the cores and memory available
+WORKER_MEMORY = 1024  # MB a simulation worker is expected to take
+BATCHES_PER_WORKER = 4
+MAX_BATCH = 16
+WARM_BOTS = 2
+RESPONSE_WAIT = 30  # seconds between checks that the local workers are alive
+TAKEN = "taken"  # num of the message a worker sends with the jobs of a batch it took
+LOST = "lost"  # num of the message the coordinator sends with the jobs of a worker it lost
+
+
+def worker_count() -> int:
+    """
+    Number of simulation workers, SIMUL_WORKERS if set, otherwise one per
+    core this process may run on, as long as the available memory fits
+    SIMUL_WORKER_MEMORY MB for each.
+    """
+    workers = int(getattr(settings, "SIMUL_WORKERS", WORKERS) or 0)
+    if workers > 0:
+        return workers
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    memory = int(getattr(settings, "SIMUL_WORKER_MEMORY", WORKER_MEMORY)) * 1024 * 1024
+    return max(1, min(cores, psutil.virtual_memory().available // memory))
+
+
+def batch_size(jobs: int, workers: int) -> int:
+    """
+    Jobs sent to a worker per request: big enough to save queue round
+    trips, small enough to leave BATCHES_PER_WORKER batches per worker so
+    a slow batch does not leave the others idle at the end.
+    """
+    return max(1, min(MAX_BATCH, math.ceil(jobs / (workers * BATCHES_PER_WORKER))))
+
+
+class SimulStats():
+    """
+    Wall time of the jobs of a run and how busy they kept the workers.
+    """
+
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        self.walls: List[float] = []
+        self.busy: Dict[Any, float] = {}
+        self.jobs: Dict[Any, int] = {}
+        self.start = time.perf_counter()
+        self.elapsed = 0.0
+
+    def add(self, wall: float, pid: Any) -> None:
+        """
+        Adds a job that took wall seconds in worker pid, the process id of
+        a local worker or host:pid of a remote one.
+        """
+        self.walls.append(wall)
+        self.busy[pid] = self.busy.get(pid, 0.0) + wall
+        self.jobs[pid] = self.jobs.get(pid, 0) + 1
+        self.elapsed = time.perf_counter() - self.start
+
+    def throughput(self) -> Dict[Any, float]:
+        """
+        Jobs per second each worker finished over the run.
+        """
+        if not self.elapsed:
+            return {}
+        return {pid: jobs / self.elapsed for pid, jobs in self.jobs.items()}
+
+    @property
+    def utilization(self) -> float:
+        """
+        Share of the workers' time spent running jobs.
+        """
+        if not self.elapsed:
+            return 0.0
+        return sum(self.walls) / (self.elapsed * self.workers)
+
+    def report(self) -> str:
+        if not self.walls:
+            return "No simulation jobs ran"
+        throughput = ", ".join(f"{pid} {self.jobs[pid]} ({rate:.2f}/s)"
+                               for pid, rate in sorted(self.throughput().items(), key=lambda item: str(item[0])))
+        return (f"Jobs: {len(self.walls)}, wall per job: avg {sum(self.walls) / len(self.walls):.3f}s "
+                f"min {min(self.walls):.3f}s max {max(self.walls):.3f}s, "
+                f"workers: {len(self.busy)}/{self.workers}, utilization: {self.utilization:.1%}\n"
+                f"Jobs per worker: {throughput}")
 
 
 class FullonSimulator:
@@ -14,48 +104,228 @@ class FullonSimulator:
     def __init__(self):
         self.request_queue: Optional[Queue] = None
         self.processes: Dict[int, Process] = {}
+        self.coordinator: Optional[Any] = None
         self.started = False
+        self.local_workers = 0
+
+    @property
+    def workers(self) -> int:
+        """
+        Local worker processes plus the remote workers connected now.
+        """
+        return self.local_workers + (self.coordinator.count if self.coordinator else 0)
+
+    @staticmethod
+    def _get_bot(bots: OrderedDict, bot_id: int, periods: int, sweep: Optional[str]) -> Bot:
+        """
+        Bot for a job. Jobs of a sweep reuse the Bot the worker loaded for
+        the first of them, other jobs get a fresh one.
+        """
+        key = (sweep, bot_id, periods)
+        if sweep is not None and key in bots:
+            bots.move_to_end(key)
+            bot = bots[key]
+            bot.reset_simul()
+            return bot
+        bot = Bot(bot_id=bot_id, bars=periods)
+        bot.indicator_cache = True
+        bot.sweep = sweep
+        if sweep is not None and bot.id:
+            bots[key] = bot
+            while len(bots) > WARM_BOTS:
+                bots.popitem(last=False)
+        return bot
+
+    @staticmethod
+    def run_batch(bots: OrderedDict, request: tuple) -> Iterator[Tuple[int, Dict, float]]:
+        """
+        Runs the jobs of a request, without its response queue.
+
+        Yields:
+            tuple: The position of each job in the sweep, its results and
+            the seconds it took.
+        """
+        bot_id, leverage, fee, periods, visual, event, noise, feeds, warm_up, jobs, sweep = request
+        for num, test_params, noise_path in jobs:
+            start = time.perf_counter()
+            bot = FullonSimulator._get_bot(bots=bots, bot_id=bot_id, periods=periods, sweep=sweep)
+            results = bot.run_simul_loop(visual=visual, event=event,
+                                         feeds=feeds, warm_up=warm_up,
+                                         test_params=test_params,
+                                         noise=noise, leverage=leverage, fee=fee,
+                                         noise_path=noise_path)
+            yield num, results, time.perf_counter() - start
 
     @staticmethod
     def process_requests(request_queue: Queue):
+        """
+        Worker loop. A job that fails gets {"ERROR": message} as its results
+        and the worker goes on with the next one, as remote workers do.
+        """
         setproctitle(f"Fullon simulator server")
+        bots: OrderedDict = OrderedDict()
+        pid = os.getpid()
         while True:
             try:
-                bot_id, leverage, fee, periods, visual, event, noise, feeds, warm_up, test_params, response_queue = request_queue.get()
-                bot = Bot(bot_id=bot_id, bars=periods)
-                results = bot.run_simul_loop(visual=visual, event=event,
-                                             feeds=feeds, warm_up=warm_up,
-                                             test_params=test_params,
-                                             noise=noise, leverage=leverage, fee=fee)
-                del bot
-                response_queue.put(results)
+                *request, response_queue = request_queue.get()
+                *head, jobs, sweep = request
+                response_queue.put((TAKEN, [job[0] for job in jobs], 0.0, pid))
+                for job in jobs:
+                    try:
+                        for num, results, wall in FullonSimulator.run_batch(bots=bots,
+                                                                            request=(*head, [job], sweep)):
+                            response_queue.put((num, results, wall, pid))
+                    except (BrokenPipeError, EOFError, ConnectionResetError):
+                        raise
+                    except Exception as error:  # pylint: disable=broad-except
+                        logger.error("Simulation job %s failed: %s", job[0], str(error))
+                        bots.clear()
+                        response_queue.put((job[0], {"ERROR": str(error)}, 0.0, pid))
             except KeyboardInterrupt:
-                #response_queue.put(None)
                 return
             except (BrokenPipeError, EOFError, ConnectionResetError, FileNotFoundError) as error:
                 print(error)
-                #response_queue.put(None)
                 return
-            except TypeError as error:
-                raise
-                logger.error(f"Type error: {error}")
+
+    def _spawn(self, num: int) -> None:
+        """
+        Starts local worker num.
+        """
+        self.processes[num] = Process(target=self.process_requests, args=(self.request_queue,))
+        self.processes[num].start()
+
+    def _respawn_dead(self) -> List[int]:
+        """
+        Replaces the local workers that died.
+
+        Returns:
+            list: Process ids of the workers that died.
+        """
+        dead = []
+        for num, process in list(self.processes.items()):
+            if not process.is_alive():
+                logger.error("Simulation worker %s died with exit code %s, starting a new one",
+                             process.pid, process.exitcode)
+                dead.append(process.pid)
+                self._spawn(num)
+        return dead
 
     def start(self):
-        global WORKERS
         if not self.started:
             mngr = Manager()
             self.request_queue = mngr.Queue()
-            for num in range(0, WORKERS):
-                self.processes[num] = Process(target=self.process_requests, args=(self.request_queue,))
-                self.processes[num].start()
+            self.local_workers = worker_count()
+            for num in range(0, self.local_workers):
+                self._spawn(num)
+            logger.info("Simulator started with %s workers", self.local_workers)
+            listen = getattr(settings, "SIMUL_LISTEN", "")
+            if listen:
+                from libs.simul_cluster import SimulCoordinator
+                self.coordinator = SimulCoordinator.listen(request_queue=self.request_queue, address=listen)
             self.started = True
 
     def stop(self):
+        if self.coordinator:
+            self.coordinator.close()
+            self.coordinator = None
         for _, process in self.processes.items():
             process.terminate()
         self.request_queue = None
         self.processes = {}
         self.started = False
+        self.local_workers = 0
+
+    def run(self,
+            bot_id: int,
+            jobs: List[Any],
+            fee: float,
+            leverage: int = 1,
+            periods: int = 500,
+            visual: int = 0,
+            event: bool = False,
+            noise: bool = False,
+            feeds: Any = None,
+            warm_up: Optional[Any] = None,
+            sweep: Optional[str] = None,
+            stats: Optional[SimulStats] = None,
+            noise_paths: Optional[List[Tuple[int, int, int]]] = None) -> Iterator[Tuple[int, Dict]]:
+        """
+        Runs the simulations of bot_id with each test_params of jobs,
+        batched over the workers.
+
+        Args:
+            jobs (list): test_params of each simulation.
+            sweep (str, optional): Id shared by the jobs of a parameter sweep,
+                workers keep the Bot they load for it instead of loading it
+                from the database for every job.
+            stats (SimulStats, optional): Gets the wall time of each job.
+            noise_paths (list, optional): Monte Carlo (seed, paths, path) of
+                each job when noise is on.
+
+        Yields:
+            tuple: The position of the job in jobs and its results, in the
+            order they finish. Jobs also go to remote workers connected to
+            the coordinator when SIMUL_LISTEN is set. A job that failed gets
+            {"ERROR": message} as its results. Local workers that die are
+            replaced, the jobs of a worker that died or was lost are sent
+            again once and get an ERROR the second time.
+        """
+        response_queue = self.new_queue()
+        noise_paths = noise_paths or [None] * len(jobs)
+        numbered = [(num, test_params, noise_paths[num]) for num, test_params in enumerate(jobs)]
+        size = batch_size(jobs=len(numbered), workers=self.workers or 1)
+        head = (bot_id, leverage, fee, periods, visual, event, noise, feeds, warm_up)
+        for start in range(0, len(numbered), size):
+            self.request_queue.put((*head, numbered[start:start + size], sweep, response_queue))
+        pending = {job[0]: job for job in numbered}
+        taken: Dict[Any, List[int]] = {}
+        claimed: set = set()
+        unclaimed: set = set()
+        retried: set = set()
+        checked = time.monotonic()
+
+        def lose(nums: List[int], worker: Any) -> Iterator[Tuple[int, Dict]]:
+            """ Sends the pending jobs of nums again, once, and gives up on the others """
+            lost = [num for num in nums if num in pending]
+            retry = [pending[num] for num in lost if num not in retried]
+            if retry:
+                logger.warning("Re-queuing %s simulation jobs of worker %s", len(retry), worker)
+                claimed.difference_update(job[0] for job in retry)
+                self.request_queue.put((*head, retry, sweep, response_queue))
+            for num in lost:
+                if num in retried:
+                    del pending[num]
+                    yield num, {"ERROR": f"Simulation worker {worker} was lost running it, twice"}
+            retried.update(lost)
+
+        while pending:
+            if time.monotonic() - checked >= RESPONSE_WAIT:
+                checked = time.monotonic()
+                for dead in self._respawn_dead():
+                    yield from lose(taken.pop(dead, []), dead)
+                # Jobs nobody claimed for a whole check while nothing is queued
+                # went with a worker that died right after taking them
+                waiting = set(pending) - claimed if not self.request_queue.qsize() else set()
+                yield from lose(sorted(waiting & unclaimed), "unknown")
+                unclaimed = waiting
+            try:
+                num, results, wall, pid = response_queue.get(timeout=RESPONSE_WAIT)
+            except queue.Empty:
+                continue
+            if num == TAKEN:
+                taken[pid] = results
+                claimed.update(results)
+                continue
+            if num == LOST:
+                yield from lose(results, pid)
+                continue
+            if num not in pending:
+                continue
+            del pending[num]
+            logger.debug("Simulation job %s took %.3fs in worker %s", num, wall, pid)
+            if stats is not None:
+                stats.add(wall=wall, pid=pid)
+            yield num, results
 
     def new_queue(self):
         """
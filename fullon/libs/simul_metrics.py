@@ -0,0 +1,153 @@
+"""
+Summary statistics of simulation trades, vectorized.
+
+simul.parse used to build a DataFrame for every feed of every simulation
+and walk its groupby groups in Python to get the win rate, returns, standard
+deviations, drawdown and Sharpe ratio of each. summarize stacks the trade
+records of any number of feeds into flat arrays once and computes every
+statistic for all of them with sorts and bincounts, giving the same numbers
+parse always gave:
+
+- a trade is the rows sharing a 'num', its return is the 'roi' of its last
+  row and its duration the time between its first two rows. Trades of one
+  row (never closed) count in Total Trades only.
+- standard deviations are population ones (numpy's default) and are 0 with
+  fewer than two returns, so is the Sharpe ratio.
+- Total Return and Max Drawdown % only look at rows with a 'reason', the
+  ones closing a trade.
+- returns are rounded as numpy rounds them, win rate and duration as
+  Python does.
+"""
+from itertools import chain
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+
+
+def _column(records: List[Dict[str, Any]], key: str) -> np.ndarray:
+    """ Float column of key, NaN where it is missing or None """
+    return np.array([record.get(key) for record in records], dtype=np.float64)
+
+
+def _stamps(records: List[Dict[str, Any]]) -> pd.DatetimeIndex:
+    return pd.DatetimeIndex([record.get('timestamp') for record in records])
+
+
+def _to_dates(values: np.ndarray, stamps: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    """ Integer values in the unit of stamps back to dates """
+    dates = pd.DatetimeIndex(values.astype(f"datetime64[{stamps.unit}]"))
+    if stamps.tz is not None:
+        dates = dates.tz_localize("UTC").tz_convert(stamps.tz)
+    return dates
+
+
+def _std(values: np.ndarray, groups: np.ndarray, count: np.ndarray) -> np.ndarray:
+    """ Population standard deviation of values by group """
+    mean = np.bincount(groups, weights=values, minlength=len(count)) / count
+    dev = values - mean[groups]
+    return np.sqrt(np.bincount(groups, weights=dev * dev, minlength=len(count)) / count)
+
+
+def summarize(trade_lists: Sequence[List[Dict[str, Any]]],
+              starting_cash: Sequence[float]) -> List[Optional[Dict[str, Any]]]:
+    """
+    Summary statistics of every list of trade records in one pass.
+
+    Args:
+        trade_lists (Sequence[List[Dict[str, Any]]]): Trade records of each
+            feed, as the strategies leave them in simulresults (without the
+            detail closing the list).
+        starting_cash (Sequence[float]): Starting cash of each feed.
+
+    Returns:
+        List[Optional[Dict[str, Any]]]: The statistics of each list, keyed as
+        in the summaries of simul.parse, None for lists of less than two
+        records.
+    """
+    size = len(trade_lists)
+    lengths = np.array([len(trades) for trades in trade_lists], dtype=np.int64)
+    if not lengths.sum():
+        return [None] * size
+    records = list(chain.from_iterable(trade_lists))
+    sets = np.repeat(np.arange(size), lengths)
+    cash = np.asarray(starting_cash, dtype=np.float64)
+    num = np.array([record.get('num') for record in records])
+    roi = _column(records, 'roi')
+    stamps = _stamps(records)
+    times = stamps.asi8
+
+    # Per feed, over all rows
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fees = np.round(np.bincount(sets, weights=np.nan_to_num(_column(records, 'fee')), minlength=size), 2)
+        closing = pd.notna(np.array([record.get('reason') for record in records], dtype=object))
+        pnlfee = np.nan_to_num(_column(records, 'pnlfee')[closing])
+        total_return = np.round(np.bincount(sets[closing], weights=pnlfee, minlength=size), 2)
+        roi_pct = np.round(100 - (cash - total_return) / cash * 100, 2)
+        assets = _column(records, 'assets')[closing]
+        low = np.full(size, np.inf)
+        np.minimum.at(low, sets[closing], np.where(np.isnan(assets), np.inf, assets))
+        low[np.isinf(low)] = np.nan
+        drawdown = (cash - low) / cash * 100
+        drawdown[drawdown < 0] = 0
+    filled = np.flatnonzero(lengths)
+    starts = np.r_[0, np.cumsum(lengths)[:-1]][filled]
+    first = _to_dates(np.minimum.reduceat(times, starts), stamps)
+    last = _to_dates(np.maximum.reduceat(times, starts), stamps)
+
+    # Trades, rows grouped by feed and num keeping their order
+    order = np.lexsort((num, sets))
+    trade_set, trade_num = sets[order], num[order]
+    bounds = np.flatnonzero(np.r_[True, (trade_set[1:] != trade_set[:-1]) | (trade_num[1:] != trade_num[:-1])])
+    ends = np.r_[bounds[1:], len(order)]
+    total_trades = np.bincount(trade_set[bounds], minlength=size)
+    closed = ends - bounds > 1
+    pset = trade_set[bounds][closed]
+    pnl = roi[order][ends[closed] - 1]
+    sorted_times = times[order]
+    durations = sorted_times[bounds[closed] + 1] - sorted_times[bounds[closed]]
+
+    count = np.bincount(pset, minlength=size)
+    wins, losses = pnl > 0, pnl < 0
+    profitable = np.bincount(pset[wins], minlength=size)
+    loss = np.bincount(pset[losses], minlength=size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        average = np.round(np.bincount(pset, weights=pnl, minlength=size) / count, 4)
+        std = _std(pnl, pset, count)
+        sharpe = np.where((count > 1) & (std != 0), np.round(average / std, 4), 0)
+        pos_std = np.where(profitable > 1, np.round(_std(pnl[wins], pset[wins], profitable), 4), 0)
+        neg_std = np.where(loss > 1, np.round(_std(pnl[losses], pset[losses], loss), 4), 0)
+        elapsed = np.zeros(size, dtype=np.int64)
+        np.add.at(elapsed, pset, durations)
+        per_second = np.timedelta64(1, 's') // np.timedelta64(1, stamps.unit)
+        duration = np.trunc(elapsed / count) / per_second
+
+    # Median, returns sorted within each feed
+    ranked = pnl[np.lexsort((pnl, pset))]
+    offsets = np.r_[0, np.cumsum(count)[:-1]]
+    has = count > 0
+    median = np.full(size, np.nan)
+    median[has] = np.round((ranked[(offsets + (count - 1) // 2)[has]] + ranked[(offsets + count // 2)[has]]) / 2, 4)
+
+    summaries: List[Optional[Dict[str, Any]]] = [None] * size
+    for pos, n in enumerate(filled):
+        if lengths[n] <= 1:
+            continue
+        summaries[n] = {
+            'Start Date': first[pos],
+            'End Date': last[pos],
+            'Total Trades': int(total_trades[n]),
+            'Profitable Trades': int(profitable[n]),
+            'Loss Trades': int(loss[n]),
+            'Win Rate (%)': round(int(profitable[n]) / int(total_trades[n]) * 100, 4),
+            'Total Fees': fees[n],
+            'Average Return %': average[n],
+            'Total Return': total_return[n],
+            'Total ROI %': roi_pct[n],
+            'Median Return': median[n],
+            'Negative Returns Standard Deviation': neg_std[n],
+            'Positive Returns Standard Deviation': pos_std[n],
+            'Average Duration (hours)': round(round(float(duration[n]), 4) / 60 / 60, 2),
+            'Max Drawdown %': drawdown[n],
+            'Sharpe Ratio': sharpe[n]
+        }
+    return summaries
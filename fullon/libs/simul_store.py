@@ -0,0 +1,234 @@
+"""
+On disk results of a simulation sweep, in Parquet.
+
+SimulManager.bot_simul used to keep the results of every simulation of a
+sweep, trades included, in memory until the last one finished. Instead the
+results of each simulation go to a SimulStore as they come back from the
+workers: every FLUSH_JOBS simulations they are parsed in one pass and
+written as a new part of a directory per sweep, partitioned by strategy:
+
+    SIMUL_STORE_DIR/<sweep>/str_id=<str_id>/summaries/part-00000.parquet
+    SIMUL_STORE_DIR/<sweep>/str_id=<str_id>/trades/part-00000.parquet
+    SIMUL_STORE_DIR/<sweep>/jobs/part-00000.parquet
+
+summaries has a row per simulation and feed with the metrics simul.parse
+computes and the strategy params as JSON, trades the trades of each, only read when verbose or xls output
+asks for them. jobs lists the simulations a part holds and is written last,
+a part without it (the process died writing it) is ignored.
+
+The sweep id hashes everything the sweep depends on, running the same sweep
+again skips the simulations already in the store, so a sweep that was
+interrupted resumes where it stopped.
+"""
+import glob
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Optional, Set
+import pandas as pd
+from libs import settings, log
+from libs.simul import simul
+
+logger = log.fullon_logger(__name__)
+
+STORE_DIR = "sweeps/"
+FLUSH_JOBS = 64
+HEAD_COLUMNS = ('Strategy', 'Symbol', 'Period', 'Compression', 'Start Date', 'End Date')
+METRIC_COLUMNS = ('Total Trades', 'Profitable Trades', 'Loss Trades', 'Win Rate (%)',
+                  'Total Fees', 'Average Return %', 'Total Return', 'Total ROI %',
+                  'Ending Cash', 'Yield', 'Median Return',
+                  'Negative Returns Standard Deviation', 'Positive Returns Standard Deviation',
+                  'Average Duration (hours)', 'Max Drawdown %', 'Profit Factor',
+                  'Recovery Factor', 'Sharpe Ratio')
+VALIDATE_KEYS = ('stop_loss', 'take_profit', 'trailing_stop', 'timeout', 'size_pct', 'size')
+
+
+def _json_value(value: Any) -> Any:
+    """
+    JSON form of the param values json does not know, numpy scalars as
+    their python value and anything else as its str.
+    """
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class SimulStore():
+    """
+    Results of the simulations of one sweep.
+
+    Args:
+        sweep (str): Id of the sweep, see key.
+        root (str, optional): Directory of the stores, SIMUL_STORE_DIR by default.
+        flush_jobs (int): Simulations kept in memory before writing a part.
+    """
+
+    def __init__(self, sweep: str, root: Optional[str] = None, flush_jobs: int = FLUSH_JOBS) -> None:
+        self.sweep = sweep
+        self.root = os.path.join(root or getattr(settings, "SIMUL_STORE_DIR", STORE_DIR), sweep)
+        self.flush_jobs = flush_jobs
+        self._pending: List[tuple] = []
+        self._part = max(self._parts(), default=-1) + 1
+
+    @staticmethod
+    def key(**inputs: Any) -> str:
+        """
+        Id of the sweep with inputs, everything its results depend on.
+        """
+        return hashlib.sha1(repr(sorted(inputs.items())).encode()).hexdigest()[:16]
+
+    def _dir(self, table: str, str_id: Any = None) -> str:
+        if str_id is None:
+            return os.path.join(self.root, table)
+        return os.path.join(self.root, f"str_id={str_id}", table)
+
+    @staticmethod
+    def _number(path: str) -> int:
+        """ Part number of a part file """
+        return int(os.path.basename(path)[len("part-"):-len(".parquet")])
+
+    def _parts(self, table: str = "**") -> Set[int]:
+        """ Part numbers written to table, to any table by default """
+        return {self._number(path)
+                for path in glob.glob(os.path.join(self.root, "**", table, "part-*.parquet"), recursive=True)}
+
+    def _read(self, table: str, str_id: Any = None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """ The committed parts of table as one DataFrame """
+        committed = self._parts("jobs")
+        frames = [pd.read_parquet(path, columns=columns)
+                  for path in sorted(glob.glob(os.path.join(self._dir(table, str_id), "part-*.parquet")))
+                  if self._number(path) in committed]
+        frames = [frame for frame in frames if not frame.empty]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    @staticmethod
+    def _write(frame: pd.DataFrame, path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        frame.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+
+    def written(self) -> Set[int]:
+        """
+        Position in the sweep of the simulations already stored.
+        """
+        jobs = self._read("jobs", columns=['job'])
+        return set(jobs['job'].tolist()) if not jobs.empty else set()
+
+    def add(self, num: int, result: Dict) -> None:
+        """
+        Keeps the results of simulation num of the sweep, as
+        Bot.run_simul_loop returns them, writing a part every flush_jobs.
+        Simulations without results, or with an error for results, are
+        not kept, a resumed sweep runs them again.
+        """
+        if not result:
+            logger.warning("No results for this simulation")
+            return
+        self._pending.append((num, result))
+        if len(self._pending) >= self.flush_jobs:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes the simulations added since the last part as a new one.
+        """
+        if not self._pending:
+            return
+        entries = []
+        failed = set()
+        for num, result in self._pending:
+            for str_id, res in result.items():
+                if isinstance(res, list) and res:
+                    entries.append((num, str_id, res))
+                else:
+                    logger.error("Simulation %s: %s", num, res)
+                    failed.add(num)
+        parsed = simul().parse_many(results=[res for _, _, res in entries], sharpe_filter=float('-inf'))
+        for (num, _, _), feeds in zip(entries, parsed):
+            if not isinstance(feeds, dict):
+                logger.error("Simulation %s: %s", num, feeds)
+                failed.add(num)
+        summaries: Dict[Any, List[Dict]] = {}
+        trades: Dict[Any, List[pd.DataFrame]] = {}
+        for (num, str_id, _), feeds in zip(entries, parsed):
+            if num in failed:
+                continue
+            for feed, summary in feeds.items():
+                row = {'job': num, 'feed': feed, 'params': json.dumps(summary['params'], default=_json_value)}
+                row.update({column: summary[column] for column in HEAD_COLUMNS + METRIC_COLUMNS})
+                summaries.setdefault(str_id, []).append(row)
+                trades.setdefault(str_id, []).append(summary['df'].assign(job=num, feed=feed))
+        part = f"part-{self._part:05d}.parquet"
+        for str_id, rows in summaries.items():
+            self._write(pd.DataFrame(rows), os.path.join(self._dir("summaries", str_id), part))
+            self._write(pd.concat(trades[str_id], ignore_index=True), os.path.join(self._dir("trades", str_id), part))
+        # Failed simulations are left out of jobs, a resumed sweep runs them again
+        done = [num for num, _ in self._pending if num not in failed]
+        self._write(pd.DataFrame({'job': pd.Series(done, dtype='int64')}), os.path.join(self._dir("jobs"), part))
+        self._pending = []
+        self._part += 1
+
+    def strategies(self) -> List[Any]:
+        """
+        str_id of the strategies with results.
+        """
+        str_ids = []
+        for path in sorted(glob.glob(os.path.join(self.root, "str_id=*"))):
+            str_id = os.path.basename(path).split("=", 1)[1]
+            str_ids.append(int(str_id) if str_id.isdigit() else str_id)
+        return sorted(str_ids, key=str)
+
+    def summaries(self, str_id: Any, sharpe_filter: float = 0.0, frames: bool = False) -> List[Dict[int, Dict[str, Any]]]:
+        """
+        What simul.parse returns for each simulation of strategy str_id,
+        in the order of the sweep.
+
+        Args:
+            sharpe_filter (float): Simulations with a feed below it are empty.
+            frames (bool): Read the trades of each feed into 'df' as well.
+        """
+        rows = self._read("summaries", str_id)
+        if rows.empty:
+            return []
+        rows = rows.sort_values(['job', 'feed'], kind='stable')
+        trades = {}
+        if frames:
+            for (num, feed), frame in self._read("trades", str_id).groupby(['job', 'feed'], sort=False):
+                trades[(num, feed)] = frame.drop(columns=['job', 'feed']).reset_index(drop=True)
+        parsed = []
+        for num, job_rows in rows.groupby('job', sort=True):
+            feeds = {}
+            for row in job_rows.to_dict('records'):
+                if row['Sharpe Ratio'] < sharpe_filter:
+                    feeds = {}
+                    break
+                params = json.loads(row['params'])
+                summary = {column: row[column] for column in HEAD_COLUMNS}
+                summary.update(params)
+                summary.update({column: row[column] for column in METRIC_COLUMNS})
+                summary['params'] = params
+                summary['df'] = trades.get((num, row['feed'])) if frames else None
+                for key in VALIDATE_KEYS:
+                    summary.setdefault(key, None)
+                feeds[row['feed']] = summary
+            parsed.append(feeds)
+        return parsed
+
+    def clear(self) -> None:
+        """
+        Removes the results of the sweep.
+        """
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    @staticmethod
+    def clear_all(root: Optional[str] = None) -> int:
+        """
+        Removes the results of every sweep, returns how many there were.
+        """
+        root = root or getattr(settings, "SIMUL_STORE_DIR", STORE_DIR)
+        sweeps = [path for path in glob.glob(os.path.join(root, "*")) if os.path.isdir(path)]
+        for path in sweeps:
+            shutil.rmtree(path, ignore_errors=True)
+        return len(sweeps)
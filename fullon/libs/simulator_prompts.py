@@ -13,6 +13,8 @@ from libs.database import Database
 from run.user_manager import UserManager
 from clint.textui import colored
 from run.simul_manager import SimulManager
+from libs.simul_cache import SimulCache
+from libs.simul_store import SimulStore
 
 logger = log.fullon_logger(__name__)
 
@@ -105,7 +107,9 @@ class Prompts():
                              "xls": {"save xls": False},
                              "verbose": {"print trades": False},
                              "visual": {"graph": 0},
-                             "event": {"event based simul": True}}
+                             "event": {"event based simul": True},
+                             "search": {"successive halving search": False},
+                             "seed": {"search seed": 0}}
 
     def set_bot(self):
         """
@@ -401,6 +405,8 @@ class Prompts():
             bot[key] = values[0]
         event = bool(bot['event'])
         del bot['event']
+        search = bool(bot.pop('search', False))
+        seed = int(bot.pop('seed', 0))
         feeds = {}
         for num, feed in self.FEEDS.items():
             match feed['Period'].lower():
@@ -416,4 +422,24 @@ class Prompts():
         for key, value in self.STR_PARAMS.items():
             if value:
                 params[key] = str(value)
-        self.simul.bot_simul(bot=bot, event_based=event, feeds=feeds, params=params)
+        if search:
+            self.simul.bot_search(bot=bot, event_based=event, feeds=feeds, params=params, seed=seed)
+        else:
+            self.simul.bot_simul(bot=bot, event_based=event, feeds=feeds, params=params)
+
+    @staticmethod
+    def simul_cache(action: str = '') -> None:
+        """
+        Shows the simulation result cache, 'clear' empties it and removes
+        the stored sweeps.
+        """
+        cache = SimulCache()
+        if action.strip().lower() == 'clear':
+            removed = cache.clear()
+            sweeps = SimulStore.clear_all()
+            print(colored.green(f"\nRemoved {removed} cached simulations and {sweeps} stored sweeps"))
+            return
+        stats = cache.stats()
+        print(tabulate([[cache.root, stats['entries'], round(stats['bytes'] / 1024 / 1024, 2),
+                         round(cache.max_bytes / 1024 / 1024, 2)]],
+                       headers=["Directory", "Entries", "MB", "Limit MB"], tablefmt="fancy_grid"))
@@ -11,6 +11,7 @@ import backtrader as bt
 import arrow
 from libs import log
 from libs.strategy import strategy
+from libs.strategy.indicator_cache import IndicatorCache, indicator_params
 from typing import Optional
 
 logger = log.fullon_logger(__name__)
@@ -32,6 +33,8 @@ class Strategy(strategy.Strategy):
         super().nextstart()
         if not self.indicators_df.empty:
             self.indicators_df.dropna(inplace=True)
+        elif getattr(self.helper, 'indicator_cache', False) and not self.helper.noise:
+            self._shared_indicators_df()
         else:
             self.set_indicators_df()
         self._state_variables()
@@ -40,6 +43,21 @@ class Strategy(strategy.Strategy):
             self.str_feed[0].last_date).shift(minutes=-1)
         return None
 
+    def _shared_indicators_df(self):
+        """
+        Takes indicators_df from the sweep's IndicatorCache, it is computed
+        by set_indicators_df only once per indicator params and feed data.
+        """
+        cache = IndicatorCache(sweep=getattr(self.helper, 'sweep', None))
+        key = cache.key(strategy_class=type(self),
+                        params=indicator_params(self.p._getkwargs()),  # pylint: disable=protected-access
+                        frames=[feed.dataframe for feed in self.str_feed])
+
+        def compute():
+            self.set_indicators_df()
+            return self.indicators_df
+        self.indicators_df = cache.get(key, compute).copy()
+
     def next(self):
         """ description """
         self.status = "looping"
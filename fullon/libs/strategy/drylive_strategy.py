@@ -28,6 +28,7 @@ class Strategy(Strategy):
     """
 
     last_update: Optional[arrow.Arrow] = None
+    stream_indicators = True
 
     def nextstart(self):
         """This only runs once... before init... before pre_next()...
@@ -57,6 +58,7 @@ class Strategy(Strategy):
             # print(arrow.get(bt.num2date(self.str_feed[0].datetime[0])))
             #self.set_indicators_df()
             return
+        self._record_tick_latency()
         self.status = "looping"
         self._stop_signal()
                 # Validate orders
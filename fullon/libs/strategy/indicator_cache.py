@@ -0,0 +1,190 @@
+"""
+indicators_df shared by the simulations of a parameter sweep.
+
+A sweep runs one strategy over the same feeds many times, and most of the
+swept params (take_profit, stop_loss, trailing_stop, timeout, size...) are
+never read by set_indicators_df. IndicatorCache keeps the frame it builds
+under a key made of the strategy, the params the strategy adds to the base
+Strategy params and a digest of the feed data, so every combination of the
+sweep with the same indicator params reuses one frame.
+
+Frames are pickled in a directory of the sweep the simulator workers
+share, INDICATOR_CACHE_DIR/<sweep>/. The first worker needing a frame
+computes it holding an exclusive flock on its key; workers asking for it
+meanwhile wait on the lock and then read the pickle instead of computing it
+again. SimulManager claims the directory with its pid before the sweep and
+removes it once the sweep is done, directories of sweeps whose process died
+are removed by the next sweep.
+"""
+import fcntl
+import glob
+import hashlib
+import inspect
+import os
+import shutil
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Optional
+import numpy
+import pandas
+from libs import settings, log
+
+logger = log.fullon_logger(__name__)
+
+CACHE_DIR = "indicators/"
+OWNER = "owner.pid"
+
+
+def indicator_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The params of a sweep combination set_indicators_df may depend on, all
+    but the risk and plumbing params of the base Strategy.
+    """
+    from libs.strategy.strategy import Strategy
+    base = set(Strategy.params._getkeys())  # pylint: disable=protected-access
+    return {key: value for key, value in params.items() if key not in base}
+
+
+def frame_digest(dataframe: pandas.DataFrame) -> str:
+    """
+    Digest of the index and values of a feed dataframe.
+    """
+    digest = hashlib.sha1()
+    if dataframe is None or dataframe.empty:
+        return digest.hexdigest()
+    digest.update(numpy.ascontiguousarray(dataframe.index.asi8).tobytes())
+    for col in dataframe.columns:
+        digest.update(str(col).encode())
+        digest.update(numpy.ascontiguousarray(dataframe[col].to_numpy()).tobytes())
+    return digest.hexdigest()
+
+
+def claim_sweep(path: str) -> None:
+    """
+    Creates the directory of a sweep owned by this process.
+    """
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, OWNER), "w") as owner:
+        owner.write(str(os.getpid()))
+
+
+def clear_stale_sweeps(root: str) -> int:
+    """
+    Removes the sweep directories in root whose owner process is gone,
+    left behind by sweeps that crashed. Returns how many there were.
+    """
+    removed = 0
+    for path in glob.glob(os.path.join(root, "*", OWNER)):
+        try:
+            with open(path) as owner:
+                pid = int(owner.read().strip())
+            os.kill(pid, 0)
+            continue
+        except PermissionError:
+            continue
+        except (ProcessLookupError, ValueError, OSError):
+            pass
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+        removed += 1
+    return removed
+
+
+class IndicatorCache():
+    """
+    Directory of indicator frames shared by the simulator workers.
+
+    Args:
+        root (str, optional): Cache directory, INDICATOR_CACHE_DIR by default.
+        sweep (str, optional): Id of the sweep, its frames are kept in a
+            directory of their own.
+    """
+
+    def __init__(self, root: Optional[str] = None, sweep: Optional[str] = None) -> None:
+        self.base = root or getattr(settings, "INDICATOR_CACHE_DIR", CACHE_DIR)
+        self.root = os.path.join(self.base, sweep) if sweep else self.base
+        self.sweep = sweep
+
+    @staticmethod
+    def key(strategy_class: type, params: Dict[str, Any], frames: Iterable[pandas.DataFrame]) -> str:
+        """
+        Key of the indicators_df of strategy_class with the indicator params
+        params over the feed dataframes frames. The source file of the class
+        is part of it, so editing a strategy does not serve stale frames.
+        """
+        digest = hashlib.sha1()
+        digest.update(f"{strategy_class.__module__}.{strategy_class.__qualname__}".encode())
+        try:
+            stat = os.stat(inspect.getfile(strategy_class))
+            digest.update(f"{stat.st_mtime_ns}:{stat.st_size}".encode())
+        except (TypeError, OSError):
+            pass
+        digest.update(repr(sorted(params.items())).encode())
+        for frame in frames:
+            digest.update(frame_digest(frame).encode())
+        return digest.hexdigest()
+
+    def _file(self, key: str, ext: str) -> str:
+        return os.path.join(self.root, f"{key}.{ext}")
+
+    @contextmanager
+    def _lock(self, key: str):
+        os.makedirs(self.root, exist_ok=True)
+        with open(self._file(key, "lock"), "a+") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read(self, key: str) -> Optional[pandas.DataFrame]:
+        try:
+            return pandas.read_pickle(self._file(key, "pkl"))
+        except (FileNotFoundError, EOFError):
+            return None
+
+    def cached(self, key: str) -> Optional[pandas.DataFrame]:
+        """
+        The frame stored under key, None if no simulation computed it yet.
+        """
+        return self._read(key)
+
+    def get(self, key: str, compute: Callable[[], pandas.DataFrame]) -> pandas.DataFrame:
+        """
+        The frame stored under key, computed and stored first if there is
+        none.
+        """
+        frame = self._read(key)
+        if frame is not None:
+            return frame
+        with self._lock(key):
+            frame = self._read(key)
+            if frame is not None:
+                return frame
+            frame = compute()
+            if frame is not None and not frame.empty:
+                tmp = self._file(key, f"{os.getpid()}.tmp")
+                frame.to_pickle(tmp)
+                os.replace(tmp, self._file(key, "pkl"))
+        return frame
+
+    def claim(self) -> None:
+        """
+        Creates the directory of the sweep, owned by this process, and
+        removes the ones of sweeps whose process died.
+        """
+        clear_stale_sweeps(self.base)
+        claim_sweep(self.root)
+
+    def clear(self) -> None:
+        """
+        Removes the cached frames, the directory of the sweep when there is
+        one, other sweeps keep theirs.
+        """
+        if self.sweep:
+            shutil.rmtree(self.root, ignore_errors=True)
+            return
+        for ext in ("pkl", "lock", "tmp"):
+            for path in glob.glob(os.path.join(self.root, f"*.{ext}")):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
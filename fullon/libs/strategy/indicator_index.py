@@ -0,0 +1,84 @@
+"""
+Positional lookup of indicators_df rows.
+
+Strategies read a few fields of indicators_df on every bar. Going through
+indicators_df.loc with a formatted date string costs a string format, a
+label parse and a pandas lookup per field; IndicatorIndex keeps the int64
+timestamps of the rows and the columns as numpy arrays, so reading a field
+is an array index. Backtests read the rows in order, so the row after the
+last one found is tried first and a binary search is only done on a miss.
+
+The index is rebuilt when indicators_df is replaced or its index or columns
+change (dropna(inplace=True) sets a new index, adding a column new columns).
+Building it is a vectorized conversion of the index, cheap enough for the
+event backtests that filter indicators_df on every bar in a position.
+"""
+from typing import Any, Dict, Optional
+import arrow
+import numpy
+import pandas
+
+
+def stamp_seconds(current_time: Any) -> int:
+    """
+    Microseconds since epoch of current_time truncated to the second, like
+    the 'YYYY-MM-DD HH:mm:ss' labels strategies used to look rows up with.
+    """
+    if not isinstance(current_time, arrow.Arrow):
+        current_time = arrow.get(current_time)
+    return current_time.int_timestamp * 1_000_000
+
+
+class IndicatorIndex():
+    """
+    Row positions by timestamp and column arrays of an indicators dataframe.
+
+    Args:
+        frame (pandas.DataFrame): indicators_df, indexed by date. Naive
+            dates are taken as UTC.
+    """
+
+    def __init__(self, frame: pandas.DataFrame) -> None:
+        self.frame = frame
+        self.index = frame.index
+        self.labels = frame.columns
+        self.columns: Dict[str, numpy.ndarray] = {}
+        self.stamps = numpy.empty(0, dtype=numpy.int64)
+        self.rows: Optional[Dict[int, int]] = None
+        self.last = -1
+        if isinstance(self.index, pandas.DatetimeIndex) and len(self.index):
+            stamps = self.index if self.index.tz is None else self.index.tz_convert("UTC")
+            self.stamps = stamps.as_unit("us").asi8
+            if not self.index.is_monotonic_increasing:
+                self.rows = dict(zip(self.stamps.tolist(), range(len(self.stamps))))
+
+    def current(self, frame: pandas.DataFrame) -> bool:
+        """
+        Whether the index was built from frame as it is now.
+        """
+        return frame is self.frame and frame.index is self.index and frame.columns is self.labels
+
+    def row(self, current_time: Any) -> Optional[int]:
+        """
+        Position of the row labelled current_time, None if there is none.
+        """
+        stamp = stamp_seconds(current_time)
+        if self.rows is not None:
+            return self.rows.get(stamp)
+        stamps = self.stamps
+        pos = self.last + 1
+        if pos >= len(stamps) or stamps[pos] != stamp:
+            pos = int(numpy.searchsorted(stamps, stamp))
+            if pos >= len(stamps) or stamps[pos] != stamp:
+                return None
+        self.last = pos
+        return pos
+
+    def column(self, name: str) -> numpy.ndarray:
+        """
+        Values of a column, KeyError if the frame does not have it.
+        """
+        values = self.columns.get(name)
+        if values is None:
+            values = self.columns[name] = self.frame[name].to_numpy()
+        return values
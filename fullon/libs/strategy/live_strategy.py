@@ -31,6 +31,7 @@ class Strategy(strategy.Strategy):
     """
 
     verbose: bool = False
+    stream_indicators = True
     loop: int = 0
 
     def nextstart(self):
@@ -70,6 +71,7 @@ class Strategy(strategy.Strategy):
         if not self.str_feed[0].islive():
             self.set_indicators_df()
             return
+        self._record_tick_latency()
         self.status = "looping"
         self._while_bot_blocked()
         self._validate_block()
@@ -11,8 +11,11 @@ import arrow
 from libs import log
 from libs.database import Database
 from libs.structs.trade_struct import TradeStruct
+from libs.strategy.stream_indicators import Indicator, IndicatorEngine
+from libs.strategy.indicator_index import IndicatorIndex
+import numpy
 import pandas
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, Sequence
 
 
 logger = log.fullon_logger(__name__)
@@ -28,6 +31,7 @@ class Strategy(bt.Strategy):
     verbose = False
     cash = {}
     totalfunds = {}
+    stream_indicators = False
 
     params = (
         ('helper', None),
@@ -43,6 +47,7 @@ class Strategy(bt.Strategy):
         ('pre_load_bars', 100),
         ('feeds', 2),
         ('pairs', False),
+        ('tick_throttle', None),
         ('stop_signal', None),
         ('str_id', None),
         ('cat_str_id', None),
@@ -143,6 +148,8 @@ class Strategy(bt.Strategy):
         self.indicators_df: pandas.DataFrame = pandas.DataFrame()
         self.open_trade: Dict = {}
         self.indicators: object = indicators()
+        self.indicator_engines: Dict[int, IndicatorEngine] = {}
+        self.indicator_index: Optional[IndicatorIndex] = None
         self.size: dict = {}
         self.str_feed: list = []
         self.post_message = False
@@ -195,6 +202,16 @@ class Strategy(bt.Strategy):
     def _end_next(self):
         pass
 
+    def _record_tick_latency(self) -> None:
+        """
+        Lets the live feeds record how long their last tick took from the
+        exchange to this next().
+        """
+        for data in self.datas:
+            record = getattr(data, "record_tick_latency", None)
+            if record:
+                record()
+
     def local_nextstart(self):
         pass
 
@@ -214,6 +231,46 @@ class Strategy(bt.Strategy):
                 return False
         return True
 
+    def stream_indicators_df(self, feed: int, indicators: Dict[str, Indicator],
+                             signals: Optional[Callable[[pandas.DataFrame], Dict[str, Any]]] = None,
+                             signal_columns: Sequence[str] = ("entry", "exit")) -> Optional[pandas.DataFrame]:
+        """
+        Incremental alternative to rebuilding indicators_df with pandas_ta.
+
+        Keeps an IndicatorEngine per feed that only processes the bars added
+        to its dataframe since the last call. Rows are labelled by the time
+        their bar closes, as adjust_index does, and start once every
+        indicator has a value.
+
+        Args:
+            feed (int): str_feed number whose dataframe holds the bars.
+            indicators (Dict[str, Indicator]): Column name and indicator,
+                only used on the first call for the feed.
+            signals (Callable, optional): Called with the rows added and the
+                one before them, returns the signal columns of those rows
+                by name. Only the added rows are kept, as 1.0/0.0.
+            signal_columns (Sequence[str]): Names of the columns signals
+                returns.
+
+        Returns:
+            Optional[pandas.DataFrame]: close, the indicator and signal
+            columns, None if no bar was added since the last call.
+        """
+        engine = self.indicator_engines.get(feed)
+        if engine is None:
+            shift = self.str_feed[feed].bar_size_minutes * 60_000_000
+            engine = IndicatorEngine(indicators=indicators, shift=shift,
+                                     signals=signal_columns if signals else ())
+            self.indicator_engines[feed] = engine
+        engine.update(self.str_feed[feed].dataframe)
+        if not engine.added:
+            return None
+        if signals:
+            rows = engine.ring.frame(start=max(len(engine.ring) - engine.added - 1, 0))
+            for column, values in signals(rows).items():
+                engine.fill(column, numpy.asarray(values, dtype=numpy.float64)[-engine.added:])
+        return engine.frame()
+
     def _bar_start_date(self, compression: int, period: str):
         """
         Gets starting date of bot data feed
@@ -290,20 +347,29 @@ class Strategy(bt.Strategy):
     def set_indicators(self):
         pass
 
-    def _this_indicators(self, current_time: arrow.Arrow, fields: list):
+    def _this_indicators(self, current_time: arrow.Arrow, fields: list, default: Any = None):
         """
         helps sets the indicators for a strategy, as self.indicator.[field]
 
+        Rows are found through an IndicatorIndex rebuilt whenever
+        indicators_df changes, instead of indicators_df.loc per field.
+
         Args:
-            current_time (arrow):  dataframe index time to get the indicator value
+            current_time (arrow):  dataframe index time to get the indicator value,
+                a 'YYYY-MM-DD HH:mm:ss' string is accepted too
             fields  (list):  fields available in self.indicator_df to get
+            default (Any): value of the fields when there is no row or column
         """
+        index = self.indicator_index
+        if index is None or not index.current(self.indicators_df):
+            index = self.indicator_index = IndicatorIndex(self.indicators_df)
+        row = index.row(current_time)
         for indicator in fields:
             try:
-                value = self.indicators_df.loc[current_time, indicator]
-                self.set_indicator(indicator, value)
+                value = index.column(indicator)[row] if row is not None else default
             except KeyError:
-                self.set_indicator(indicator, None)
+                value = default
+            self.set_indicator(indicator, value)
 
     def _print_position_variables(self, feed: int) -> None:
         """
@@ -0,0 +1,317 @@
+"""
+Streaming indicators for live strategies.
+
+Every indicator takes one bar at a time and updates its state in O(1), so a
+strategy that keeps its indicators in an IndicatorEngine only pays for the
+bars that closed since its last update instead of recomputing pandas_ta
+over the whole feed dataframe. Values follow pandas_ta with TA-Lib installed
+(SMA seeded EMA, Wilder smoothing seeded with the mean of the first length
+values, population standard deviation), NaN until an indicator has enough
+bars.
+
+    engine = IndicatorEngine(indicators={'rsi': RSI(14), 'bb': BBands(20)})
+    dataframe = engine.update(feed.dataframe)   # close, rsi, bb_lower, ...
+"""
+import abc
+import math
+from typing import Dict, Optional, Sequence, Tuple
+import numpy
+import pandas
+from libs.btrader.bar_aggregator import BarRing
+
+NAN = float("nan")
+
+
+class _Window():
+    """
+    Sum and variance of the last length values.
+
+    Sums are kept relative to a reference value to limit cancellation, and
+    recomputed from the window every length values so rounding errors do
+    not pile up.
+    """
+
+    def __init__(self, length: int) -> None:
+        self.length = length
+        self.values = [0.0] * length
+        self.pos = 0
+        self.count = 0
+        self.ref = 0.0
+        self.total = 0.0
+        self.squares = 0.0
+
+    def add(self, value: float) -> None:
+        if self.count == 0:
+            self.ref = value
+        old = self.values[self.pos] - self.ref if self.count >= self.length else None
+        self.values[self.pos] = value
+        self.pos = (self.pos + 1) % self.length
+        self.count += 1
+        if self.pos == 0:
+            window = self.values if self.count >= self.length else self.values[:self.count]
+            self.ref = math.fsum(window) / len(window)
+            self.total = math.fsum(v - self.ref for v in window)
+            self.squares = math.fsum((v - self.ref) ** 2 for v in window)
+            return
+        value -= self.ref
+        self.total += value
+        self.squares += value * value
+        if old is not None:
+            self.total -= old
+            self.squares -= old * old
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.length
+
+    def sum(self) -> float:
+        return self.total + self.ref * min(self.count, self.length)
+
+    def mean(self) -> float:
+        return self.ref + self.total / self.length
+
+    def std(self) -> float:
+        mean = self.total / self.length
+        return math.sqrt(max(self.squares / self.length - mean * mean, 0.0))
+
+
+class Indicator(abc.ABC):
+    """
+    Base class of the streaming indicators.
+
+    Attributes:
+        outputs (Tuple[str]): Suffixes of the values update returns, empty
+            for indicators returning a single value named after them.
+        warmup (int): Bars before the first value.
+    """
+
+    outputs: Tuple[str, ...] = ()
+    warmup: int = 0
+
+    @abc.abstractmethod
+    def update(self, open_: float, high: float, low: float, close: float,
+               volume: float) -> Tuple[float, ...]:
+        """ Takes the next bar and returns the values after it """
+
+
+class SMA(Indicator):
+    """ Simple moving average of the close, ta.sma """
+
+    def __init__(self, length: int = 10) -> None:
+        self.window = _Window(int(length))
+        self.warmup = int(length) - 1
+
+    def update(self, open_, high, low, close, volume):
+        self.window.add(close)
+        return (self.window.mean() if self.window.full else NAN,)
+
+
+class EMA(Indicator):
+    """ Exponential moving average of the close seeded with an SMA, ta.ema """
+
+    def __init__(self, length: int = 10) -> None:
+        self.length = int(length)
+        self.alpha = 2 / (self.length + 1)
+        self.warmup = self.length - 1
+        self.count = 0
+        self.value = 0.0
+
+    def update(self, open_, high, low, close, volume):
+        self.count += 1
+        if self.count < self.length:
+            self.value += close
+            return (NAN,)
+        if self.count == self.length:
+            self.value = (self.value + close) / self.length
+        else:
+            self.value += self.alpha * (close - self.value)
+        return (self.value,)
+
+
+class _Wilder():
+    """ Wilder smoothing seeded with the mean of the first length values """
+
+    def __init__(self, length: int) -> None:
+        self.length = length
+        self.count = 0
+        self.value = 0.0
+
+    def add(self, value: float) -> float:
+        self.count += 1
+        if self.count < self.length:
+            self.value += value
+            return NAN
+        if self.count == self.length:
+            self.value = (self.value + value) / self.length
+        else:
+            self.value += (value - self.value) / self.length
+        return self.value
+
+
+class RSI(Indicator):
+    """ Relative strength index of the close, ta.rsi """
+
+    def __init__(self, length: int = 14) -> None:
+        self.gains = _Wilder(int(length))
+        self.losses = _Wilder(int(length))
+        self.warmup = int(length)
+        self.prev: Optional[float] = None
+
+    def update(self, open_, high, low, close, volume):
+        prev, self.prev = self.prev, close
+        if prev is None:
+            return (NAN,)
+        change = close - prev
+        gain = self.gains.add(max(change, 0.0))
+        loss = self.losses.add(max(-change, 0.0))
+        if gain != gain:
+            return (NAN,)
+        total = gain + loss
+        return (100 * gain / total if total else 0.0,)
+
+
+def _true_range(high: float, low: float, prev: float) -> float:
+    return max(high, prev) - min(low, prev)
+
+
+class ATR(Indicator):
+    """ Average true range with Wilder smoothing, ta.atr """
+
+    def __init__(self, length: int = 14) -> None:
+        self.ranges = _Wilder(int(length))
+        self.warmup = int(length)
+        self.prev: Optional[float] = None
+
+    def update(self, open_, high, low, close, volume):
+        prev, self.prev = self.prev, close
+        if prev is None:
+            return (NAN,)
+        return (self.ranges.add(_true_range(high, low, prev)),)
+
+
+class BBands(Indicator):
+    """ Bollinger bands over an SMA of the close, ta.bbands """
+
+    outputs = ("lower", "mid", "upper", "bandwidth", "percent")
+
+    def __init__(self, length: int = 5, std: float = 2.0) -> None:
+        self.window = _Window(int(length))
+        self.std = float(std)
+        self.warmup = int(length) - 1
+
+    def update(self, open_, high, low, close, volume):
+        self.window.add(close)
+        if not self.window.full:
+            return (NAN,) * 5
+        mid = self.window.mean()
+        width = self.std * self.window.std()
+        lower, upper = mid - width, mid + width
+        span = upper - lower
+        bandwidth = 100 * span / mid if mid else NAN
+        percent = (close - lower) / span if span else NAN
+        return (lower, mid, upper, bandwidth, percent)
+
+
+class Vortex(Indicator):
+    """ Vortex indicator, ta.vortex """
+
+    outputs = ("pos", "neg")
+
+    def __init__(self, length: int = 14) -> None:
+        self.ranges = _Window(int(length))
+        self.plus = _Window(int(length))
+        self.minus = _Window(int(length))
+        self.warmup = int(length)
+        self.prev: Optional[Tuple[float, float, float]] = None
+
+    def update(self, open_, high, low, close, volume):
+        prev, self.prev = self.prev, (high, low, close)
+        if prev is None:
+            return (NAN, NAN)
+        self.ranges.add(_true_range(high, low, prev[2]))
+        self.plus.add(abs(high - prev[1]))
+        self.minus.add(abs(low - prev[0]))
+        if not self.ranges.full:
+            return (NAN, NAN)
+        ranges = self.ranges.sum()
+        return (self.plus.sum() / ranges, self.minus.sum() / ranges)
+
+
+class IndicatorEngine():
+    """
+    Keeps a set of streaming indicators over the bars of a feed dataframe.
+
+    update() feeds only the rows newer than the last one it saw and returns
+    a DataFrame, a view of preallocated arrays, with the close and one
+    column per indicator output (name, or name_output for indicators with
+    several outputs). Rows before every indicator has a value are left out,
+    like dropna() on the batch frame.
+
+    Signal columns, computed by the strategy from the indicators, are kept
+    in the same arrays (as 1.0/0.0), fill() sets them for the rows added.
+
+    Args:
+        indicators (Dict[str, Indicator]): Indicators by column name.
+        shift (int): Microseconds added to the bar dates, the bar length to
+            label every row by the time its bar closes, as adjust_index does.
+        signals (Sequence[str]): Names of the signal columns.
+
+    Attributes:
+        added (int): Rows the last update added.
+    """
+
+    def __init__(self, indicators: Dict[str, Indicator], shift: int = 0, signals: Sequence[str] = ()) -> None:
+        self.indicators = indicators
+        self.shift = shift
+        self.columns = ["close"]
+        for name, indicator in indicators.items():
+            self.columns += [f"{name}_{out}" for out in indicator.outputs] if indicator.outputs else [name]
+        self.signals = list(signals)
+        self.added = 0
+        self.warmup = max([indicator.warmup for indicator in indicators.values()], default=0)
+        self.ring: Optional[BarRing] = None
+        self.last: Optional[int] = None
+        self.seen = 0
+
+    def update(self, dataframe: pandas.DataFrame) -> pandas.DataFrame:
+        """
+        Feeds the new bars of dataframe and returns the indicator frame.
+        """
+        index = dataframe.index
+        if self.ring is None:
+            self.ring = BarRing(capacity=2 * len(dataframe), utc=index.tz is not None,
+                                columns=self.columns + self.signals)
+        stamps = (index if index.tz is None else index.tz_convert("UTC")).as_unit("us").asi8
+        start = 0 if self.last is None else int(numpy.searchsorted(stamps, self.last, side="right"))
+        rows = len(stamps) - start
+        self.added = max(rows, 0)
+        if rows > 0:
+            bars = [dataframe[col].to_numpy(dtype=numpy.float64)[start:]
+                    if col in dataframe else numpy.zeros(rows) for col in ("open", "high", "low", "close", "volume")]
+            values = numpy.empty((rows, len(self.columns)), dtype=numpy.float64)
+            values[:, 0] = bars[3]
+            for num, bar in enumerate(zip(*[column.tolist() for column in bars])):
+                col = 1
+                for indicator in self.indicators.values():
+                    result = indicator.update(*bar)
+                    values[num, col:col + len(result)] = result
+                    col += len(result)
+            columns = {col: values[:, num] for num, col in enumerate(self.columns)}
+            columns.update({col: numpy.full(rows, numpy.nan) for col in self.signals})
+            self.ring.extend(stamps[start:] + self.shift, columns)
+            self.last = int(stamps[-1])
+            self.seen += rows
+        return self.frame()
+
+    def frame(self) -> pandas.DataFrame:
+        """
+        The indicator frame, from the first row every indicator has a value.
+        """
+        return self.ring.frame(start=min(max(0, self.warmup - (self.seen - len(self.ring))), len(self.ring)))
+
+    def fill(self, column: str, values: numpy.ndarray) -> None:
+        """
+        Sets a signal column for the newest len(values) rows.
+        """
+        if len(values):
+            self.ring.columns[column][len(self.ring) - len(values):len(self.ring)] = values
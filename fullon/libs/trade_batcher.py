@@ -0,0 +1,174 @@
+"""
+TradeBatcher groups the trades received by websocket callbacks and pushes
+them to the redis trade lists in batches, one RPUSH per symbol and flush,
+instead of one round trip per trade.
+
+Batching is configured per exchange in fullon.conf:
+
+    [trade_batch]
+    KRAKEN_TRADE_FLUSH_MS = 0
+    KRAKEN_TRADE_FLUSH_SIZE = 500
+
+With FLUSH_MS = 0 every websocket message is flushed right away in a single
+pipeline. With FLUSH_MS > 0 trades are held until FLUSH_SIZE trades are
+buffered or FLUSH_MS milliseconds have passed since the oldest one.
+"""
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from libs import log, settings
+from libs.caches.trades_cache import Cache
+
+logger = log.fullon_logger(__name__)
+
+DEFAULT_FLUSH_MS = 0
+DEFAULT_FLUSH_SIZE = 500
+STATS_WINDOW = 1000
+
+
+class TradeBatcher():
+    """
+    Buffers trades per symbol for one exchange and flushes them to redis.
+    """
+
+    def __init__(self, exchange: str,
+                 flush_ms: Optional[int] = None,
+                 flush_size: Optional[int] = None) -> None:
+        """
+        Args:
+            exchange (str): Exchange name, used for the redis keys and settings lookup.
+            flush_ms (int, optional): Max age in ms of a buffered trade. Defaults to settings.
+            flush_size (int, optional): Buffered trades that force a flush. Defaults to settings.
+        """
+        self.exchange = exchange
+        if flush_ms is None:
+            flush_ms = getattr(settings, f"{exchange}_TRADE_FLUSH_MS".upper(), DEFAULT_FLUSH_MS)
+        if flush_size is None:
+            flush_size = getattr(settings, f"{exchange}_TRADE_FLUSH_SIZE".upper(), DEFAULT_FLUSH_SIZE)
+        self.flush_ms = int(flush_ms)
+        self.flush_size = max(int(flush_size), 1)
+        self._buffer: Dict[str, List[Dict]] = {}
+        self._buffered = 0
+        self._oldest: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sizes: Deque[int] = deque(maxlen=STATS_WINDOW)
+        self._latencies: Deque[float] = deque(maxlen=STATS_WINDOW)
+        self._thread: Optional[threading.Thread] = None
+        if self.flush_ms > 0:
+            self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+            self._thread.start()
+
+    def add(self, symbol: str, trades: List[Dict]) -> int:
+        """
+        Adds the trades of one websocket message.
+
+        Args:
+            symbol (str): The trading symbol.
+            trades (List[Dict]): Trade dictionaries, oldest first.
+
+        Returns:
+            int: Number of trades flushed by this call, 0 if they were buffered.
+        """
+        if not trades:
+            return 0
+        with self._lock:
+            self._buffer.setdefault(symbol, []).extend(trades)
+            self._buffered += len(trades)
+            if self._oldest is None:
+                self._oldest = time.perf_counter()
+            if self._thread and self._buffered < self.flush_size:
+                return 0
+            return self._flush()
+
+    def flush(self) -> int:
+        """
+        Pushes every buffered trade to redis.
+
+        Returns:
+            int: Number of trades flushed.
+        """
+        with self._lock:
+            return self._flush()
+
+    def stop(self) -> None:
+        """
+        Stops the flush thread and pushes whatever is left in the buffer,
+        trades added afterwards are flushed right away.
+        """
+        if self._stop.is_set():
+            self.flush()
+            return
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+        self.flush()
+        self.report()
+
+    def report(self) -> None:
+        """
+        Logs the flush statistics.
+        """
+        stats = self.stats()
+        if stats['flushes']:
+            logger.info("Trade batcher for %s: %s", self.exchange, stats)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Flush size and latency figures over the last flushes.
+
+        Latency is measured from the arrival of the oldest trade of a batch
+        until redis acknowledged the push.
+
+        Returns:
+            Dict[str, float]: flushes, avg_size, max_size, p50_ms, p99_ms
+        """
+        sizes = list(self._sizes)
+        latencies = sorted(self._latencies)
+        if not sizes:
+            return {'flushes': 0, 'avg_size': 0, 'max_size': 0, 'p50_ms': 0, 'p99_ms': 0}
+        return {'flushes': len(sizes),
+                'avg_size': sum(sizes) / len(sizes),
+                'max_size': max(sizes),
+                'p50_ms': latencies[len(latencies) // 2],
+                'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]}
+
+    def _flush(self) -> int:
+        """
+        Pushes the buffer, caller must hold the lock. The trades of a symbol
+        whose push failed stay in the buffer for the next flush.
+        """
+        if not self._buffered:
+            return 0
+        store = Cache.shared()
+        failed: Dict[str, List[Dict]] = {}
+        for symbol, trades in self._buffer.items():
+            if not store.push_trades_list(symbol=symbol, exchange=self.exchange, trades=trades):
+                failed[symbol] = trades
+        kept = sum(len(trades) for trades in failed.values())
+        flushed = self._buffered - kept
+        if failed:
+            logger.warning("Trade batcher for %s kept %s trades of %s to push again",
+                           self.exchange, kept, list(failed))
+        if flushed:
+            self._sizes.append(flushed)
+            self._latencies.append((time.perf_counter() - self._oldest) * 1000)
+        self._buffer = failed
+        self._buffered = kept
+        self._oldest = self._oldest if failed else None
+        return flushed
+
+    def _flush_loop(self) -> None:
+        """
+        Flushes buffers that got older than flush_ms when no new trades arrive.
+        """
+        interval = self.flush_ms / 1000
+        while not self._stop.wait(interval / 2):
+            with self._lock:
+                if self._oldest and time.perf_counter() - self._oldest >= interval:
+                    try:
+                        self._flush()
+                    except Exception as error:
+                        logger.error("Trade batcher flush error for %s: %s", self.exchange, str(error))
@@ -0,0 +1,359 @@
+"""
+Vectorized backtests of signal strategies.
+
+Bot.run_simul_loop steps a strategy through backtrader one minute at a
+time. For the strategies whose decisions only depend on the entry and exit
+columns of indicators_df, the take_profit/stop_loss/trailing_stop/timeout
+params and the broker, VectorBacktest replays the same rules without
+Cerebro: it jumps from one entry to the next with precomputed index arrays
+and scans the minutes of an open position with numpy for the first one that
+closes it. Fills, fees, cash and the trade records follow the backtrader
+path (market orders filled at the open of the next minute, BackBroker cash
+accounting, BacktestStrategy.notify_trade records), so the results can be
+fed to simul.parse as they are. With SIMUL_VECTOR on, Bot.run_simul_loop
+runs the simulations of these strategies here once the IndicatorCache of
+the sweep holds their indicators_df, see Bot._run_vector.
+
+    engine = VectorBacktest(ticks=feed0.dataframe, bars=feed1.dataframe,
+                            signals=strategy.indicators_df, bar_size_minutes=240,
+                            **FAMILIES['heuristic_longs'])
+    trades = engine.run(take_profit=4, stop_loss=2, timeout=6, size_pct=20)
+"""
+import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import numpy
+import pandas
+
+MINUTE = 60_000_000
+EPOCH = datetime.datetime(1970, 1, 1)
+# CommissionInfo leverage of the bot brokers, BackBroker moves the cash of a
+# long position by its value divided by it
+COMMINFO_LEVERAGE = 1.0
+
+# How each supported strategy opens, which positions its exit signal closes
+# and how long it waits before opening again.
+FAMILIES: Dict[str, Dict[str, Any]] = {
+    'heuristic_longs': {'side': 'Buy', 'exit_when': 'long', 'clear_exit': True},
+    'heuristic_shorts': {'side': 'Sell', 'exit_when': 'any', 'clear_exit': True},
+    'rsimom_short': {'side': 'Sell', 'exit_when': 'short'},
+    'xgb_forest_mom_long': {'side': 'Buy', 'exit_when': 'long', 'reopen_delay': 1440, 'lookup_shift': 1},
+    'xgb_forest_mom_short': {'side': 'Sell', 'exit_when': 'long', 'reopen_delay': 1440},
+}
+
+
+def _stamps(index: pandas.Index) -> numpy.ndarray:
+    """ Microseconds since epoch of a DatetimeIndex, naive dates as UTC """
+    index = pandas.DatetimeIndex(index)
+    return (index if index.tz is None else index.tz_convert("UTC")).as_unit("us").asi8
+
+
+def _next_true(flags: numpy.ndarray) -> numpy.ndarray:
+    """ Position of the first True at or after every position, len(flags) if none """
+    size = len(flags)
+    positions = numpy.where(flags, numpy.arange(size), size)
+    return numpy.append(numpy.minimum.accumulate(positions[::-1])[::-1], size)
+
+
+class VectorBacktest():
+    """
+    Replays a signal strategy over the minute bars of a feed.
+
+    Args:
+        ticks (pandas.DataFrame): 1 minute bars of the trading feed (feed 0),
+            with open and close.
+        bars (pandas.DataFrame): Bars of the strategy feed (feed 1), indexed by
+            the time they start.
+        signals (pandas.DataFrame): indicators_df of the strategy, entry and
+            exit by feed 1 date.
+        bar_size_minutes (int): Minutes of a feed 1 bar.
+        side (str): Buy for strategies that open longs, Sell for shorts.
+        exit_when (str): Positions the exit signal closes: long, short or any.
+        reopen_delay (int): Minutes added to the next bar before opening again
+            after a close.
+        clear_exit (bool): Whether opening clears the exit signal of the bar,
+            as the heuristic strategies do.
+        lookup_shift (int): Bars before the current feed 1 bar the signals are
+            read at.
+        futures (bool): Whether the exchange allows the strategy to open longs.
+        fee (float): Commission per operation, as a fraction of its value.
+        leverage (int): Broker multiplier.
+        cash (float): Starting cash.
+    """
+
+    def __init__(self,
+                 ticks: pandas.DataFrame,
+                 bars: pandas.DataFrame,
+                 signals: pandas.DataFrame,
+                 bar_size_minutes: int,
+                 side: str = "Buy",
+                 exit_when: str = "long",
+                 reopen_delay: int = 0,
+                 clear_exit: bool = False,
+                 lookup_shift: int = 0,
+                 futures: bool = True,
+                 fee: float = 0.0015,
+                 leverage: int = 1,
+                 cash: float = 10000) -> None:
+        if side not in ("Buy", "Sell"):
+            raise ValueError(f"side must be Buy or Sell, not {side}")
+        if exit_when not in ("long", "short", "any"):
+            raise ValueError(f"exit_when must be long, short or any, not {exit_when}")
+        self.side = side
+        self.exit_when = exit_when
+        self.clear_exit = clear_exit
+        self.futures = futures
+        self.fee = fee
+        self.leverage = leverage
+        self.starting_cash = cash
+        self.bar = bar_size_minutes * MINUTE
+        self.reopen_delay = reopen_delay * MINUTE
+        labels = _stamps(bars.index)
+        stamps = _stamps(ticks.index)
+        # the strategy runs from the first minute with a feed 1 bar
+        first = int(numpy.searchsorted(stamps, labels[0])) if len(labels) else len(stamps)
+        self.stamps = stamps[first:]
+        self.open = ticks['open'].to_numpy(dtype=numpy.float64)[first:]
+        self.close = ticks['close'].to_numpy(dtype=numpy.float64)[first:]
+        self.last_trading_date = stamps[-1] - MINUTE if len(stamps) else 0
+        self.label = labels[numpy.searchsorted(labels, self.stamps, side="right") - 1]
+        # entry and exit of the indicators_df row each minute reads
+        rows = _stamps(signals.index)
+        wanted = self.label - lookup_shift * self.bar
+        pos = numpy.minimum(numpy.searchsorted(rows, wanted), max(len(rows) - 1, 0))
+        found = rows[pos] == wanted if len(rows) else numpy.zeros(len(wanted), dtype=bool)
+        self.entry = found & self._flags(signals, 'entry')[pos] if len(rows) else found
+        self.exit = found & self._flags(signals, 'exit')[pos] if len(rows) else found
+        self.next_entry = _next_true(self.entry)
+        self.next_exit = _next_true(self.exit)
+
+    @staticmethod
+    def _flags(signals: pandas.DataFrame, column: str) -> numpy.ndarray:
+        """ Truthiness of a signal column, NaN and None as False """
+        if column not in signals:
+            return numpy.zeros(len(signals), dtype=bool)
+        values = signals[column]
+        return values.where(values.notna(), False).astype(bool).to_numpy()
+
+    def run(self,
+            take_profit: Optional[float] = None,
+            stop_loss: Optional[float] = None,
+            trailing_stop: Optional[float] = None,
+            timeout: Optional[float] = None,
+            size: Optional[float] = None,
+            size_pct: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Runs the strategy with a set of params.
+
+        Args:
+            take_profit (float): Take profit, percent of the entry tick.
+            stop_loss (float): Stop loss, percent of the entry tick.
+            trailing_stop (float): Trailing stop percent, replaces stop_loss.
+            timeout (float): Feed 1 bars after which a position is closed.
+            size (float): Value of every position.
+            size_pct (float): Percent of the cash for every position when
+                size is not set.
+
+        Returns:
+            List[Dict[str, Any]]: The trade records BacktestStrategy.notify_trade
+            writes, two per closed position. ending_assets is left with the
+            broker value at the end of the run.
+        """
+        if not size and not size_pct:
+            raise ValueError(f"Parameters size({size}) or size_pct {size_pct} not set")
+        if trailing_stop:
+            stop_loss = trailing_stop
+        is_long = self.side == "Buy"
+        self.cash = self.starting_cash
+        self.ending_assets = self.cash
+        trades: List[Dict[str, Any]] = []
+        if is_long and not self.futures:
+            return trades
+        last = len(self.stamps) - 1
+        timeout_us = None
+        if timeout:
+            timeout_us = int(datetime.timedelta(minutes=self.bar // MINUTE * timeout) /
+                             datetime.timedelta(microseconds=1))
+        loop_end = int(numpy.searchsorted(self.stamps, self.last_trading_date))
+        next_open = self.stamps[0] if last >= 0 else 0
+        minute = 1
+        ref = 0
+        while minute < last:
+            start = max(minute, int(numpy.searchsorted(self.stamps, next_open)))
+            enter = int(self.next_entry[min(start, last + 1)])
+            if enter >= last:
+                break
+            tick = self.open[enter]
+            amount = self._size(enter, size, size_pct)
+            fill = enter + 1
+            price = self.open[fill]
+            amount = amount if is_long else -amount
+            if not amount or self._opened(amount, self.close[enter]) < 0.0 or self._opened(amount, price) < 0.0:
+                if self.cash < 100:
+                    raise ValueError("Cant continue without funds")
+                minute = fill
+                continue
+            open_fee = abs(amount) * self.fee * price
+            self.cash = self._opened(amount, price)
+            exit_from = fill
+            if self.clear_exit:
+                exit_from = max(fill, int(numpy.searchsorted(self.label, self.label[enter], side="right")))
+            close, reason = self._exit(enter=enter, tick=tick, is_long=is_long, loop_end=loop_end,
+                                       timeout=self.stamps[enter] + timeout_us if timeout_us else None,
+                                       take_profit=take_profit, stop_loss=stop_loss,
+                                       trailing=bool(trailing_stop), exit_from=exit_from)
+            if close is None or close >= last:
+                self._hold(amount, price)
+                break
+            ref += 1
+            trades += self._close(ref=ref, amount=amount, entry=fill, price=price,
+                                  open_fee=open_fee, close=close + 1, reason=reason)
+            self.ending_assets = self.cash
+            if reason != "loop end":
+                next_open = self.label[close] + self.bar + self.reopen_delay
+                if next_open - self.stamps[close] <= MINUTE:
+                    next_open += self.bar
+            minute = close + 1
+        return trades
+
+    def _size(self, enter: int, size: Optional[float], size_pct: Optional[float]) -> float:
+        """ Size of a position opened at enter, as Strategy.entry and PercentSizer get it """
+        price = self.close[enter]
+        if size:
+            return size / (1 + self.fee) / price
+        percents = round(size_pct / (1 + self.fee), 2)
+        return self.cash / price * (percents / 100)
+
+    def _opened(self, amount: float, price: float) -> float:
+        """
+        Cash left after opening amount at price, BackBroker with shortcash
+        credits the value of a short and rejects the order below zero.
+        """
+        value = amount * price
+        if value > 0:
+            value /= COMMINFO_LEVERAGE
+        return self.cash - value - abs(amount) * self.fee * price
+
+    def _exit(self, enter: int, tick: float, is_long: bool, loop_end: int, timeout: Optional[int],
+              take_profit: Optional[float], stop_loss: Optional[float], trailing: bool,
+              exit_from: int) -> Tuple[Optional[int], Optional[str]]:
+        """
+        First minute after the fill at which the position is closed and why,
+        None if it stays open until the last minute.
+        """
+        first = enter + 1
+        end = len(self.stamps)
+        candidates = [(max(loop_end, first), "loop end")]
+        if timeout is not None:
+            candidates.append((max(int(numpy.searchsorted(self.stamps, timeout)), first), "timeout"))
+        bound = min(candidate for candidate, _ in candidates)
+        if take_profit:
+            target = float(tick) + float(tick) * float(take_profit) / 100 if is_long else \
+                tick - tick * float(take_profit) / 100
+            candidates.append((self._touch(first, bound, target, above=is_long), "take_profit"))
+        if stop_loss:
+            stop = float(stop_loss)
+            level = tick - tick * stop / 100 if is_long else float(tick) + float(tick) * stop / 100
+            if trailing:
+                hit = self._trail(first, bound, level, stop, is_long)
+            else:
+                hit = self._touch(first, bound, level, above=not is_long)
+            candidates.append((hit, "stop_loss"))
+        if self.exit_when == "any" or (self.exit_when == "long") == is_long:
+            candidates.append((int(self.next_exit[min(exit_from, end)]), "strategy"))
+        close, reason = min(candidates, key=lambda candidate: candidate[0])
+        return (close, reason) if close < end else (None, None)
+
+    def _windows(self, first: int, bound: int):
+        """ Slices from first to bound in growing windows """
+        width = 256
+        while first < min(bound, len(self.stamps)):
+            stop = min(first + width, bound, len(self.stamps))
+            yield first, stop
+            first = stop
+            width *= 4
+
+    def _touch(self, first: int, bound: int, level: float, above: bool) -> int:
+        """ First minute from first whose open reaches level, bound if none before it """
+        for start, stop in self._windows(first, bound):
+            window = self.open[start:stop]
+            hits = numpy.flatnonzero(window >= level if above else window <= level)
+            if len(hits):
+                return start + int(hits[0])
+        return bound
+
+    def _trail(self, first: int, bound: int, level: float, stop: float, is_long: bool) -> int:
+        """ First minute from first whose open crosses the trailing stop, bound if none """
+        for start, end in self._windows(first, bound):
+            window = self.open[start:end]
+            if is_long:
+                levels = numpy.maximum(numpy.maximum.accumulate(window - window * stop / 100), level)
+                hits = numpy.flatnonzero(window <= levels)
+                level = levels[-1]
+            else:
+                levels = numpy.minimum(numpy.minimum.accumulate(window + window * stop / 100), level)
+                hits = numpy.flatnonzero(window >= levels)
+                level = levels[-1]
+            if len(hits):
+                return start + int(hits[0])
+        return bound
+
+    def _hold(self, amount: float, price: float) -> None:
+        """ Broker value with a position still open at the end of the run """
+        value = amount * self.close[-1]
+        if value > 0:
+            unrealized = amount * (self.close[-1] - price) * self.leverage
+            value = (value - unrealized) / COMMINFO_LEVERAGE + unrealized
+        self.ending_assets = self.cash + value
+
+    def _close(self, ref: int, amount: float, entry: int, price: float, open_fee: float,
+               close: int, reason: str) -> List[Dict[str, Any]]:
+        """ Closes a position at the open of close and returns its trade records """
+        exit_price = self.open[close]
+        close_fee = abs(amount) * self.fee * exit_price
+        value = amount * price
+        if value > 0:
+            value /= COMMINFO_LEVERAGE
+        self.cash += value + amount * (exit_price - price) * self.leverage
+        self.cash -= close_fee
+        # Trade.update averages the fill into an empty trade, which is not
+        # always price to the last bit
+        avg_price = amount * price / amount
+        cost = amount * avg_price
+        pnl = amount * (exit_price - avg_price) * self.leverage
+        pnlfee = pnl - (open_fee + close_fee)
+        roi = (pnlfee / cost) * 100 if cost > 0 else (pnlfee / abs(cost)) * 100
+        return [
+            {"num": ref, "seq": 0, "timestamp": self._date(entry),
+             "side": 'Buy' if amount > 0 else 'Sell', "event_price": price,
+             "avg_price": avg_price, "event_size": amount, "avg_size": amount,
+             "cost": cost, "pnl": 0.0, "pnlfee": -open_fee, "roi": 0,
+             "fee": open_fee, "assets": None, "reason": None},
+            {"num": ref, "seq": 1, "timestamp": self._date(close),
+             "side": 'Buy' if -amount > 0 else 'Sell', "event_price": exit_price,
+             "avg_price": avg_price, "event_size": -amount, "avg_size": 0.0,
+             "cost": cost, "pnl": pnl, "pnlfee": pnlfee, "roi": roi,
+             "fee": close_fee, "assets": self.cash, "reason": reason}]
+
+    def _date(self, minute: int) -> datetime.datetime:
+        return EPOCH + datetime.timedelta(microseconds=int(self.stamps[minute]))
+
+    def simulresults(self, trades: List[Dict[str, Any]], detail: Dict[str, Any],
+                     feeds: int = 2) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Results by feed as Bot.run_simul_loop leaves them in simulresults,
+        the trades of feed 0 and the detail of the run closing every list.
+
+        Args:
+            trades (List[Dict[str, Any]]): Records returned by run.
+            detail (Dict[str, Any]): strategy, params and feed of the run.
+            feeds (int): Feeds of the strategy.
+        """
+        detail = {**detail, "imgtitle": detail.get("imgtitle", ""),
+                  "starting_cash": self.starting_cash,
+                  "ending_assets": self.ending_assets,
+                  "interest_earned": detail.get("interest_earned", 0.0)}
+        results = {num: [] for num in range(feeds)}
+        results[0] = list(trades)
+        for num in results:
+            results[num].append(dict(detail))
+        return results
@@ -361,12 +361,11 @@ class BotManager:
         :return: Dictionary of results from the simulation
         """
         try:
-            response_queue = simulator.new_queue()
-            request = (bot_id, leverage, fee, periods, visual, event, noise, feeds, warm_up, test_params, response_queue)
-            simulator.request_queue.put(request)
-            results = response_queue.get()
-            del response_queue
-            return results
+            for _, results in simulator.run(bot_id=bot_id, jobs=[test_params], fee=fee,
+                                            leverage=leverage, periods=periods, visual=visual,
+                                            event=event, noise=noise, feeds=feeds, warm_up=warm_up):
+                return results
+            return {}
         except Exception as e:
             logger.error(f"Failed to start bot {bot_id}: {e}")
             raise
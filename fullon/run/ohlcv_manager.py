@@ -203,15 +203,14 @@ class OhlcvManager:
         Returns:
             None
         """
-        trades = None
+        saved = False
         with cache.Cache() as store:
-            trades = store.get_trades_list(
-                symbol=symbol.symbol, exchange=symbol.exchange_name)
-        if trades:
-            with self.database_handler(symbol=symbol) as dbase:
-                dbase.save_symbol_trades(data=trades)
-            return True
-        return False
+            for trades in store.drain_trades_list(
+                    symbol=symbol.symbol, exchange=symbol.exchange_name):
+                with self.database_handler(symbol=symbol) as dbase:
+                    dbase.save_symbol_trades(data=trades)
+                saved = True
+        return saved
 
     @staticmethod
     def _update_process(exchange_name: str, symbol: str, message="Synced") -> bool:
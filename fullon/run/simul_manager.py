@@ -7,18 +7,30 @@ import setproctitle
 #from concurrent.futures import ProcessPoolExecutor, as_completed
 from tqdm import tqdm
 import time
+import arrow
 import numpy
-from libs import log, simul, settings
+from libs import log, simul, settings, simul_launcher
+from libs.bot import Bot
+from libs.strategy.indicator_cache import IndicatorCache, indicator_params
+from libs.montecarlo import NoisePaths
+from libs.simul_store import SimulStore
 from run.bot_manager import BotManager
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
 import decimal
 from setproctitle import setproctitle
-from concurrent.futures import ThreadPoolExecutor
 import csv
 import os
+import copy
+import uuid
+import random
 
 logger = log.fullon_logger(__name__)
 
+SEARCH_ETA = 3
+SEARCH_MIN_BARS = 50
+SEARCH_OBJECTIVE = 'Sharpe Ratio'
+SEARCH_OBJECTIVES = ('Sharpe Ratio', 'Total ROI %')
+
 
 class SimulManager():
 
@@ -192,31 +204,6 @@ class SimulManager():
                         return [simuls[0]]
         return simuls
 
-    def run_simul_and_update_progress(self,
-                                      bot,
-                                      leverage: int,
-                                      fee: float,
-                                      event: bool,
-                                      feeds: dict,
-                                      params: list,
-                                      visual: bool,
-                                      noise: bool,
-                                      progress_bar):
-        """
-        Executes a single simulation run and updates the associated progress bar by 1 unit.
-        Args:
-            bot: Bot configuration for the simulation.
-            event: Specifies whether the simulation is event-based.
-            feeds (dict): Additional feeds to be provided to the bot.
-            params (dict): Parameters for the simulation.
-            progress_bar (tqdm object): Progress bar for monitoring the simulations.
-        Returns:
-            result: The result of the simulation run.
-        """
-        result = self.run_simul(bot=bot, leverage=leverage, event=event, fee=fee, feeds=feeds, params=params, visual=visual, noise=noise)
-        progress_bar.update(1)
-        return result
-
     @staticmethod
     def load_from_file(filename: str) -> list:
         """
@@ -256,13 +243,95 @@ class SimulManager():
                 simulations.append(simulation_dict)
         return simulations
 
+    @staticmethod
+    def group_by_indicators(sim_params: List[dict]) -> List[dict]:
+        """
+        Orders the combinations of a sweep so the ones sharing indicator
+        params run next to each other, while their indicators_df is in the
+        IndicatorCache. Ties keep the get_simul_list order.
+        """
+        return sorted(sim_params, key=lambda params: repr(sorted(indicator_params(params).items())))
+
+    def _run_jobs(self, bot: dict, jobs: list, periods: int, leverage: int, fee: float,
+                  event: bool, feeds: dict, visual: bool, noise: bool,
+                  desc: str = "Running Simulations",
+                  noise_paths: Optional[list] = None,
+                  sink: Optional[Callable[[int, Dict], None]] = None) -> Dict[int, Dict]:
+        """
+        Runs jobs, the test_params of each simulation, on the simulator
+        workers as one sweep and reports their wall time.
+
+        Args:
+            sink (callable, optional): Gets the position in jobs and the
+                results of every job as it finishes, they are not kept then.
+
+        Returns:
+            Dict[int, Dict]: The results of each job by its position in jobs.
+        """
+        progress_bar = tqdm(total=len(jobs), desc=desc)
+        done = {}
+        sweep = uuid.uuid4().hex
+        indicator_cache = IndicatorCache(sweep=sweep)
+        indicator_cache.claim()
+        NoisePaths.claim(sweep=sweep)
+        stats = simul_launcher.SimulStats(workers=simul_launcher.simulator.workers or 1)
+        try:
+            for num, result in simul_launcher.simulator.run(bot_id=bot['bot_id'],
+                                                          jobs=jobs,
+                                                          fee=fee,
+                                                          leverage=leverage,
+                                                          periods=periods,
+                                                          visual=visual,
+                                                          event=event,
+                                                          noise=noise,
+                                                          feeds=feeds,
+                                                          warm_up=bot.get('warm_up', False),
+                                                          sweep=sweep,
+                                                          stats=stats,
+                                                          noise_paths=noise_paths):
+                progress_bar.update(1)
+                if sink is None:
+                    done[num] = result
+                else:
+                    sink(num, result)
+        except (KeyError, ValueError, TypeError) as e:
+            logger.error(f"Error during simulation execution: {e}")
+        finally:
+            progress_bar.close()
+            indicator_cache.clear()
+            NoisePaths.clear(sweep=sweep)
+        print(f"\n{stats.report()}")
+        return done
+
+    @staticmethod
+    def _collect_results(bot: dict, done: Dict[int, Dict]) -> Dict:
+        """
+        Results of _run_jobs by str_id, as echo_results takes them. Jobs
+        finish in any order, results keep the order of the sweep.
+        """
+        results = {}
+        for num in sorted(done):
+            if not done[num]:
+                logger.warning("No results for this simulation")
+                continue
+            for str_id, res in done[num].items():
+                if str_id not in results:
+                    results[str_id] = []
+                results[str_id].append((bot, res))
+        return results
+
     def bot_simul(self, bot: dict, xls: bool = False,  visual: bool = False,
                   verbose: bool = False, event_based: bool = False,
                   feeds: dict = {}, params: list = [],
                   sharpe_filter: float = 0.0, filename: str = '',
-                  montecarlo: int = 1, leverage: int = 1, fee: float = 0.0015):
+                  montecarlo: int = 1, leverage: int = 1, fee: float = 0.0015,
+                  seed: Optional[int] = None):
         """
         Executes multiple simulation runs based on given parameters and updates a progress bar.
+        With montecarlo > 1 every combination runs over montecarlo noisy paths of the
+        candles, drawn from seed (random when not given, printed to repeat the run).
+        Results are streamed to a SimulStore as each simulation finishes, running
+        the same sweep again resumes it, skipping the simulations already stored.
         """
         setproctitle("Fullon Simulator")
         # Early exit if no parameters are provided
@@ -296,48 +365,48 @@ class SimulManager():
                     return
 
         noise = True if montecarlo > 1 else False
+        if 'bot_id' not in bot.keys():
+            logger.error("Cant continue, no bot_id included in bot array")
+            return
 
-        # Setup progress bar and executor for simulations
-        progress_bar = tqdm(total=len(sim_list) * montecarlo / len(params), desc="Running Simulations")
-        results = {}
-        try:
-            with ThreadPoolExecutor() as executor:
-                futures = {}
-                if single_str:
-                    for sim_params in sim_list[0][0]:
-                        for _ in range(montecarlo):
-                            future = executor.submit(
-                                self.run_simul_and_update_progress, bot, leverage, fee, event_based, feeds, [sim_params], visual, noise, progress_bar
-                            )
-                            futures[future] = [sim_params]
-                else:
-                    sim_params = []
-                    for num, sim in enumerate(sim_list):
-                        sim_params.append((sim[num][0]))
-                    for _ in range(montecarlo):
-                        future = executor.submit(
-                            self.run_simul_and_update_progress, bot, leverage, fee, event_based, feeds, sim_params, visual, noise, progress_bar
-                        )
-                        futures[future] = sim_params
-                # Collect results from futures
-                for future in futures:
-                    result = future.result()
-                    if not result:
-                        logger.warning("No results for this simulation")
-                        pass
-                    else:
-                        for str_id, res in result.items():
-                            if str_id not in results:
-                                results[str_id] = []
-                            results[str_id].append((bot, res))
+        # Every job is the test_params of one simulation
+        if single_str:
+            jobs = [[sim_params] for sim_params in self.group_by_indicators(sim_list[0][0])
+                    for _ in range(montecarlo)]
+        else:
+            sim_params = []
+            for num, sim in enumerate(sim_list):
+                sim_params.append((sim[num][0]))
+            jobs = [sim_params] * montecarlo
+        noise_paths = None
+        if noise:
+            seed = seed if seed is not None else random.SystemRandom().randrange(2 ** 32)
+            print(f"Monte Carlo seed: {seed}")
+            noise_paths = [(seed, montecarlo, num % montecarlo) for num in range(len(jobs))]
 
-        except (KeyError, ValueError, TypeError) as e:
-            logger.error(f"Error during simulation execution: {e}")
+        periods = int(bot.get('periods', 365))
+        store = SimulStore(sweep=SimulStore.key(bot_id=bot['bot_id'], periods=periods,
+                                                warm_up=bot.get('warm_up', False), jobs=jobs,
+                                                noise_paths=noise_paths, feeds=feeds, leverage=leverage,
+                                                fee=fee, event=event_based,
+                                                **self._sweep_inputs(bot_id=bot['bot_id'], periods=periods)))
+        written = store.written()
+        pending = [num for num in range(len(jobs)) if num not in written]
+        if written:
+            print(f"Resuming sweep {store.sweep}: {len(jobs) - len(pending)} of {len(jobs)} simulations already done")
+        try:
+            if pending:
+                self._run_jobs(bot=bot, jobs=[jobs[num] for num in pending], periods=periods,
+                               leverage=leverage, fee=fee, event=event_based, feeds=feeds,
+                               visual=visual, noise=noise,
+                               noise_paths=[noise_paths[num] for num in pending] if noise_paths else None,
+                               sink=lambda pos, result: store.add(num=pending[pos], result=result))
         finally:
-            progress_bar.close()
+            store.flush()
         sim = simul.simul()
         sim.echo_results(bot=bot,
-                         results=results,
+                         results={},
+                         store=store,
                          sharpe_filter=sharpe_filter,
                          montecarlo=montecarlo > 1,
                          verbose=verbose,
@@ -347,6 +416,105 @@ class SimulManager():
         execution_time = end_time - start_time
         print(f"\nRun time: {round(execution_time,5)}sec")
 
+    @staticmethod
+    def _sweep_inputs(bot_id: int, periods: int) -> Dict:
+        """
+        Strategy sources and feed data a sweep of bot_id depends on, see
+        Bot.sweep_inputs. A sweep is resumed while they stay the same.
+        """
+        bot = Bot(bot_id=bot_id, bars=periods)
+        return bot.sweep_inputs() if bot.id else {}
+
+    @staticmethod
+    def search_rungs(candidates: int, periods: int, eta: int = SEARCH_ETA,
+                     min_bars: int = SEARCH_MIN_BARS) -> List[int]:
+        """
+        Bars each rung of a successive halving search simulates, the last
+        rung runs the full periods. Every rung keeps 1/eta of the candidates,
+        so there are as many rungs as halvings fit in candidates, as long as
+        the first one still simulates min_bars.
+        """
+        rungs = 0
+        while eta ** (rungs + 1) <= candidates and periods // eta ** (rungs + 1) >= min_bars:
+            rungs += 1
+        return [periods // eta ** (rungs - rung) for rung in range(rungs + 1)]
+
+    @staticmethod
+    def search_score(result: Dict, objective: str = SEARCH_OBJECTIVE) -> float:
+        """
+        objective of the final summary of a simulation, as echo_results
+        computes it. Simulations without trades score -inf.
+        """
+        try:
+            res = copy.deepcopy(next(iter(result.values())))
+            summaries = simul.simul().parse(results=res, sharpe_filter=float('-inf'), frames=False)
+            score = float(simul.simul().calculate_final_summary(summaries=summaries)[objective])
+        except (StopIteration, KeyError, IndexError, TypeError, AttributeError, ValueError):
+            return float('-inf')
+        return score if numpy.isfinite(score) else float('-inf')
+
+    def bot_search(self, bot: dict, params: dict, seed: int = 0,
+                   eta: int = SEARCH_ETA, min_bars: int = SEARCH_MIN_BARS,
+                   max_candidates: int = 0, objective: str = SEARCH_OBJECTIVE,
+                   xls: bool = False, visual: bool = False, verbose: bool = False,
+                   event_based: bool = False, feeds: dict = {},
+                   sharpe_filter: float = 0.0, leverage: int = 1, fee: float = 0.0015):
+        """
+        Successive halving search over the grid get_simul_list expands from
+        params. Every candidate is simulated over the most recent bars of a
+        short window first, the best 1/eta by objective (Sharpe Ratio or
+        Total ROI %) move on to a window eta times longer, until the last
+        ones run the full periods and are shown as bot_simul shows a sweep.
+
+        Args:
+            seed (int): Seeds the sample of max_candidates and the order of
+                candidates that tie, the same seed gives the same search.
+            max_candidates (int): Random sample of the grid to search, 0
+                searches all of it.
+        """
+        setproctitle("Fullon Simulator")
+        start_time = time.perf_counter()
+        if 'bot_id' not in bot.keys():
+            logger.error("Cant continue, no bot_id included in bot array")
+            return
+        if objective not in SEARCH_OBJECTIVES:
+            logger.error("Unknown search objective %s, use one of %s", objective, SEARCH_OBJECTIVES)
+            return
+        candidates = self.get_simul_list(params)
+        if not candidates or isinstance(candidates[0], str):
+            logger.error(candidates[0] if candidates else "No parameters to search")
+            return
+        rng = random.Random(seed)
+        if max_candidates and len(candidates) > max_candidates:
+            candidates = rng.sample(candidates, max_candidates)
+        tie_break = list(range(len(candidates)))
+        rng.shuffle(tie_break)
+        periods = int(bot.get('periods', 365))
+        rungs = self.search_rungs(candidates=len(candidates), periods=periods, eta=eta, min_bars=min_bars)
+        alive = list(range(len(candidates)))
+        done: Dict[int, Dict] = {}
+        for rung, bars in enumerate(rungs):
+            alive = sorted(alive, key=lambda num: repr(sorted(indicator_params(candidates[num]).items())))
+            print(f"\nRung {rung + 1}/{len(rungs)}: {len(alive)} candidates over {bars} bars")
+            done = self._run_jobs(bot=bot, jobs=[[candidates[num]] for num in alive], periods=bars,
+                                  leverage=leverage, fee=fee, event=event_based, feeds=feeds,
+                                  visual=False, noise=False, desc=f"Rung {rung + 1}")
+            done = {alive[pos]: result for pos, result in done.items()}
+            if rung == len(rungs) - 1:
+                break
+            scores = {num: self.search_score(result=done.get(num, {}), objective=objective) for num in alive}
+            alive = sorted(alive, key=lambda num: (-scores[num], tie_break[num]))[:max(1, len(alive) // eta)]
+        results = self._collect_results(bot=bot, done=done)
+        sim = simul.simul()
+        sim.echo_results(bot=bot,
+                         results=results,
+                         sharpe_filter=sharpe_filter,
+                         visual=visual,
+                         verbose=verbose,
+                         xls=xls)
+        execution_time = time.perf_counter() - start_time
+        print(f"\nRun time: {round(execution_time,5)}sec")
+
     def run_simul(self,
                   bot: Dict,
                   leverage: int,
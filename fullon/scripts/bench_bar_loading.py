@@ -0,0 +1,94 @@
+"""
+Bars/sec benchmark for feeding bars into the backtest feeds.
+
+Starts and preloads a feed over a synthetic 1 minute dataframe the way
+cerebro does, twice: once from a deque of rows through FullonFeed._load_ohlcv_line
+(arrow.get, bt.date2num and six float() per bar, the previous sim feed
+path) and once from a BarCursor through FullonFeed._load_bar. Preparing
+the queue from the dataframe is included in the timings, and both feeds
+must end up with the same lines.
+
+    cd fullon && python scripts/bench_bar_loading.py --bars 525600
+"""
+import sys
+import time
+import argparse
+from collections import deque
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import numpy
+import pandas
+import backtrader as bt
+from libs.settings_config import fullon_settings_loader  # pylint: disable=unused-import
+from libs.btrader.bar_cursor import BarCursor
+from libs.btrader.fullonfeed import FullonFeed
+
+
+class RowFeed(bt.feeds.DataBase):
+    """ rows popped from a deque, converted bar by bar """
+    params = (('dataframe', None),)
+
+    def start(self):
+        super().start()
+        self.result = deque(self.p.dataframe.reset_index().values.tolist())
+
+    def _load(self):
+        if not self.result:
+            return False
+        FullonFeed._load_ohlcv_line(self, one_row=self.result.popleft())
+        return True
+
+
+class ArrayFeed(bt.feeds.DataBase):
+    """ bars read from the arrays of a BarCursor """
+    params = (('dataframe', None),)
+
+    def start(self):
+        super().start()
+        self.result = BarCursor(self.p.dataframe)
+
+    def _load(self):
+        if not self.result:
+            return False
+        FullonFeed._load_bar(self, self.result)
+        return True
+
+
+def make_dataframe(bars: int) -> pandas.DataFrame:
+    index = pandas.date_range("2020-01-01", periods=bars, freq="1min", name="date")
+    close = 30000 + numpy.cumsum(numpy.random.default_rng(1).normal(0, 5, bars))
+    return pandas.DataFrame({'open': close, 'high': close + 5, 'low': close - 5,
+                             'close': close, 'volume': 1.0}, index=index)
+
+
+def run(feed_class, dataframe: pandas.DataFrame) -> tuple:
+    """ starts and preloads the feed the way cerebro does before a backtest """
+    cerebro = bt.Cerebro(stdstats=False)
+    feed = feed_class(dataframe=dataframe)
+    cerebro.adddata(feed)
+    start = time.perf_counter()
+    feed._start()
+    feed.preload()
+    rate = len(dataframe) / (time.perf_counter() - start)
+    return rate, feed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="bar loading benchmark")
+    parser.add_argument("--bars", type=int, default=525600)
+    args = parser.parse_args()
+    dataframe = make_dataframe(args.bars)
+    rate_rows, rows = run(RowFeed, dataframe)
+    rate_arrays, arrays = run(ArrayFeed, dataframe)
+    for line in ("datetime", "open", "high", "low", "close", "volume"):
+        assert list(getattr(rows.lines, line).array) == list(getattr(arrays.lines, line).array), line
+    print(f"bars         : {args.bars}")
+    print(f"row feed     : {rate_rows:12.0f} bars/s")
+    print(f"array feed   : {rate_arrays:12.0f} bars/s")
+    print(f"speedup      : {rate_arrays / rate_rows:12.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark for trade ingestion into the ohlcv database.
+
+Loads synthetic trades into a scratch schema (bench_BENCH_USD) in batches,
+once through executemany and once through the COPY staging path of
+ohlcv_model.Database.save_symbol_trades, and prints rows/s for both.
+The schema is dropped at the end. Needs the ohlcv database from fullon.conf.
+
+    cd fullon && python scripts/bench_bulk_copy.py --rows 1000000 --batch 500
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import arrow
+from libs.settings_config import fullon_settings_loader  # pylint: disable=unused-import
+from libs.models.ohlcv_model import Database
+from libs.structs.trade_struct import TradeStruct
+
+EXCHANGE = "bench"
+SYMBOL = "BENCH/USD"
+
+
+def make_trades(rows: int, offset: int) -> list:
+    """ one trade per millisecond starting at offset """
+    start = arrow.get("2020-01-01").shift(seconds=offset)
+    trades = []
+    for num in range(rows):
+        trades.append(TradeStruct(time=start.shift(microseconds=num * 1000).format("YYYY-MM-DD HH:mm:ss.SSS"),
+                                  price=30000 + (num % 500),
+                                  volume=0.01,
+                                  side="buy" if num % 2 else "sell",
+                                  order_type="l",
+                                  ex_trade_id=str(num)))
+    return trades
+
+
+def load(dbase: Database, trades: list, batch: int, bulk: bool) -> float:
+    start = time.perf_counter()
+    for pos in range(0, len(trades), batch):
+        dbase.save_symbol_trades(data=trades[pos:pos + batch], bulk=bulk)
+    return len(trades) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="COPY vs executemany trade loader benchmark")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+    with Database(exchange=EXCHANGE, symbol=SYMBOL) as dbase:
+        dbase.make_schema()
+        dbase.make_trade_table()
+        try:
+            rate_many = load(dbase, make_trades(args.rows, 0), args.batch, bulk=False)
+            rate_copy = load(dbase, make_trades(args.rows, 10 * 365 * 86400), args.batch, bulk=True)
+        finally:
+            dbase.delete_schema()
+    print(f"executemany : {rate_many:12.0f} rows/s")
+    print(f"copy        : {rate_copy:12.0f} rows/s")
+    print(f"speedup     : {rate_copy / rate_many:12.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Micro benchmark for websocket style cache writes.
+
+Compares the old callback pattern, a fresh Cache (and its PING) per message,
+against the shared per process handle returned by Cache.shared().
+Needs a reachable redis server as configured in fullon.conf.
+
+    cd fullon && python scripts/bench_cache.py --messages 20000
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from libs.settings_config import fullon_settings_loader  # pylint: disable=unused-import
+from libs.caches.trades_cache import Cache
+
+EXCHANGE = "bench"
+SYMBOL = "BTC/USD"
+
+
+def ticker(num: int) -> dict:
+    return {'price': 30000 + num % 100, 'volume': 1.0, 'time': '2024-01-01 00:00:00.000'}
+
+
+def run_eager(messages: int) -> float:
+    """ One Cache plus a PING per message, as callbacks used to do """
+    start = time.perf_counter()
+    for num in range(messages):
+        with Cache() as store:
+            store.test()
+            store.update_ticker(symbol=SYMBOL, exchange=EXCHANGE, data=ticker(num))
+    return messages / (time.perf_counter() - start)
+
+
+def run_shared(messages: int) -> float:
+    """ One long lived handle reused for every message """
+    start = time.perf_counter()
+    for num in range(messages):
+        store = Cache.shared()
+        store.update_ticker(symbol=SYMBOL, exchange=EXCHANGE, data=ticker(num))
+    return messages / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="cache handle micro benchmark")
+    parser.add_argument("--messages", type=int, default=10000)
+    args = parser.parse_args()
+    eager = run_eager(args.messages)
+    shared = run_shared(args.messages)
+    print(f"cache per message : {eager:10.0f} msg/s")
+    print(f"shared handle     : {shared:10.0f} msg/s")
+    print(f"speedup           : {shared / eager:10.2f}x")
+    Cache.shared().del_exchange_ticker(exchange=EXCHANGE)
+
+
+if __name__ == '__main__':
+    main()
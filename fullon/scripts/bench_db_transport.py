@@ -0,0 +1,92 @@
+"""
+Throughput benchmark for the database worker transports.
+
+Runs a synthetic worker behind both transports used by libs/database.py and
+libs/database_ohlcv.py, the Manager queue (DB_TRANSPORT = queue) and the
+unix socket pipes (DB_TRANSPORT = pipe), and reports calls/s for a small
+result and for a fetch_ohlcv sized result of --rows candles.
+
+    cd fullon && python scripts/bench_db_transport.py --rows 300000
+"""
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+from multiprocessing import Manager, Process
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from libs import pipe_transport
+from libs.queue_pool import QueuePool
+
+STOP = "StopThisRun"
+
+
+def payload(request):
+    """ small results echo back, 'ohlcv' requests get rows like fetch_ohlcv """
+    method_name, method_params = request
+    if method_name == "fetch_ohlcv":
+        start = datetime(2020, 1, 1)
+        return [(start + timedelta(minutes=num), 1.0 * num, 2.0, 0.5, 1.5, 10.0)
+                for num in range(method_params['rows'])]
+    return method_params
+
+
+def queue_worker(request_queue) -> None:
+    while True:
+        request = request_queue.get()
+        if request == STOP:
+            break
+        method_name, method_params, response_queue = request
+        response_queue.put(payload((method_name, method_params)))
+
+
+def bench_queue(request, calls: int) -> float:
+    mngr = Manager()
+    request_queue = mngr.Queue()
+    worker = Process(target=queue_worker, args=(request_queue,))
+    worker.start()
+    pool = QueuePool(procname="bench")
+    start = time.perf_counter()
+    for _ in range(calls):
+        with pool.get_queue() as response_queue:
+            request_queue.put((*request, response_queue))
+            response_queue.get()
+    rate = calls / (time.perf_counter() - start)
+    request_queue.put(STOP)
+    worker.join()
+    return rate
+
+
+def bench_pipe(request, calls: int) -> float:
+    address = pipe_transport.worker_address(name="bench", num=0)
+    worker = Process(target=pipe_transport.serve, args=(address, payload))
+    worker.start()
+    client = pipe_transport.PipeClient(addresses=[address])
+    client.call(("ping", {}))
+    start = time.perf_counter()
+    for _ in range(calls):
+        client.call(request)
+    rate = calls / (time.perf_counter() - start)
+    pipe_transport.stop_worker(address)
+    worker.join()
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="database transport benchmark")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--large-calls", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=300000)
+    args = parser.parse_args()
+    small = ("get_user_list", {'page': 1})
+    large = ("fetch_ohlcv", {'rows': args.rows})
+    print(f"small queue : {bench_queue(small, args.calls):10.1f} calls/s")
+    print(f"small pipe  : {bench_pipe(small, args.calls):10.1f} calls/s")
+    print(f"large queue : {bench_queue(large, args.large_calls):10.2f} calls/s ({args.rows} rows)")
+    print(f"large pipe  : {bench_pipe(large, args.large_calls):10.2f} calls/s ({args.rows} rows)")
+
+
+if __name__ == '__main__':
+    main()
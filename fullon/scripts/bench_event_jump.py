@@ -0,0 +1,98 @@
+"""
+Benchmark for the event jumps of FullonEventFeed.
+
+Builds a synthetic gap-free 1 minute feed over --years years and replays the
+same sequence of event timeouts, once through the previous deque based jump
+(rotate, slice and rebuild the deque on every jump) and once through
+FullonEventFeed._jump_to_next_event on a BarCursor. Prints jumps/s for both
+and checks both land on the same bars.
+
+    cd fullon && python scripts/bench_event_jump.py --years 3 --jumps 2000
+"""
+import sys
+import time
+import argparse
+import itertools
+from collections import deque
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import arrow
+from libs.settings_config import fullon_settings_loader  # pylint: disable=unused-import
+import numpy
+import pandas
+from libs.btrader.bar_cursor import BarCursor
+from libs.btrader.fulloneventfeed import FullonEventFeed
+
+TIME_FACTOR = 60
+
+
+def make_dataframe(years: int) -> pandas.DataFrame:
+    index = pandas.date_range("2020-01-01", periods=years * 525600, freq="1min", name="date")
+    close = 30000 + numpy.cumsum(numpy.random.default_rng(1).normal(0, 5, len(index)))
+    return pandas.DataFrame({'open': close, 'high': close + 5, 'low': close - 5,
+                             'close': close, 'volume': 1.0}, index=index)
+
+
+def legacy_jump(feed) -> list:
+    """ the deque based _jump_to_next_event this replaces """
+    event = feed.result.popleft()
+    if not feed.event_timeout:
+        return event
+    if feed.event_timeout.timestamp() < arrow.get(event[0]).timestamp():
+        return event
+    steps = (feed.event_timeout.timestamp() - arrow.get(event[0]).timestamp()) / feed.time_factor
+    size = len(feed.result)
+    steps = int(steps) - 1
+    if steps <= 0:
+        return event
+    if size <= steps:
+        return event
+    feed.event_timeout = None
+    feed.result.rotate(-steps)
+    mslice = list(itertools.islice(feed.result, 0, size + 1 - steps))
+    mslice.pop()
+    feed.result = deque(mslice)
+    return feed.result.popleft() if feed.result else []
+
+
+def cursor_jump(feed) -> list:
+    FullonEventFeed._jump_to_next_event(feed)
+    return feed.result.popleft()
+
+
+def replay(feed, jump, gaps: list) -> tuple:
+    landed = []
+    start = time.perf_counter()
+    for gap in gaps:
+        if not feed.result:
+            break
+        row = feed.result[0]
+        feed.event_timeout = arrow.get(row[0]).shift(minutes=gap)
+        landed.append(jump(feed)[0])
+    return len(landed) / (time.perf_counter() - start), landed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="event feed jump benchmark")
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--jumps", type=int, default=2000)
+    args = parser.parse_args()
+    dataframe = make_dataframe(args.years)
+    gaps = numpy.random.default_rng(2).integers(1, 240, args.jumps).tolist()
+    legacy = SimpleNamespace(result=deque(dataframe.reset_index().values.tolist()),
+                             event_timeout=None, time_factor=TIME_FACTOR)
+    cursor = SimpleNamespace(result=BarCursor(dataframe), event_timeout=None, time_factor=TIME_FACTOR)
+    rate_legacy, landed_legacy = replay(legacy, legacy_jump, gaps)
+    rate_cursor, landed_cursor = replay(cursor, cursor_jump, gaps)
+    assert landed_legacy == landed_cursor, "jumps landed on different bars"
+    print(f"bars        : {len(dataframe)}")
+    print(f"deque jump  : {rate_legacy:12.1f} jumps/s")
+    print(f"cursor jump : {rate_cursor:12.1f} jumps/s")
+    print(f"speedup     : {rate_cursor / rate_legacy:12.1f}x")
+
+
+if __name__ == '__main__':
+    main()
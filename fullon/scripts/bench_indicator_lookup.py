@@ -0,0 +1,84 @@
+"""
+Benchmark for the per bar indicator reads of the strategies.
+
+Replays set_indicators over a synthetic 1 minute indicators_df with the
+fields each strategy reads, once the previous way (format curtime, then
+indicators_df.loc per field) and once through IndicatorIndex as
+Strategy._this_indicators does now. The read values must match. Timings
+are taken over --bars bars and reported in seconds per 1M bars.
+
+    cd fullon && python scripts/bench_indicator_lookup.py --bars 20000
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import arrow
+import numpy
+import pandas
+from libs.strategy.indicator_index import IndicatorIndex
+
+STRATEGIES = {
+    'rsi_reversal': ['entry', 'exit', 'rsi'],
+    'rsi_hayden': ['entry', 'exit', 'rsi'],
+    'sma_momentum': ['entry', 'exit', 'sma'],
+    'heuristic_longs': ['entry', 'exit'],
+    'xgb_forest_mom_short': ['entry', 'exit', 'ema_short', 'rsi_entry', 'macd_entry', 'stoch_entry'],
+}
+
+
+def make_dataframe(bars: int) -> pandas.DataFrame:
+    index = pandas.date_range("2020-01-01", periods=bars, freq="1min", name="date").astype('datetime64[ns]')
+    rng = numpy.random.default_rng(1)
+    values = {'close': 30000 + numpy.cumsum(rng.normal(0, 5, bars))}
+    for field in sorted({field for fields in STRATEGIES.values() for field in fields}):
+        if field in ('entry', 'exit'):
+            values[field] = rng.random(bars) > 0.9
+        else:
+            values[field] = rng.normal(50, 10, bars)
+    return pandas.DataFrame(values, index=index)
+
+
+def legacy(dataframe: pandas.DataFrame, times: list, fields: list) -> tuple:
+    out = []
+    start = time.perf_counter()
+    for curtime in times:
+        current_time = curtime.format('YYYY-MM-DD HH:mm:ss')
+        for indicator in fields:
+            out.append(dataframe.loc[current_time, indicator])
+    return time.perf_counter() - start, out
+
+
+def indexed(dataframe: pandas.DataFrame, times: list, fields: list) -> tuple:
+    out = []
+    start = time.perf_counter()
+    index = IndicatorIndex(dataframe)
+    for curtime in times:
+        row = index.row(curtime)
+        for indicator in fields:
+            out.append(index.column(indicator)[row])
+    return time.perf_counter() - start, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="indicator lookup benchmark")
+    parser.add_argument("--bars", type=int, default=20000)
+    args = parser.parse_args()
+    dataframe = make_dataframe(args.bars)
+    times = [arrow.get(stamp) for stamp in dataframe.index.to_pydatetime()]
+    scale = 1_000_000 / args.bars
+    print(f"bars: {args.bars}, seconds per 1M bars")
+    print(f"{'strategy':22} {'fields':>6} {'.loc':>10} {'index':>10} {'speedup':>8}")
+    for name, fields in STRATEGIES.items():
+        took_loc, values_loc = legacy(dataframe, times, fields)
+        took_index, values_index = indexed(dataframe, times, fields)
+        assert values_loc == values_index, name
+        print(f"{name:22} {len(fields):6} {took_loc * scale:10.2f} {took_index * scale:10.2f} "
+              f"{took_loc / took_index:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark of the Monte Carlo noise paths.
+
+Builds --paths noisy versions of --days of synthetic 1 minute candles and a
+--compression minutes secondary feed for each, once the previous way (copy
+the frame, add noise column by column, pandas resample, per simulation) and
+once through NoisePaths (all paths drawn at once into shared memory and
+reduced in one pass). Reports wall time, the peak of Python allocations and
+the size of the shared arrays, and checks the reduced bars match resample.
+
+    cd fullon && python scripts/bench_montecarlo.py --paths 100 --days 30
+"""
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from libs.settings_config import fullon_settings_loader  # noqa: F401 pylint: disable=unused-import
+import numpy
+import pandas
+from libs.montecarlo import COLUMNS, NoisePaths
+
+AGG = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+
+
+def market(days: int) -> pandas.DataFrame:
+    minutes = days * 1440
+    rng = numpy.random.default_rng(7)
+    index = pandas.date_range("2024-03-01", periods=minutes, freq="1min", name="date")
+    close = 30000 * numpy.exp(numpy.cumsum(rng.normal(0, 0.0012, minutes)))
+    open_ = numpy.append(30000, close[:-1])
+    return pandas.DataFrame({'open': open_, 'high': numpy.maximum(open_, close),
+                             'low': numpy.minimum(open_, close), 'close': close,
+                             'volume': rng.random(minutes)}, index=index)
+
+
+def legacy(dataframe: pandas.DataFrame, paths: int, compression: int) -> float:
+    start = time.perf_counter()
+    for _ in range(paths):
+        noisy = dataframe.copy()
+        for col in COLUMNS:
+            noisy[col] += numpy.random.normal(0, noisy[col].std() * 0.003, size=len(noisy))
+        noisy.resample(f"{compression}min").agg(AGG)
+    return time.perf_counter() - start
+
+
+def batched(dataframe: pandas.DataFrame, paths: int, compression: int, root: str) -> tuple:
+    start = time.perf_counter()
+    noise = NoisePaths(dataframe=dataframe, paths=paths, seed=1, root=root)
+    for num in range(paths):
+        noise.path(num)
+        noise.path(num, compression=compression, period='minutes')
+    took = time.perf_counter() - start
+    size = sum(file.stat().st_size for file in Path(root).glob("*.npy"))
+    return took, size, noise
+
+
+def measure(func, *args) -> tuple:
+    tracemalloc.start()
+    result = func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo noise benchmark")
+    parser.add_argument("--paths", type=int, default=100)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--compression", type=int, default=60)
+    args = parser.parse_args()
+    dataframe = market(args.days)
+    mb = 1024 * 1024
+
+    took_legacy, peak_legacy = measure(legacy, dataframe, args.paths, args.compression)
+    with tempfile.TemporaryDirectory(dir="/dev/shm" if Path("/dev/shm").is_dir() else None) as root:
+        (took, size, noise), peak = measure(batched, dataframe, args.paths, args.compression, root)
+        reduced = noise.path(3, compression=args.compression, period='minutes')
+        expected = noise.path(3).resample(f"{args.compression}min").agg(AGG)
+        assert reduced.index.equals(expected.index)
+        assert numpy.allclose(reduced.to_numpy(), expected.to_numpy(), rtol=1e-5, equal_nan=True)
+
+    print(f"{args.paths} paths, {len(dataframe)} bars, {args.compression}min secondary feed")
+    print(f"{'':10} {'wall s':>10} {'peak MB':>10} {'shared MB':>10}")
+    print(f"{'per run':10} {took_legacy:10.3f} {peak_legacy / mb:10.1f} {0:10.1f}")
+    print(f"{'batched':10} {took:10.3f} {peak / mb:10.1f} {size / mb:10.1f}")
+    print(f"speedup {took_legacy / took:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Latency benchmark for response channels of the worker queues.
+
+Runs the request/response pattern of libs/database.py against an echo
+worker and reports p50/p90/p99 latency of a trivial forwarded call, once
+creating a Manager().Queue() per call (the old QueuePool.get_queue) and
+once checking queues out of the pooled QueuePool.
+
+    cd fullon && python scripts/bench_queue_pool.py --calls 5000
+"""
+import sys
+import time
+import argparse
+from contextlib import contextmanager
+from multiprocessing import Manager, Process
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from libs.queue_pool import QueuePool
+
+STOP = "StopThisRun"
+
+
+def echo_worker(request_queue) -> None:
+    while True:
+        request = request_queue.get()
+        if request == STOP:
+            break
+        method_name, method_params, response_queue = request
+        response_queue.put(method_params)
+
+
+class PerCallPool(QueuePool):
+    """ the previous behaviour, one manager queue per call """
+
+    @contextmanager
+    def get_queue(self):
+        queue = self.manager.Queue()
+        yield queue
+        del queue
+
+
+def measure(pool: QueuePool, request_queue, calls: int) -> list:
+    latencies = []
+    for num in range(calls):
+        start = time.perf_counter()
+        with pool.get_queue() as response_queue:
+            request_queue.put(("ping", {'num': num}, response_queue))
+            response_queue.get()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return sorted(latencies)
+
+
+def percentiles(latencies: list) -> str:
+    def pct(value):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * value))]
+    return f"p50 {pct(0.50):7.3f} ms  p90 {pct(0.90):7.3f} ms  p99 {pct(0.99):7.3f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="response queue latency benchmark")
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+    mngr = Manager()
+    request_queue = mngr.Queue()
+    worker = Process(target=echo_worker, args=(request_queue,))
+    worker.start()
+    try:
+        before = measure(PerCallPool(procname="bench"), request_queue, args.calls)
+        after = measure(QueuePool(procname="bench"), request_queue, args.calls)
+    finally:
+        request_queue.put(STOP)
+        worker.join()
+    print(f"queue per call : {percentiles(before)}")
+    print(f"pooled queues  : {percentiles(after)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark of VectorBacktest against the backtrader path.
+
+Runs a strategy family over --days of synthetic 1 minute bars once through
+Cerebro, as Bot.run_simul_loop does, and once through VectorBacktest, checks
+both produce the same trades and reports the seconds per run and how many
+VectorBacktest runs of a parameter sweep fit in one backtrader run.
+
+    cd fullon && python scripts/bench_vector_backtest.py --days 30
+"""
+import sys
+import time
+import argparse
+import importlib
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from libs.settings_config import fullon_settings_loader  # noqa: F401 pylint: disable=unused-import
+import arrow
+import backtrader as bt
+import numpy
+import pandas
+from libs import strategy
+from libs.btrader.basebroker import BaseBroker
+from libs.vector_backtest import FAMILIES, VectorBacktest
+
+BAR = 60
+FEE = 0.0015
+
+
+def market(days: int) -> tuple:
+    minutes = days * 1440
+    rng = numpy.random.default_rng(7)
+    index = pandas.date_range("2024-03-01", periods=minutes, freq="1min", name="date")
+    close = 30000 * numpy.exp(numpy.cumsum(rng.normal(0, 0.0012, minutes)))
+    open_ = numpy.append(30000, close[:-1])
+    ticks = pandas.DataFrame({'open': open_, 'high': numpy.maximum(open_, close),
+                              'low': numpy.minimum(open_, close), 'close': close,
+                              'volume': rng.random(minutes)}, index=index)
+    bars = ticks.resample(f"{BAR}min").agg({'open': 'first', 'high': 'max', 'low': 'min',
+                                            'close': 'last', 'volume': 'sum'})
+    signals = pandas.DataFrame({'close': bars['close'], 'entry': rng.random(len(bars)) > 0.6,
+                                'exit': rng.random(len(bars)) > 0.7},
+                               index=bars.index + pandas.Timedelta(minutes=BAR))
+    return ticks, bars, signals.iloc[5:]
+
+
+def add_feed(cerebro, dataframe, trading, timeframe, compression):
+    data = bt.feeds.PandasData(dataname=dataframe, timeframe=timeframe, compression=compression)
+    data.timeframe, data.compression = timeframe, compression
+    data.feed = SimpleNamespace(trading=trading, futures=True, str_id=1)
+    data.dataframe = data.result = dataframe
+    data.symbol = "BTC/USD"
+    data.bar_size_minutes = compression
+    data.last_date = arrow.get(dataframe.index[-1])
+    data.last_moments = bt.date2num(dataframe.index[-1].to_pydatetime())
+    data.event_timeout = None
+    cerebro.adddata(data)
+
+
+def backtrader(name, ticks, bars, signals, params) -> list:
+    strategy.STRATEGY_TYPE = "backtest"
+    from libs.strategy import loader
+    importlib.reload(loader)
+    module = importlib.reload(importlib.import_module(f"strategies.{name}.strategy"))
+
+    class Strategy(module.Strategy):
+        def set_predictor(self):
+            pass
+
+        def set_indicators_df(self):
+            self.indicators_df = signals.copy()
+
+    helper = SimpleNamespace(id=1, dry_run=True, noise=False, simulresults={1: {0: [], 1: []}})
+    cerebro = bt.Cerebro(tradehistory=True)
+    broker = BaseBroker()
+    broker.setcash(10000)
+    broker.setcommission(commission=FEE, margin=None, mult=1, interest=0.000)
+    cerebro.setbroker(broker)
+    cerebro.addstrategy(Strategy, helper=helper, str_id=1, **params)
+    add_feed(cerebro, ticks, True, bt.TimeFrame.Ticks, 1)
+    add_feed(cerebro, bars, False, bt.TimeFrame.Minutes, BAR)
+    cerebro.run(live=True)
+    return helper.simulresults[1][0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="vector backtest benchmark")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--strategy", default="heuristic_shorts", choices=sorted(FAMILIES))
+    parser.add_argument("--sweep", type=int, default=200)
+    args = parser.parse_args()
+    ticks, bars, signals = market(args.days)
+    params = {'take_profit': 1.2, 'stop_loss': 0.8, 'trailing_stop': None, 'timeout': 5, 'size_pct': 20}
+
+    start = time.perf_counter()
+    expected = backtrader(args.strategy, ticks, bars, signals, params)
+    took_bt = time.perf_counter() - start
+
+    start = time.perf_counter()
+    engine = VectorBacktest(ticks=ticks, bars=bars, signals=signals, bar_size_minutes=BAR,
+                            fee=FEE, **FAMILIES[args.strategy])
+    took_setup = time.perf_counter() - start
+    start = time.perf_counter()
+    trades = engine.run(**params)
+    took_run = time.perf_counter() - start
+    first = expected[0]['num'] if expected else 0
+    assert trades == [{**trade, 'num': trade['num'] - first + 1} for trade in expected]
+
+    rng = numpy.random.default_rng(1)
+    start = time.perf_counter()
+    for _ in range(args.sweep):
+        engine.run(take_profit=rng.uniform(0.5, 3), stop_loss=rng.uniform(0.5, 3),
+                   timeout=int(rng.integers(2, 20)), size_pct=20)
+    took_sweep = (time.perf_counter() - start) / args.sweep
+
+    print(f"{args.strategy}, {args.days} days, {len(trades) // 2} trades")
+    print(f"backtrader      {took_bt:10.3f}s")
+    print(f"vector setup    {took_setup:10.3f}s")
+    print(f"vector run      {took_run:10.3f}s  {took_bt / took_run:8.0f}x")
+    print(f"sweep avg run   {took_sweep:10.3f}s  {took_bt / (took_setup + took_sweep):8.0f}x with setup")
+
+
+if __name__ == '__main__':
+    main()
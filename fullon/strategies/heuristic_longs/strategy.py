@@ -224,13 +224,7 @@ class Strategy(strat.Strategy):
     def set_indicators(self):
         """
         """
-        current_time = self.curtime[1].format('YYYY-MM-DD HH:mm:ss')
-        for indicator in ['entry', 'exit']:
-            try:
-                value = self.indicators_df.loc[current_time, indicator]
-                self.set_indicator(indicator, value)
-            except KeyError:
-                self.set_indicator(indicator, False)
+        self._this_indicators(current_time=self.curtime[1], fields=['entry', 'exit'], default=False)
         #ipdb.set_trace()
 
     def local_nextstart(self):
@@ -7,6 +7,7 @@ from libs.strategy import loader
 from libs import log
 import pandas
 import pandas_ta as ta
+from libs.strategy.stream_indicators import RSI
 
 
 logger = log.fullon_logger(__name__)
@@ -49,6 +50,12 @@ class Strategy(strat.Strategy):
                 self.crossed_upper = False
 
     def set_indicators_df(self):
+        if self.stream_indicators:
+            indicators_df = self.stream_indicators_df(feed=1, indicators={'rsi': RSI(self.p.rsi)},
+                                                      signals=self._signals)
+            if indicators_df is not None:
+                self.indicators_df = indicators_df
+            return
         if not self.indicators_df.empty:
             if self.indicators_df.index[-1] == self.str_feed[1].dataframe.index[-1]:
                 return
@@ -61,29 +68,26 @@ class Strategy(strat.Strategy):
         self.indicators_df.index = new_index
         self.indicators_df = self.indicators_df.dropna()
 
-    def _set_signals(self):
+    def _signals(self, frame: pandas.DataFrame) -> dict:
         buffer_zone = 3  # Adding a buffer zone of x RSI points
 
-        # Create new columns for entry and exit signals, initialized to False
-        self.indicators_df['entry'] = False
-        self.indicators_df['exit'] = False
-
         # Conditions for RSI thresholds including buffer zone
-        rsi_previously_below_entry = self.indicators_df['rsi'].shift(1) < self.p.entry
-        rsi_cross_back_entry = self.indicators_df['rsi'] >= self.p.entry + buffer_zone  # Buffer zone added
+        rsi_previously_below_entry = frame['rsi'].shift(1) < self.p.entry
+        rsi_cross_back_entry = frame['rsi'] >= self.p.entry + buffer_zone  # Buffer zone added
 
         # Define conditions for long entry and exit signals
         long_entry_cond = rsi_previously_below_entry & rsi_cross_back_entry
-        long_exit_cond = self.indicators_df['rsi'] > self.p.exit
+        long_exit_cond = frame['rsi'] > self.p.exit
+        return {'entry': long_entry_cond, 'exit': long_exit_cond}
 
+    def _set_signals(self):
         # Update the DataFrame with the entry and exit signals based on the conditions
-        self.indicators_df.loc[long_entry_cond, 'entry'] = True
-        self.indicators_df.loc[long_exit_cond, 'exit'] = True
+        for column, values in self._signals(self.indicators_df).items():
+            self.indicators_df[column] = values
 
     def set_indicators(self):
-        current_time = self.curtime[1].format('YYYY-MM-DD HH:mm:ss')
         fields = ['entry', 'exit', 'rsi']
-        self._this_indicators(current_time=current_time, fields=fields)
+        self._this_indicators(current_time=self.curtime[1], fields=fields)
 
     def local_nextstart(self):
         """ Only runs once, before local_next"""
@@ -108,14 +108,8 @@ class Strategy(strat.Strategy):
 
         printed when verbose is true in simuls
         """
-        current_time = self.curtime[1].format('YYYY-MM-DD HH:mm:ss')
         ind_list = ['entry', 'exit']
-        for indicator in ind_list:
-            try:
-                value = self.indicators_df.loc[current_time, indicator]
-                self.set_indicator(indicator, value)
-            except KeyError:
-                self.set_indicator(indicator, None)
+        self._this_indicators(current_time=self.curtime[1], fields=ind_list)
 
     def local_nextstart(self):
         """ Only runs once, before local_next"""
@@ -7,6 +7,7 @@ from libs.strategy import loader
 from libs import log
 import pandas
 import pandas_ta as ta
+from libs.strategy.stream_indicators import SMA
 
 
 logger = log.fullon_logger(__name__)
@@ -39,6 +40,12 @@ class Strategy(strat.Strategy):
                 self.open_pos(0)
 
     def set_indicators_df(self):
+        if self.stream_indicators:
+            indicators_df = self.stream_indicators_df(feed=1, indicators={'sma': SMA(int(self.p.sma_period))},
+                                                      signals=self._signals)
+            if indicators_df is not None:
+                self.indicators_df = indicators_df
+            return
         if not self.indicators_df.empty:
             if self.indicators_df.index[-1] == self.str_feed[1].dataframe.index[-1]:
                 return
@@ -52,22 +59,20 @@ class Strategy(strat.Strategy):
         self.indicators_df.index = new_index
         self.indicators_df = self.indicators_df.dropna()
 
-    def _set_signals(self):
-        # Create new columns for entry and exit signals, initialized to False
-        self.indicators_df['entry'] = False
-        self.indicators_df['exit'] = False
+    def _signals(self, frame: pandas.DataFrame) -> dict:
         # Define conditions for long entry and exit signals
-        close_above_sma = self.indicators_df['close'].shift(1) > self.indicators_df['sma']
-        close_below_sma = self.indicators_df['close'].shift(1) < self.indicators_df['sma']
+        close_above_sma = frame['close'].shift(1) > frame['sma']
+        close_below_sma = frame['close'].shift(1) < frame['sma']
+        return {'entry': close_above_sma, 'exit': close_below_sma}
 
+    def _set_signals(self):
         # Update the DataFrame with the entry and exit signals based on the conditions
-        self.indicators_df.loc[close_above_sma, 'entry'] = True
-        self.indicators_df.loc[close_below_sma, 'exit'] = True
+        for column, values in self._signals(self.indicators_df).items():
+            self.indicators_df[column] = values
 
     def set_indicators(self):
-        current_time = self.curtime[1].format('YYYY-MM-DD HH:mm:ss')
         fields = ['entry', 'exit', 'sma']
-        self._this_indicators(current_time=current_time, fields=fields)
+        self._this_indicators(current_time=self.curtime[1], fields=fields)
 
     def local_nextstart(self):
         """ Only runs once, before local_next"""
@@ -125,18 +125,13 @@ class Strategy(strat.Strategy):
         printed when verbose is true in simuls
         """
         bar_size = self.str_feed[1].bar_size_minutes
-        current_time = self.curtime[1].shift(minutes=-bar_size).format('YYYY-MM-DD HH:mm:ss')
+        current_time = self.curtime[1].shift(minutes=-bar_size)
         '''
         for indicator in ['entry', 'exit', 'score', 'adsoc',
                           'ema_long', 'rsi_entry', 'cmf_entry',
                           'vwap_entry', 'macd_entry']:
         '''
-        for indicator in ['entry', 'exit']:
-            try:
-                value = self.indicators_df.loc[current_time, indicator]
-                self.set_indicator(indicator, value)
-            except KeyError:
-                self.set_indicator(indicator, None)
+        self._this_indicators(current_time=current_time, fields=['entry', 'exit'])
 
     def local_nextstart(self):
         """ Only runs once, before local_next"""
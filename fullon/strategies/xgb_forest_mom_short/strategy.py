@@ -124,15 +124,9 @@ class Strategy(strat.Strategy):
 
         printed when verbose is true in simuls
         """
-        current_time = self.curtime[1].format('YYYY-MM-DD HH:mm:ss')
         ind_list = ['entry', 'exit', 'ema_short',  'rsi_entry',
                     'macd_entry', 'stoch_entry']
-        for indicator in ind_list:
-            try:
-                value = self.indicators_df.loc[current_time, indicator]
-                self.set_indicator(indicator, value)
-            except KeyError:
-                self.set_indicator(indicator, None)
+        self._this_indicators(current_time=self.curtime[1], fields=ind_list)
 
     def local_nextstart(self):
         """ Only runs once, before local_next"""
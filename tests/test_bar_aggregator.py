@@ -0,0 +1,134 @@
+import json
+from types import SimpleNamespace
+import numpy
+import pandas
+import pytest
+from libs.btrader.bar_aggregator import BarAggregator, BarRing, bucket_microseconds, trade_us
+from libs.btrader.fullonresampler import FullonFeedResampler
+
+MINUTE = 60_000_000
+START = trade_us("2024-01-01 00:00:00")
+
+
+def frame(rows: int, start: str = "2024-01-01", freq: str = "5min") -> pandas.DataFrame:
+    index = pandas.date_range(start, periods=rows, freq=freq, name="date", tz="UTC")
+    close = numpy.arange(rows, dtype=numpy.float64) + 100
+    return pandas.DataFrame({'open': close, 'high': close + 1, 'low': close - 1,
+                             'close': close, 'volume': 1.0}, index=index)
+
+
+@pytest.mark.order(1)
+def test_trade_us():
+    assert trade_us("2024-01-01 00:00:00.500") == START + 500_000
+    assert trade_us("2024-01-01T00:00:00.500Z") == START + 500_000
+    assert bucket_microseconds("minutes", 5) == 5 * MINUTE
+    assert bucket_microseconds("months", 1) is None
+
+
+@pytest.mark.order(2)
+def test_bar_ring():
+    ring = BarRing(capacity=10, utc=True)
+    assert ring.capacity == 1024
+    source = frame(3000)
+    ring.extend_frame(source.iloc[:1000])
+    view = ring.frame()
+    ring.extend_frame(source.iloc[1000:])
+    assert len(ring) <= ring.capacity
+    result = ring.frame()
+    pandas.testing.assert_frame_equal(result, source.iloc[-len(ring):], check_freq=False)
+    pandas.testing.assert_frame_equal(view, source.iloc[:1000], check_freq=False)
+    assert ring.last_bar() == (3099.0, 3100.0, 3098.0, 3099.0)
+
+
+@pytest.mark.order(3)
+def test_aggregator_matches_gapfill():
+    aggregator = BarAggregator(bucket_us=5 * MINUTE, now_us=START + 10)
+    assert aggregator.since == START + 5 * MINUTE
+    rng = numpy.random.default_rng(3)
+    stamps = numpy.sort(rng.integers(START, START + 60 * MINUTE, 400))
+    stamps = stamps[(stamps < START + 20 * MINUTE) | (stamps >= START + 30 * MINUTE)]
+    prices = rng.normal(100, 1, len(stamps)).round(2)
+    volumes = rng.random(len(stamps))
+    trades = [{'time': str(pandas.Timestamp(int(stamp), unit="us")), 'price': price, 'volume': volume}
+              for stamp, price, volume in zip(stamps, prices, volumes)]
+    for num in range(0, len(trades), 7):
+        aggregator.add_trades(json.dumps(trades[num:num + 7]))
+    starts, columns = aggregator.close(first=START + 5 * MINUTE, end=START + 60 * MINUTE,
+                                       previous=(1.0, 2.0, 0.5, 1.5))
+    frame = pandas.DataFrame({'price': prices, 'volume': volumes},
+                             index=pandas.to_datetime(stamps, unit="us"))
+    frame = frame[frame.index >= pandas.Timestamp(START + 5 * MINUTE, unit="us")]
+    expected = frame.resample("5min").agg({'price': ['first', 'max', 'min', 'last'], 'volume': 'sum'})
+    expected.columns = ['open', 'high', 'low', 'close', 'volume']
+    expected[['open', 'high', 'low', 'close']] = expected[['open', 'high', 'low', 'close']].ffill()
+    assert list(starts) == list(expected.index.as_unit("us").asi8)
+    for col in expected.columns:
+        numpy.testing.assert_allclose(columns[col], expected[col].to_numpy())
+    assert columns['volume'][3] == 0 and columns['close'][3] == columns['close'][2]
+    assert not aggregator._bars
+
+
+@pytest.mark.order(4)
+def test_append_row_repairs_then_streams(mocker):
+    now = START + 42 * MINUTE
+    mocker.patch.object(FullonFeedResampler, "_now_us", return_value=now)
+    sampler = FullonFeedResampler()
+    sampler._data = SimpleNamespace(dataframe=None)
+    sampler._ring = BarRing(capacity=0, utc=True)
+    sampler._ring.extend_frame(frame(4))
+    sampler._hub = SimpleNamespace(resets=0)
+    sampler._aggregator = BarAggregator(bucket_us=5 * MINUTE, now_us=START + 27 * MINUTE)
+    sampler._aggregator.add(START + 31 * MINUTE, 50.0, 2.0)
+    fetch = mocker.patch.object(FullonFeedResampler, "_fetch_bars",
+                                return_value=frame(2, start="2024-01-01 00:20"))
+    sampler.append_row()
+    fetch.assert_called_once_with(fromdate=START + 20 * MINUTE, todate=START + 30 * MINUTE)
+    dataframe = sampler._data.dataframe
+    assert list(dataframe.index.minute) == [0, 5, 10, 15, 20, 25, 30, 35]
+    assert dataframe['close'].iloc[-2] == 50.0 and dataframe['volume'].iloc[-2] == 2.0
+    assert dataframe['close'].iloc[-1] == 50.0 and dataframe['volume'].iloc[-1] == 0.0
+    sampler.append_row()
+    assert fetch.call_count == 1 and len(sampler._data.dataframe) == 8
+
+
+@pytest.mark.order(5)
+def test_late_trades_and_close_delay(mocker):
+    aggregator = BarAggregator(bucket_us=5 * MINUTE, now_us=START)
+    aggregator.add(START + MINUTE, 50.0, 1.0)
+    aggregator.close(first=START, end=START + 5 * MINUTE, previous=(1.0, 1.0, 1.0, 1.0))
+    aggregator.add(START + 2 * MINUTE, 60.0, 1.0)
+    assert aggregator.late == 1
+    _, columns = aggregator.close(first=START + 5 * MINUTE, end=START + 10 * MINUTE,
+                                  previous=(50.0, 50.0, 50.0, 50.0))
+    assert aggregator.late == 0 and columns['volume'][0] == 0
+    mocker.patch("libs.btrader.fullonresampler.settings",
+                 SimpleNamespace(RESAMPLER_CLOSE_DELAY=1, KRAKEN_TRADE_FLUSH_MS=2000))
+    sampler = FullonFeedResampler()
+    sampler._data = SimpleNamespace(exchange="kraken")
+    assert sampler._close_delay() == 4_000_000
+    sampler._data = SimpleNamespace(exchange="bitmex")
+    assert sampler._close_delay() == 1_000_000
+
+
+@pytest.mark.order(6)
+def test_aggregator_subscribes_first(mocker):
+    calls = []
+    hub = SimpleNamespace(resets=0,
+                          add_callback=lambda channel, callback: calls.append(("add", channel)),
+                          remove_callback=lambda channel, callback: calls.append(("remove", channel)))
+    mocker.patch("libs.btrader.fullonresampler.TickerHub.get", return_value=hub)
+    mocker.patch("libs.btrader.fullonresampler.settings", SimpleNamespace(RESAMPLER_CLOSE_DELAY=1))
+    stamps = iter([START + 2 * MINUTE, START + 7 * MINUTE])
+    mocker.patch.object(FullonFeedResampler, "_now_us", side_effect=lambda: next(stamps))
+    sampler = FullonFeedResampler()
+    sampler._period = "minutes"
+    data = SimpleNamespace(exchange="kraken", symbol="BTC/USD", compression=5, _table="kraken_btc_usd.trades",
+                           stop=lambda: calls.append(("stop", None)))
+    sampler._data = data
+    sampler._start_aggregator()
+    assert calls == [("add", "next_trades:kraken:BTC/USD")]
+    assert sampler._aggregator.since == START + 10 * MINUTE
+    data.stop = sampler._custom_stop(data.stop)
+    data.stop()
+    assert calls[1:] == [("stop", None), ("remove", "next_trades:kraken:BTC/USD")]
+    assert sampler._aggregator is None
@@ -0,0 +1,46 @@
+import pytest
+import pandas
+import backtrader as bt
+from libs.btrader.bar_cursor import BarCursor
+
+
+@pytest.fixture
+def cursor():
+    index = pandas.date_range("2023-01-01", periods=10, freq="1min", name="date")
+    dataframe = pandas.DataFrame({'open': range(10), 'high': range(10), 'low': range(10),
+                                  'close': range(10), 'volume': 1.0}, index=index)
+    return BarCursor(dataframe)
+
+
+@pytest.mark.order(1)
+def test_popleft(cursor):
+    assert len(cursor) == 10
+    row = cursor.popleft()
+    assert row == [pandas.Timestamp("2023-01-01 00:00"), 0.0, 0.0, 0.0, 0.0, 1.0]
+    assert len(cursor) == 9
+    assert cursor[0][1] == 1.0
+    assert cursor[-1][1] == 9.0
+    for _ in range(9):
+        cursor.popleft()
+    assert not cursor
+    with pytest.raises(IndexError):
+        cursor.popleft()
+
+
+@pytest.mark.order(2)
+def test_seek(cursor):
+    stamp = pandas.Timestamp("2023-01-01 00:04:30").timestamp()
+    assert cursor.index_at(stamp) == 4
+    assert cursor.index_at(cursor.stamps[0] - 1) == -1
+    cursor.seek(cursor.index_at(stamp))
+    assert cursor.popleft()[1] == 4.0
+    assert len(cursor) == 5
+
+
+@pytest.mark.order(3)
+def test_datenums(cursor):
+    expected = [bt.date2num(date) for date in cursor.dates.to_pydatetime()]
+    assert cursor.datenums.tolist() == expected
+    aware = BarCursor(pandas.DataFrame({'open': [1.0], 'high': [1.0], 'low': [1.0], 'close': [1.0], 'volume': [1.0]},
+                                       index=pandas.DatetimeIndex(['2023-01-01 10:30:15.250'], tz='UTC', name='date')))
+    assert aware.datenums[0] == bt.date2num(aware.dates[0].to_pydatetime())
@@ -227,3 +227,19 @@ def test_check_account(store, bot, dbase):
     res = bot.check_account(store=store, feed=feed)
     assert isinstance(res, bool)
 
+
+
+@pytest.mark.order(14)
+def test_live_feeds_tick_throttle(monkeypatch):
+    from types import SimpleNamespace
+    monkeypatch.setitem(importlib.import_module("libs.bot").FEED_CLASSES, "FullonFeed", "types.SimpleNamespace")
+    bot = Bot.__new__(Bot)
+    bot.pre_load_bars = 10
+    bot.str_params = {1: {'tick_throttle': 250}, 2: {}}
+    bot.str_feeds = {1: [SimpleNamespace(compression=1, period="ticks", exchange_name="kraken", symbol="BTC/USD")],
+                     2: [SimpleNamespace(compression=1, period="ticks", exchange_name="kraken", symbol="ETH/USD")]}
+    monkeypatch.setattr(bot, "backload_from", lambda str_id, bars: (arrow.utcnow(), arrow.utcnow()), raising=False)
+    monkeypatch.setattr(bot, "_sim_feeds_can_start", lambda feed, fromdate: True, raising=False)
+    datas = []
+    bot._load_live_feeds(cerebro=SimpleNamespace(adddata=lambda data, name: datas.append(data)))
+    assert [data.tick_throttle for data in datas] == [250, None]
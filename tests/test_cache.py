@@ -100,3 +100,12 @@ def test_get_symbol(store, user_ex):
 def test_prepare_cache(store):
     result = store.prepare_cache()
     assert result is None
+
+
+@pytest.mark.order(8)
+def test_shared_cache():
+    store = cache.Cache.shared()
+    assert store is cache.Cache.shared()
+    with cache.Cache.shared() as other:
+        assert other is store
+    assert store.test() is True
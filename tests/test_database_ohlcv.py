@@ -1,6 +1,8 @@
 from __future__ import unicode_literals, print_function
 import pytest
 from libs.database_ohlcv import Database
+from libs.models.ohlcv_model import Database as DatabaseOHLCV
+from libs.structs.trade_struct import TradeStruct
 import datetime
 from multiprocessing import Process
 
@@ -44,3 +46,53 @@ def test_test():
 
     for num in procs.copy().keys():
         procs[num].join(timeout=4)
+
+
+@pytest.mark.order(3)
+def test_save_symbol_trades_bulk():
+    trades = [TradeStruct(time=f"2020-01-01 00:00:{num % 50:02d}.000", price=100 + num,
+                          volume=1, side="buy", order_type="l", ex_trade_id=str(num))
+              for num in range(60)]
+    with DatabaseOHLCV(exchange='test', symbol='BULK/USD') as dbase:
+        dbase.make_schema()
+        dbase.make_trade_table()
+        try:
+            dbase.save_symbol_trades(data=trades[:30], bulk=False)
+            dbase.save_symbol_trades(data=trades, bulk=True)
+            with dbase.con.cursor() as cur:
+                cur.execute(f"SELECT count(*), sum(price) FROM {dbase.schema}.trades")
+                count, total = cur.fetchone()
+            assert count == 50
+            assert total == sum(100 + num for num in range(50))
+            dbase.save_symbol_trades(data=[TradeStruct(time="2020-01-01 00:01:00.000", price=1, volume=1,
+                                                       side="buy", order_type="l", ex_trade_id=None)],
+                                     bulk=True)
+            with dbase.con.cursor() as cur:
+                cur.execute(f"SELECT count(*) FROM {dbase.schema}.trades WHERE ord IS NULL")
+                assert cur.fetchone()[0] == 1
+        finally:
+            dbase.delete_schema()
+
+
+@pytest.mark.order(4)
+def test_fetch_ohlcv_df():
+    trades = [TradeStruct(time=f"2020-01-01 00:{num // 4:02d}:{(num % 4) * 15:02d}.000", price=100 + num,
+                          volume=1, side="buy", order_type="l", ex_trade_id=str(num))
+              for num in range(40)]
+    with DatabaseOHLCV(exchange='test', symbol='COLS/USD') as dbase:
+        dbase.make_schema()
+        dbase.make_trade_table()
+        try:
+            dbase.save_symbol_trades(data=trades)
+            table = f"{dbase.schema}.trades"
+            params = {'table': table, 'compression': 1, 'period': 'minutes',
+                      'fromdate': '2020-01-01 00:00:00', 'todate': '2020-01-01 00:09:59'}
+            rows = dbase.fetch_ohlcv(**params)
+            dataframe = dbase.fetch_ohlcv_df(**params)
+            assert list(dataframe.columns) == ['open', 'high', 'low', 'close', 'volume']
+            assert all(str(dtype) == 'float64' for dtype in dataframe.dtypes)
+            assert len(dataframe) == len(rows) == 10
+            assert list(dataframe.index.to_pydatetime()) == [row[0] for row in rows]
+            assert dataframe.values.tolist() == [list(row[1:]) for row in rows]
+        finally:
+            dbase.delete_schema()
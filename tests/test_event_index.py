@@ -0,0 +1,67 @@
+import pytest
+import numpy
+import pandas
+from libs.btrader.event_index import EventIndex
+
+
+@pytest.fixture(scope="module")
+def closes():
+    rng = numpy.random.default_rng(7)
+    return numpy.round(100 + numpy.cumsum(rng.normal(0, 0.5, 3000)), 1)
+
+
+def _first(close, start, end, cond):
+    hits = numpy.nonzero(cond(close[start:end + 1]))[0]
+    return start + hits[0] if len(hits) else -1
+
+
+def _trailing(close, start, end, price, percent, long):
+    """ the dataframe version the index replaces """
+    df_ohlcv = pandas.DataFrame({'close': close[start:end + 1]})
+    if long:
+        stop = df_ohlcv['close'].expanding().max() * (1 - percent / 100)
+    else:
+        stop = df_ohlcv['close'].expanding().min() * (1 + percent / 100)
+    previous = stop.shift(1)
+    previous.iloc[0] = price
+    hits = df_ohlcv[df_ohlcv['close'] < previous] if long else df_ohlcv[df_ohlcv['close'] > previous]
+    if hits.empty:
+        return -1, price
+    return start + hits.index[0], stop.loc[hits.index[0]]
+
+
+@pytest.mark.order(1)
+def test_first_touch(closes):
+    index = EventIndex(stamps=numpy.arange(len(closes)) * 60.0, close=closes)
+    rng = numpy.random.default_rng(1)
+    for _ in range(500):
+        start = int(rng.integers(0, len(closes)))
+        end = int(rng.integers(start, len(closes)))
+        level = float(rng.choice(closes))
+        assert index.first_above(start, end, level) == _first(closes, start, end, lambda c: c > level)
+        assert index.first_above(start, end, level, inclusive=True) == _first(closes, start, end, lambda c: c >= level)
+        assert index.first_below(start, end, level) == _first(closes, start, end, lambda c: c < level)
+        assert index.first_below(start, end, level, inclusive=True) == _first(closes, start, end, lambda c: c <= level)
+
+
+@pytest.mark.order(2)
+def test_trailing_stop(closes):
+    index = EventIndex(stamps=numpy.arange(len(closes)) * 60.0, close=closes)
+    rng = numpy.random.default_rng(2)
+    for _ in range(500):
+        start = int(rng.integers(0, len(closes)))
+        end = int(rng.integers(start, len(closes)))
+        long = bool(rng.integers(0, 2))
+        percent = float(rng.uniform(0.2, 5))
+        price = closes[start] * (0.97 if long else 1.03)
+        assert index.trailing_stop(start, end, price, percent, long) == \
+            _trailing(closes, start, end, price, percent, long)
+
+
+@pytest.mark.order(3)
+def test_positions():
+    index = EventIndex(stamps=numpy.array([60.0, 120.0, 180.0]), close=numpy.array([1.0, 2.0, 3.0]))
+    assert index.position(120) == 1
+    assert index.position(121) == 2
+    assert index.last_position(179) == 1
+    assert index.last_position(10) == -1
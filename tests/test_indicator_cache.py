@@ -0,0 +1,78 @@
+import numpy
+import pandas
+import pytest
+from libs.strategy.indicator_cache import IndicatorCache, indicator_params
+
+
+class Strategy():
+    pass
+
+
+def frames(seed: int = 1) -> list:
+    rng = numpy.random.default_rng(seed)
+    index = pandas.date_range("2024-03-01", periods=500, freq="1min", name="date")
+    return [pandas.DataFrame({'close': rng.random(500), 'volume': rng.random(500)}, index=index)]
+
+
+@pytest.mark.order(1)
+def test_indicator_params():
+    params = {'take_profit': 2, 'stop_loss': 1, 'timeout': 10, 'size_pct': 20, 'rsi': 14, 'sma': 30}
+    assert indicator_params(params) == {'rsi': 14, 'sma': 30}
+
+
+@pytest.mark.order(2)
+def test_key():
+    key = IndicatorCache.key(Strategy, {'rsi': 14}, frames())
+    assert key == IndicatorCache.key(Strategy, {'rsi': 14}, frames())
+    assert key != IndicatorCache.key(Strategy, {'rsi': 15}, frames())
+    assert key != IndicatorCache.key(Strategy, {'rsi': 14}, frames(seed=2))
+    params = {'take_profit': 2, 'rsi': 14}
+    assert key == IndicatorCache.key(Strategy, indicator_params(params), frames())
+
+
+@pytest.mark.order(3)
+def test_get_computes_once(tmp_path):
+    cache = IndicatorCache(root=str(tmp_path))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return frames()[0].rolling(14).mean()
+
+    key = cache.key(Strategy, {'rsi': 14}, frames())
+    first = cache.get(key, compute)
+    second = cache.get(key, compute)
+    assert len(calls) == 1
+    pandas.testing.assert_frame_equal(first, second)
+    cache.clear()
+    assert list(tmp_path.iterdir()) == []
+    cache.get(key, compute)
+    assert len(calls) == 2
+
+
+@pytest.mark.order(4)
+def test_sweep_directories(tmp_path):
+    first = IndicatorCache(root=str(tmp_path), sweep="a")
+    second = IndicatorCache(root=str(tmp_path), sweep="b")
+    first.claim()
+    second.claim()
+    key = first.key(Strategy, {'rsi': 14}, frames())
+    first.get(key, lambda: frames()[0])
+    second.get(key, lambda: frames()[0])
+    first.clear()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["b"]
+    assert second.get(key, lambda: None) is not None
+    # A sweep whose process died is removed by the next claim
+    (tmp_path / "b" / "owner.pid").write_text("999999999")
+    first.claim()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a"]
+
+
+@pytest.mark.order(5)
+def test_group_by_indicators():
+    pytest.importorskip("tqdm")
+    from run.simul_manager import SimulManager
+    sweep = [{'rsi': rsi, 'take_profit': take_profit} for take_profit in (1, 2, 3) for rsi in (14, 21)]
+    grouped = SimulManager.group_by_indicators(sweep)
+    assert [params['rsi'] for params in grouped] == [14, 14, 14, 21, 21, 21]
+    assert [params['take_profit'] for params in grouped] == [1, 2, 3, 1, 2, 3]
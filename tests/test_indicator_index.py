@@ -0,0 +1,46 @@
+import arrow
+import numpy
+import pandas
+import pytest
+from libs.strategy.indicator_index import IndicatorIndex
+
+
+def frame(rows: int = 500) -> pandas.DataFrame:
+    index = pandas.date_range("2024-01-01", periods=rows, freq="5min", name="date").astype('datetime64[ns]')
+    rng = numpy.random.default_rng(4)
+    return pandas.DataFrame({'rsi': rng.normal(50, 10, rows), 'entry': rng.random(rows) > 0.5},
+                            index=index)
+
+
+@pytest.mark.order(1)
+def test_matches_loc():
+    dataframe = frame()
+    index = IndicatorIndex(dataframe)
+    times = [arrow.get(stamp) for stamp in dataframe.index.to_pydatetime()]
+    for curtime in times[::3] + times[::-7]:
+        row = index.row(curtime.shift(microseconds=999))
+        label = curtime.format('YYYY-MM-DD HH:mm:ss')
+        for field in ('rsi', 'entry'):
+            assert index.column(field)[row] == dataframe.loc[label, field]
+    assert index.row(times[0].shift(minutes=1)) is None
+    assert index.row(times[-1].shift(minutes=5)) is None
+    assert index.row(times[10].format('YYYY-MM-DD HH:mm:ss')) == 10
+    with pytest.raises(KeyError):
+        index.column('exit')
+
+
+@pytest.mark.order(2)
+def test_current():
+    dataframe = frame()
+    index = IndicatorIndex(dataframe)
+    assert index.current(dataframe)
+    dataframe.loc[dataframe.index[3], 'rsi'] = numpy.nan
+    dataframe.dropna(inplace=True)
+    assert not index.current(dataframe)
+    index = IndicatorIndex(dataframe)
+    dataframe['exit'] = False
+    assert not index.current(dataframe)
+    assert not index.current(dataframe.copy())
+    shuffled = IndicatorIndex(dataframe.iloc[::-1])
+    assert shuffled.row(arrow.get(dataframe.index[5].to_pydatetime())) == len(dataframe) - 6
+    assert IndicatorIndex(pandas.DataFrame()).row(arrow.utcnow()) is None
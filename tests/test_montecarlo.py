@@ -0,0 +1,59 @@
+import numpy
+import pandas
+import pytest
+from libs.montecarlo import NoisePaths, resample_minutes
+
+AGG = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+
+
+def candles() -> pandas.DataFrame:
+    rng = numpy.random.default_rng(0)
+    index = pandas.date_range("2024-03-01 00:07", periods=3 * 1440, freq="1min", name="date")
+    index = index.delete(range(300, 420))
+    close = 30000 + numpy.cumsum(rng.normal(0, 5, len(index)))
+    return pandas.DataFrame({'open': close, 'high': close + 3, 'low': close - 3, 'close': close,
+                             'volume': rng.random(len(index))}, index=index)
+
+
+@pytest.mark.order(1)
+def test_paths_are_seeded(tmp_path):
+    dataframe = candles()
+    paths = NoisePaths(dataframe=dataframe, paths=4, seed=1, root=str(tmp_path / "a"))
+    again = NoisePaths(dataframe=dataframe, paths=4, seed=1, root=str(tmp_path / "b"))
+    other = NoisePaths(dataframe=dataframe, paths=4, seed=2, root=str(tmp_path / "c"))
+    assert paths.values().shape == (5, 4, len(dataframe))
+    assert paths.values().dtype == numpy.float32
+    pandas.testing.assert_frame_equal(paths.path(2), again.path(2))
+    assert not paths.path(2).equals(paths.path(3))
+    assert not paths.path(2).equals(other.path(2))
+    assert paths.path(2).index.equals(dataframe.index)
+    assert (paths.path(2)['close'] - dataframe['close']).abs().max() < dataframe['close'].std() * 0.05
+
+
+@pytest.mark.order(2)
+@pytest.mark.parametrize("compression, period, rule", [(15, 'minutes', '15min'), (60, 'minutes', '60min'),
+                                                       (1, 'days', '1D')])
+def test_reduced_matches_resample(tmp_path, compression, period, rule):
+    paths = NoisePaths(dataframe=candles(), paths=3, seed=5, root=str(tmp_path))
+    reduced = paths.path(1, compression=compression, period=period)
+    expected = paths.path(1).resample(rule).agg(AGG)
+    assert reduced.index.equals(expected.index)
+    numpy.testing.assert_allclose(reduced.to_numpy(), expected.to_numpy(), rtol=1e-5)
+
+
+@pytest.mark.order(3)
+def test_resample_minutes_and_clear(tmp_path):
+    assert resample_minutes(1, 'minutes') is None
+    assert resample_minutes(30, 'Minutes') == 30
+    assert resample_minutes(2, 'days') == 2880
+    assert resample_minutes(1, 'weeks') is None
+    paths = NoisePaths(dataframe=candles(), paths=2, seed=1, root=str(tmp_path))
+    paths.path(0, compression=5)
+    NoisePaths.clear(root=str(tmp_path))
+    assert list(tmp_path.iterdir()) == []
+    for sweep in ("a", "b"):
+        NoisePaths.claim(sweep=sweep, root=str(tmp_path))
+        NoisePaths(dataframe=candles(), paths=2, seed=1, root=str(tmp_path), sweep=sweep).values()
+    NoisePaths.clear(root=str(tmp_path), sweep="a")
+    assert [path.name for path in tmp_path.iterdir()] == ["b"]
+    assert len(list((tmp_path / "b").glob("*.npy"))) == 1
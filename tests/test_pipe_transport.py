@@ -0,0 +1,45 @@
+from __future__ import unicode_literals, print_function
+from datetime import datetime, timedelta
+from multiprocessing import Process
+import pytest
+from libs import pipe_transport
+
+
+def echo(request):
+    return request
+
+
+@pytest.fixture(scope="module")
+def client():
+    address = pipe_transport.worker_address(name="test", num=0)
+    worker = Process(target=pipe_transport.serve, args=(address, echo))
+    worker.start()
+    yield pipe_transport.PipeClient(addresses=[address])
+    pipe_transport.stop_worker(address=address)
+    worker.join(timeout=2)
+
+
+@pytest.mark.order(1)
+def test_pack_result():
+    rows = [(datetime(2024, 1, 1) + timedelta(minutes=num), 1.0 * num, 2.0, 0.5, 1.5, 10.0)
+            for num in range(pipe_transport.PACK_MIN_ROWS)]
+    packed = pipe_transport.pack_result(rows)
+    assert packed[0] == pipe_transport.PACKED
+    assert pipe_transport.unpack_result(packed) == rows
+    assert pipe_transport.pack_result(rows[:10]) == rows[:10]
+    counts = [(row[0], num) for num, row in enumerate(rows)]
+    unpacked = pipe_transport.unpack_result(pipe_transport.pack_result(counts))
+    assert unpacked == counts and all(isinstance(row[1], int) for row in unpacked)
+    # Missing values or mixed columns anywhere leave the rows as they are
+    missing = rows[:-1] + [(rows[-1][0], None, 2.0, 0.5, 1.5, 10.0)]
+    assert pipe_transport.pack_result(missing) is missing
+    mixed = counts[:-1] + [(counts[-1][0], 1.5)]
+    assert pipe_transport.pack_result(mixed) is mixed
+
+
+@pytest.mark.order(2)
+def test_call(client):
+    assert client.call(("get_user_list", {'page': 1})) == ("get_user_list", {'page': 1})
+    rows = [(datetime(2024, 1, 1) + timedelta(minutes=num), 1.0 * num)
+            for num in range(pipe_transport.PACK_MIN_ROWS)]
+    assert client.call(rows) == rows
@@ -0,0 +1,53 @@
+from __future__ import unicode_literals, print_function
+import pytest
+from libs.queue_pool import QueuePool
+
+
+@pytest.fixture(scope="module")
+def pool():
+    yield QueuePool(procname="test", size=2)
+
+
+@pytest.mark.order(1)
+def test_get_queue_reuses(pool):
+    with pool.get_queue() as queue:
+        queue.put(1)
+        assert queue.get() == 1
+    with pool.get_queue() as other:
+        assert other is queue
+
+
+@pytest.mark.order(2)
+def test_get_queue_discard(pool):
+    with pool.get_queue() as queue:
+        pool.discard(queue)
+    with pool.get_queue() as other:
+        assert other is not queue
+
+
+@pytest.mark.order(3)
+def test_get_queue_error(pool):
+    with pytest.raises(ValueError):
+        with pool.get_queue() as queue:
+            raise ValueError("boom")
+    with pool.get_queue() as other:
+        assert other is not queue
+
+
+@pytest.mark.order(4)
+def test_proxy_timeout_discards(pool, monkeypatch):
+    from queue import Queue
+    from libs import settings, database_ohlcv
+    monkeypatch.setattr(settings, "DB_RESPONSE_TIMEOUT", 0.1, raising=False)
+    monkeypatch.setattr(database_ohlcv, "request_queue", Queue())
+    monkeypatch.setattr(database_ohlcv, "response_queue_pool", pool)
+    monkeypatch.setattr(database_ohlcv, "pipe_client", None)
+    monkeypatch.setattr(database_ohlcv, "remote", None)
+    with pool.get_queue() as free:
+        pass
+    with pytest.raises(database_ohlcv.WorkerError):
+        database_ohlcv.Database(exchange="kraken", symbol="BTC/USD").get_latest_timestamp()
+    assert database_ohlcv.request_queue.get_nowait()[-1] is free
+    assert not pool._discarded
+    with pool.get_queue() as other:
+        assert other is not free
@@ -1,9 +1,13 @@
 import pytest
+from datetime import datetime, timezone
+import numpy
+import pandas
 from unittest.mock import patch
 from libs.bot import Bot
 from libs.database import Database
 from libs.models.ohlcv_model import Database as DataBase_ohclv
 from libs.btrader.fullonsimfeed import FullonSimFeed
+from libs.candle_store import CandleStore
 
 
 @pytest.fixture
@@ -26,22 +30,47 @@ def fullon_sim_feed():
 
 @pytest.mark.order(1)
 def test_fetch_ohlcv(fullon_sim_feed):
-    with patch.object(fullon_sim_feed, '_load_from_pickle') as mock_load_from_pickle, \
-            patch.object(fullon_sim_feed, '_save_to_df') as mock_save_to_df, \
-            patch.object(fullon_sim_feed, '_save_to_pickle') as mock_save_to_pickle, \
+    dataframe = pandas.DataFrame({'open': [60000.0], 'high': [61000.0], 'low': [59000.0],
+                                  'close': [60500.0], 'volume': [500.0]},
+                                 index=pandas.DatetimeIndex(['2023-05-16 00:00:00'], name='date'))
+    with patch.object(fullon_sim_feed, 'fetch_data_from_db') as mock_fetch_data_from_db, \
             patch.object(fullon_sim_feed, '_empty_bar') as mock_empty_bar:
-        # Test when pickle file exists
-        mock_load_from_pickle.return_value = [('2023-05-16 00:00:00', 60000, 61000, 59000, 60500, 500)]
+        # Test when the candle store returns data
+        mock_fetch_data_from_db.return_value = dataframe
         fullon_sim_feed._fetch_ohlcv()
-        mock_load_from_pickle.assert_called_once_with(fromdate=fullon_sim_feed.p.fromdate)
-        mock_save_to_df.assert_called_once()
+        mock_fetch_data_from_db.assert_called_once()
         assert len(fullon_sim_feed.result) == 1
-        assert fullon_sim_feed.result[0] == ('2023-05-16 00:00:00', 60000, 61000, 59000, 60500, 500)
-        mock_save_to_pickle.assert_not_called()
+        assert fullon_sim_feed.result[0] == [pandas.Timestamp('2023-05-16 00:00:00'), 60000, 61000, 59000, 60500, 500]
         mock_empty_bar.assert_not_called()
 
-        # Test when pickle file does not exist
-        mock_load_from_pickle.return_value = []
+        # Result already loaded, nothing is fetched again
         fullon_sim_feed._fetch_ohlcv()
-        mock_load_from_pickle.assert_called_with(fromdate=fullon_sim_feed.p.fromdate)
-        mock_save_to_df.assert_called_once()
+        mock_fetch_data_from_db.assert_called_once()
+
+
+@pytest.mark.order(2)
+def test_candle_store(tmp_path):
+    calls = []
+
+    def fetch(fromdate, todate):
+        calls.append((fromdate, todate))
+        index = pandas.date_range(fromdate, todate, freq='1min', name='date')
+        values = numpy.arange(len(index), dtype=float)
+        return pandas.DataFrame({col: values for col in ('open', 'high', 'low', 'close', 'volume')},
+                                index=index)
+
+    store = CandleStore(table='test_btc_usd.candles1m', compression=1, period='minutes', root=str(tmp_path))
+    latest = '2023-05-20 00:00:00'
+    dataframe = store.load('2023-05-16', '2023-05-16 23:59:59.999999', fetch=fetch, latest=latest)
+    assert len(dataframe) == 1440
+    assert len(calls) == 1
+    # Inside the stored range nothing is fetched
+    dataframe = store.load('2023-05-16 12:00', '2023-05-16 23:59:59.999999', fetch=fetch, latest=latest)
+    assert len(dataframe) == 720
+    assert len(calls) == 1
+    # A later range only fetches the missing tail
+    dataframe = store.load('2023-05-16', '2023-05-17 23:59:59.999999', fetch=fetch, latest=latest)
+    assert len(dataframe) == 2880
+    assert len(calls) == 2
+    assert calls[-1][0] == datetime(2023, 5, 17, tzinfo=timezone.utc)
+    assert dataframe.index.is_monotonic_increasing and dataframe.index.is_unique
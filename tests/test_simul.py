@@ -1,6 +1,11 @@
+import copy
+from types import SimpleNamespace
+import numpy as np
 import pytest
 from libs.simul import simul
-from pandas import DataFrame, Timestamp
+from libs.simul_metrics import summarize
+from pandas import DataFrame, Timedelta, Timestamp
+from pandas.testing import assert_frame_equal
 
 
 
@@ -89,3 +94,106 @@ def test_calculate_final_summary(sim):
         }
     }
     res = sim.calculate_final_summary(summaries)
+
+
+def legacy_metrics(trades: list, starting_cash: float) -> dict:
+    """ The metrics of a feed as parse computed them before simul_metrics """
+    df = DataFrame.from_dict(trades)
+    grouped_df = df.groupby('num')
+    profitable_pnl, loss_pnl, all_pnl, durations = [], [], [], []
+    for _, group in grouped_df:
+        try:
+            closing_trade_pnl = group.iloc[-1]['roi']
+            durations.append(group.iloc[1]['timestamp'] - group.iloc[0]['timestamp'])
+            all_pnl.append(closing_trade_pnl)
+            if closing_trade_pnl > 0:
+                profitable_pnl.append(closing_trade_pnl)
+            elif closing_trade_pnl < 0:
+                loss_pnl.append(closing_trade_pnl)
+        except IndexError:
+            pass
+    average_return = round(np.mean(all_pnl), 4)
+    if len(all_pnl) > 1 and np.std(all_pnl) != 0:
+        sharpe_ratio = round(average_return / np.std(all_pnl), 4)
+    else:
+        sharpe_ratio = 0
+    filtered_df = df[df['reason'].notnull()]
+    total_return = round(filtered_df['pnlfee'].sum(), 2)
+    max_drawdown = (starting_cash - filtered_df['assets'].min()) / starting_cash * 100
+    return {
+        'Start Date': df['timestamp'].min(),
+        'End Date': df['timestamp'].max(),
+        'Total Trades': grouped_df.ngroups,
+        'Profitable Trades': len(profitable_pnl),
+        'Loss Trades': len(loss_pnl),
+        'Win Rate (%)': round((len(profitable_pnl) / grouped_df.ngroups) * 100, 4),
+        'Total Fees': round(df['fee'].sum(), 2),
+        'Average Return %': average_return,
+        'Total Return': total_return,
+        'Total ROI %': round(100 - (starting_cash - total_return) / starting_cash * 100, 2),
+        'Median Return': round(np.median(all_pnl), 4),
+        'Negative Returns Standard Deviation': round(np.std(loss_pnl), 4) if len(loss_pnl) > 1 else 0,
+        'Positive Returns Standard Deviation': round(np.std(profitable_pnl), 4) if len(profitable_pnl) > 1 else 0,
+        'Average Duration (hours)': round(round(np.mean(durations).total_seconds(), 4) / 60 / 60, 2),
+        'Max Drawdown %': max(max_drawdown, 0),
+        'Sharpe Ratio': sharpe_ratio
+    }
+
+
+def random_trades(rng: np.random.Generator, count: int) -> list:
+    """ Trades of random length, unordered nums and a trade left open """
+    trades = []
+    assets = 10000.0
+    stamp = Timestamp('2024-01-01') + Timedelta(minutes=int(rng.integers(0, 600)))
+    for num in rng.permutation(count) + 3:
+        rows = 1 if num == 3 else int(rng.integers(2, 4))
+        for seq in range(rows):
+            stamp += Timedelta(seconds=int(rng.integers(1, 90000)), microseconds=int(rng.integers(0, 999999)))
+            closing = seq == rows - 1 and rows > 1
+            pnlfee = float(rng.normal(5, 40)) if closing else -float(rng.random())
+            assets += pnlfee
+            trades.append({'num': int(num), 'seq': seq, 'timestamp': stamp.to_pydatetime(),
+                           'side': 'Buy', 'pnlfee': pnlfee, 'fee': float(rng.random()),
+                           'roi': round(float(rng.normal(0.2, 2)), int(rng.integers(1, 4))) if closing else 0,
+                           'assets': assets if closing else None, 'reason': 'tp' if closing else None})
+    return trades
+
+
+@pytest.mark.order(2)
+def test_summarize_matches_legacy():
+    rng = np.random.default_rng(3)
+    trade_lists = [random_trades(rng, int(rng.integers(2, 25))) for _ in range(60)]
+    trade_lists += [[], trade_lists[0][:1]]
+    cash = [float(rng.choice([1000, 10000, 12000])) for _ in trade_lists]
+    metrics = summarize(trade_lists=trade_lists, starting_cash=cash)
+    assert metrics[-2:] == [None, None]
+    for trades, starting_cash, metric in zip(trade_lists[:-2], cash, metrics):
+        assert metric == legacy_metrics(trades, starting_cash)
+
+
+@pytest.mark.order(3)
+def test_parse_many(sim):
+    rng = np.random.default_rng(4)
+    feed = SimpleNamespace(compression=1, period='Minutes', symbol='BTC/USD')
+
+    def simulation() -> list:
+        detail = {'strategy': 'test', 'feed': feed, 'starting_cash': 10000, 'ending_assets': 10100,
+                  'interest_earned': 0.0, 'params': {'pairs': False, 'bot_id': 1, 'uid': 1, 'feeds': 2,
+                                                     'str_id': 1, 'take_profit': 2}}
+        return [random_trades(rng, 6) + [detail], random_trades(rng, 4) + [copy.deepcopy(detail)]]
+
+    results = [simulation() for _ in range(5)]
+    low = float('-inf')
+    expected = [sim.parse(results=copy.deepcopy(result), sharpe_filter=low) for result in results]
+    parsed = sim.parse_many(results=copy.deepcopy(results), sharpe_filter=low)
+    lean = sim.parse_many(results=copy.deepcopy(results), sharpe_filter=low, frames=False)
+    for result, summaries, with_frames, without in zip(results, expected, parsed, lean):
+        assert list(summaries) == [0, 1]
+        for n, summary in summaries.items():
+            assert_frame_equal(with_frames[n].pop('df'), DataFrame.from_dict(result[n][:-1]))
+            assert without[n].pop('df') is None
+            summary.pop('df')
+            assert summary == with_frames[n] == without[n]
+            assert summary['Total Trades'] == 6 - n * 2
+            assert 'bot_id' not in summary and summary['take_profit'] == 2
+    assert sim.parse(results=copy.deepcopy(results[0]), sharpe_filter=float('inf')) == {}
@@ -0,0 +1,91 @@
+import os
+import time
+import pytest
+from libs.simul_cache import SimulCache, source_digest
+
+
+class Base():
+    pass
+
+
+def key(**changes) -> str:
+    inputs = {'sources': ['abc'], 'params': {1: {'take_profit': 2, 'rsi': 14, 'helper': object()}},
+              'feeds': [(1, '2024-01-01', '2024-03-01', [('kraken', 'BTC/USD', 'minutes', 1)])],
+              'fee': 0.0015, 'leverage': 1}
+    inputs.update(changes)
+    return SimulCache.key(**inputs)
+
+
+@pytest.mark.order(1)
+def test_key():
+    assert key() == key()
+    assert key() == key(params={1: {'rsi': 14, 'take_profit': 2}})
+    assert key() != key(params={1: {'take_profit': 3, 'rsi': 14}})
+    assert key() != key(sources=['abd'])
+    assert key() != key(fee=0.001)
+    assert key() != key(feeds=[(1, '2024-01-02', '2024-03-01', [('kraken', 'BTC/USD', 'minutes', 1)])])
+
+
+@pytest.mark.order(2)
+def test_source_digest():
+    assert source_digest(Base) == source_digest(Base)
+    assert source_digest(SimulCache) == source_digest(object)
+
+
+@pytest.mark.order(3)
+def test_get_put_clear(tmp_path):
+    cache = SimulCache(root=str(tmp_path), max_mb=1)
+    assert cache.get(key()) is None
+    results = {1: {0: [{'num': 1, 'reason': 'tp'}]}}
+    cache.put(key(), results)
+    assert cache.get(key()) == results
+    assert cache.stats()['entries'] == 1
+    assert cache.clear() == 1
+    assert cache.get(key()) is None
+    assert not SimulCache(root=str(tmp_path), max_mb=0).enabled
+
+
+@pytest.mark.order(4)
+def test_lru_eviction(tmp_path):
+    cache = SimulCache(root=str(tmp_path), max_mb=1)
+    blob = os.urandom(400 * 1024)
+    for num in range(3):
+        cache.put(f"k{num}", blob)
+        time.sleep(0.01)
+    assert cache.get("k0") is None
+    assert cache.get("k1") == blob
+    time.sleep(0.01)
+    cache.put("k3", blob)
+    assert cache.get("k1") == blob
+    assert cache.get("k2") is None
+    assert cache.stats()['bytes'] <= cache.max_bytes
+
+
+class Data():
+    """ Loaded feed with the parts Bot._simul_key reads. """
+
+    def __init__(self, digest):
+        self.feed = type("Feed", (), {'exchange_name': 'kraken', 'period': 'minutes'})
+        self.symbol = 'BTC/USD'
+        self.compression = 1
+        self.p = type("Params", (), {'fromdate': '2024-01-01'})
+        self.digest = digest
+
+    def data_digest(self):
+        return self.digest
+
+
+@pytest.mark.order(5)
+def test_bot_key_follows_feed_data():
+    from libs.bot import Bot
+    bot = Bot.__new__(Bot)
+    bot.id, bot.bars, bot.str_params, bot.noise_path = 1, 100, {1: {'rsi': 14}}, None
+
+    def bot_key(digest='a', noise_path=None):
+        bot.noise_path = noise_path
+        cerebro = type("Cerebro", (), {'strats': [[(Base, (), {})]], 'datas': [Data(digest)]})
+        return bot._simul_key(cerebro=cerebro, feeds={}, warm_up=0, event=False, leverage=1, fee=0.1)
+    assert bot_key() == bot_key()
+    assert bot_key() != bot_key(digest='b')
+    assert bot_key(noise_path=(1, 8, 2)) != bot_key(noise_path=(1, 8, 3))
+    assert bot_key(noise_path=(1, 8, 2)) != bot_key()
@@ -0,0 +1,211 @@
+import os
+import socket
+import time
+from multiprocessing import Event, Manager, Process
+from types import SimpleNamespace
+import arrow
+import pandas
+import pytest
+from libs import database_ohlcv, settings
+
+pytest.importorskip("psutil")
+from libs import simul_launcher
+from libs.bot import Bot
+from libs.btrader import fullonsimfeed
+from libs.btrader.fullonfeed import FullonFeed
+from libs.simul_cluster import SimulCoordinator, _cache_dirs, parse_address, work
+from libs.simul_launcher import FullonSimulator, SimulStats
+
+CANDLE_ARGS = {'exchange': 'kraken', 'symbol': 'BTC/USD', 'table': 'kraken_btc_usd.trades', 'compression': 1,
+               'period': 'minutes', 'fromdate': '2024-01-01', 'todate': '2024-02-01'}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.mark.order(1)
+def test_parse_address():
+    assert parse_address("10.0.0.2:9400") == ("10.0.0.2", 9400)
+    assert parse_address(" localhost:1 ") == ("localhost", 1)
+    with pytest.raises(ValueError):
+        parse_address("9400")
+
+
+@pytest.mark.order(2)
+def test_remote_workers(monkeypatch, tmp_path):
+    """
+    Workers started as local processes share a sweep over TCP, get the
+    candles from the coordinator, which loads them once, and the jobs of a
+    worker that dies are done by the others.
+    """
+    died = Event()
+    loads = []
+
+    def run_batch(bots, request):
+        for num, test_params, _ in request[-2]:
+            candles = fullonsimfeed.candles(**CANDLE_ARGS)
+            if num == 3 and not died.is_set():
+                died.set()
+                os._exit(1)
+            time.sleep(0.02)
+            yield num, {'params': test_params, 'rows': len(candles), 'pid': os.getpid()}, 0.02
+
+    def load_candles(**_):
+        loads.append(1)
+        return pandas.DataFrame({'close': [1.0, 2.0, 3.0]})
+
+    address = f"127.0.0.1:{free_port()}"
+    monkeypatch.setattr(settings, "SIMUL_AUTHKEY", "test", raising=False)
+    monkeypatch.setattr(settings, "SIMUL_WORKER_DIR", str(tmp_path), raising=False)
+    monkeypatch.setattr(FullonSimulator, "run_batch", staticmethod(run_batch))
+    monkeypatch.setattr(fullonsimfeed, "load_candles", load_candles)
+    monkeypatch.setattr(fullonsimfeed, "_CANDLES", fullonsimfeed.OrderedDict())
+    simulator = FullonSimulator()
+    simulator.request_queue = Manager().Queue()
+    simulator.coordinator = SimulCoordinator.listen(request_queue=simulator.request_queue, address=address)
+    workers = [Process(target=work, args=(address,)) for _ in range(3)]
+    try:
+        for process in workers:
+            process.start()
+        while simulator.workers < 3:
+            time.sleep(0.05)
+        stats = SimulStats(workers=simulator.workers)
+        jobs = [[{'take_profit': num}] for num in range(24)]
+        results = dict(simulator.run(bot_id=1, jobs=jobs, fee=0.001, sweep="s1", stats=stats))
+    finally:
+        for process in workers:
+            process.terminate()
+        simulator.coordinator.close()
+    assert sorted(results) == list(range(24))
+    assert all(results[num]['params'] == jobs[num] and results[num]['rows'] == 3 for num in results)
+    assert died.is_set()
+    assert len({result['pid'] for result in results.values()}) >= 2
+    assert loads == [1]
+    assert sum(stats.jobs.values()) == 24
+    assert all(":" in name for name in stats.throughput())
+    assert "Jobs per worker" in stats.report()
+
+
+@pytest.mark.order(3)
+def test_remote_job_failures(monkeypatch, tmp_path):
+    """
+    A job that kills every worker it runs on is sent again once and then
+    reported as an ERROR, candles the coordinator can't load fail the job.
+    """
+    def run_batch(bots, request):
+        for num, test_params, _ in request[-2]:
+            if test_params == "exit":
+                os._exit(1)
+            args = dict(CANDLE_ARGS, table="missing" if test_params == "missing" else CANDLE_ARGS['table'])
+            yield num, {'rows': len(fullonsimfeed.candles(**args))}, 0.01
+
+    def load_candles(table, **_):
+        if table == "missing":
+            raise ValueError("no table")
+        return pandas.DataFrame({'close': [1.0, 2.0, 3.0]})
+
+    address = f"127.0.0.1:{free_port()}"
+    monkeypatch.setattr(settings, "SIMUL_AUTHKEY", "test", raising=False)
+    monkeypatch.setattr(settings, "SIMUL_WORKER_DIR", str(tmp_path), raising=False)
+    monkeypatch.setattr(FullonSimulator, "run_batch", staticmethod(run_batch))
+    monkeypatch.setattr(fullonsimfeed, "load_candles", load_candles)
+    monkeypatch.setattr(fullonsimfeed, "_CANDLES", fullonsimfeed.OrderedDict())
+    simulator = FullonSimulator()
+    simulator.request_queue = Manager().Queue()
+    simulator.coordinator = SimulCoordinator.listen(request_queue=simulator.request_queue, address=address)
+    workers = [Process(target=work, args=(address,)) for _ in range(3)]
+    try:
+        for process in workers:
+            process.start()
+        while simulator.workers < 3:
+            time.sleep(0.05)
+        results = dict(simulator.run(bot_id=1, jobs=["a", "exit", "missing", "b"], fee=0.001, sweep="s3"))
+    finally:
+        for process in workers:
+            process.terminate()
+        simulator.coordinator.close()
+    assert results[0] == results[3] == {'rows': 3}
+    assert "twice" in results[1]['ERROR']
+    assert "no table" in results[2]['ERROR']
+
+
+class SimBot():
+    """ Bot whose simulation only does the OHLCV lookups of a real one """
+
+    def __init__(self, bot_id, bars):
+        self.id = bot_id
+        self.bars = bars
+
+    def reset_simul(self):
+        pass
+
+    def run_simul_loop(self, test_params, **_):
+        feed = SimpleNamespace(exchange_name='kraken', symbol='BTC/USD')
+        data = SimpleNamespace(feed=feed, symbol='BTC/USD', _table='kraken_btc_usd.trades')
+        return {'params': test_params,
+                'can_start': Bot._sim_feeds_can_start(self, feed=feed, fromdate=arrow.get('2024-06-01')),
+                'last': FullonFeed.get_last_date(data).isoformat(),
+                'rows': len(fullonsimfeed.candles(**CANDLE_ARGS))}
+
+
+class OHLCVWorkers():
+    """ The OHLCV database workers of the coordinator """
+
+    def __init__(self):
+        self.calls = []
+
+    def call(self, request):
+        self.calls.append(request[2:])
+        return {'get_oldest_timestamp': '2024-01-01 00:00:00',
+                'get_latest_timestamp': '2024-07-01 00:00:00'}[request[2]]
+
+
+@pytest.mark.order(4)
+def test_remote_workers_run_batch(monkeypatch, tmp_path):
+    """
+    The jobs of remote workers go through FullonSimulator.run_batch and
+    get their OHLCV timestamps from the coordinator.
+    """
+    address = f"127.0.0.1:{free_port()}"
+    ohlcv = OHLCVWorkers()
+    monkeypatch.setattr(settings, "SIMUL_AUTHKEY", "test", raising=False)
+    monkeypatch.setattr(settings, "SIMUL_WORKER_DIR", str(tmp_path), raising=False)
+    monkeypatch.setattr(simul_launcher, "Bot", SimBot)
+    monkeypatch.setattr(database_ohlcv, "pipe_client", ohlcv)
+    monkeypatch.setattr(fullonsimfeed, "load_candles", lambda **_: pandas.DataFrame({'close': [1.0, 2.0]}))
+    monkeypatch.setattr(fullonsimfeed, "_CANDLES", fullonsimfeed.OrderedDict())
+    simulator = FullonSimulator()
+    simulator.request_queue = Manager().Queue()
+    simulator.coordinator = SimulCoordinator.listen(request_queue=simulator.request_queue, address=address)
+    worker = Process(target=work, args=(address,))
+    try:
+        worker.start()
+        while simulator.workers < 1:
+            time.sleep(0.05)
+        results = dict(simulator.run(bot_id=1, jobs=[[{'take_profit': 1}], [{'take_profit': 2}]],
+                                     fee=0.001, sweep="s2"))
+    finally:
+        worker.terminate()
+        simulator.coordinator.close()
+    assert sorted(results) == [0, 1]
+    assert all(result['can_start'] and result['rows'] == 2 for result in results.values())
+    assert results[0]['last'] == '2024-07-01T00:00:00+00:00'
+    assert ohlcv.calls.count(('get_oldest_timestamp', {})) == 2
+    assert ohlcv.calls.count(('get_latest_timestamp', {'table2': 'kraken_btc_usd.trades'})) == 2
+
+
+@pytest.mark.order(5)
+def test_cache_dirs(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "SIMUL_WORKER_DIR", str(tmp_path), raising=False)
+    monkeypatch.setattr(settings, "INDICATOR_CACHE_DIR", "indicators/", raising=False)
+    monkeypatch.setattr(settings, "MONTECARLO_DIR", None, raising=False)
+    (tmp_path / "s1" / "indicators").mkdir(parents=True)
+    _cache_dirs(sweep="s1")
+    assert os.listdir(tmp_path) == ["s1"]
+    _cache_dirs(sweep="s2")
+    assert os.listdir(tmp_path) == []
+    assert settings.INDICATOR_CACHE_DIR == os.path.join(str(tmp_path), "s2", "indicators/")
+    assert settings.MONTECARLO_DIR == os.path.join(str(tmp_path), "s2", "montecarlo/")
@@ -0,0 +1,128 @@
+import threading
+import pytest
+from libs import settings
+
+psutil = pytest.importorskip("psutil")
+from libs import simul_launcher
+from libs.simul_launcher import SimulStats, batch_size, worker_count
+
+
+@pytest.mark.order(1)
+def test_worker_count(monkeypatch):
+    monkeypatch.setattr(settings, "SIMUL_WORKERS", 3, raising=False)
+    assert worker_count() == 3
+    monkeypatch.setattr(settings, "SIMUL_WORKERS", 0, raising=False)
+    monkeypatch.setattr(settings, "SIMUL_WORKER_MEMORY", 1, raising=False)
+    assert 1 <= worker_count() <= (psutil.cpu_count() or 1)
+    monkeypatch.setattr(settings, "SIMUL_WORKER_MEMORY", 10 ** 9, raising=False)
+    assert worker_count() == 1
+
+
+@pytest.mark.order(2)
+def test_batch_size():
+    assert batch_size(jobs=1, workers=8) == 1
+    assert batch_size(jobs=64, workers=4) == 4
+    assert batch_size(jobs=100000, workers=4) == simul_launcher.MAX_BATCH
+
+
+@pytest.mark.order(3)
+def test_simul_stats():
+    stats = SimulStats(workers=2)
+    assert stats.report() == "No simulation jobs ran"
+    stats.add(wall=0.5, pid=10)
+    stats.add(wall=1.5, pid=11)
+    assert stats.busy == {10: 0.5, 11: 1.5}
+    assert 0 < stats.utilization
+    assert "Jobs: 2" in stats.report()
+    assert "workers: 2/2" in stats.report()
+
+
+class Requests():
+    """ Request queue that stops the worker once it is empty. """
+
+    def __init__(self, *requests):
+        self.requests = list(requests)
+
+    def get(self):
+        if not self.requests:
+            raise KeyboardInterrupt
+        return self.requests.pop(0)
+
+
+@pytest.mark.order(4)
+def test_failed_job_reports_error(monkeypatch):
+    def run_batch(bots, request):
+        for num, test_params, _ in request[-2]:
+            if test_params == "bad":
+                raise ValueError("bad params")
+            yield num, {"1": test_params}, 0.1
+    monkeypatch.setattr(simul_launcher.FullonSimulator, "run_batch", staticmethod(run_batch))
+    monkeypatch.setattr(simul_launcher, "setproctitle", lambda title: None)
+    responses = simul_launcher.queue.Queue()
+    jobs = [(0, "a", None), (1, "bad", None), (2, "c", None)]
+    simul_launcher.FullonSimulator.process_requests(Requests((*[None] * 9, jobs, "s", responses)))
+    got = [responses.get_nowait() for _ in range(responses.qsize())]
+    assert got[0][:2] == (simul_launcher.TAKEN, [0, 1, 2])
+    assert [item[:2] for item in got[1:]] == [(0, {"1": "a"}), (1, {"ERROR": "bad params"}), (2, {"1": "c"})]
+
+
+class Process():
+    pid = 7
+    exitcode = -9
+
+    def __init__(self, alive=False):
+        self.alive = alive
+
+    def is_alive(self):
+        return self.alive
+
+
+@pytest.mark.order(5)
+def test_dead_worker_jobs_requeued(monkeypatch):
+    simulator = simul_launcher.FullonSimulator()
+    simulator.request_queue = simul_launcher.queue.Queue()
+    simulator.local_workers = 1
+    simulator.processes = {0: Process()}
+    spawned = []
+
+    def spawn(num):
+        spawned.append(num)
+        simulator.processes[num] = Process(alive=True)
+    monkeypatch.setattr(simulator, "_spawn", spawn)
+    responses = simul_launcher.queue.Queue()
+    monkeypatch.setattr(simulator, "new_queue", lambda: responses)
+    responses.put((simul_launcher.TAKEN, [0, 1], 0.0, 7))
+    responses.put((0, {"1": "a"}, 0.1, 7))
+    results = simulator.run(bot_id=1, jobs=["a", "b"], fee=0.1)
+    assert next(results) == (0, {"1": "a"})
+    monkeypatch.setattr(simul_launcher, "RESPONSE_WAIT", 0)
+    responses.put((1, {"1": "b"}, 0.1, 8))
+    responses.put((1, {"1": "b"}, 0.1, 9))
+    assert list(results) == [(1, {"1": "b"})]
+    assert spawned == [0]
+    batches = [simulator.request_queue.get_nowait()[-3] for _ in range(simulator.request_queue.qsize())]
+    assert batches == [[(0, "a", None)], [(1, "b", None)], [(1, "b", None)]]
+
+
+@pytest.mark.order(6)
+def test_unclaimed_jobs_requeued(monkeypatch):
+    """ A batch taken by a worker that died before saying so is sent again """
+    simulator = simul_launcher.FullonSimulator()
+    simulator.request_queue = simul_launcher.queue.Queue()
+    responses = simul_launcher.queue.Queue()
+    monkeypatch.setattr(simulator, "new_queue", lambda: responses)
+    monkeypatch.setattr(simul_launcher, "RESPONSE_WAIT", 0)
+    results = simulator.run(bot_id=1, jobs=["a", "b"], fee=0.1)
+    responses.put((simul_launcher.TAKEN, [0], 0.0, 7))
+    responses.put((0, {"1": "a"}, 0.1, 7))
+    assert next(results) == (0, {"1": "a"})
+    batches = [simulator.request_queue.get_nowait()[-3] for _ in range(simulator.request_queue.qsize())]
+    assert batches == [[(0, "a", None)], [(1, "b", None)]]
+    # Nothing claims job 1, after two checks with an empty queue it goes out again
+    rest = []
+    thread = threading.Thread(target=lambda: rest.extend(results))
+    thread.start()
+    assert simulator.request_queue.get(timeout=5)[-3] == [(1, "b", None)]
+    responses.put((1, {"1": "b"}, 0.1, 8))
+    thread.join(timeout=5)
+    assert rest == [(1, {"1": "b"})]
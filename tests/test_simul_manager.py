@@ -81,3 +81,113 @@ def test_get_simul_bot_list6(simul):
     response = simul.get_simul_list(params)
     # print("6",response)
     assert (isinstance(response, list) and 'ERROR' in response[0])
+
+
+@pytest.mark.order(8)
+def test_search_rungs():
+    assert SimulManager.search_rungs(candidates=81, periods=10000) == [123, 370, 1111, 3333, 10000]
+    assert SimulManager.search_rungs(candidates=100, periods=200) == [66, 200]
+    assert SimulManager.search_rungs(candidates=1, periods=500) == [500]
+
+
+def fake_search(simul, monkeypatch, **kwargs) -> tuple:
+    runs = []
+    shown = []
+
+    def run_jobs(self, bot, jobs, periods, **_):
+        runs.append((periods, [job[0] for job in jobs]))
+        return {num: {1: job[0]} for num, job in enumerate(jobs)}
+
+    def score(result, objective):
+        params = result[1]
+        return -abs(params['take_profit'] - 7) - abs(params['stop_loss'] - 3)
+
+    monkeypatch.setattr(SimulManager, "_run_jobs", run_jobs)
+    monkeypatch.setattr(SimulManager, "search_score", staticmethod(score))
+    monkeypatch.setattr("libs.simul.simul.echo_results", lambda self, results, **_: shown.append(results))
+    simul.bot_search(bot={'bot_id': 1, 'periods': 1000},
+                     params={'take_profit': '1:10', 'stop_loss': '1:5'}, min_bars=10, **kwargs)
+    return runs, shown
+
+
+@pytest.mark.order(9)
+def test_bot_search(simul, monkeypatch):
+    runs, shown = fake_search(simul, monkeypatch)
+    assert [(periods, len(jobs)) for periods, jobs in runs] == [(37, 50), (111, 16), (333, 5), (1000, 1)]
+    assert runs[-1][1] == [{'take_profit': 7.0, 'stop_loss': 3.0}]
+    assert [res for _, res in shown[0][1]] == runs[-1][1]
+    again, _ = fake_search(simul, monkeypatch)
+    assert again == runs
+
+
+@pytest.mark.order(10)
+def test_bot_search_seed(simul, monkeypatch):
+    runs, _ = fake_search(simul, monkeypatch, seed=5, max_candidates=20)
+    assert len(runs[0][1]) == 20
+    assert runs == fake_search(simul, monkeypatch, seed=5, max_candidates=20)[0]
+    assert runs != fake_search(simul, monkeypatch, seed=6, max_candidates=20)[0]
+
+
+@pytest.mark.order(11)
+def test_search_score():
+    from types import SimpleNamespace
+    import numpy
+    import pandas
+    from libs.vector_backtest import FAMILIES, VectorBacktest
+    rng = numpy.random.default_rng(3)
+    index = pandas.date_range("2024-03-01", periods=3 * 1440, freq="1min", name="date")
+    close = 30000 * numpy.exp(numpy.cumsum(rng.normal(0, 0.001, len(index))))
+    ticks = pandas.DataFrame({'open': close, 'high': close, 'low': close, 'close': close, 'volume': 1.0},
+                             index=index)
+    bars = ticks.resample("60min").last()
+    signals = pandas.DataFrame({'close': bars['close'], 'entry': rng.random(len(bars)) > 0.6,
+                                'exit': rng.random(len(bars)) > 0.7}, index=bars.index + pandas.Timedelta(minutes=60))
+    engine = VectorBacktest(ticks=ticks, bars=bars, signals=signals.iloc[5:], bar_size_minutes=60,
+                            **FAMILIES['rsimom_short'])
+    params = {'take_profit': 1, 'stop_loss': 1, 'trailing_stop': None, 'timeout': None, 'size_pct': 20}
+    detail = {'strategy': 'rsimom_short', 'imgtitle': '', 'interest_earned': 0.0,
+              'feed': SimpleNamespace(compression=1, period='Minutes', symbol='BTC/USD'),
+              'params': {'pairs': False, 'bot_id': 1, 'uid': 1, 'feeds': 2, 'str_id': 1,
+                         'leverage': 1, **params}}
+    result = {1: engine.simulresults(engine.run(**params), detail=detail)}
+    sharpe = SimulManager.search_score(result)
+    assert numpy.isfinite(sharpe)
+    assert SimulManager.search_score(result, objective='Total ROI %') != sharpe
+    assert result[1][0][-1]['params']['bot_id'] == 1
+    assert SimulManager.search_score({}) == float('-inf')
+    assert SimulManager.search_score({1: {0: []}}) == float('-inf')
+
+
+@pytest.mark.order(12)
+def test_bot_simul_resumes(simul, monkeypatch, tmp_path):
+    pytest.importorskip("pyarrow")
+    from test_simul_store import result
+    import numpy
+    rng = numpy.random.default_rng(1)
+    runs = []
+    shown = []
+
+    def run_jobs(self, bot, jobs, sink, **_):
+        runs.append([job[0]['take_profit'] for job in jobs])
+        for num, job in enumerate(jobs):
+            if job[0]['take_profit'] == 3 and len(runs) == 1:
+                raise KeyboardInterrupt
+            sink(num, result(rng, job[0]['take_profit']))
+        return {}
+
+    monkeypatch.setattr(settings, "SIMUL_STORE_DIR", str(tmp_path), raising=False)
+    monkeypatch.setattr(SimulManager, "_run_jobs", run_jobs)
+    monkeypatch.setattr("libs.simul.simul.echo_results", lambda self, store, **_: shown.append(store))
+    inputs = {'sources': ['abc'], 'feed_data': [(1, 'kraken', 'BTC/USD', 'minutes', 1, '2024-01-01 00:00:00')]}
+    monkeypatch.setattr(SimulManager, "_sweep_inputs", staticmethod(lambda **_: inputs))
+    sweep = {'bot': {'bot_id': 1, 'periods': 100}, 'params': [{'take_profit': '1:5'}]}
+    with pytest.raises(KeyboardInterrupt):
+        simul.bot_simul(**sweep)
+    simul.bot_simul(**sweep)
+    assert runs == [[1.0, 2.0, 3.0, 4.0, 5.0], [3.0, 4.0, 5.0]]
+    assert len(shown[0].summaries(str_id=1, sharpe_filter=float('-inf'))) == 5
+    simul.bot_simul(**sweep)
+    assert len(runs) == 2
+    inputs['sources'] = ['abd']
+    simul.bot_simul(**sweep)
+    assert runs[-1] == [1.0, 2.0, 3.0, 4.0, 5.0]
@@ -0,0 +1,85 @@
+import copy
+import json
+import os
+import shutil
+from types import SimpleNamespace
+import numpy
+import pytest
+from pandas import Timedelta, Timestamp, read_parquet
+from pandas.testing import assert_frame_equal
+pytest.importorskip("pyarrow")
+from libs.simul import simul
+from libs.simul_store import SimulStore
+
+
+def trades(rng: numpy.random.Generator, count: int) -> list:
+    records = []
+    stamp = Timestamp('2024-01-01')
+    assets = 10000.0
+    for num in range(count):
+        pnlfee = float(rng.normal(5, 40))
+        assets += pnlfee
+        for seq in range(2):
+            stamp += Timedelta(minutes=int(rng.integers(1, 600)))
+            records.append({'num': num, 'seq': seq, 'timestamp': stamp.to_pydatetime(), 'side': 'Buy',
+                            'pnlfee': pnlfee if seq else -0.5, 'fee': 0.5,
+                            'roi': float(rng.normal(0.2, 2)) if seq else 0,
+                            'assets': assets if seq else None, 'reason': 'tp' if seq else None})
+    return records
+
+
+def result(rng: numpy.random.Generator, take_profit: float) -> dict:
+    detail = {'strategy': 'test', 'feed': SimpleNamespace(compression=1, period='Minutes', symbol='BTC/USD'),
+              'starting_cash': 10000, 'ending_assets': 10100, 'interest_earned': 0.0,
+              'params': {'pairs': False, 'bot_id': 1, 'uid': 1, 'feeds': 2, 'str_id': 1,
+                         'take_profit': take_profit}}
+    return {1: [trades(rng, 5) + [detail], trades(rng, 3) + [copy.deepcopy(detail)]]}
+
+
+@pytest.fixture
+def results() -> list:
+    rng = numpy.random.default_rng(2)
+    return [result(rng, take_profit) for take_profit in range(5)]
+
+
+@pytest.mark.order(1)
+def test_summaries_match_parse(tmp_path, results):
+    store = SimulStore(sweep="a", root=str(tmp_path), flush_jobs=2)
+    for num in (3, 0, 4, 1, 2):
+        store.add(num=num, result=copy.deepcopy(results[num]))
+    store.flush()
+    assert len(os.listdir(tmp_path / "a" / "jobs")) == 3
+    rows = read_parquet(tmp_path / "a" / "str_id=1" / "summaries" / "part-00000.parquet")
+    assert json.loads(rows['params'][0])['take_profit'] == 3
+    assert store.strategies() == [1]
+    expected = [simul().parse(results=copy.deepcopy(res[1]), sharpe_filter=float('-inf')) for res in results]
+    stored = store.summaries(str_id=1, sharpe_filter=float('-inf'), frames=True)
+    for feeds, stored_feeds in zip(expected, stored):
+        assert list(stored_feeds) == [0, 1]
+        for feed, summary in feeds.items():
+            assert_frame_equal(stored_feeds[feed].pop('df'), summary.pop('df'), check_dtype=False)
+            assert stored_feeds[feed] == summary
+    assert all(feeds['df'] is None for job in store.summaries(str_id=1) for feeds in job.values())
+    assert store.summaries(str_id=1, sharpe_filter=float('inf')) == [{}] * 5
+
+
+@pytest.mark.order(2)
+def test_resume(tmp_path, results):
+    store = SimulStore(sweep="b", root=str(tmp_path), flush_jobs=10)
+    store.add(num=0, result=copy.deepcopy(results[0]))
+    store.add(num=1, result={})
+    store.add(num=3, result={'ERROR': 'worker died'})
+    store.flush()
+    # A part whose jobs never got written is left out
+    summaries = tmp_path / "b" / "str_id=1" / "summaries"
+    shutil.copy(summaries / "part-00000.parquet", summaries / "part-00007.parquet")
+    again = SimulStore(sweep="b", root=str(tmp_path))
+    assert again.written() == {0}
+    assert len(again.summaries(str_id=1, sharpe_filter=float('-inf'))) == 1
+    again.add(num=2, result=copy.deepcopy(results[2]))
+    again.flush()
+    assert (tmp_path / "b" / "jobs" / "part-00008.parquet").exists()
+    assert SimulStore(sweep="b", root=str(tmp_path)).written() == {0, 2}
+    assert SimulStore.key(jobs=[1], fee=0.1) == SimulStore.key(fee=0.1, jobs=[1]) != SimulStore.key(jobs=[2], fee=0.1)
+    assert SimulStore.clear_all(root=str(tmp_path)) == 1
+    assert SimulStore(sweep="b", root=str(tmp_path)).written() == set()
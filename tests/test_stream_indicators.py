@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+import numpy
+import pandas
+import pandas_ta as ta
+import pytest
+from libs.strategy.strategy import Strategy
+from libs.strategy.stream_indicators import ATR, BBands, EMA, Indicator, IndicatorEngine, RSI, SMA, Vortex
+
+MINUTE = 60_000_000
+
+
+def frame(rows: int, seed: int = 1) -> pandas.DataFrame:
+    index = pandas.date_range("2024-01-01", periods=rows, freq="1min", name="date")
+    close = 30000 + numpy.cumsum(numpy.random.default_rng(seed).normal(0, 20, rows))
+    spread = numpy.abs(numpy.random.default_rng(seed + 1).normal(0, 10, rows))
+    return pandas.DataFrame({'open': close, 'high': close + spread, 'low': close - spread,
+                             'close': close, 'volume': 1.0}, index=index)
+
+
+def indicators() -> dict:
+    return {'sma': SMA(20), 'ema': EMA(12), 'rsi': RSI(14), 'atr': ATR(14),
+            'bb': BBands(20, 2), 'vtx': Vortex(14)}
+
+
+@pytest.mark.order(1)
+def test_matches_pandas_ta():
+    bars = frame(3000)
+    result = IndicatorEngine(indicators=indicators()).update(bars)
+    bbands = ta.bbands(bars['close'], length=20, std=2)
+    vortex = ta.vortex(bars['high'], bars['low'], bars['close'], length=14)
+    expected = {'sma': ta.sma(bars['close'], length=20),
+                'ema': ta.ema(bars['close'], length=12),
+                'rsi': ta.rsi(bars['close'], length=14),
+                'atr': ta.atr(bars['high'], bars['low'], bars['close'], length=14),
+                'bb_lower': bbands.iloc[:, 0], 'bb_mid': bbands.iloc[:, 1],
+                'bb_upper': bbands.iloc[:, 2], 'vtx_pos': vortex.iloc[:, 0],
+                'vtx_neg': vortex.iloc[:, 1]}
+    tail = result.index[100:]
+    for column, series in expected.items():
+        numpy.testing.assert_allclose(result.loc[tail, column].to_numpy(),
+                                      series.loc[tail].to_numpy(), rtol=1e-9, err_msg=column)
+
+
+@pytest.mark.order(2)
+def test_incremental_update():
+    bars = frame(2000, seed=3)
+    whole = IndicatorEngine(indicators=indicators(), shift=MINUTE).update(bars)
+    engine = IndicatorEngine(indicators=indicators(), shift=MINUTE)
+    for end in range(500, 2001, 37):
+        result = engine.update(bars.iloc[:end])
+    result = engine.update(bars)
+    assert not result.isna().any().any()
+    assert whole.index[0] == bars.index[19] + pandas.Timedelta(minutes=1)
+    assert len(result) <= len(whole)
+    pandas.testing.assert_frame_equal(result, whole.iloc[-len(result):])
+    assert engine.update(bars) is not result
+    assert len(engine.update(bars)) == len(result)
+
+
+@pytest.mark.order(3)
+def test_stream_indicators_df_signals():
+    bars = frame(1500, seed=5)
+    sizes = []
+
+    def signals(rows):
+        sizes.append(len(rows))
+        return {'entry': (rows['rsi'].shift(1) < 45) & (rows['rsi'] >= 48), 'exit': rows['rsi'] > 60}
+
+    strategy = SimpleNamespace(indicator_engines={}, str_feed=[None, SimpleNamespace(bar_size_minutes=1)])
+    for end in (1000, 1001, 1040, 1500):
+        strategy.str_feed[1].dataframe = bars.iloc[:end]
+        indicators_df = Strategy.stream_indicators_df(strategy, feed=1, indicators={'rsi': RSI(14)},
+                                                      signals=signals)
+        # Without new bars nothing is computed
+        assert Strategy.stream_indicators_df(strategy, feed=1, indicators={}, signals=signals) is None
+    assert sizes == [1000, 2, 40, 461]
+    expected = bars[['close']].copy()
+    expected['rsi'] = ta.rsi(expected['close'], length=14)
+    expected = expected.assign(**signals(expected)).dropna()
+    expected.index = expected.index + pandas.Timedelta(minutes=1)
+    assert (indicators_df['entry'].to_numpy() == expected['entry'].to_numpy()).all()
+    assert (indicators_df['exit'].to_numpy() == expected['exit'].to_numpy()).all()
+    assert indicators_df['entry'].any()
+    assert list(indicators_df.index) == list(expected.index.tz_localize(None))
+
+
+@pytest.mark.order(4)
+def test_indicator_is_abstract():
+    with pytest.raises(TypeError):
+        Indicator()
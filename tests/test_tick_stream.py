@@ -0,0 +1,66 @@
+import json
+import threading
+import time
+import pytest
+from libs.btrader.tick_stream import TickStream, LatencyHistogram
+
+
+def ticker(price, stamp="2024-01-01 00:00:00.000"):
+    return json.dumps({'price': price, 'volume': 1, 'time': stamp})
+
+
+@pytest.mark.order(1)
+def test_latency_histogram():
+    hist = LatencyHistogram()
+    assert hist.percentile(50) == 0
+    assert hist.summary() == "no samples"
+    for millis in [0.5, 3, 3, 40, 7000, -2]:
+        hist.add(millis)
+    assert hist.count == 6
+    assert hist.counts[0] == 2
+    assert hist.percentile(50) == 5
+    assert hist.percentile(100) == 7000
+    assert "n=6" in hist.summary()
+
+
+@pytest.mark.order(2)
+def test_next_tick_timeout():
+    stream = TickStream(exchange="kraken", symbol="BTC/USD", throttle=0)
+    start = time.monotonic()
+    assert stream.next_tick(timeout=0.05) is None
+    assert time.monotonic() - start >= 0.05
+
+
+@pytest.mark.order(3)
+def test_next_tick_coalesces():
+    stream = TickStream(exchange="kraken", symbol="BTC/USD", throttle=0)
+    assert stream.channel == "next_ticker:kraken:BTC/USD"
+    stream.push(ticker(1))
+    stream.push(ticker(2))
+    stream.push("not json")
+    price, stamp = stream.next_tick(timeout=0.01)
+    assert price == 2
+    assert stamp == 1704067200
+    assert stream.coalesced == 1
+    assert stream.next_tick(timeout=0.01) is None
+
+
+@pytest.mark.order(4)
+def test_next_tick_wakes_on_push():
+    stream = TickStream(exchange="kraken", symbol="BTC/USD", throttle=0)
+    timer = threading.Timer(0.05, stream.push, args=(ticker(3, stamp="bad"),))
+    timer.start()
+    start = time.monotonic()
+    assert stream.next_tick(timeout=5) == (3, None)
+    assert time.monotonic() - start < 1
+
+
+@pytest.mark.order(5)
+def test_next_tick_throttle():
+    stream = TickStream(exchange="kraken", symbol="BTC/USD", throttle=100)
+    stream.push(ticker(1))
+    assert stream.next_tick(timeout=0.01)[0] == 1
+    stream.push(ticker(2))
+    start = time.monotonic()
+    assert stream.next_tick(timeout=0.01)[0] == 2
+    assert time.monotonic() - start >= 0.09
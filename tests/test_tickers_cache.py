@@ -1,7 +1,12 @@
 from __future__ import unicode_literals, print_function
 import pytest
 import arrow
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
 from libs import cache
+from libs.caches import tick_cache
+from libs.caches.tick_cache import TickerHub
 
 exchange_list = ['kraken']
 
@@ -99,3 +104,107 @@ def test_get_ticker_2(store, exchange_name):
     stamp = arrow.get(stamp)
     assert isinstance(ticker, float) is True
     assert isinstance(stamp, arrow.Arrow) is True
+
+
+def publish_until(done, publish, timeout: float = 5) -> None:
+    """ Publishes until done(), waiters may still be registering """
+    for _ in range(int(timeout / 0.02)):
+        publish()
+        if done():
+            return
+        threading.Event().wait(0.02)
+
+
+@pytest.mark.order(8)
+@pytest.mark.parametrize("exchange_name", exchange_list)
+def test_get_next_ticker(store, exchange_name):
+    symbols = {'BTC/USD': "28600.0", 'ETH/USD': "3100.0"}
+    hub = TickerHub.get()
+    stamp = arrow.utcnow().format('YYYY-MM-DD HH:mm:ss.SSS')
+
+    def publish():
+        for symbol, price in symbols.items():
+            store.update_ticker(symbol=symbol, exchange=exchange_name,
+                                data={"price": price, "volume": "1.0", "time": stamp})
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        waits = {symbol: [pool.submit(store.get_next_ticker, symbol=symbol, exchange=exchange_name)
+                          for _ in range(2)] for symbol in symbols}
+        futures = [future for futures in waits.values() for future in futures]
+        publish_until(lambda: all(future.done() for future in futures), publish)
+        for symbol, futures in waits.items():
+            for future in futures:
+                assert future.result(timeout=5) == (float(symbols[symbol]), stamp)
+    assert TickerHub.get() is hub
+
+
+@pytest.mark.order(9)
+@pytest.mark.parametrize("exchange_name", exchange_list)
+def test_remove_callback(store, exchange_name):
+    hub = TickerHub.get()
+    channel = f"next_ticker:{exchange_name}:BTC/USD"
+    calls = []
+
+    def removed(data):
+        calls.append("removed")
+
+    def added(data):
+        calls.append("added")
+
+    def publish():
+        store.update_ticker(symbol="BTC/USD", exchange=exchange_name,
+                            data={"price": "28600.0", "volume": "1.0", "time": "2024-01-01 00:00:00.000"})
+
+    hub.add_callback(channel, removed)
+    publish_until(lambda: "removed" in calls, publish)
+    hub.remove_callback(channel, removed)
+    hub.add_callback(channel, added)
+    try:
+        publish_until(lambda: calls.count("added") > 2, publish)
+    finally:
+        hub.remove_callback(channel, added)
+    assert "removed" not in calls[calls.index("added"):]
+    assert hub.wait(channel, timeout=0.1) is None
+
+
+@pytest.mark.order(10)
+def test_hub_subscribes_trades_per_channel(monkeypatch):
+    class PubSub():
+        def __init__(self, **_):
+            self.commands = []
+            self.threads = set()
+
+        def psubscribe(self, pattern):
+            self.commands.append(("psubscribe", pattern))
+
+        def subscribe(self, channel):
+            self.threads.add(threading.current_thread().name)
+            self.commands.append(("subscribe", channel))
+
+        def unsubscribe(self, channel):
+            self.threads.add(threading.current_thread().name)
+            self.commands.append(("unsubscribe", channel))
+
+        def get_message(self, timeout):
+            threading.Event().wait(0.01)
+
+    pubsub = PubSub()
+    shared = SimpleNamespace(conn=SimpleNamespace(pubsub=lambda **_: pubsub))
+    monkeypatch.setattr(tick_cache.Cache, "shared", classmethod(lambda cls: shared))
+    hub = TickerHub()
+    received = []
+    channel = "next_trades:kraken:BTC/USD"
+    hub.add_callback(channel, received.append)
+    assert pubsub.commands[-1] == ("subscribe", channel)
+    hub.add_callback(channel, received.append)
+    hub.add_callback("next_ticker:kraken:BTC/USD", received.append)
+    hub.dispatch({'type': 'message', 'channel': channel.encode(), 'data': '[]'})
+    assert received == ['[]', '[]']
+    hub.remove_callback(channel, received.append)
+    hub.remove_callback(channel, received.append)
+    for _ in range(100):
+        if len(pubsub.commands) == 3:
+            break
+        threading.Event().wait(0.01)
+    assert pubsub.threads == {"ticker_hub"}
+    assert pubsub.commands == [("psubscribe", "next_ticker:*"), ("subscribe", channel), ("unsubscribe", channel)]
@@ -1,5 +1,7 @@
 from __future__ import unicode_literals, print_function
 import pytest
+from libs import trade_batcher
+from libs.trade_batcher import TradeBatcher
 
 
 @pytest.mark.order(1)
@@ -24,3 +26,63 @@ def test_get_trade_status_keys(store):
 def test_get_all_trade_statuses(store):
     res = store.get_all_trade_statuses()
     assert len(res) > 1
+
+
+@pytest.mark.order(5)
+def test_push_trades_list(store):
+    trades = [{'price': 100 + num, 'volume': 1, 'time': '2024-01-01 00:00:00.000',
+               'side': 'buy', 'order_type': 'l'} for num in range(5)]
+    res = store.push_trades_list(symbol="TEST/USD", exchange="test", trades=trades)
+    assert res == 5
+    res = store.get_trades_list(symbol="TEST/USD", exchange="test")
+    assert [trade.price for trade in res] == [100, 101, 102, 103, 104]
+
+
+@pytest.mark.order(6)
+def test_trade_batcher(store):
+    trade = {'price': 100, 'volume': 1, 'time': '2024-01-01 00:00:00.000',
+             'side': 'buy', 'order_type': 'l'}
+    batcher = TradeBatcher(exchange="test", flush_ms=60000, flush_size=3)
+    assert batcher.add(symbol="TEST/USD", trades=[trade, trade]) == 0
+    assert batcher.add(symbol="TEST/USD", trades=[trade]) == 3
+    assert batcher.add(symbol="TEST/USD", trades=[trade]) == 0
+    batcher.stop()
+    assert batcher.stats()['flushes'] == 2
+    res = store.get_trades_list(symbol="TEST/USD", exchange="test")
+    assert len(res) == 4
+
+
+@pytest.mark.order(6)
+def test_trade_batcher_keeps_failed_pushes(monkeypatch):
+    pushed = []
+
+    class Store():
+        down = True
+
+        def push_trades_list(self, symbol, exchange, trades):
+            if self.down:
+                return 0
+            pushed.extend(trades)
+            return len(pushed)
+
+    store = Store()
+    monkeypatch.setattr(trade_batcher.Cache, "shared", classmethod(lambda cls: store))
+    batcher = TradeBatcher(exchange="test", flush_ms=0)
+    assert batcher.add(symbol="TEST/USD", trades=[{'price': 100}]) == 0
+    store.down = False
+    assert batcher.add(symbol="TEST/USD", trades=[{'price': 101}]) == 2
+    assert [trade['price'] for trade in pushed] == [100, 101]
+    batcher = TradeBatcher(exchange="test", flush_ms=60000, flush_size=10)
+    batcher.stop()
+    assert batcher.add(symbol="TEST/USD", trades=[{'price': 102}]) == 1
+
+
+@pytest.mark.order(7)
+def test_drain_trades_list(store):
+    trades = [{'price': 100 + num, 'volume': 1, 'time': '2024-01-01 00:00:00.000',
+               'side': 'buy', 'order_type': 'l'} for num in range(25)]
+    store.push_trades_list(symbol="TEST/USD", exchange="test", trades=trades)
+    chunks = list(store.drain_trades_list(symbol="TEST/USD", exchange="test", batch_size=10))
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    assert chunks[2][-1].price == 124
+    assert store.get_trades_list(symbol="TEST/USD", exchange="test") == []
@@ -0,0 +1,193 @@
+import copy
+import importlib
+from types import SimpleNamespace
+import arrow
+import backtrader as bt
+import numpy
+import pandas
+import pytest
+from libs import strategy
+from libs.btrader.basebroker import BaseBroker
+from libs.simul import simul
+from libs.vector_backtest import FAMILIES, VectorBacktest
+
+BAR = 60
+FEE = 0.0015
+PARAMS = [
+    {'take_profit': 1.2, 'stop_loss': 0.8, 'trailing_stop': None, 'timeout': 5, 'size_pct': 20},
+    {'take_profit': None, 'stop_loss': 1, 'trailing_stop': 0.5, 'timeout': None, 'size_pct': 50},
+    {'take_profit': 0.6, 'stop_loss': None, 'trailing_stop': None, 'timeout': 3, 'size': 2000},
+    {'take_profit': None, 'stop_loss': None, 'trailing_stop': None, 'timeout': None, 'size_pct': 100},
+]
+
+
+def market(minutes: int = 4 * 1440, seed: int = 7, exits: float = 0.7) -> tuple:
+    rng = numpy.random.default_rng(seed)
+    index = pandas.date_range("2024-03-01", periods=minutes, freq="1min", name="date")
+    close = 30000 * numpy.exp(numpy.cumsum(rng.normal(0, 0.0012, minutes)))
+    open_ = numpy.append(30000, close[:-1]) * (1 + rng.normal(0, 0.0002, minutes))
+    ticks = pandas.DataFrame({'open': open_, 'high': numpy.maximum(open_, close) * 1.0005,
+                              'low': numpy.minimum(open_, close) * 0.9995, 'close': close,
+                              'volume': rng.random(minutes)}, index=index)
+    bars = ticks.resample(f"{BAR}min").agg({'open': 'first', 'high': 'max', 'low': 'min',
+                                            'close': 'last', 'volume': 'sum'})
+    signals = pandas.DataFrame({'close': bars['close'], 'entry': rng.random(len(bars)) > 0.6,
+                                'exit': rng.random(len(bars)) > exits}, index=bars.index)
+    signals.index = signals.index + pandas.Timedelta(minutes=BAR)
+    return ticks, bars, signals.iloc[5:]
+
+
+def family_strategy(name: str, signals: pandas.DataFrame):
+    strategy.STRATEGY_TYPE = "backtest"
+    from libs.strategy import loader
+    importlib.reload(loader)
+    module = pytest.importorskip(f"strategies.{name}.strategy")
+    module = importlib.reload(module)
+
+    class Strategy(module.Strategy):
+        def set_predictor(self):
+            pass
+
+        def set_indicators_df(self):
+            self.indicators_df = signals.copy()
+
+    return Strategy
+
+
+def add_feed(cerebro: bt.Cerebro, dataframe: pandas.DataFrame, trading: bool, timeframe, compression: int):
+    data = bt.feeds.PandasData(dataname=dataframe, timeframe=timeframe, compression=compression)
+    data.timeframe, data.compression = timeframe, compression
+    data.feed = SimpleNamespace(trading=trading, futures=True, str_id=1, exchange_name='kraken',
+                                period='minutes', compression=compression)
+    data.dataframe = data.result = dataframe
+    data.symbol = "BTC/USD"
+    data.bar_size_minutes = compression
+    data.last_date = arrow.get(dataframe.index[-1])
+    data.last_moments = bt.date2num(dataframe.index[-1].to_pydatetime())
+    data.event_timeout = None
+    cerebro.adddata(data)
+
+
+def run_backtrader(name: str, params: dict, exits: float = 0.7) -> tuple:
+    ticks, bars, signals = market(exits=exits)
+    helper = SimpleNamespace(id=1, dry_run=True, noise=False, simulresults={1: {0: [], 1: []}})
+    cerebro = bt.Cerebro(tradehistory=True)
+    broker = BaseBroker()
+    broker.setcash(10000)
+    broker.setcommission(commission=FEE, margin=None, mult=1, interest=0.000)
+    cerebro.setbroker(broker)
+    cerebro.addstrategy(family_strategy(name, signals), helper=helper, str_id=1, **params)
+    add_feed(cerebro, ticks, True, bt.TimeFrame.Ticks, 1)
+    add_feed(cerebro, bars, False, bt.TimeFrame.Minutes, BAR)
+    cerebro.run(live=True)
+    detail = {"ending_assets": cerebro.broker.getvalue()}
+    return helper.simulresults[1], detail
+
+
+def run_vector(name: str, params: dict, exits: float = 0.7) -> tuple:
+    ticks, bars, signals = market(exits=exits)
+    engine = VectorBacktest(ticks=ticks, bars=bars, signals=signals, bar_size_minutes=BAR,
+                            fee=FEE, **FAMILIES[name])
+    return engine, engine.run(**params)
+
+
+def normalized(trades: list) -> list:
+    first = trades[0]['num'] if trades else 0
+    return [{**trade, 'num': trade['num'] - first} for trade in trades]
+
+
+def summary(trades: list, ending_assets: float, params: dict) -> dict:
+    detail = {'strategy': 'parity', 'feed': SimpleNamespace(compression=BAR, period='Minutes', symbol='BTC/USD'),
+              'params': {'pairs': False, 'bot_id': 1, 'uid': 1, 'feeds': 2, 'str_id': 1, **params},
+              'imgtitle': '', 'starting_cash': 10000, 'ending_assets': ending_assets,
+              'interest_earned': 0.0}
+    results = [copy.deepcopy(trades) + [detail], [copy.deepcopy(detail)]]
+    parsed = simul().parse(results)
+    for feed in parsed.values():
+        feed.pop('df')
+    return parsed
+
+
+@pytest.mark.order(1)
+@pytest.mark.parametrize("name", sorted(FAMILIES))
+@pytest.mark.parametrize("params", PARAMS)
+def test_parity(name, params):
+    results, detail = run_backtrader(name, params)
+    engine, trades = run_vector(name, params)
+    assert results[1] == []
+    assert len(trades) > 4
+    assert normalized(trades) == normalized(results[0])
+    assert engine.ending_assets == detail['ending_assets']
+    assert summary(trades, engine.ending_assets, params) == \
+        summary(results[0], detail['ending_assets'], params)
+
+
+@pytest.mark.order(2)
+@pytest.mark.parametrize("name", ['heuristic_shorts', 'rsimom_short'])
+def test_parity_loop_end(name):
+    params = {'take_profit': None, 'stop_loss': None, 'trailing_stop': None, 'timeout': None, 'size_pct': 10}
+    results, detail = run_backtrader(name, params, exits=1)
+    engine, trades = run_vector(name, params, exits=1)
+    assert [trade['reason'] for trade in trades] == [None, 'loop end']
+    assert normalized(trades) == normalized(results[0])
+    assert engine.ending_assets == detail['ending_assets']
+
+
+@pytest.mark.order(3)
+def test_simulresults():
+    engine, trades = run_vector('rsimom_short', PARAMS[0])
+    results = engine.simulresults(trades, detail={'strategy': 'rsimom_short', 'params': {}, 'feed': None})
+    assert results[0][:-1] == trades
+    assert results[0][-1] == results[1][0]
+    assert results[1][0]['ending_assets'] == engine.ending_assets
+    assert results[1][0]['starting_cash'] == 10000
+    with pytest.raises(ValueError):
+        engine.run(take_profit=1)
+
+
+@pytest.mark.order(4)
+def test_longs_need_futures():
+    ticks, bars, signals = market()
+    engine = VectorBacktest(ticks=ticks, bars=bars, signals=signals, bar_size_minutes=BAR,
+                            futures=False, **FAMILIES['heuristic_longs'])
+    assert engine.run(size_pct=20) == []
+    assert engine.ending_assets == 10000
+
+
+@pytest.mark.order(5)
+def test_bot_run_vector(monkeypatch, tmp_path):
+    from libs import settings
+    from libs.bot import Bot
+    from libs.strategy.indicator_cache import IndicatorCache, indicator_params
+    monkeypatch.setattr(settings, "INDICATOR_CACHE_DIR", str(tmp_path), raising=False)
+    ticks, bars, signals = market()
+    strategy_class = family_strategy('heuristic_longs', signals)
+    feeds = [SimpleNamespace(futures=True), SimpleNamespace(futures=True)]
+    cerebro = SimpleNamespace(
+        strats=[[(strategy_class, (), {})]],
+        datas=[SimpleNamespace(source_frame=lambda: ticks, bar_size_minutes=1, feed=feeds[0]),
+               SimpleNamespace(source_frame=lambda: bars, bar_size_minutes=BAR, feed=feeds[1])])
+    broker = SimpleNamespace(startingcash=10000)
+
+    def bot(cat_name='heuristic_longs'):
+        bot = Bot.__new__(Bot)
+        bot.indicator_cache = True
+        bot.sweep = "sweep"
+        bot.str_params = {1: {'cat_name': cat_name, 'str_id': 1, **PARAMS[0]}}
+        bot.str_feeds = {1: feeds}
+        bot.simulresults = {1: {0: [], 1: []}}
+        return bot
+
+    assert bot()._run_vector(cerebro=cerebro, broker=broker, leverage=1, fee=FEE) is None
+    cache = IndicatorCache(sweep="sweep")
+    params = {**dict(strategy_class.params._getitems()), **bot().str_params[1]}
+    cache.get(cache.key(strategy_class=strategy_class, params=indicator_params(params),
+                        frames=[ticks, bars]), lambda: signals)
+    assert bot('rsimom_long')._run_vector(cerebro=cerebro, broker=broker, leverage=1, fee=FEE) is None
+    results = bot()._run_vector(cerebro=cerebro, broker=broker, leverage=1, fee=FEE)
+    engine, trades = run_vector('heuristic_longs', PARAMS[0])
+    assert results[1][0][:-1] == trades
+    assert [detail['feed'] for detail in (results[1][0][-1], results[1][1][-1])] == feeds
+    assert results[1][1][-1]['ending_assets'] == engine.ending_assets
+    assert results[1][1][-1]['strategy'] == 'heuristic_longs'
+    assert 'cat_name' not in results[1][1][-1]['params']